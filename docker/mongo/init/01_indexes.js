@@ -5,3 +5,7 @@ db.flights.createIndex({ op_unique_carrier:1, fl_date:1 }, { name:"carrier_day"
 db.flights.createIndex({ origin:1, fl_date:1 }, { name:"origin_day" });
 db.flights.createIndex({ origin:1, dest:1, fl_date:1 }, { name:"route_day" });
 db.flights.createIndex({ arr_delay:1 }, { name:"arr_delay" });
+
+db.flights_performance.createIndex({ flight_id:1 }, { name:"perf_flight_id" });
+db.flights_delayed.createIndex({ flight_id:1 }, { name:"delayed_flight_id" });
+db.flights_cancelled.createIndex({ flight_id:1 }, { name:"cancelled_flight_id" });
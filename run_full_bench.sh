@@ -13,6 +13,8 @@ docker exec dbbench-cassandra cqlsh -f /docker-entrypoint-initdb.d/schema.cql
 
 echo "3/4 installing Python dependencies in runner"
 docker compose exec -T runner bash -lc "cd /app && pip install -r requirements.txt"
+# tc (netem) for the injected network delay sweep (pipeline.delays_ms)
+docker compose exec -T runner bash -lc "apt-get update -qq && apt-get install -y -qq --no-install-recommends iproute2 > /dev/null"
 
 echo "4/4 running bench_runner.py"
 docker compose exec -T runner bash -lc "cd /app && python bench_runner.py"
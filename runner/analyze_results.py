@@ -1,8 +1,13 @@
 import csv
+import re
 from pathlib import Path
 from statistics import mean
 
 RESULTS_PATH = Path("results/results.csv")
+REFERENCE_DB = "reference"
+_ROUTE_COUNT_RE = re.compile(r"^[^;()]+-[^;()]+\((\d+)\)$")
+# warianty zapytania z Scenario.param_op: parametry i odpowiedź jak operacji bazowej
+PARAM_OPS = {"rank_punctual_airlines_pipeline": "rank_punctual_airlines"}
 
 
 def load_results():
@@ -16,11 +21,29 @@ def load_results():
     return rows
 
 
+def note_tags(notes):
+    """Tagi doklejone przez bench_common.log_result po " | " (np. cache=warm)."""
+    _, _, tags = (notes or "").partition(" | ")
+    return dict(part.strip().split("=", 1) for part in tags.split(",") if "=" in part)
+
+
+# tagi, które dzielą scenariusz na osobne serie (profil serwera, protokół zapytań, tryb cache, opóźnienie sieci,
+# RTT proxy, profiler klienta)
+SERIES_TAGS = ("profile", "protocol", "cache", "net_delay", "rtt", "profiler")
+
+
+def _series(scenario, tags, keys=SERIES_TAGS):
+    """Nazwa serii, np. "postgres_top_routes_month [big_buffers/prepared/warm]"."""
+    parts = [tags[k] for k in keys if k in tags]
+    return f"{scenario} [{'/'.join(parts)}]" if parts else scenario
+
+
 def aggregate(results):
     agg = {}
 
     for r in results:
-        key = (r["db"], r["dataset"], r["scenario"])
+        scenario = _series(r["scenario"], note_tags(r["notes"]))
+        key = (r["db"], r["dataset"], scenario)
         agg.setdefault(key, []).append(r["elapsed_ms"])
 
     summary = []
@@ -41,15 +64,513 @@ def aggregate(results):
     return summary
 
 
+def _dataset_key(dataset):
+    d = str(dataset).strip().lower()
+    try:
+        if d.endswith("k"):
+            return int(float(d[:-1]) * 1000)
+        if d.endswith("m"):
+            return int(float(d[:-1]) * 1_000_000)
+        return int(d)
+    except ValueError:
+        return d
+
+
+def _note_fields(notes):
+    """Porównywalne pola notatki: pary k=v albo lista liczności tras (kolejność przy remisach jest dowolna)."""
+    notes = (notes or "").partition(" | ")[0].strip()
+    entries = [e for e in notes.split(";") if e]
+    counts = [_ROUTE_COUNT_RE.match(e) for e in entries]
+    if entries and all(counts):
+        return {"route_counts": sorted((int(m.group(1)) for m in counts), reverse=True)}
+
+    fields = {}
+    for part in notes.split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            fields[k.strip()] = v.strip()
+    return fields
+
+
+def check_against_reference(results):
+    """Porównuje notatki każdej bazy z odpowiedziami silnika referencyjnego (ten sam dataset/operacja/powtórzenie)."""
+    reference = {}
+    for r in results:
+        if r["db"] == REFERENCE_DB:
+            op = r["scenario"].split("_", 1)[-1]
+            reference[(_dataset_key(r["dataset"]), op, r["repeat"])] = _note_fields(r["notes"])
+
+    checks = {}
+    for r in results:
+        if r["db"] == REFERENCE_DB:
+            continue
+        op = r["scenario"].split("_", 1)[-1]
+        op = PARAM_OPS.get(op, op)
+        expected = reference.get((_dataset_key(r["dataset"]), op, r["repeat"]))
+        if expected is None:
+            continue
+        got = _note_fields(r["notes"])
+        common = set(expected) & set(got)
+        if not common:
+            continue
+        entry = checks.setdefault((r["db"], r["dataset"], r["scenario"]), {"checked": 0, "mismatches": []})
+        entry["checked"] += 1
+        diff = {k: (got[k], expected[k]) for k in sorted(common) if got[k] != expected[k]}
+        if diff:
+            entry["mismatches"].append((r["repeat"], diff))
+    return checks
+
+
+def print_reference_checks(checks):
+    if not checks:
+        print("\nBrak wyników do porównania z silnikiem referencyjnym.")
+        return
+
+    print("\nZgodność z silnikiem referencyjnym:")
+    for (db, dataset, scenario), entry in sorted(checks.items()):
+        bad = len(entry["mismatches"])
+        status = "OK" if not bad else f"{bad} rozbieżności"
+        print(f"{db:8} {dataset:8} {scenario[:30]:30} {entry['checked']:3d} {status}")
+        for repeat, diff in entry["mismatches"][:3]:
+            details = "; ".join(f"{k}: {got} != {exp}" for k, (got, exp) in diff.items())
+            print(f"    run={repeat}: {details}")
+
+
+_IMPORT_PHASE_RE = re.compile(r"^[a-z]+_import_(\w+)$")
+_IMPORT_PHASE_ORDER = ["parse", "transform", "deindex", "dimensions", "facts", "commit", "flush", "logged", "index",
+                       "constraints", "analyze", "total"]
+
+
+def _phase_key(phase):
+    return _IMPORT_PHASE_ORDER.index(phase) if phase in _IMPORT_PHASE_ORDER else len(_IMPORT_PHASE_ORDER)
+
+
+def import_throughput(results):
+    """Wiersze <db>_import_<faza>: czas fazy i przepustowość (rows/s, bytes/s) w funkcji rozmiaru datasetu."""
+    rows = []
+    for r in results:
+        m = _IMPORT_PHASE_RE.match(r["scenario"])
+        if not m:
+            continue
+        fields = _note_fields(r["notes"])
+        try:
+            rows_per_s = float(fields.get("rows_per_s", 0))
+            # bytes_per_s tylko dla parse / facts / total (import_timing.THROUGHPUT_PHASES)
+            bytes_per_s = float(fields["bytes_per_s"]) if "bytes_per_s" in fields else None
+        except ValueError:
+            continue
+        rows.append({
+            "db": r["db"],
+            "dataset": r["dataset"],
+            "phase": m.group(1),
+            "elapsed_ms": r["elapsed_ms"],
+            "rows": int(fields.get("rows", 0) or 0),
+            "rows_per_s": rows_per_s,
+            "bytes_per_s": bytes_per_s,
+            "workers": fields.get("workers", "-"),
+            "concurrency": fields.get("concurrency", "-"),
+        })
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), str(x["workers"]).zfill(4),
+                             str(x["concurrency"]).zfill(4), _phase_key(x["phase"])))
+    return rows
+
+
+def print_import_throughput(rows):
+    if not rows:
+        return
+
+    print("\nImport - fazy:")
+    header = (f"{'DB':8} {'DATASET':8} {'W':3} {'C':3} {'PHASE':12} {'TIME[ms]':10} {'ROWS':9} {'ROWS/s':10} "
+              f"{'MB/s':8}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        mb_per_s = "-" if row["bytes_per_s"] is None else f"{row['bytes_per_s'] / 1e6:8.2f}"
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['workers']:>3} "
+            f"{row['concurrency']:>3} "
+            f"{row['phase']:12} "
+            f"{row['elapsed_ms']:10.1f} "
+            f"{row['rows']:9d} "
+            f"{row['rows_per_s']:10.0f} "
+            f"{mb_per_s:>8}"
+        )
+
+
+SERVER_METRICS = ("hit_ratio", "rows_read", "bytes_read")
+
+
+def server_metrics(results):
+    """Średnie pól pochodnych z liczników serwera (tagi server_metrics.py) per baza/dataset/scenariusz."""
+    agg = {}
+    for r in results:
+        tags = note_tags(r["notes"])
+        values = {k: float(tags[k]) for k in SERVER_METRICS if k in tags}
+        if not values:
+            continue
+        scenario = _series(r["scenario"], tags)
+        entry = agg.setdefault((r["db"], r["dataset"], scenario), {k: [] for k in SERVER_METRICS})
+        for k, v in values.items():
+            entry[k].append(v)
+
+    rows = []
+    for (db, dataset, scenario), values in agg.items():
+        rows.append({
+            "db": db,
+            "dataset": dataset,
+            "scenario": scenario,
+            **{k: mean(v) if v else None for k, v in values.items()},
+        })
+    rows.sort(key=lambda x: (x["db"], x["dataset"], x["scenario"]))
+    return rows
+
+
+def print_server_metrics(rows):
+    if not rows:
+        return
+
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print("\nLiczniki serwera (średnio na powtórzenie):")
+    header = f"{'DB':8} {'DATASET':8} {'SCENARIO':38} {'HIT':>7} {'ROWS':>12} {'MB READ':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        mb = row["bytes_read"] / 1e6 if row["bytes_read"] is not None else None
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['scenario'][:38]:38} "
+            f"{fmt(row['hit_ratio'], '7.4f'):>7} "
+            f"{fmt(row['rows_read'], '12.0f'):>12} "
+            f"{fmt(mb, '9.2f'):>9}"
+        )
+
+
+_RESULT_CACHE_RE = re.compile(r"^[a-z]+_result_cache_(off|on)$")
+
+
+def result_cache_runs(results):
+    """Wiersze mieszanego workloadu z result_cache.py: odczyty bez cache i przez cache."""
+    rows = []
+    for r in results:
+        m = _RESULT_CACHE_RE.match(r["scenario"])
+        if not m:
+            continue
+        fields = _note_fields(r["notes"])
+        try:
+            rows.append({
+                "db": r["db"],
+                "dataset": r["dataset"],
+                "mode": m.group(1),
+                "hit_rate": float(fields.get("hit_rate", 0)),
+                "p50_ms": float(fields.get("p50_ms", 0)),
+                "p99_ms": float(fields.get("p99_ms", 0)),
+                "stale": int(fields.get("stale", 0)),
+                "age_max_ms": float(fields.get("age_max_ms", 0)),
+            })
+        except ValueError:
+            continue
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), x["mode"]))
+    return rows
+
+
+def print_result_cache_runs(rows):
+    if not rows:
+        return
+
+    print("\nCache wyników - mieszany workload (odczyty):")
+    header = f"{'DB':12} {'DATASET':8} {'CACHE':5} {'HIT':>6} {'P50[ms]':>9} {'P99[ms]':>9} {'STALE':>6} {'AGE MAX[ms]':>12}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['db']:12} "
+            f"{row['dataset']:8} "
+            f"{row['mode']:5} "
+            f"{row['hit_rate']:6.3f} "
+            f"{row['p50_ms']:9.3f} "
+            f"{row['p99_ms']:9.3f} "
+            f"{row['stale']:6d} "
+            f"{row['age_max_ms']:12.1f}"
+        )
+
+
+def best_profiles(results):
+    """Per baza/dataset/scenariusz (i tryb cache): profil serwera z najniższym średnim czasem."""
+    agg = {}
+    for r in results:
+        tags = note_tags(r["notes"])
+        if "profile" not in tags or r["scenario"].endswith("_server_profile"):
+            continue
+        series = agg.setdefault((r["db"], r["dataset"], _series(r["scenario"], tags, ("protocol", "cache"))), {})
+        series.setdefault(tags["profile"], []).append(r["elapsed_ms"])
+
+    rows = []
+    for (db, dataset, scenario), profiles in agg.items():
+        if len(profiles) < 2:
+            continue
+        avg = {name: mean(times) for name, times in profiles.items()}
+        best = min(avg, key=avg.get)
+        # punkt odniesienia: profil "default", a bez niego najwolniejszy
+        base = "default" if "default" in avg else max(avg, key=avg.get)
+        rows.append({
+            "db": db,
+            "dataset": dataset,
+            "scenario": scenario,
+            "best": best,
+            "best_ms": avg[best],
+            "base": base,
+            "speedup": avg[base] / avg[best] if avg[best] > 0 else None,
+        })
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), x["scenario"]))
+    return rows
+
+
+def print_best_profiles(rows):
+    if not rows:
+        return
+
+    print("\nNajlepszy profil konfiguracji serwera:")
+    header = f"{'DB':8} {'DATASET':8} {'SCENARIO':38} {'BEST':16} {'AVG[ms]':>9} {'VS':16} {'SPEEDUP':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        speedup = "-" if row["speedup"] is None else f"{row['speedup']:7.2f}x"
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['scenario'][:38]:38} "
+            f"{row['best'][:16]:16} "
+            f"{row['best_ms']:9.2f} "
+            f"{row['base'][:16]:16} "
+            f"{speedup:>8}"
+        )
+
+
+def prepared_vs_text(results):
+    """Średni czas scenariusza w protokole text i prepared (tag protocol) - różnica to głównie parse/plan."""
+    agg = {}
+    for r in results:
+        tags = note_tags(r["notes"])
+        if tags.get("protocol") not in ("text", "prepared"):
+            continue
+        key = (r["db"], r["dataset"], _series(r["scenario"], tags, ("profile", "cache")))
+        agg.setdefault(key, {}).setdefault(tags["protocol"], []).append(r["elapsed_ms"])
+
+    rows = []
+    for (db, dataset, scenario), modes in agg.items():
+        if len(modes) < 2:
+            continue
+        text_ms, prepared_ms = mean(modes["text"]), mean(modes["prepared"])
+        rows.append({
+            "db": db,
+            "dataset": dataset,
+            "scenario": scenario,
+            "text_ms": text_ms,
+            "prepared_ms": prepared_ms,
+            "saved_ms": text_ms - prepared_ms,
+        })
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), x["scenario"]))
+    return rows
+
+
+def print_prepared_vs_text(rows):
+    if not rows:
+        return
+
+    print("\nInstrukcje przygotowane vs tekst zapytania:")
+    header = f"{'DB':8} {'DATASET':8} {'SCENARIO':38} {'TEXT[ms]':>9} {'PREP[ms]':>9} {'SAVED[ms]':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['scenario'][:38]:38} "
+            f"{row['text_ms']:9.2f} "
+            f"{row['prepared_ms']:9.2f} "
+            f"{row['saved_ms']:10.2f}"
+        )
+
+
+_STATS_RE = re.compile(r"^([a-z]+)_add_flight_stats(_pipelined)?$")
+
+
+def pipelined_vs_sequential(results):
+    """add_flight_stats (3 round tripy) obok add_flight_stats_pipelined (1) - lokalnie i pod tagiem net_delay."""
+    agg = {}
+    for r in results:
+        m = _STATS_RE.match(r["scenario"])
+        if not m:
+            continue
+        tags = note_tags(r["notes"])
+        key = (r["db"], r["dataset"], tags.get("net_delay", "local"), _series("", tags, ("profile", "cache")).strip())
+        agg.setdefault(key, {}).setdefault("pipelined" if m.group(2) else "sequential", []).append(r["elapsed_ms"])
+
+    rows = []
+    for (db, dataset, net, series), variants in agg.items():
+        if len(variants) < 2:
+            continue
+        seq_ms, pipe_ms = mean(variants["sequential"]), mean(variants["pipelined"])
+        rows.append({
+            "db": db,
+            "dataset": dataset,
+            "net": net,
+            "series": series,
+            "sequential_ms": seq_ms,
+            "pipelined_ms": pipe_ms,
+            "speedup": seq_ms / pipe_ms if pipe_ms > 0 else None,
+        })
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), x["series"],
+                             float(x["net"].rstrip("ms")) if x["net"] != "local" else -1.0))
+    return rows
+
+
+def print_pipelined_vs_sequential(rows):
+    if not rows:
+        return
+
+    print("\nadd_flight_stats: sekwencyjnie vs pipelined:")
+    header = f"{'DB':8} {'DATASET':8} {'NET':8} {'SERIES':16} {'SEQ[ms]':>9} {'PIPE[ms]':>9} {'SPEEDUP':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        speedup = "-" if row["speedup"] is None else f"{row['speedup']:7.2f}x"
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['net']:8} "
+            f"{row['series'][:16]:16} "
+            f"{row['sequential_ms']:9.2f} "
+            f"{row['pipelined_ms']:9.2f} "
+            f"{speedup:>8}"
+        )
+
+
+def rtt_sensitivity(results):
+    """
+    Przemiatanie network.rtt_ms: średni czas przy najmniejszym i największym RTT oraz nachylenie prostej
+    czas(RTT) - ms czasu na 1 ms RTT, czyli w przybliżeniu liczba podróży do serwera na operację.
+    """
+    agg = {}
+    for r in results:
+        tags = note_tags(r["notes"])
+        if "rtt" not in tags:
+            continue
+        key = (r["db"], r["dataset"], _series(r["scenario"], tags, ("profile", "protocol", "cache")))
+        agg.setdefault(key, {}).setdefault(float(tags["rtt"].rstrip("ms")), []).append(r["elapsed_ms"])
+
+    rows = []
+    for (db, dataset, scenario), by_rtt in agg.items():
+        if len(by_rtt) < 2:
+            continue
+        points = sorted((rtt, mean(times)) for rtt, times in by_rtt.items())
+        rtt_avg = mean(rtt for rtt, _ in points)
+        ms_avg = mean(ms for _, ms in points)
+        slope = (sum((rtt - rtt_avg) * (ms - ms_avg) for rtt, ms in points)
+                 / sum((rtt - rtt_avg) ** 2 for rtt, _ in points))
+        rows.append({
+            "db": db,
+            "dataset": dataset,
+            "scenario": scenario,
+            "rtt_range": f"{points[0][0]:g}-{points[-1][0]:g}",
+            "min_rtt_ms": points[0][1],
+            "max_rtt_ms": points[-1][1],
+            "trips": slope,
+        })
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), -x["trips"]))
+    return rows
+
+
+def print_rtt_sensitivity(rows):
+    if not rows:
+        return
+
+    print("\nWrażliwość na RTT (proxy network.rtt_ms; TRIPS = ms czasu na 1 ms RTT):")
+    header = f"{'DB':8} {'DATASET':8} {'SCENARIO':38} {'RTT[ms]':>9} {'LOW[ms]':>9} {'HIGH[ms]':>9} {'TRIPS':>7}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['scenario'][:38]:38} "
+            f"{row['rtt_range']:>9} "
+            f"{row['min_rtt_ms']:9.2f} "
+            f"{row['max_rtt_ms']:9.2f} "
+            f"{row['trips']:7.2f}"
+        )
+
+
+def client_cpu(results):
+    """profiling.enabled: czas CPU klienta (process_time) na tle czasu scenariusza, pauzy GC i alokacje."""
+    agg = {}
+    for r in results:
+        tags = note_tags(r["notes"])
+        if "cpu_ms" not in tags:
+            continue
+        entry = agg.setdefault((r["db"], r["dataset"], _series(r["scenario"], tags)),
+                               {"wall": [], "cpu": [], "gc": [], "alloc": []})
+        entry["wall"].append(r["elapsed_ms"])
+        entry["cpu"].append(float(tags["cpu_ms"]))
+        entry["gc"].append(float(tags.get("gc_ms", 0)))
+        if "alloc_kb" in tags:
+            entry["alloc"].append(float(tags["alloc_kb"]))
+
+    rows = []
+    for (db, dataset, scenario), entry in agg.items():
+        wall_ms, cpu_ms = mean(entry["wall"]), mean(entry["cpu"])
+        rows.append({
+            "db": db,
+            "dataset": dataset,
+            "scenario": scenario,
+            "wall_ms": wall_ms,
+            "cpu_ms": cpu_ms,
+            "cpu_share": cpu_ms / wall_ms if wall_ms > 0 else None,
+            "gc_ms": mean(entry["gc"]),
+            "alloc_kb": mean(entry["alloc"]) if entry["alloc"] else None,
+        })
+    rows.sort(key=lambda x: (x["db"], str(_dataset_key(x["dataset"])).zfill(12), -(x["cpu_share"] or 0)))
+    return rows
+
+
+def print_client_cpu(rows):
+    if not rows:
+        return
+
+    print("\nPraca klienta w czasie scenariusza (CPU procesu runnera, wszystkie wątki):")
+    header = (f"{'DB':8} {'DATASET':8} {'SCENARIO':38} {'AVG[ms]':>9} {'CPU[ms]':>9} {'CPU%':>6} "
+              f"{'GC[ms]':>8} {'ALLOC[KiB]':>10}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        share = "-" if row["cpu_share"] is None else f"{row['cpu_share'] * 100:5.0f}%"
+        alloc = "-" if row["alloc_kb"] is None else f"{row['alloc_kb']:10.1f}"
+        print(
+            f"{row['db']:8} "
+            f"{row['dataset']:8} "
+            f"{row['scenario'][:38]:38} "
+            f"{row['wall_ms']:9.2f} "
+            f"{row['cpu_ms']:9.2f} "
+            f"{share:>6} "
+            f"{row['gc_ms']:8.2f} "
+            f"{alloc:>10}"
+        )
+
+
 def print_table(summary):
-    header = f"{'DB':8} {'DATASET':8} {'SCENARIO':30} {'N':3} {'AVG[ms]':8} {'MIN':8} {'MAX':8}"
+    header = f"{'DB':8} {'DATASET':8} {'SCENARIO':38} {'N':3} {'AVG[ms]':8} {'MIN':8} {'MAX':8}"
     print(header)
     print("-" * len(header))
     for row in summary:
         print(
             f"{row['db']:8} "
             f"{row['dataset']:8} "
-            f"{row['scenario'][:30]:30} "
+            f"{row['scenario'][:38]:38} "
             f"{row['n']:3d} "
             f"{row['avg_ms']:8.2f} "
             f"{row['min_ms']:8.2f} "
@@ -64,3 +585,12 @@ if __name__ == "__main__":
     results = load_results()
     summary = aggregate(results)
     print_table(summary)
+    print_reference_checks(check_against_reference(results))
+    print_import_throughput(import_throughput(results))
+    print_server_metrics(server_metrics(results))
+    print_result_cache_runs(result_cache_runs(results))
+    print_best_profiles(best_profiles(results))
+    print_prepared_vs_text(prepared_vs_text(results))
+    print_pipelined_vs_sequential(pipelined_vs_sequential(results))
+    print_rtt_sensitivity(rtt_sensitivity(results))
+    print_client_cpu(client_cpu(results))
@@ -1,24 +1,61 @@
-import time
+import os
 from datetime import datetime, timedelta, date
 from cassandra.cluster import Cluster
 from cassandra.query import SimpleStatement
 
-from bench_common import log_result
+from scenario import (Scenario, SkipScenario, carrier_day_params, forget_write_state, month_param, month_range,
+                      route_params, run_scenarios, write_state)
 
 
 def cass_client():
-    host = "cassandra"
-    port = 9042
+    host = os.getenv("CASSANDRA_HOST", "cassandra")
+    port = int(os.getenv("CASSANDRA_PORT", 9042))
     cluster = Cluster([host], port=port)
     sess = cluster.connect("flights")
     sess.default_timeout = 20
     return sess
 
+
+_SESSION = None
+
+
+def shared_cass_session():
+    """Jedna sesja na wszystkie scenariusze (cass_client() za każdym razem tworzy nowy Cluster)."""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = cass_client()
+    return _SESSION
+
+
+def close_cass_session():
+    global _SESSION
+    if _SESSION is not None:
+        _SESSION.cluster.shutdown()
+        _SESSION = None
+
 def reset_cassandra():
     s = cass_client()
     s.execute("TRUNCATE flights_by_route_day;")
     s.execute("TRUNCATE flights_by_carrier_day;")
 
+
+def cleanup_cassandra(cfg, keep_rows: int):
+    """Usuwa wiersze wstawione przez scenariusze zapisu (po kluczach ze stanu zapisu; import nie ma flight_id)."""
+    s = cass_client()
+    written = write_state("cassandra").cass_written
+    for origin, dest, fl_date, dep_time, carrier, fl_num in set(written):
+        s.execute(
+            "DELETE FROM flights_by_route_day WHERE origin = %s AND dest = %s AND fl_date = %s "
+            "AND dep_time = %s AND op_unique_carrier = %s AND op_carrier_fl_num = %s",
+            (origin, dest, fl_date, dep_time, carrier, fl_num),
+        )
+        s.execute(
+            "DELETE FROM flights_by_carrier_day WHERE op_unique_carrier = %s AND fl_date = %s "
+            "AND dep_time = %s AND origin = %s AND dest = %s AND op_carrier_fl_num = %s",
+            (carrier, fl_date, dep_time, origin, dest, fl_num),
+        )
+    forget_write_state("cassandra")
+
 import csv
 
 def import_to_cassandra(file_name):
@@ -125,40 +162,7 @@ def _parse_date(iso_str: str) -> date:
     return datetime.fromisoformat(iso_str).date()
 
 
-
-def s_cass_add_flight(cfg, iteration: int):
-    """
-    Analog mysql_add_flight:
-    bierzemy kolejne flight sample z queries.insert_flight.flights
-    i wstawiamy do flights_by_route_day + flights_by_carrier_day.
-    """
-    s = cass_client()
-    insert_cfg = cfg["queries"]["insert_flight"]
-    flights = insert_cfg.get("flights", [])
-    if not flights:
-        return 0.0, "no_flights_in_config"
-
-    flight = flights[(iteration - 1) % len(flights)]
-
-    fl_date_str = flight["fl_date"]
-    fl_date = _parse_date(fl_date_str)
-
-    origin = str(flight["origin"])
-    dest = str(flight["dest"])
-    carrier = str(flight["op_unique_carrier"])
-    fl_num = int(flight["op_carrier_fl_num"])
-    dep_time = int(flight.get("crs_dep_time", 0))
-    distance = int(flight.get("distance", 0))
-
-    arr_delay = 0
-    dep_delay = 0
-    cancelled = 0
-    diverted = 0
-
-    t0 = time.perf_counter()
-
-    s.execute(
-        """
+INSERT_ROUTE_DAY_CQL = """
         INSERT INTO flights_by_route_day (
             origin, dest, fl_date, dep_time,
             op_unique_carrier, op_carrier_fl_num,
@@ -166,365 +170,351 @@ def s_cass_add_flight(cfg, iteration: int):
             cancelled, diverted
         )
         VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """,
-        (
-            origin, dest, fl_date, dep_time,
-            carrier, fl_num,
-            arr_delay, dep_delay, distance,
-            cancelled, diverted,
-        ),
-    )
-
-    s.execute(
         """
+
+INSERT_CARRIER_DAY_CQL = """
         INSERT INTO flights_by_carrier_day (
             op_unique_carrier, fl_date, dep_time,
             origin, dest, op_carrier_fl_num,
             arr_delay, dep_delay, cancelled, diverted
         )
         VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """,
-        (
-            carrier, fl_date, dep_time,
-            origin, dest, fl_num,
-            arr_delay, dep_delay,
-            cancelled, diverted,
-        ),
-    )
-
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, "OK"
-
+        """
 
-def s_cass_add_flight_stats(cfg, iteration: int):
-    """
-    Analog mysql_add_flight_stats:
-    łączy dane z insert_flight + update_flight.flight_performance
-    i wstawia kolejne wiersze z arr_delay / dep_delay itp.
-    """
-    s = cass_client()
 
-    insert_cfg = cfg["queries"]["insert_flight"]
-    flights = insert_cfg.get("flights", [])
-    update_cfg = cfg["queries"]["update_flight"]
-    perf_list = update_cfg.get("flight_performance", [])
+def _bucket_counts(rows, bins) -> list:
+    counts = [0] * len(bins)
 
-    if not flights or not perf_list:
-        return 0.0, "no_flights_or_performance"
+    for row in rows:
+        v = row.arr_delay
+        if v is None:
+            continue
+        v = float(v)
+        placed = False
+        for i in range(len(bins) - 1):
+            if bins[i] <= v < bins[i + 1]:
+                counts[i] += 1
+                placed = True
+                break
+        if not placed:
+            counts[-1] += 1
+    return counts
 
-    flight = flights[(iteration - 1) % len(flights)]
-    perf = perf_list[(iteration - 1) % len(perf_list)]
 
-    fl_date_str = flight["fl_date"]
-    fl_date = _parse_date(fl_date_str)
+class CassScenario(Scenario):
+    """Wspólna sesja w prepare() - bez nowego Cluster/connect w każdym powtórzeniu."""
 
-    origin = str(flight["origin"])
-    dest = str(flight["dest"])
-    carrier = str(flight["op_unique_carrier"])
-    fl_num = int(flight["op_carrier_fl_num"])
-    distance = int(flight.get("distance", 0))
+    def prepare(self, ctx):
+        ctx.conn = shared_cass_session()
 
-    dep_time = int(perf.get("dep_time", 0))
-    arr_delay = int(perf.get("arr_delay", 0))
-    dep_delay = int(perf.get("dep_delay", 0))
-    cancelled = 1 if perf.get("cancelled") else 0
-    diverted = 1 if perf.get("diverted") else 0
 
-    t0 = time.perf_counter()
+class CassWriteScenario(CassScenario):
+    """Wstawia ten sam lot do obu tabel; klucz wiersza trafia do stanu zapisu (sprzątanie przed importem)."""
 
-    s.execute(
-        """
-        INSERT INTO flights_by_route_day (
-            origin, dest, fl_date, dep_time,
-            op_unique_carrier, op_carrier_fl_num,
-            arr_delay, dep_delay, distance,
-            cancelled, diverted
-        )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """,
-        (
+    def set_row(self, ctx, origin, dest, fl_date, dep_time, carrier, fl_num, arr_delay, dep_delay, distance,
+                cancelled, diverted):
+        ctx.params["route_args"] = (
             origin, dest, fl_date, dep_time,
             carrier, fl_num,
             arr_delay, dep_delay, distance,
             cancelled, diverted,
-        ),
-    )
-
-    s.execute(
-        """
-        INSERT INTO flights_by_carrier_day (
-            op_unique_carrier, fl_date, dep_time,
-            origin, dest, op_carrier_fl_num,
-            arr_delay, dep_delay, cancelled, diverted
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """,
-        (
+        ctx.params["carrier_args"] = (
             carrier, fl_date, dep_time,
             origin, dest, fl_num,
             arr_delay, dep_delay,
             cancelled, diverted,
-        ),
-    )
+        )
+        ctx.params["key"] = (origin, dest, fl_date, dep_time, carrier, fl_num)
 
-    dt = (time.perf_counter() - t0) * 1000
-    note = f"carrier={carrier}, route={origin}-{dest}"
-    return dt, note
+    def run(self, ctx):
+        ctx.conn.execute(INSERT_ROUTE_DAY_CQL, ctx.params["route_args"])
+        ctx.conn.execute(INSERT_CARRIER_DAY_CQL, ctx.params["carrier_args"])
+        return ctx.params["note"]
 
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.cass_written.append(ctx.params["key"])
 
-def s_cass_top_routes_month(cfg, iteration: int):
+
+class CassAddFlight(CassWriteScenario):
+    """
+    Analog mysql_add_flight:
+    bierzemy kolejne flight sample z queries.insert_flight.flights
+    i wstawiamy do flights_by_route_day + flights_by_carrier_day.
+    """
+    name = "cass_add_flight"
+
+    def prepare(self, ctx):
+        flights = ctx.cfg["queries"]["insert_flight"].get("flights", [])
+        if not flights:
+            raise SkipScenario("no_flights_in_config")
+        super().prepare(ctx)
+
+        flight = flights[(ctx.iteration - 1) % len(flights)]
+        self.set_row(
+            ctx,
+            origin=str(flight["origin"]),
+            dest=str(flight["dest"]),
+            fl_date=_parse_date(flight["fl_date"]),
+            dep_time=int(flight.get("crs_dep_time", 0)),
+            carrier=str(flight["op_unique_carrier"]),
+            fl_num=int(flight["op_carrier_fl_num"]),
+            arr_delay=0,
+            dep_delay=0,
+            distance=int(flight.get("distance", 0)),
+            cancelled=0,
+            diverted=0,
+        )
+        ctx.params["note"] = "OK"
+
+
+class CassAddFlightStats(CassWriteScenario):
+    """
+    Analog mysql_add_flight_stats:
+    łączy dane z insert_flight + update_flight.flight_performance
+    i wstawia kolejne wiersze z arr_delay / dep_delay itp.
+    """
+    name = "cass_add_flight_stats"
+
+    def prepare(self, ctx):
+        flights = ctx.cfg["queries"]["insert_flight"].get("flights", [])
+        perf_list = ctx.cfg["queries"]["update_flight"].get("flight_performance", [])
+        if not flights or not perf_list:
+            raise SkipScenario("no_flights_or_performance")
+        super().prepare(ctx)
+
+        flight = flights[(ctx.iteration - 1) % len(flights)]
+        perf = perf_list[(ctx.iteration - 1) % len(perf_list)]
+        origin, dest, carrier = str(flight["origin"]), str(flight["dest"]), str(flight["op_unique_carrier"])
+        self.set_row(
+            ctx,
+            origin=origin,
+            dest=dest,
+            fl_date=_parse_date(flight["fl_date"]),
+            dep_time=int(perf.get("dep_time", 0)),
+            carrier=carrier,
+            fl_num=int(flight["op_carrier_fl_num"]),
+            arr_delay=int(perf.get("arr_delay", 0)),
+            dep_delay=int(perf.get("dep_delay", 0)),
+            distance=int(flight.get("distance", 0)),
+            cancelled=1 if perf.get("cancelled") else 0,
+            diverted=1 if perf.get("diverted") else 0,
+        )
+        ctx.params["note"] = f"carrier={carrier}, route={origin}-{dest}"
+
+
+class CassTopRoutesMonth(CassScenario):
     """
     Analog top_routes_month – korzystamy z flights_by_route_day,
     filtrujemy po fl_date (zakres miesiąca) i liczymy średni arr_delay.
     """
-    s = cass_client()
-    month_cfg = cfg["queries"]["top_routes_month"]["month"]
-    y, m = map(int, month_cfg.split("-"))
-    start = datetime(y, m, 1).date()
-    end = datetime(y + 1, 1, 1).date() if m == 12 else datetime(y, m + 1, 1).date()
-
-    stmt = SimpleStatement(
-        "SELECT origin, dest, arr_delay FROM flights_by_route_day "
-        "WHERE fl_date >= %s AND fl_date < %s ALLOW FILTERING"
-    )
+    name = "cass_top_routes_month"
 
-    t0 = time.perf_counter()
-    agg = {}
-    scanned = 0
-
-    for row in s.execute(stmt, (start, end)):
-        key = (row.origin, row.dest)
-        if row.arr_delay is not None:
-            tot, cnt = agg.get(key, (0.0, 0))
-            tot += float(row.arr_delay)
-            cnt += 1
-            agg[key] = (tot, cnt)
-            scanned += 1
-
-    top = sorted(
-        (
-            (k, (tot / cnt if cnt else 0.0), cnt)
-            for k, (tot, cnt) in agg.items()
-        ),
-        key=lambda x: x[1],
-        reverse=True,
-    )[:10]
-
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"rows={len(top)} scanned={scanned}"
-
-
-def s_cass_histogram_arr_delay(cfg, iteration: int):
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["stmt"] = SimpleStatement(
+            "SELECT origin, dest, arr_delay FROM flights_by_route_day "
+            "WHERE fl_date >= %s AND fl_date < %s ALLOW FILTERING"
+        )
+        ctx.params["args"] = month_range(*month_param(ctx))
+
+    def run(self, ctx):
+        agg = {}
+        scanned = 0
+
+        for row in ctx.conn.execute(ctx.params["stmt"], ctx.params["args"]):
+            key = (row.origin, row.dest)
+            if row.arr_delay is not None:
+                tot, cnt = agg.get(key, (0.0, 0))
+                tot += float(row.arr_delay)
+                cnt += 1
+                agg[key] = (tot, cnt)
+                scanned += 1
+
+        top = sorted(
+            (
+                (k, (tot / cnt if cnt else 0.0), cnt)
+                for k, (tot, cnt) in agg.items()
+            ),
+            key=lambda x: x[1],
+            reverse=True,
+        )[:10]
+
+        return f"rows={len(top)} scanned={scanned}"
+
+
+class CassHistogramArrDelay(CassScenario):
     """
     Analog histogram_arr_delay – globalnie po flights_by_route_day.
     """
-    s = cass_client()
-    bins = cfg["queries"]["histogram_arr_delay"]["bins"]
-    stmt = SimpleStatement("SELECT arr_delay FROM flights_by_route_day")
+    name = "cass_histogram_arr_delay"
 
-    t0 = time.perf_counter()
-    counts = [0] * len(bins)
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["bins"] = ctx.cfg["queries"]["histogram_arr_delay"]["bins"]
+        ctx.params["stmt"] = SimpleStatement("SELECT arr_delay FROM flights_by_route_day")
 
-    for row in s.execute(stmt):
-        v = row.arr_delay
-        if v is None:
-            continue
-        v = float(v)
-        placed = False
-        for i in range(len(bins) - 1):
-            if bins[i] <= v < bins[i + 1]:
-                counts[i] += 1
-                placed = True
-                break
-        if not placed:
-            counts[-1] += 1
-
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"buckets={len(counts)}"
+    def run(self, ctx):
+        counts = _bucket_counts(ctx.conn.execute(ctx.params["stmt"]), ctx.params["bins"])
+        return f"buckets={len(counts)}"
 
 
-def s_cass_find_route_with_stats(cfg, iteration: int):
+class CassFindRouteWithStats(CassScenario):
     """
     Analog find_flights_route_range_with_stats:
     bazujemy na flights_by_route_day – arr_delay, dep_delay, cancelled, diverted
     mamy w jednym wierszu, więc "statystyki" są od razu z tabeli.
     """
-    s = cass_client()
-    q = cfg["queries"]["find_all_flights_on_route"]
-    routes = q.get("routes", [])
-    if not routes:
-        return 0.0, "no_routes_in_config"
-
-    route = routes[(iteration - 1) % len(routes)]
-    origin = route.get("origin")
-    dest = route.get("dest")
-    date_from = _parse_date(route.get("date_from"))
-    date_to = _parse_date(route.get("date_to"))
-    limit = int(q.get("limit", 1000))
-
-    stmt = SimpleStatement(
-        """
-        SELECT origin, dest, fl_date, dep_time,
-               op_unique_carrier, op_carrier_fl_num,
-               arr_delay, dep_delay, cancelled, diverted
-        FROM flights_by_route_day
-        WHERE origin = %s AND dest = %s
-          AND fl_date >= %s AND fl_date <= %s
-        ALLOW FILTERING
-        """
-    )
-
-    t0 = time.perf_counter()
-    count = 0
-    for row in s.execute(stmt, (origin, dest, date_from, date_to)):
-        count += 1
-        if count >= limit:
-            break
+    name = "cass_find_route_with_stats"
+
+    def prepare(self, ctx):
+        origin, dest, date_from, date_to, limit = route_params(ctx)
+        super().prepare(ctx)
+
+        ctx.params["args"] = (origin, dest, _parse_date(date_from), _parse_date(date_to))
+        ctx.params["limit"] = limit
+        ctx.params["stmt"] = SimpleStatement(
+            """
+            SELECT origin, dest, fl_date, dep_time,
+                   op_unique_carrier, op_carrier_fl_num,
+                   arr_delay, dep_delay, cancelled, diverted
+            FROM flights_by_route_day
+            WHERE origin = %s AND dest = %s
+              AND fl_date >= %s AND fl_date <= %s
+            ALLOW FILTERING
+            """
+        )
 
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"count={count}"
+    def run(self, ctx):
+        limit = ctx.params["limit"]
+        count = 0
+        for row in ctx.conn.execute(ctx.params["stmt"], ctx.params["args"]):
+            count += 1
+            if count >= limit:
+                break
+        return f"count={count}"
 
 
-def s_cass_rank_punctual_airlines(cfg, iteration: int):
+class CassRankPunctualAirlines(CassScenario):
     """
     Analog mysql_rank_punctual_airlines:
-    - dla miesiąca = iteration (1..12) liczymy:
+    - dla miesiąca (i roku) z generatora parametrów liczymy:
       avg_arr_delay + (cancelled_count * cancellation_weight / total_flights) * 100
     na podstawie flights_by_route_day (pole cancelled).
     """
-    s = cass_client()
-    rank_cfg = cfg["queries"]["airlines_ranking"]
-    limit = int(rank_cfg["limit"])
-    cancellation_weight = float(rank_cfg["cancellation_weight"])
-
-    month = iteration
-    year = 2018  
-    start = datetime(year, month, 1).date()
-    end = datetime(year + 1, 1, 1).date() if month == 12 else datetime(year, month + 1, 1).date()
-
-    stmt = SimpleStatement(
-        """
-        SELECT op_unique_carrier, arr_delay, cancelled
-        FROM flights_by_route_day
-        WHERE fl_date >= %s AND fl_date < %s
-        ALLOW FILTERING
-        """
-    )
-
-    t0 = time.perf_counter()
-    stats = {}  
-
-    for row in s.execute(stmt, (start, end)):
-        carrier = row.op_unique_carrier or "UNK"
-        if carrier not in stats:
-            stats[carrier] = {"sum_delay": 0.0, "total": 0, "cancelled": 0}
-
-        if row.arr_delay is not None:
-            stats[carrier]["sum_delay"] += float(row.arr_delay)
-            stats[carrier]["total"] += 1
-
-        if row.cancelled is not None and int(row.cancelled) != 0:
-            stats[carrier]["cancelled"] += 1
-
-    scores = []
-    for carrier, s_data in stats.items():
-        total = max(s_data["total"], 1)
-        avg_delay = s_data["sum_delay"] / total if s_data["total"] > 0 else 0.0
-        cancel_component = (s_data["cancelled"] * cancellation_weight / total) * 100.0
-        score = avg_delay + cancel_component
-        scores.append((carrier, score))
-
-    if not scores:
-        dt = (time.perf_counter() - t0) * 1000
-        return dt, f"month={month}, no_results"
-
-    scores.sort(key=lambda x: x[1])
-    best_carrier = scores[0][0]
-    dt = (time.perf_counter() - t0) * 1000
-    note = f"month={month}, most_punctual={best_carrier}"
-    return dt, note
-
+    name = "cass_rank_punctual_airlines"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        ctx.params["cancellation_weight"] = float(rank_cfg["cancellation_weight"])
+
+        year, month = month_param(ctx)
+        ctx.params["month"] = month
+        ctx.params["args"] = month_range(year, month)
+        ctx.params["stmt"] = SimpleStatement(
+            """
+            SELECT op_unique_carrier, arr_delay, cancelled
+            FROM flights_by_route_day
+            WHERE fl_date >= %s AND fl_date < %s
+            ALLOW FILTERING
+            """
+        )
 
+    def run(self, ctx):
+        cancellation_weight, month = ctx.params["cancellation_weight"], ctx.params["month"]
+        stats = {}
+
+        for row in ctx.conn.execute(ctx.params["stmt"], ctx.params["args"]):
+            carrier = row.op_unique_carrier or "UNK"
+            if carrier not in stats:
+                stats[carrier] = {"sum_delay": 0.0, "total": 0, "cancelled": 0}
+
+            if row.arr_delay is not None:
+                stats[carrier]["sum_delay"] += float(row.arr_delay)
+                stats[carrier]["total"] += 1
+
+            if row.cancelled is not None and int(row.cancelled) != 0:
+                stats[carrier]["cancelled"] += 1
+
+        scores = []
+        for carrier, s_data in stats.items():
+            total = max(s_data["total"], 1)
+            avg_delay = s_data["sum_delay"] / total if s_data["total"] > 0 else 0.0
+            cancel_component = (s_data["cancelled"] * cancellation_weight / total) * 100.0
+            score = avg_delay + cancel_component
+            scores.append((carrier, score))
+
+        if not scores:
+            return f"month={month}, no_results"
+
+        scores.sort(key=lambda x: x[1])
+        best_carrier = scores[0][0]
+        return f"month={month}, most_punctual={best_carrier}"
+
+
+class CassReadByCarrierDay(CassScenario):
+    name = "cass_read_by_carrier_day"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        carrier, date_from, date_to, limit = carrier_day_params(ctx)
+        ctx.params["carrier"] = carrier
+        ctx.params["days"] = [_parse_date(d) for d in daterange_strs(date_from, date_to)]
+        ctx.params["limit"] = limit
+        # prepare statementu to round-trip do serwera - poza pomiarem
+        ctx.params["stmt"] = ctx.conn.prepare(
+            "SELECT origin, dest, arr_delay "
+            "FROM flights_by_carrier_day "
+            "WHERE op_unique_carrier = ? AND fl_date = ?"
+        )
 
-def s_cass_read_by_carrier_day(cfg, iteration: int):
-    s = cass_client()
-    q = cfg["queries"]["read_by_carrier_day"]
-    carrier = q["carrier"]
-    days = daterange_strs(q["date_from"], q["date_to"])
-    limit_total = int(q["limit"])
-    got = 0
-
-    t0 = time.perf_counter()
-    st = s.prepare(
-        "SELECT origin, dest, arr_delay "
-        "FROM flights_by_carrier_day "
-        "WHERE op_unique_carrier = ? AND fl_date = ?"
-    )
+    def run(self, ctx):
+        carrier, limit_total, st = ctx.params["carrier"], ctx.params["limit"], ctx.params["stmt"]
+        got = 0
 
-    for d in days:
-        if got >= limit_total:
-            break
-        fl_date = _parse_date(d)
-        rows = s.execute(st, (carrier, fl_date))
-        for _ in rows:
-            got += 1
+        for fl_date in ctx.params["days"]:
             if got >= limit_total:
                 break
+            rows = ctx.conn.execute(st, (carrier, fl_date))
+            for _ in rows:
+                got += 1
+                if got >= limit_total:
+                    break
 
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"found={got}"
-
+        return f"found={got}"
 
-def s_cass_histogram_arr_delay_month(cfg, iteration: int):
-    s = cass_client()
-    bins = cfg["queries"]["histogram_arr_delay"]["bins"]
-    month_cfg = cfg["queries"]["top_routes_month"]["month"]
-    y, m = map(int, month_cfg.split("-"))
-    start = datetime(y, m, 1).date()
-    end = datetime(y + 1, 1, 1).date() if m == 12 else datetime(y, m + 1, 1).date()
-
-    stmt = SimpleStatement(
-        "SELECT arr_delay FROM flights_by_route_day "
-        "WHERE fl_date >= %s AND fl_date < %s ALLOW FILTERING"
-    )
 
-    t0 = time.perf_counter()
-    counts = [0] * len(bins)
+class CassHistogramArrDelayMonth(CassScenario):
+    name = "cass_histogram_arr_delay_month"
 
-    for row in s.execute(stmt, (start, end)):
-        v = row.arr_delay
-        if v is None:
-            continue
-        v = float(v)
-        placed = False
-        for i in range(len(bins) - 1):
-            if bins[i] <= v < bins[i + 1]:
-                counts[i] += 1
-                placed = True
-                break
-        if not placed:
-            counts[-1] += 1
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["bins"] = ctx.cfg["queries"]["histogram_arr_delay"]["bins"]
+        ctx.params["args"] = month_range(*month_param(ctx))
+        ctx.params["stmt"] = SimpleStatement(
+            "SELECT arr_delay FROM flights_by_route_day "
+            "WHERE fl_date >= %s AND fl_date < %s ALLOW FILTERING"
+        )
 
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"buckets={len(counts)}"
+    def run(self, ctx):
+        counts = _bucket_counts(ctx.conn.execute(ctx.params["stmt"], ctx.params["args"]), ctx.params["bins"])
+        return f"buckets={len(counts)}"
 
 
 SCENARIOS_CASS = [
-    ("cass_add_flight", s_cass_add_flight),
-    ("cass_add_flight_stats", s_cass_add_flight_stats),
-    ("cass_top_routes_month", s_cass_top_routes_month),
-    ("cass_histogram_arr_delay", s_cass_histogram_arr_delay),
-    ("cass_find_route_with_stats", s_cass_find_route_with_stats),
-    ("cass_rank_punctual_airlines", s_cass_rank_punctual_airlines),
-
-    ("cass_read_by_carrier_day", s_cass_read_by_carrier_day),
-    ("cass_histogram_arr_delay_month", s_cass_histogram_arr_delay_month),
+    CassAddFlight(),
+    CassAddFlightStats(),
+    CassTopRoutesMonth(),
+    CassHistogramArrDelay(),
+    CassFindRouteWithStats(),
+    CassRankPunctualAirlines(),
+
+    CassReadByCarrierDay(),
+    CassHistogramArrDelayMonth(),
 ]
 
 
 def run_cassandra(cfg, dataset_size: int, dataset_name: str):
-    for name, fn in SCENARIOS_CASS:
-        for r in range(1, int(cfg["repeats"]) + 1):
-            ms, notes = fn(cfg, r)
-            log_result("cassandra", dataset_name, name, r, ms, notes)
-            print(f"[cassandra][{name}][run={r}] {ms:.2f} ms :: {notes}")
+    run_scenarios("cassandra", SCENARIOS_CASS, cfg, dataset_name)
@@ -4,6 +4,55 @@ from pathlib import Path
 
 RESULTS_PATH = Path("/app/results/results.csv")
 
-def log_result(db, dataset, scenario, repeat, ms, notes=""):
+# wywoływane przed każdym powtórzeniem scenariusza (poza pomiarem czasu), np. restore snapshotu, eviction cache
+_BEFORE_SCENARIO_HOOKS = []
+
+# pary k=v doklejane do notatki każdego wyniku po " | " (np. cache=warm); nie mieszają się z odpowiedzią zapytania
+_RESULT_TAGS = {}
+
+# tagi całego przebiegu (np. profile=<profil konfiguracji serwera); set_result_tags ich nie czyści
+_RUN_TAGS = {}
+
+# sondy wokół mierzonej fazy (poza czasem): probe(ctx) przed run() zwraca funkcję wołaną po run(),
+# która zwraca tagi tego jednego wyniku (np. delty liczników serwera)
+_RUN_PROBES = []
+
+# sondy najbliżej pomiaru (profilowanie klienta): startują po sondach globalnych i sondzie scenariusza
+_INNER_RUN_PROBES = []
+
+def set_run_tags(**tags):
+    _RUN_TAGS.clear()
+    _RUN_TAGS.update({k: v for k, v in tags.items() if v is not None})
+
+def set_result_tags(**tags):
+    _RESULT_TAGS.clear()
+    _RESULT_TAGS.update({k: v for k, v in tags.items() if v is not None})
+
+def log_result(db, dataset, scenario, repeat, ms, notes="", tags=None):
+    tags = {**_RUN_TAGS, **_RESULT_TAGS, **(tags or {})}
+    if tags:
+        notes = f"{notes} | " + ", ".join(f"{k}={v}" for k, v in tags.items())
     with open(RESULTS_PATH, "a", newline="") as f:
-        csv.writer(f).writerow([datetime.utcnow().isoformat(), db, dataset, scenario, repeat, round(ms,2), notes])
\ No newline at end of file
+        csv.writer(f).writerow([datetime.utcnow().isoformat(), db, dataset, scenario, repeat, round(ms,2), notes])
+
+def add_before_scenario_hook(hook):
+    _BEFORE_SCENARIO_HOOKS.append(hook)
+
+def add_run_probe(probe, innermost: bool = False):
+    (_INNER_RUN_PROBES if innermost else _RUN_PROBES).append(probe)
+
+def start_run_probes(ctx, scenario_probes=()) -> list:
+    """Start sond: globalne, scenariusza (probe(ctx) może zwrócić None), innermost; kończone w odwrotnej kolejności."""
+    probes = [probe(ctx) for probe in _RUN_PROBES]
+    probes += [finish for finish in (probe(ctx) for probe in scenario_probes) if finish is not None]
+    return probes + [probe(ctx) for probe in _INNER_RUN_PROBES]
+
+def clear_scenario_hooks():
+    _BEFORE_SCENARIO_HOOKS.clear()
+    _RUN_PROBES.clear()
+    _INNER_RUN_PROBES.clear()
+
+def before_scenario(db, scenario, repeat=1, run=None):
+    """run - jedno niemierzone wykonanie scenariusza (dla rozgrzewki)."""
+    for hook in _BEFORE_SCENARIO_HOOKS:
+        hook(db, scenario, repeat, run)
\ No newline at end of file
@@ -0,0 +1,282 @@
+import os
+import time
+from typing import Optional
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from dataset_cache import columnar_path, open_columnar
+from import_timing import ImportTimer
+from scenario import (FLIGHT_INSERT_COLS, Scenario, flight_values, histogram_bins, insert_flight_entry, month_param,
+                      route_params, run_scenarios)
+
+_CONN = None
+
+# kolumny tabeli flights (jedna szeroka tabela - DuckDB jest kolumnowy, joiny nie są potrzebne)
+DUCKDB_COLUMNS = [
+    ("year", "INTEGER"),
+    ("month", "INTEGER"),
+    ("day_of_month", "INTEGER"),
+    ("day_of_week", "INTEGER"),
+    ("fl_date", "TIMESTAMP"),
+    ("op_unique_carrier", "VARCHAR"),
+    ("op_carrier_fl_num", "VARCHAR"),
+    ("origin", "VARCHAR"),
+    ("dest", "VARCHAR"),
+    ("crs_dep_time", "INTEGER"),
+    ("dep_time", "INTEGER"),
+    ("dep_delay", "INTEGER"),
+    ("taxi_out", "INTEGER"),
+    ("wheels_off", "INTEGER"),
+    ("wheels_on", "INTEGER"),
+    ("taxi_in", "INTEGER"),
+    ("crs_arr_time", "INTEGER"),
+    ("arr_time", "INTEGER"),
+    ("arr_delay", "INTEGER"),
+    ("cancelled", "BOOLEAN"),
+    ("cancellation_code", "VARCHAR"),
+    ("diverted", "BOOLEAN"),
+    ("crs_elapsed_time", "INTEGER"),
+    ("actual_elapsed_time", "INTEGER"),
+    ("air_time", "INTEGER"),
+    ("distance", "INTEGER"),
+    ("carrier_delay", "INTEGER"),
+    ("weather_delay", "INTEGER"),
+    ("nas_delay", "INTEGER"),
+    ("security_delay", "INTEGER"),
+    ("late_aircraft_delay", "INTEGER"),
+]
+
+
+def duckdb_conn():
+    global _CONN
+    if _CONN is None:
+        _CONN = duckdb.connect(os.getenv("DUCKDB_PATH", "/tmp/flights.duckdb"))
+        threads = os.getenv("DUCKDB_THREADS")
+        if threads:
+            _CONN.execute(f"SET threads = {int(threads)}")
+    return _CONN
+
+
+def close_duckdb():
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
+
+
+def reset_duckdb():
+    conn = duckdb_conn()
+    conn.execute("DROP TABLE IF EXISTS flights")
+    conn.execute("DROP SEQUENCE IF EXISTS flights_id_seq")
+
+
+def cleanup_duckdb(cfg, keep_rows: int):
+    """Przed importem przyrostowym: usuwa wiersze dopisane przez duckdb_add_flight (flight_id > keep_rows)."""
+    conn = duckdb_conn()
+    conn.execute("DELETE FROM flights WHERE flight_id > ?", [keep_rows])
+
+
+def analyze_duckdb():
+    duckdb_conn().execute("ANALYZE")
+
+
+def _source_relation(conn, file_name: str):
+    """
+    Relacja źródłowa + parametry: próbka .arrow (zero-copy), Parquet albo równoległy reader CSV.
+    Każda ma kolumnę src_row - numer wiersza w pliku nadany przy odczycie; od niego zależą flight_id
+    i to, które wiersze import przyrostowy uznaje za już zaimportowane (skan DuckDB nie ma ustalonej kolejności).
+    """
+    arrow = columnar_path(file_name)
+    if arrow.exists():
+        table = open_columnar(arrow)
+        conn.register("flights_src", table.append_column("src_row", pa.array(np.arange(table.num_rows))))
+        return "flights_src", []
+    if file_name.endswith(".parquet"):
+        return "(SELECT *, file_row_number AS src_row FROM read_parquet(?, file_row_number = true))", [file_name]
+    # read_csv nie zwraca numeru wiersza: tabela tymczasowa zachowuje kolejność wstawiania
+    # (preserve_insertion_order), więc jej rowid to numer wiersza w pliku; typy rzutujemy sami niżej
+    conn.execute("CREATE OR REPLACE TEMP TABLE flights_src_csv AS "
+                 "SELECT * FROM read_csv(?, header = true, auto_detect = true, parallel = true)", [file_name])
+    return "(SELECT *, rowid AS src_row FROM flights_src_csv)", []
+
+
+def import_to_duckdb(file_name: str, cfg=None, start_row: int = 0) -> Optional[ImportTimer]:
+    print(f"\n[IMPORTING] Importing {file_name} into DuckDB (from row {start_row})...")
+
+    if not os.path.exists(file_name):
+        print(f"ERROR: File not found: {file_name}")
+        return
+
+    select_list = ", ".join(f"TRY_CAST({name} AS {typ}) AS {name}" for name, typ in DUCKDB_COLUMNS)
+
+    # DuckDB parsuje, rzutuje i ładuje w jednym zapytaniu, więc jest tylko faza facts
+    timer = ImportTimer("duckdb", file_name, start_row=start_row)
+    t0 = time.perf_counter()
+
+    conn = duckdb_conn()
+    conn.execute("DROP SEQUENCE IF EXISTS flights_id_seq")
+    relation, params = _source_relation(conn, file_name)
+    # flight_id = numer wiersza w pliku + 1, jak w pozostałych bazach
+    if start_row:
+        # import przyrostowy: próbka jest prefiksem, dokładamy tylko wiersze od start_row (id start_row + 1...)
+        conn.execute(
+            f"INSERT INTO flights "
+            f"SELECT CAST(src_row + 1 AS BIGINT) AS flight_id, {select_list} "
+            f"FROM {relation} WHERE src_row >= ? ORDER BY src_row",
+            [*params, start_row],
+        )
+    else:
+        conn.execute("DROP TABLE IF EXISTS flights")
+        conn.execute(
+            f"CREATE TABLE flights AS "
+            f"SELECT CAST(src_row + 1 AS BIGINT) AS flight_id, {select_list} "
+            f"FROM {relation} ORDER BY src_row",
+            params,
+        )
+    if relation == "flights_src":
+        conn.unregister("flights_src")
+    conn.execute("DROP TABLE IF EXISTS flights_src_csv")
+    total = conn.execute("SELECT COUNT(*), COALESCE(MAX(flight_id), 0) FROM flights").fetchone()
+    timer.add("facts", time.perf_counter() - t0, int(total[0]) - start_row)
+    conn.execute(f"CREATE SEQUENCE flights_id_seq START WITH {int(total[1]) + 1}")
+
+    print(f"[IMPORTING][duckdb] done. Total: {total[0]} records.")
+    return timer.finish()
+
+
+class DuckdbScenario(Scenario):
+    def prepare(self, ctx):
+        ctx.conn = duckdb_conn()
+
+
+class DuckdbAddFlight(DuckdbScenario):
+    name = "duckdb_add_flight"
+
+    insert_sql = (
+        f"INSERT INTO flights (flight_id, {', '.join(FLIGHT_INSERT_COLS)}) "
+        f"VALUES (nextval('flights_id_seq'), {', '.join(['?'] * len(FLIGHT_INSERT_COLS))}) RETURNING flight_id"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        flight = insert_flight_entry(ctx.cfg, ctx.iteration)
+        ctx.params["vals"] = flight_values(flight, flight["op_unique_carrier"])
+
+    def run(self, ctx):
+        ctx.result = ctx.conn.execute(self.insert_sql, ctx.params["vals"]).fetchone()[0]
+        return f"inserted_id={ctx.result}"
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_flight(ctx.result)
+
+
+class DuckdbTopRoutesMonth(DuckdbScenario):
+    name = "duckdb_top_routes_month"
+
+    sql = (
+        "SELECT origin, dest, COUNT(*) AS flights_count "
+        "FROM flights "
+        "WHERE month = ? "
+        "GROUP BY origin, dest "
+        "ORDER BY flights_count DESC "
+        "LIMIT ?"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        _, month = month_param(ctx)
+        ctx.params["args"] = [month, int(ctx.cfg["queries"]["top_routes_month"]["limit"])]
+
+    def run(self, ctx):
+        rows = ctx.conn.execute(self.sql, ctx.params["args"]).fetchall()
+        entries = [f"{origin}-{dest}({count})" for origin, dest, count in rows]
+        return ";".join(entries) if entries else "no_results"
+
+
+class DuckdbHistogramArrDelay(DuckdbScenario):
+    name = "duckdb_histogram_arr_delay"
+
+    def prepare(self, ctx):
+        bins = histogram_bins(ctx.cfg)
+        parts = []
+        params = []
+        for i in range(len(bins) - 1):
+            parts.append(f"COUNT(*) FILTER (WHERE arr_delay >= ? AND arr_delay < ?) AS b{i}")
+            params.extend([bins[i], bins[i + 1]])
+
+        parts.append("COUNT(*) FILTER (WHERE arr_delay < ? OR arr_delay >= ? OR arr_delay IS NULL) AS other")
+        params.extend([bins[0], bins[-1]])
+
+        super().prepare(ctx)
+        # odpowiednik flights_performance z modelu SQL: loty nieodwołane
+        ctx.params.update(sql="SELECT " + ", ".join(parts) + " FROM flights WHERE NOT cancelled",
+                          args=params, buckets=len(bins))
+
+    def run(self, ctx):
+        row = ctx.conn.execute(ctx.params["sql"], ctx.params["args"]).fetchone()
+        return f"buckets={ctx.params['buckets']}, total_in_first={row[0] if row else 0}"
+
+
+class DuckdbFindRouteWithStats(DuckdbScenario):
+    name = "duckdb_find_route_with_stats"
+
+    sql = (
+        "SELECT flight_id, fl_date, op_unique_carrier, op_carrier_fl_num, origin, dest, "
+        "dep_time, dep_delay, arr_time, arr_delay, actual_elapsed_time, air_time, diverted, "
+        "carrier_delay, weather_delay, nas_delay, security_delay, late_aircraft_delay, "
+        "cancellation_code "
+        "FROM flights "
+        "WHERE origin = ? AND dest = ? AND fl_date BETWEEN ? AND ? "
+        "LIMIT ?"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["args"] = list(route_params(ctx))
+
+    def run(self, ctx):
+        rows = ctx.conn.execute(self.sql, ctx.params["args"]).fetchall()
+        return f"count={len(rows)}"
+
+
+class DuckdbRankPunctualAirlines(DuckdbScenario):
+    name = "duckdb_rank_punctual_airlines"
+
+    sql = (
+        "SELECT op_unique_carrier AS carrier, "
+        "       AVG(arr_delay) AS avg_arr_delay, "
+        "       COUNT(*) FILTER (WHERE cancelled) AS cancelled_count, "
+        "       COUNT(*) AS total_flights, "
+        "       (COALESCE(AVG(arr_delay), 0) + (COUNT(*) FILTER (WHERE cancelled) * ? / GREATEST(COUNT(*), 1)) * 100) AS score "
+        "FROM flights "
+        "WHERE month = ? "
+        "GROUP BY op_unique_carrier "
+        "ORDER BY score ASC "
+        "LIMIT ?"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        _, ctx.params["month"] = month_param(ctx)
+        ctx.params["args"] = [float(rank_cfg["cancellation_weight"]), ctx.params["month"], int(rank_cfg["limit"])]
+
+    def run(self, ctx):
+        rows = ctx.conn.execute(self.sql, ctx.params["args"]).fetchall()
+        return ("month=" + str(ctx.params["month"]) + ", most_punctual=" + rows[0][0]) if rows else "no_results"
+
+
+SCENARIOS_DUCKDB = [
+    DuckdbAddFlight(),
+    DuckdbTopRoutesMonth(),
+    DuckdbHistogramArrDelay(),
+    DuckdbFindRouteWithStats(),
+    DuckdbRankPunctualAirlines(),
+]
+
+
+def run_duckdb(cfg, dataset_size: int, dataset_name: str):
+    run_scenarios("duckdb", SCENARIOS_DUCKDB, cfg, dataset_name)
@@ -1,391 +1,680 @@
-import os, time
+import os
+from datetime import datetime, date
+from bson import ObjectId
 from pymongo import MongoClient
 
-from bench_common import log_result
+from scenario import (Scenario, SkipScenario, carrier_day_params, forget_write_state, month_param, month_range,
+                      route_params, run_scenarios, stats_note, write_state)
+
+# Layout kolekcji flights:
+# - raw:        wiersze csv.DictReader (prawie same stringi)
+# - typed:      BSON datetime / int32 / bool
+# - timeseries: jak typed, ale w kolekcji time-series (timeField fl_date, metaField meta)
+MONGO_LAYOUTS = ("raw", "typed", "timeseries")
+
+MONGO_INT_FIELDS = [
+    "year", "month", "day_of_month", "day_of_week", "op_carrier_fl_num",
+    "crs_dep_time", "dep_time", "dep_delay", "taxi_out", "wheels_off", "wheels_on", "taxi_in",
+    "crs_arr_time", "arr_time", "arr_delay", "crs_elapsed_time", "actual_elapsed_time",
+    "air_time", "distance", "carrier_delay", "weather_delay", "nas_delay",
+    "security_delay", "late_aircraft_delay",
+]
+MONGO_BOOL_FIELDS = ["cancelled", "diverted"]
+
+# pola przenoszone do metaField w kolekcji time-series
+MONGO_META_FIELDS = {
+    "op_unique_carrier": "carrier",
+    "origin": "origin",
+    "dest": "dest",
+}
+
+# odpowiednik docker/mongo/init/01_indexes.js (potrzebny przy przebudowie kolekcji)
+MONGO_FLIGHT_INDEXES = [
+    ("uniq_route_day_flight", ["fl_date", "op_unique_carrier", "op_carrier_fl_num", "origin", "dest"]),
+    ("carrier_day", ["op_unique_carrier", "fl_date"]),
+    ("origin_day", ["origin", "fl_date"]),
+    ("route_day", ["origin", "dest", "fl_date"]),
+    ("arr_delay", ["arr_delay"]),
+]
 
 
 def mongo_client():
     host = os.getenv("MONGO_HOST", "mongodb")
-    uri = f"mongodb://{host}:27017/?retryWrites=false"
+    port = int(os.getenv("MONGO_PORT", 27017))
+    uri = f"mongodb://{host}:{port}/?retryWrites=false"
     return MongoClient(uri, serverSelectionTimeoutMS=5000)
 
+
+_CLIENT = None
+
+
+def shared_mongo_client():
+    """Jeden klient na wszystkie scenariusze (mongo_client() za każdym razem otwiera nową pulę połączeń)."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = mongo_client()
+    return _CLIENT
+
+
+def close_mongo_client():
+    global _CLIENT
+    if _CLIENT is not None:
+        _CLIENT.close()
+        _CLIENT = None
+
+
+def mongo_layout(cfg) -> str:
+    layout = ((cfg or {}).get("mongo") or {}).get("layout", "raw")
+    if layout not in MONGO_LAYOUTS:
+        raise ValueError(f"Nieznany mongo.layout: {layout} (dozwolone: {', '.join(MONGO_LAYOUTS)})")
+    return layout
+
+
+def mongo_db_label(cfg) -> str:
+    """Nazwa bazy w results.csv - osobna dla każdego layoutu, żeby dało się je porównać."""
+    layout = mongo_layout(cfg)
+    return "mongo" if layout == "raw" else f"mongo_{layout}"
+
+
+def _field(cfg, name: str) -> str:
+    if mongo_layout(cfg) == "timeseries" and name in MONGO_META_FIELDS:
+        return "meta." + MONGO_META_FIELDS[name]
+    return name
+
+
+def _date_value(cfg, value):
+    if mongo_layout(cfg) == "raw" or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _int_value(cfg, value):
+    # w layoucie raw liczby z CSV są stringami
+    return str(value) if mongo_layout(cfg) == "raw" else int(value)
+
+
+def _to_int(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_typed_doc(row: dict, layout: str = "typed") -> dict:
+    """Konwertuje wiersz CSV / wpis z configu na dokument z typami BSON; puste pola są pomijane."""
+    doc = {}
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        if key == "fl_date":
+            if isinstance(value, datetime):
+                doc[key] = value
+            elif isinstance(value, date):
+                doc[key] = datetime(value.year, value.month, value.day)
+            else:
+                doc[key] = datetime.fromisoformat(str(value))
+        elif key in MONGO_INT_FIELDS:
+            v = _to_int(value)
+            if v is not None:
+                doc[key] = v
+        elif key in MONGO_BOOL_FIELDS:
+            v = _to_int(value)
+            if v is not None:
+                doc[key] = bool(v)
+        else:
+            doc[key] = value
+
+    if layout == "timeseries":
+        doc["meta"] = {meta: doc.pop(key, None) for key, meta in MONGO_META_FIELDS.items()}
+    return doc
+
+
+def shape_doc(cfg, row: dict) -> dict:
+    layout = mongo_layout(cfg)
+    return dict(row) if layout == "raw" else to_typed_doc(row, layout)
+
+
+def ensure_flights_collection(db, layout: str):
+    """Zakłada kolekcję flights w wymaganym layoucie (time-series albo zwykła) razem z indeksami."""
+    exists = bool(db.list_collection_names(filter={"name": "flights"}))
+    is_ts = exists and "timeseries" in db["flights"].options()
+
+    want_ts = layout == "timeseries"
+    if exists and is_ts == want_ts:
+        return db["flights"]
+
+    if exists:
+        db.drop_collection("flights")
+
+    if want_ts:
+        db.create_collection(
+            "flights",
+            timeseries={"timeField": "fl_date", "metaField": "meta", "granularity": "hours"},
+        )
+    else:
+        db.create_collection("flights")
+
+    cfg = {"mongo": {"layout": layout}}
+    col = db["flights"]
+    for name, keys in MONGO_FLIGHT_INDEXES:
+        col.create_index([(_field(cfg, k), 1) for k in keys], name=name)
+    return col
+
+
+def storage_note(db) -> str:
+    stats = next(db["flights"].aggregate([{"$collStats": {"storageStats": {}}}]), {})
+    st = stats.get("storageStats", {})
+    return (
+        f"count={st.get('count', 0)}, size={st.get('size', 0)}, "
+        f"storage={st.get('storageSize', 0)}, indexes={st.get('totalIndexSize', 0)}"
+    )
+
 def reset_mongo():
     c = mongo_client()
     db = c["flightsdb"]
     db["flights"].delete_many({})
 
+def cleanup_mongo(cfg, keep_rows: int):
+    """
+    Przed importem przyrostowym: usuwa dokumenty z mongo_add_flight (stan zapisu), z insert_batch (ZZ)
+    i wpisy add_flight_stats. Dokumenty z importu nie mają flight_id, więc keep_rows nie jest potrzebne.
+    (Kolekcja time-series pozwala na delete po _id dopiero od MongoDB 7.0.)
+    """
+    db = mongo_client()["flightsdb"]
+    state = write_state("mongo")
+    ids = [i for i in state.inserted_ids if isinstance(i, ObjectId)]
+    # add_flight_stats bez stanu bierze dowolny dokument z importu - jego statystyki też są do usunięcia
+    stats_ids = ids + [i for i in state.stats_ids if i not in ids]
+
+    if ids:
+        db["flights"].delete_many({"_id": {"$in": ids}})
+    db["flights"].delete_many({_field(cfg, "op_unique_carrier"): "ZZ"})
+    for name in ("flights_performance", "flights_delayed", "flights_cancelled"):
+        db[name].delete_many({"flight_id": {"$in": stats_ids}} if stats_ids else {})
+
+    forget_write_state("mongo")
+
+def analyze_mongo():
+    # Mongo nie ma statystyk do przeliczenia; czyścimy cache planów, żeby wybrano je od nowa dla większej kolekcji
+    mongo_client()["flightsdb"].command("planCacheClear", "flights")
+
 def import_to_mongo(file_name):
     print(f"\n[IMPORTING] Importing {file_name}...")
 
-def s_mongo_add_flight(cfg):
+class MongoScenario(Scenario):
+    """Wspólny klient w prepare() - bez nawiązywania połączenia w każdym powtórzeniu."""
+
+    def prepare(self, ctx):
+        ctx.conn = shared_mongo_client()
+
+    def collection(self, ctx, name: str = "flights"):
+        return ctx.conn["flightsdb"][name]
+
+
+class MongoAddFlight(MongoScenario):
     """
     Analog mysql_add_flight:
     - bierze kolejne sample z queries.insert_flight.flights
     - wrzuca jako dokument do flightsdb.flights
-    - zapisuje _id do queries.update_flight._inserted_ids
+    - zapisuje _id w stanie zapisu (dla add_flight_stats i sprzątania)
     """
-    c = mongo_client()
-    db = c["flightsdb"]
-    col = db["flights"]
-
-    insert_cfg = cfg["queries"]["insert_flight"]
-    flights = insert_cfg.get("flights", [])
-    if not flights:
-        return 0.0, "no_flights_in_config"
+    name = "mongo_add_flight"
 
-    idx = insert_cfg.get("_next_idx", 0)
-    flight = flights[idx % len(flights)]
-    insert_cfg["_next_idx"] = idx + 1
+    def prepare(self, ctx):
+        flights = ctx.cfg["queries"]["insert_flight"].get("flights", [])
+        if not flights:
+            raise SkipScenario("no_flights_in_config")
+        super().prepare(ctx)
+        ctx.params["doc"] = shape_doc(ctx.cfg, flights[(ctx.iteration - 1) % len(flights)])
 
-    doc = dict(flight)
+    def run(self, ctx):
+        ctx.result = self.collection(ctx).insert_one(ctx.params["doc"]).inserted_id
+        return "OK"
 
-    t0 = time.perf_counter()
-    res = col.insert_one(doc)
-    dt = (time.perf_counter() - t0) * 1000.0
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_flight(ctx.result)
 
-    update_cfg = cfg["queries"].setdefault("update_flight", {})
-    inserted_ids = update_cfg.setdefault("_inserted_ids", [])
-    inserted_ids.append(res.inserted_id)
 
-    return dt, "OK"
-
-
-def s_mongo_add_flight_stats(cfg):
+class MongoAddFlightStats(MongoScenario):
     """
     Analog mysql_add_flight_stats:
-    - bierze kolejne flight_id z update_flight._inserted_ids
+    - bierze kolejne _id wstawione przez mongo_add_flight
     - bierze odpowiednie dane z flight_performance i flights_delayed
     - wstawia do kolekcji flights_performance, flights_delayed
     """
-    c = mongo_client()
-    db = c["flightsdb"]
-    col_perf = db["flights_performance"]
-    col_delayed = db["flights_delayed"]
-
-    update_cfg = cfg["queries"]["update_flight"]
-
-    inserted_ids = update_cfg.get("_inserted_ids", [])
-    perf_list = update_cfg.get("flight_performance", [])
-
-    if not perf_list:
-        return 0.0, "no_flight_performance"
-
-    idx = update_cfg.get("_stats_idx", 0)
-    update_cfg["_stats_idx"] = idx + 1
-
-    if inserted_ids:
-        flight_id = inserted_ids[idx % len(inserted_ids)]
-    else:
-        col_f = db["flights"]
-        doc_any = col_f.find_one({}, projection={"_id": 1})
-        if not doc_any:
-            return 0.0, "no_flights_in_db"
-        flight_id = doc_any["_id"]
-
-    perf = perf_list[idx % len(perf_list)]
-
-    delayed_list = update_cfg.get("flights_delayed", [])
-    delayed_entry = next(
-        (d for d in delayed_list if d.get("flight_index") == (idx % len(perf_list))),
-        None
-    )
-
-    t0 = time.perf_counter()
-
-    if delayed_entry:
-        col_delayed.insert_one({
+    name = "mongo_add_flight_stats"
+
+    def prepare(self, ctx):
+        update_cfg = ctx.cfg["queries"]["update_flight"]
+        perf_list = update_cfg.get("flight_performance", [])
+        if not perf_list:
+            raise SkipScenario("no_flight_performance")
+
+        super().prepare(ctx)
+        flight_id = ctx.state.take_pending(newest=False)
+        if flight_id is None:
+            doc_any = self.collection(ctx).find_one({}, projection={"_id": 1})
+            if not doc_any:
+                raise SkipScenario("no_flights_in_db")
+            flight_id = doc_any["_id"]
+
+        idx = (ctx.iteration - 1) % len(perf_list)
+        perf = perf_list[idx]
+        delayed_list = update_cfg.get("flights_delayed", [])
+        delayed_entry = next(
+            (d for d in delayed_list if d.get("flight_index") == idx),
+            None
+        )
+
+        ctx.params["delayed_doc"] = {
             "flight_id": flight_id,
             "carrier_delay": int(delayed_entry.get("carrier_delay", 0)),
             "weather_delay": int(delayed_entry.get("weather_delay", 0)),
             "nas_delay": int(delayed_entry.get("nas_delay", 0)),
             "security_delay": int(delayed_entry.get("security_delay", 0)),
             "late_aircraft_delay": int(delayed_entry.get("late_aircraft_delay", 0)),
-        })
-
-    col_perf.insert_one({
-        "flight_id": flight_id,
-        "dep_time": int(perf.get("dep_time", 0)),
-        "dep_delay": int(perf.get("dep_delay", 0)),
-        "taxi_out": int(perf.get("taxi_out", 0)),
-        "wheels_off": int(perf.get("wheels_off", 0)),
-        "wheels_on": int(perf.get("wheels_on", 0)),
-        "taxi_in": int(perf.get("taxi_in", 0)),
-        "arr_time": int(perf.get("arr_time", 0)),
-        "arr_delay": int(perf.get("arr_delay", 0)),
-        "actual_elapsed_time": int(perf.get("actual_elapsed_time", 0)),
-        "air_time": int(perf.get("air_time", 0)),
-        "diverted": bool(perf.get("diverted", False)),
-    })
-
-    dt = (time.perf_counter() - t0) * 1000.0
-    note = f"flight_id={flight_id}, perf_inserted=1"
-    if delayed_entry:
-        note += ", delayed_inserted=1"
-    return dt, note
-
-
-def s_mongo_find_route_with_stats(cfg):
+        } if delayed_entry else None
+
+        ctx.params["perf_doc"] = {
+            "flight_id": flight_id,
+            "dep_time": int(perf.get("dep_time", 0)),
+            "dep_delay": int(perf.get("dep_delay", 0)),
+            "taxi_out": int(perf.get("taxi_out", 0)),
+            "wheels_off": int(perf.get("wheels_off", 0)),
+            "wheels_on": int(perf.get("wheels_on", 0)),
+            "taxi_in": int(perf.get("taxi_in", 0)),
+            "arr_time": int(perf.get("arr_time", 0)),
+            "arr_delay": int(perf.get("arr_delay", 0)),
+            "actual_elapsed_time": int(perf.get("actual_elapsed_time", 0)),
+            "air_time": int(perf.get("air_time", 0)),
+            "diverted": bool(perf.get("diverted", False)),
+        }
+        ctx.params.update(flight_id=flight_id, delayed_entry=delayed_entry)
+
+    def run(self, ctx):
+        if ctx.params["delayed_doc"]:
+            self.collection(ctx, "flights_delayed").insert_one(ctx.params["delayed_doc"])
+        self.collection(ctx, "flights_performance").insert_one(ctx.params["perf_doc"])
+        return stats_note(ctx.params["flight_id"], ctx.params["delayed_entry"])
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_stats(ctx.params["flight_id"])
+
+
+class MongoFindRouteWithStats(MongoScenario):
     """
     Analog mysql_find_flights_route_range_with_stats:
     - wybiera kolejną trasę z queries.find_all_flights_on_route.routes
     - zwraca count wyników z joinem na performance / delayed / cancelled
     """
-    c = mongo_client()
-    db = c["flightsdb"]
-    col_f = db["flights"]
-
-    q = cfg["queries"]["find_all_flights_on_route"]
-    routes = q.get("routes", [])
-    if not routes:
-        return 0.0, "no_routes_in_config"
-
-    idx = q.get("_next_route_idx", 0)
-    q["_next_route_idx"] = idx + 1
-    route = routes[idx % len(routes)]
-
-    origin = route.get("origin")
-    dest = route.get("dest")
-    date_from = route.get("date_from")
-    date_to = route.get("date_to")
-    limit = int(q.get("limit", 1000))
-
-    pipeline = [
-        {
-            "$match": {
-                "origin": origin,
-                "dest": dest,
-                "fl_date": {"$gte": date_from, "$lte": date_to},
-            }
-        },
-        {
-            "$lookup": {
-                "from": "flights_performance",
-                "localField": "_id",
-                "foreignField": "flight_id",
-                "as": "performance",
-            }
-        },
-        {
-            "$lookup": {
-                "from": "flights_delayed",
-                "localField": "_id",
-                "foreignField": "flight_id",
-                "as": "delayed",
-            }
-        },
-        {
-            "$lookup": {
-                "from": "flights_cancelled",
-                "localField": "_id",
-                "foreignField": "flight_id",
-                "as": "cancelled",
-            }
-        },
-        {"$limit": limit},
-    ]
-
-    t0 = time.perf_counter()
-    docs = list(col_f.aggregate(pipeline, allowDiskUse=True))
-    dt = (time.perf_counter() - t0) * 1000.0
-
-    return dt, f"count={len(docs)}"
-
-
-def s_mongo_rank_punctual_airlines(cfg):
+    name = "mongo_find_route_with_stats"
+
+    def prepare(self, ctx):
+        cfg = ctx.cfg
+        origin, dest, date_from, date_to, limit = route_params(ctx)
+        ctx.params["pipeline"] = [
+            {
+                "$match": {
+                    _field(cfg, "origin"): origin,
+                    _field(cfg, "dest"): dest,
+                    "fl_date": {"$gte": _date_value(cfg, date_from), "$lte": _date_value(cfg, date_to)},
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "flights_performance",
+                    "localField": "_id",
+                    "foreignField": "flight_id",
+                    "as": "performance",
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "flights_delayed",
+                    "localField": "_id",
+                    "foreignField": "flight_id",
+                    "as": "delayed",
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "flights_cancelled",
+                    "localField": "_id",
+                    "foreignField": "flight_id",
+                    "as": "cancelled",
+                }
+            },
+            {"$limit": limit},
+        ]
+        super().prepare(ctx)
+
+    def run(self, ctx):
+        docs = list(self.collection(ctx).aggregate(ctx.params["pipeline"], allowDiskUse=True))
+        return f"count={len(docs)}"
+
+
+# sekcje serverStatus, których nie potrzebujemy przy liczeniu ruchu sieciowego
+_SERVER_STATUS_EXCLUDE = ["asserts", "connections", "extra_info", "globalLock", "locks", "logicalSessionRecordCache",
+                          "metrics", "opLatencies", "opcounters", "opcountersRepl", "repl", "storageEngine",
+                          "tcmalloc", "transactions", "wiredTiger"]
+
+
+def _net_counters(client):
+    cmd = {"serverStatus": 1}
+    cmd.update({k: 0 for k in _SERVER_STATUS_EXCLUDE})
+    net = client.admin.command(cmd)["network"]
+    return int(net["bytesIn"]), int(net["bytesOut"])
+
+
+def _traffic_start(client):
+    """Stan liczników sieci serwera + koszt samego odczytu serverStatus (odejmowany na końcu)."""
+    a = _net_counters(client)
+    b = _net_counters(client)
+    return b, (b[0] - a[0], b[1] - a[1])
+
+
+def _traffic_note(client, start) -> str:
+    (b_in, b_out), (o_in, o_out) = start
+    e_in, e_out = _net_counters(client)
+    return f"bytes_in={max(e_in - b_in - o_in, 0)}, bytes_out={max(e_out - b_out - o_out, 0)}"
+
+
+class MongoRankScenario(MongoScenario):
+    """Ranking przewoźników: liczniki ruchu sieciowego czytane przed i po pomiarze (sonda), doklejane do notatki."""
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        ctx.params.update(
+            limit=int(rank_cfg["limit"]),
+            cancellation_weight=float(rank_cfg["cancellation_weight"]),
+            month=month_param(ctx)[1],
+        )
+
+    def probe(self, ctx):
+        # wewnątrz okna sondy metrics: jej serverStatus na tym samym kliencie nie liczy się do ruchu zapytania
+        start = _traffic_start(ctx.conn)
+
+        def finish():
+            ctx.note += ", " + _traffic_note(ctx.conn, start)
+            return {}
+
+        return finish
+
+
+class MongoRankPunctualAirlines(MongoRankScenario):
     """
     Analog mysql_rank_punctual_airlines:
-    - dla kolejnego miesiąca (1..12 albo lista z configu) liczy score per carrier
+    - dla miesiąca z generatora parametrów liczy score per carrier
     - score = avg_arr_delay + (cancelled_count * cancellation_weight / total_flights) * 100
     - zwraca month=X, most_punctual=ZZ
     """
-    c = mongo_client()
-    db = c["flightsdb"]
-    col_f = db["flights"]
-    col_cancel = db["flights_cancelled"]
-    col_perf = db["flights_performance"]
+    name = "mongo_rank_punctual_airlines"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["carrier_field"] = _field(ctx.cfg, "op_unique_carrier")
+        ctx.params["match"] = {"month": _int_value(ctx.cfg, ctx.params["month"])}
+
+    def run(self, ctx):
+        limit, cancellation_weight, month = ctx.params["limit"], ctx.params["cancellation_weight"], ctx.params["month"]
+        carrier_field = ctx.params["carrier_field"]
+
+        flights = list(self.collection(ctx).find(ctx.params["match"], projection={"_id": 1, carrier_field: 1}))
+
+        if not flights:
+            return f"month={month}, no_results"
+
+        stats = {}
+
+        if carrier_field.startswith("meta."):
+            id_to_carrier = {f["_id"]: (f.get("meta") or {}).get("carrier") or "UNK" for f in flights}
+        else:
+            id_to_carrier = {f["_id"]: f.get("op_unique_carrier", "UNK") for f in flights}
+
+        perf_docs = self.collection(ctx, "flights_performance").find(
+            {"flight_id": {"$in": list(id_to_carrier.keys())}},
+            projection={"flight_id": 1, "arr_delay": 1},
+        )
+
+        for doc in perf_docs:
+            fid = doc["flight_id"]
+            carrier = id_to_carrier.get(fid, "UNK")
+            arr_delay = doc.get("arr_delay")
+            if carrier not in stats:
+                stats[carrier] = {"sum_delay": 0.0, "total": 0, "cancelled": 0}
+            if arr_delay is not None:
+                stats[carrier]["sum_delay"] += float(arr_delay)
+            stats[carrier]["total"] += 1
+
+        cancel_docs = self.collection(ctx, "flights_cancelled").find(
+            {"flight_id": {"$in": list(id_to_carrier.keys())}},
+            projection={"flight_id": 1},
+        )
+        for doc in cancel_docs:
+            fid = doc["flight_id"]
+            carrier = id_to_carrier.get(fid, "UNK")
+            if carrier not in stats:
+                stats[carrier] = {"sum_delay": 0.0, "total": 0, "cancelled": 0}
+            stats[carrier]["cancelled"] += 1
+
+        scores = []
+        for carrier, s in stats.items():
+            total = max(s["total"], 1)
+            avg_delay = s["sum_delay"] / total if s["total"] > 0 else 0.0
+            cancel_component = (s["cancelled"] * cancellation_weight / total) * 100.0
+            score = avg_delay + cancel_component
+            scores.append((carrier, score))
+
+        if not scores:
+            return f"month={month}, no_results"
+
+        scores.sort(key=lambda x: x[1])
+        top_carriers = scores[:limit]
+        best = top_carriers[0][0]
+        return f"month={month}, most_punctual={best}"
+
+
+class MongoRankPunctualAirlinesPipeline(MongoRankScenario):
+    """
+    To samo co mongo_rank_punctual_airlines, ale w całości po stronie serwera:
+    $match -> $lookup (indeks flight_id) -> $group -> $sort -> $limit.
+    Do klienta wraca tylko ranking, bez list id i bez $in.
+    """
+    name = "mongo_rank_punctual_airlines_pipeline"
+    # ten sam miesiąc co mongo_rank_punctual_airlines w każdym powtórzeniu - porównanie przy tych samych parametrach
+    param_op = "rank_punctual_airlines"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        cfg = ctx.cfg
+        cancellation_weight = ctx.params["cancellation_weight"]
+        ctx.params["pipeline"] = [
+            {"$match": {"month": _int_value(cfg, ctx.params["month"])}},
+            {"$project": {"carrier": {"$ifNull": ["$" + _field(cfg, "op_unique_carrier"), "UNK"]}}},
+            {
+                "$lookup": {
+                    "from": "flights_performance",
+                    "localField": "_id",
+                    "foreignField": "flight_id",
+                    "pipeline": [{"$project": {"_id": 0, "arr_delay": 1}}],
+                    "as": "perf",
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "flights_cancelled",
+                    "localField": "_id",
+                    "foreignField": "flight_id",
+                    "pipeline": [{"$project": {"_id": 1}}],
+                    "as": "cancelled",
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$carrier",
+                    "sum_delay": {"$sum": {"$sum": "$perf.arr_delay"}},
+                    "total": {"$sum": {"$size": "$perf"}},
+                    "cancelled": {"$sum": {"$size": "$cancelled"}},
+                }
+            },
+            {"$match": {"$or": [{"total": {"$gt": 0}}, {"cancelled": {"$gt": 0}}]}},
+            {
+                "$project": {
+                    "score": {
+                        "$add": [
+                            {"$cond": [{"$gt": ["$total", 0]}, {"$divide": ["$sum_delay", "$total"]}, 0]},
+                            {"$multiply": [
+                                {"$divide": [{"$multiply": ["$cancelled", cancellation_weight]}, {"$max": ["$total", 1]}]},
+                                100,
+                            ]},
+                        ]
+                    }
+                }
+            },
+            {"$sort": {"score": 1, "_id": 1}},
+            {"$limit": ctx.params["limit"]},
+        ]
+
+    def run(self, ctx):
+        month = ctx.params["month"]
+        ranking = list(self.collection(ctx).aggregate(ctx.params["pipeline"], allowDiskUse=True))
+        if not ranking:
+            return f"month={month}, no_results"
+        return f"month={month}, most_punctual={ranking[0]['_id']}"
+
+
+class MongoReadByCarrierDay(MongoScenario):
+    name = "mongo_read_by_carrier_day"
+
+    def prepare(self, ctx):
+        cfg = ctx.cfg
+        carrier, date_from, date_to, limit = carrier_day_params(ctx)
+        ctx.params["query"] = {
+            _field(cfg, "op_unique_carrier"): carrier,
+            "fl_date": {"$gte": _date_value(cfg, date_from), "$lte": _date_value(cfg, date_to)},
+        }
+        ctx.params["limit"] = limit
+        super().prepare(ctx)
+
+    def run(self, ctx):
+        docs = list(self.collection(ctx).find(ctx.params["query"]).limit(ctx.params["limit"]))
+        return f"found={len(docs)}"
+
+
+class MongoTopRoutesMonth(MongoScenario):
+    name = "mongo_top_routes_month"
+
+    def prepare(self, ctx):
+        cfg = ctx.cfg
+        start, end = (_date_value(cfg, d.isoformat()) for d in month_range(*month_param(ctx)))
+        ctx.params["pipeline"] = [
+            {"$match": {"fl_date": {"$gte": start, "$lt": end}}},
+            {
+                "$group": {
+                    "_id": {"origin": "$" + _field(cfg, "origin"), "dest": "$" + _field(cfg, "dest")},
+                    "avg_arr_delay": {"$avg": "$arr_delay"},
+                    "cnt": {"$sum": 1},
+                }
+            },
+            {"$sort": {"avg_arr_delay": -1}},
+            {"$limit": 10},
+        ]
+        super().prepare(ctx)
+
+    def run(self, ctx):
+        res = list(self.collection(ctx).aggregate(ctx.params["pipeline"], allowDiskUse=True))
+        return f"rows={len(res)}"
+
+
+class MongoHistogramArrDelay(MongoScenario):
+    name = "mongo_histogram_arr_delay"
+
+    def prepare(self, ctx):
+        ctx.params["pipeline"] = [
+            {
+                "$bucket": {
+                    "groupBy": "$arr_delay",
+                    "boundaries": ctx.cfg["queries"]["histogram_arr_delay"]["bins"],
+                    "default": "other",
+                    "output": {"count": {"$sum": 1}},
+                }
+            }
+        ]
+        super().prepare(ctx)
 
-    rank_cfg = cfg["queries"]["airlines_ranking"]
-    limit = int(rank_cfg["limit"])
-    cancellation_weight = float(rank_cfg["cancellation_weight"])
+    def run(self, ctx):
+        res = list(self.collection(ctx).aggregate(ctx.params["pipeline"], allowDiskUse=True))
+        return f"buckets={len(res)}"
 
-    months = rank_cfg.get("months")
-    if not months:
-        months = list(range(1, 13))
 
-    idx = rank_cfg.get("_next_month_idx", 0)
-    rank_cfg["_next_month_idx"] = idx + 1
-    month = int(months[idx % len(months)])
+class MongoInsertBatch(MongoScenario):
+    name = "mongo_insert_batch"
 
-    t0 = time.perf_counter()
+    def prepare(self, ctx):
+        n = int(ctx.cfg["crud"]["sample_size_for_writes"])
+        ctx.params["sample"] = [
+            shape_doc(ctx.cfg, {
+                "fl_date": "2024-02-01",
+                "op_unique_carrier": "ZZ",
+                "op_carrier_fl_num": i,
+                "origin": "AAA",
+                "dest": "BBB",
+                "arr_delay": i % 60,
+                "dep_delay": i % 30,
+            })
+            for i in range(n)
+        ]
+        super().prepare(ctx)
 
-    flights = list(col_f.find({"month": month}, projection={"_id": 1, "op_unique_carrier": 1}))
+    def run(self, ctx):
+        self.collection(ctx).insert_many(ctx.params["sample"], ordered=False)
+        return f"inserted={len(ctx.params['sample'])}"
 
-    if not flights:
-        dt = (time.perf_counter() - t0) * 1000.0
-        return dt, f"month={month}, no_results"
 
-    stats = {}  
+class MongoUpdateMany(MongoScenario):
+    name = "mongo_update_many"
 
-    id_to_carrier = {f["_id"]: f.get("op_unique_carrier", "UNK") for f in flights}
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["filter"] = {_field(ctx.cfg, "op_unique_carrier"): "ZZ"}
 
-    perf_docs = col_perf.find(
-        {"flight_id": {"$in": list(id_to_carrier.keys())}},
-        projection={"flight_id": 1, "arr_delay": 1},
-    )
+    def run(self, ctx):
+        res = self.collection(ctx).update_many(ctx.params["filter"], {"$inc": {"arr_delay": 1}})
+        return f"matched={res.matched_count}, modified={res.modified_count}"
 
-    for doc in perf_docs:
-        fid = doc["flight_id"]
-        carrier = id_to_carrier.get(fid, "UNK")
-        arr_delay = doc.get("arr_delay")
-        if carrier not in stats:
-            stats[carrier] = {"sum_delay": 0.0, "total": 0, "cancelled": 0}
-        if arr_delay is not None:
-            stats[carrier]["sum_delay"] += float(arr_delay)
-        stats[carrier]["total"] += 1
-
-    cancel_docs = col_cancel.find(
-        {"flight_id": {"$in": list(id_to_carrier.keys())}},
-        projection={"flight_id": 1},
-    )
-    for doc in cancel_docs:
-        fid = doc["flight_id"]
-        carrier = id_to_carrier.get(fid, "UNK")
-        if carrier not in stats:
-            stats[carrier] = {"sum_delay": 0.0, "total": 0, "cancelled": 0}
-        stats[carrier]["cancelled"] += 1
-
-    scores = []
-    for carrier, s in stats.items():
-        total = max(s["total"], 1)
-        avg_delay = s["sum_delay"] / total if s["total"] > 0 else 0.0
-        cancel_component = (s["cancelled"] * cancellation_weight / total) * 100.0
-        score = avg_delay + cancel_component
-        scores.append((carrier, score))
-
-    if not scores:
-        dt = (time.perf_counter() - t0) * 1000.0
-        return dt, f"month={month}, no_results"
-
-    scores.sort(key=lambda x: x[1])
-    top_carriers = scores[:limit]
-    best = top_carriers[0][0]
-
-    dt = (time.perf_counter() - t0) * 1000.0
-    note = f"month={month}, most_punctual={best}"
-    return dt, note
-
-
-def s_mongo_read_by_carrier_day(cfg):
-    c = mongo_client()
-    col = c["flightsdb"]["flights"]
-    q = cfg["queries"]["read_by_carrier_day"]
-    query = {
-        "op_unique_carrier": q["carrier"],
-        "fl_date": {"$gte": q["date_from"], "$lte": q["date_to"]},
-    }
-    t0 = time.perf_counter()
-    docs = list(col.find(query).limit(int(q["limit"])))
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"found={len(docs)}"
-
-
-def s_mongo_top_routes_month(cfg):
-    c = mongo_client()
-    col = c["flightsdb"]["flights"]
-    month = cfg["queries"]["top_routes_month"]["month"]
-    y, m = map(int, month.split("-"))
-    start = f"{y}-{m:02d}-01"
-    end = f"{y+1}-01-01" if m == 12 else f"{y}-{m+1:02d}-01"
-    pipeline = [
-        {"$match": {"fl_date": {"$gte": start, "$lt": end}}},
-        {
-            "$group": {
-                "_id": {"origin": "$origin", "dest": "$dest"},
-                "avg_arr_delay": {"$avg": "$arr_delay"},
-                "cnt": {"$sum": 1},
-            }
-        },
-        {"$sort": {"avg_arr_delay": -1}},
-        {"$limit": 10},
-    ]
-    t0 = time.perf_counter()
-    res = list(col.aggregate(pipeline, allowDiskUse=True))
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"rows={len(res)}"
 
+class MongoDeleteMany(MongoScenario):
+    name = "mongo_delete_many"
 
-def s_mongo_histogram_arr_delay(cfg):
-    c = mongo_client()
-    col = c["flightsdb"]["flights"]
-    bins = cfg["queries"]["histogram_arr_delay"]["bins"]
-    pipeline = [
-        {
-            "$bucket": {
-                "groupBy": "$arr_delay",
-                "boundaries": bins,
-                "default": "other",
-                "output": {"count": {"$sum": 1}},
-            }
-        }
-    ]
-    t0 = time.perf_counter()
-    res = list(col.aggregate(pipeline, allowDiskUse=True))
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"buckets={len(res)}"
-
-
-def s_mongo_insert_batch(cfg):
-    c = mongo_client()
-    col = c["flightsdb"]["flights"]
-    n = int(cfg["crud"]["sample_size_for_writes"])
-    sample = [
-        {
-            "fl_date": "2024-02-01",
-            "op_unique_carrier": "ZZ",
-            "op_carrier_fl_num": i,
-            "origin": "AAA",
-            "dest": "BBB",
-            "arr_delay": i % 60,
-            "dep_delay": i % 30,
-        }
-        for i in range(n)
-    ]
-    t0 = time.perf_counter()
-    col.insert_many(sample, ordered=False)
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"inserted={n}"
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["filter"] = {_field(ctx.cfg, "op_unique_carrier"): "ZZ"}
 
-
-def s_mongo_update_many(cfg):
-    c = mongo_client()
-    col = c["flightsdb"]["flights"]
-    t0 = time.perf_counter()
-    res = col.update_many({"op_unique_carrier": "ZZ"}, {"$inc": {"arr_delay": 1}})
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"matched={res.matched_count}, modified={res.modified_count}"
-
-
-def s_mongo_delete_many(cfg):
-    c = mongo_client()
-    col = c["flightsdb"]["flights"]
-    t0 = time.perf_counter()
-    res = col.delete_many({"op_unique_carrier": "ZZ"})
-    dt = (time.perf_counter() - t0) * 1000
-    return dt, f"deleted={res.deleted_count}"
+    def run(self, ctx):
+        res = self.collection(ctx).delete_many(ctx.params["filter"])
+        return f"deleted={res.deleted_count}"
 
 
 SCENARIOS_MONGO = [
-    ("mongo_add_flight", s_mongo_add_flight),
-    ("mongo_add_flight_stats", s_mongo_add_flight_stats),
-    ("mongo_top_routes_month", s_mongo_top_routes_month),
-    ("mongo_histogram_arr_delay", s_mongo_histogram_arr_delay),
-    ("mongo_find_route_with_stats", s_mongo_find_route_with_stats),
-    ("mongo_rank_punctual_airlines", s_mongo_rank_punctual_airlines),
-
-    ("mongo_read_by_carrier_day", s_mongo_read_by_carrier_day),
-    ("mongo_insert_batch", s_mongo_insert_batch),
-    ("mongo_update_many", s_mongo_update_many),
-    ("mongo_delete_many", s_mongo_delete_many),
+    MongoAddFlight(),
+    MongoAddFlightStats(),
+    MongoTopRoutesMonth(),
+    MongoHistogramArrDelay(),
+    MongoFindRouteWithStats(),
+    MongoRankPunctualAirlines(),
+    MongoRankPunctualAirlinesPipeline(),
+
+    MongoReadByCarrierDay(),
+    MongoInsertBatch(),
+    MongoUpdateMany(),
+    MongoDeleteMany(),
 ]
 
 
@@ -393,9 +682,4 @@ def run_mongo(cfg, dataset_size: int, dataset_name: str):
     crud_cfg = cfg.setdefault("crud", {})
     crud_cfg["sample_size_for_writes"] = dataset_size
     crud_cfg.setdefault("sample_size_for_reads", dataset_size)
-
-    for name, fn in SCENARIOS_MONGO:
-        for r in range(1, int(cfg["repeats"]) + 1):
-            ms, notes = fn(cfg)
-            log_result("mongo", dataset_name, name, r, ms, notes)
-            print(f"[mongo][{name}][run={r}] {ms:.2f} ms :: {notes}")
+    run_scenarios("mongo", SCENARIOS_MONGO, cfg, dataset_name, label=mongo_db_label(cfg))
@@ -1,15 +1,27 @@
 import os
-import time
+import sys
 from mysql.connector.pooling import MySQLConnectionPool
 
-from bench_common import log_result
+from dimensions import ensure_flight_dimensions
+from scenario import (FLIGHT_INSERT_COLS, Scenario, delayed_values, flight_values, forget_write_state,
+                      histogram_bins, insert_flight_entry, month_param, performance_values, prepared_statements,
+                      route_params, run_scenarios, stats_entries, stats_note, write_state)
 
 _POOL = None
+# tryb, dla którego zbudowano pulę (prepared -> bez resetu sesji przy zwrocie połączenia)
+_POOL_PREPARED = None
+
+# kursory prepared per połączenie serwera (connection_id): tekst zapytania -> kursor z przygotowaną instrukcją
+_PREPARED = {}
 
 
 def mysql_conn():
-    global _POOL
+    global _POOL, _POOL_PREPARED
+    prepared = prepared_statements()
+    if _POOL is not None and _POOL_PREPARED != prepared:
+        close_mysql_pool()
     if _POOL is None:
+        _POOL_PREPARED = prepared
         _POOL = MySQLConnectionPool(
             pool_name="bench_pool",
             pool_size=int(os.getenv("MYSQL_POOL_SIZE", 5)),
@@ -18,10 +30,21 @@ def mysql_conn():
             user=os.getenv('MYSQL_USER'),
             password=os.getenv('MYSQL_PASSWORD'),
             database=os.getenv('MYSQL_DATABASE'),
-            autocommit=False
+            autocommit=False,
+            # reset sesji przy zwrocie do puli (COM_RESET_CONNECTION) usuwa instrukcje przygotowane,
+            # więc wyłączamy go tylko w trybie prepared; tryb text zostaje przy domyślnym resecie
+            pool_reset_session=not prepared
         )
     return _POOL.get_connection()
 
+def close_mysql_pool():
+    """Porzuca pulę (np. po restarcie serwera połączenia w puli są martwe); następne mysql_conn() tworzy nową."""
+    global _POOL
+    if _POOL is not None:
+        _POOL._remove_connections()
+        _POOL = None
+    _PREPARED.clear()
+
 def reset_mysql():
     conn = mysql_conn()
     cur = conn.cursor()
@@ -40,274 +63,316 @@ def reset_mysql():
     conn.close()
 
 
-def warmup_mysql():
+def cleanup_mysql(cfg, keep_rows: int):
+    """
+    Przed importem przyrostowym: usuwa wiersze dopisane przez scenariusze zapisu (flight_id > keep_rows
+    i statystyki add_flight_stats ze stanu zapisu), przewoźnika ZZ / lotniska bez nazwy dodane przez add_flight i ustawia AUTO_INCREMENT na keep_rows + 1.
+    """
     conn = mysql_conn()
     cur = conn.cursor()
     try:
-        cur.execute("SELECT flight_id from flights LIMIT 1")
-        cur.fetchone()
+        for table in ["flight_status", "flights_performance", "flights_delayed", "flights_cancelled", "flights"]:
+            cur.execute(f"DELETE FROM {table} WHERE flight_id > %s", (keep_rows,))
+        # statystyki z add_flight_stats mogą wisieć na locie z importu (cel awaryjny MAX(flight_id) po restore)
+        stats_ids = [int(i) for i in write_state("mysql").stats_ids]
+        if stats_ids:
+            placeholders = ", ".join(["%s"] * len(stats_ids))
+            for table in ["flight_status", "flights_performance", "flights_delayed"]:
+                cur.execute(f"DELETE FROM {table} WHERE flight_id IN ({placeholders})", stats_ids)
+        cur.execute(
+            "DELETE FROM airport WHERE city_name IS NULL "
+            "AND airport_code NOT IN (SELECT origin FROM flights) "
+            "AND airport_code NOT IN (SELECT dest FROM flights)"
+        )
+        cur.execute("DELETE FROM airline WHERE carrier_code NOT IN (SELECT op_unique_carrier FROM flights)")
         conn.commit()
-        return None
+        cur.execute(f"ALTER TABLE flights AUTO_INCREMENT = {int(keep_rows) + 1}")
     finally:
         cur.close()
         conn.close()
 
-def s_mysql_add_flight(cfg, iteration: int):
-    flight = cfg["queries"]["insert_flight"]["flights"][iteration - 1]
+    forget_write_state("mysql")
 
-    cols = [
-        "year", "month", "day_of_month", "day_of_week", "fl_date",
-        "op_unique_carrier", "op_carrier_fl_num", "origin", "dest",
-        "crs_dep_time", "crs_arr_time", "crs_elapsed_time", "distance"
-    ]
-    placeholders = ", ".join(["%s"] * len(cols))
-    insert_sql = f"INSERT INTO flights ({', '.join(cols)}) VALUES ({placeholders})"
 
+def analyze_mysql():
     conn = mysql_conn()
     cur = conn.cursor()
+    try:
+        cur.execute("ANALYZE TABLE airline, airport, flights, flights_performance, flights_delayed, "
+                    "flights_cancelled, flight_status")
+        cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
 
-    cur.execute("SELECT carrier_code FROM airline LIMIT 1;")
-    row = cur.fetchone()
-    if row:
-        carrier_code = row[0]
-    else:
-        carrier_code = "ZZ"
-        cur.execute(
-            "INSERT INTO airline (carrier_code) VALUES (%s)",
-            (carrier_code,)
-        )
-        conn.commit()
-
-    origin = str(flight["origin"])
-    dest = str(flight["dest"])
-
-    for code in {origin, dest}:
-        cur.execute("SELECT 1 FROM airport WHERE airport_code = %s", (code,))
-        if not cur.fetchone():
-            cur.execute(
-                "INSERT INTO airport (airport_code, city_name, state_name) "
-                "VALUES (%s, NULL, NULL)",
-                (code,)
-            )
-    conn.commit()
-
-    vals = [
-        int(flight["year"]),
-        int(flight["month"]),
-        int(flight["day_of_month"]),
-        int(flight["day_of_week"]),
-        flight["fl_date"],
-        carrier_code,
-        str(flight["op_carrier_fl_num"]),
-        origin,
-        dest,
-        int(flight.get("crs_dep_time", 0)),
-        int(flight.get("crs_arr_time", 0)),
-        int(flight.get("crs_elapsed_time", 0)),
-        int(flight.get("distance", 0)),
-    ]
-
-    t0 = time.perf_counter()
-    cur.execute(insert_sql, vals)
-    inserted_id = cur.lastrowid
-
-    inserted_ids = cfg["queries"]["update_flight"].setdefault("_inserted_ids", [])
-    inserted_ids.append(inserted_id)
-
-    conn.commit()
-    dt = (time.perf_counter() - t0) * 1000
-
-    cur.close()
-    conn.close()
-
-    return dt, "OK"
 
-def s_mysql_add_flight_stats(cfg, iteration: int):
+def warmup_mysql():
     conn = mysql_conn()
     cur = conn.cursor()
+    try:
+        cur.execute("SELECT flight_id from flights LIMIT 1")
+        cur.fetchone()
+        conn.commit()
+        return None
+    finally:
+        cur.close()
+        conn.close()
 
-    update_flight_cfg = cfg["queries"]["update_flight"]
-    inserted_ids = update_flight_cfg.get("_inserted_ids", [])
-
-    repeats = int(cfg.get("repeats", len(inserted_ids) or 1))
-
-    start_index = max(0, len(inserted_ids) - repeats)
-    index = start_index + (iteration - 1)
-
-    if 0 <= index < len(inserted_ids):
-        flight_id = int(inserted_ids[index])
-    else:
-        cur.execute("SELECT MAX(flight_id) FROM flights;")
-        row = cur.fetchone()
-        flight_id = int(row[0])
-
-    perf = update_flight_cfg["flight_performance"][iteration - 1]
-    delayed_list = update_flight_cfg.get("flights_delayed", [])
-    delayed_entry = next(
-        (d for d in delayed_list if d.get("flight_index") == (iteration - 1)),
-        None
+class MysqlScenario(Scenario):
+    """Połączenie z puli i kursor w prepare(), zwrot do puli w cleanup()."""
+
+    def prepare(self, ctx):
+        ctx.conn = mysql_conn()
+        ctx.cur = ctx.conn.cursor()
+
+    def cursor(self, ctx, sql: str):
+        """
+        Kursor dla zapytania sql: ctx.cur albo (tryb prepared) kursor prepared=True z cache połączenia.
+        Nowy kursor przygotowuje instrukcję tutaj (execute bez parametrów robi tylko COM_STMT_PREPARE),
+        więc run() jedynie ją wykonuje; takie powtórzenie dostaje tag stmt_prepare.
+        Connector nie przygotowuje ponownie, o ile run() poda ten sam obiekt str co tutaj.
+        """
+        if not prepared_statements():
+            return ctx.cur
+        cursors = _PREPARED.setdefault(ctx.conn.connection_id, {})
+        if sql not in cursors:
+            cur = ctx.conn.cursor(prepared=True)
+            # instrukcji bez parametrów nie da się przygotować bez wykonania - zostaje przy pierwszym execute
+            if "%s" in sql:
+                cur.execute(sql)
+            cursors[sql] = cur
+            ctx.tags["stmt_prepare"] = ctx.tags.get("stmt_prepare", 0) + 1
+        return cursors[sql]
+
+    def cleanup(self, ctx):
+        if ctx.cur is not None:
+            ctx.cur.close()
+        if ctx.conn is not None:
+            ctx.conn.close()
+
+
+class MysqlAddFlight(MysqlScenario):
+    name = "mysql_add_flight"
+
+    insert_sql = (
+        f"INSERT INTO flights ({', '.join(FLIGHT_INSERT_COLS)}) "
+        f"VALUES ({', '.join(['%s'] * len(FLIGHT_INSERT_COLS))})"
     )
 
-    t0 = time.perf_counter()
-    try:
-        if delayed_entry:
-            cur.execute(
-                """
-                INSERT INTO flights_delayed (
-                    flight_id,
-                    carrier_delay,
-                    weather_delay,
-                    nas_delay,
-                    security_delay,
-                    late_aircraft_delay
-                )
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    int(flight_id),
-                    int(delayed_entry.get("carrier_delay", 0)),
-                    int(delayed_entry.get("weather_delay", 0)),
-                    int(delayed_entry.get("nas_delay", 0)),
-                    int(delayed_entry.get("security_delay", 0)),
-                    int(delayed_entry.get("late_aircraft_delay", 0)),
-                )
-            )
-
-        cur.execute(
-            """
-            INSERT INTO flights_performance (
-                flight_id,
-                dep_time,
-                dep_delay,
-                taxi_out,
-                wheels_off,
-                wheels_on,
-                taxi_in,
-                arr_time,
-                arr_delay,
-                actual_elapsed_time,
-                air_time,
-                diverted,
-                delay_id
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                int(flight_id),
-                int(perf.get("dep_time", 0)),
-                int(perf.get("dep_delay", 0)),
-                int(perf.get("taxi_out", 0)),
-                int(perf.get("wheels_off", 0)),
-                int(perf.get("wheels_on", 0)),
-                int(perf.get("taxi_in", 0)),
-                int(perf.get("arr_time", 0)),
-                int(perf.get("arr_delay", 0)),
-                int(perf.get("actual_elapsed_time", 0)),
-                int(perf.get("air_time", 0)),
-                bool(perf.get("diverted", False)),
-                flight_id if delayed_entry else None,
-            )
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        flight = insert_flight_entry(ctx.cfg, ctx.iteration)
+        flight = {**flight, "origin": str(flight["origin"]), "dest": str(flight["dest"])}
+
+        # słowniki (airline/airport) poza pomiarem: zapytanie tylko dla kodów nieznanych rejestrowi
+        ensure_flight_dimensions(ctx, flight)
+        ctx.conn.commit()
+        ctx.params["cur"] = self.cursor(ctx, self.insert_sql)
+        ctx.params["vals"] = flight_values(flight, flight["op_unique_carrier"])
+
+    def run(self, ctx):
+        cur = ctx.params["cur"]
+        cur.execute(self.insert_sql, ctx.params["vals"])
+        ctx.result = cur.lastrowid
+        ctx.conn.commit()
+        return "OK"
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_flight(ctx.result)
+        super().cleanup(ctx)
+
+
+class MysqlAddFlightStats(MysqlScenario):
+    name = "mysql_add_flight_stats"
+
+    delayed_sql = """
+        INSERT INTO flights_delayed (
+            flight_id,
+            carrier_delay,
+            weather_delay,
+            nas_delay,
+            security_delay,
+            late_aircraft_delay
+        )
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+
+    performance_sql = """
+        INSERT INTO flights_performance (
+            flight_id,
+            dep_time,
+            dep_delay,
+            taxi_out,
+            wheels_off,
+            wheels_on,
+            taxi_in,
+            arr_time,
+            arr_delay,
+            actual_elapsed_time,
+            air_time,
+            diverted,
+            delay_id
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+    status_sql = """
+        INSERT INTO flight_status (flight_id, performance_id, cancellation_id)
+        VALUES (%s, %s, %s)
+    """
+
+    def target_flight(self, ctx):
+        # cel: najstarszy lot z add_flight bez statystyk; MAX(flight_id) tylko, gdy stanu nie ma (np. po restore)
+        flight_id = ctx.state.take_pending(newest=False)
+        if flight_id is None:
+            ctx.cur.execute("SELECT MAX(flight_id) FROM flights;")
+            row = ctx.cur.fetchone()
+            ctx.conn.commit()
+            flight_id = row[0]
+        return int(flight_id)
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        flight_id = self.target_flight(ctx)
+        perf, delayed_entry = stats_entries(ctx.cfg, ctx.iteration)
+        ctx.params.update(
+            flight_id=flight_id,
+            delayed_entry=delayed_entry,
+            delayed_args=delayed_values(flight_id, delayed_entry) if delayed_entry else None,
+            perf_args=performance_values(flight_id, perf, delayed_entry),
+            status_args=(int(flight_id), int(flight_id), None),
         )
+        self.prepare_statements(ctx)
 
-        cur.execute(
-            """
-            INSERT INTO flight_status (flight_id, performance_id, cancellation_id)
-            VALUES (%s, %s, %s)
-            """,
-            (int(flight_id), int(flight_id), None)
+    def prepare_statements(self, ctx):
+        ctx.params.update(
+            delayed_cur=self.cursor(ctx, self.delayed_sql) if ctx.params["delayed_entry"] else None,
+            performance_cur=self.cursor(ctx, self.performance_sql),
+            status_cur=self.cursor(ctx, self.status_sql),
         )
 
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-        note = f"flight_id={flight_id}, perf_inserted=1"
-        if delayed_entry:
-            note += ", delayed_inserted=1"
-        return dt, note
+    def run(self, ctx):
+        if ctx.params["delayed_args"]:
+            ctx.params["delayed_cur"].execute(self.delayed_sql, ctx.params["delayed_args"])
+        ctx.params["performance_cur"].execute(self.performance_sql, ctx.params["perf_args"])
+        ctx.params["status_cur"].execute(self.status_sql, ctx.params["status_args"])
+
+        ctx.conn.commit()
+        return stats_note(ctx.params["flight_id"], ctx.params["delayed_entry"])
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_stats(ctx.params["flight_id"])
+        super().cleanup(ctx)
+
+
+class MysqlAddFlightStatsPipelined(MysqlAddFlightStats):
+    """
+    add_flight_stats jako multi-statement: trzy INSERT-y w jednym COM_QUERY - jedna podróż do serwera zamiast
+    trzech. Instrukcje wykonują się po kolei, więc flights_delayed jest wstawiony przed flights_performance
+    z delay_id (= flight_id). Kursor prepared nie obsługuje wielu instrukcji - w trybie prepared ten scenariusz
+    idzie protokołem tekstowym (tag protocol=text).
+    Cel: kopia najnowszego lotu wstawiona w prepare() (loty z add_flight zabiera sekwencyjny add_flight_stats).
+    """
+    name = "mysql_add_flight_stats_pipelined"
+
+    copy_sql = (
+        f"INSERT INTO flights ({', '.join(FLIGHT_INSERT_COLS)}) "
+        f"SELECT {', '.join(FLIGHT_INSERT_COLS)} FROM flights ORDER BY flight_id DESC LIMIT 1"
+    )
 
-    finally:
-        cur.close()
-        conn.close()
+    def target_flight(self, ctx):
+        ctx.cur.execute(self.copy_sql)
+        flight_id = ctx.cur.lastrowid
+        ctx.conn.commit()
+        ctx.state.inserted_ids.append(flight_id)
+        return int(flight_id)
+
+    def prepare_statements(self, ctx):
+        if ctx.params["delayed_entry"]:
+            statements, args = [self.delayed_sql], ctx.params["delayed_args"]
+        else:
+            statements, args = [], ()
+        statements += [self.performance_sql, self.status_sql]
+        ctx.params.update(sql=";".join(statements), args=args + ctx.params["perf_args"] + ctx.params["status_args"])
+        if prepared_statements():
+            ctx.tags["protocol"] = "text"
+
+    def run(self, ctx):
+        cur = ctx.cur
+        cur.execute(ctx.params["sql"], ctx.params["args"])
+        # wyniki kolejnych instrukcji trzeba odebrać przed commitem
+        while cur.nextset():
+            pass
+        ctx.conn.commit()
+        return stats_note(ctx.params["flight_id"], ctx.params["delayed_entry"])
+
+
+class MysqlTopRoutesMonth(MysqlScenario):
+    name = "mysql_top_routes_month"
 
-def s_mysql_top_routes_month(cfg, iteration: int):
-    month = iteration
-    limit = int(cfg["queries"]["top_routes_month"]["limit"])
+    sql = (
+        "SELECT f.origin, f.dest, COUNT(*) AS flights_count "
+        "FROM flights f "
+        "WHERE f.month = %s "
+        "GROUP BY f.origin, f.dest "
+        "ORDER BY flights_count DESC "
+        "LIMIT %s"
+    )
 
-    conn = mysql_conn()
-    cur = conn.cursor()
-    try:
-        sql = (
-            "SELECT f.origin, f.dest, COUNT(*) AS flights_count "
-            "FROM flights f "
-            "WHERE f.month = %s "
-            "GROUP BY f.origin, f.dest "
-            "ORDER BY flights_count DESC "
-            "LIMIT %s"
-        )
-        t0 = time.perf_counter()
-        cur.execute(sql, (month, limit))
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        _, month = month_param(ctx)
+        ctx.params["cur"] = self.cursor(ctx, self.sql)
+        ctx.params["args"] = (month, int(ctx.cfg["queries"]["top_routes_month"]["limit"]))
+
+    def run(self, ctx):
+        cur = ctx.params["cur"]
+        cur.execute(self.sql, ctx.params["args"])
         rows = cur.fetchall()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
+        ctx.conn.commit()
 
         entries = []
         for origin, dest, count in rows:
             entries.append(f"{origin}-{dest}({count})")
 
-        note = ";".join(entries) if entries else "no_results"
-        return dt, note
-    finally:
-        cur.close()
-        conn.close()
+        return ";".join(entries) if entries else "no_results"
 
 
-def s_mysql_histogram_arr_delay(cfg, iteration: int):
-    bins = cfg["queries"]["histogram_arr_delay"]["bins"]
-    try:
-        bins = [int(b) for b in bins]
-    except Exception:
-        return 0.0, "invalid_bins"
-
-    if len(bins) < 2:
-        return 0.0, "buckets=0"
+class MysqlHistogramArrDelay(MysqlScenario):
+    name = "mysql_histogram_arr_delay"
 
-    parts = []
-    params = []
-    for i in range(len(bins) - 1):
-        a = bins[i];
-        b = bins[i + 1]
-        parts.append(f"SUM(CASE WHEN p.arr_delay >= %s AND p.arr_delay < %s THEN 1 ELSE 0 END) AS b{i}")
-        params.extend([a, b])
+    def prepare(self, ctx):
+        bins = histogram_bins(ctx.cfg)
+        parts = []
+        params = []
+        for i in range(len(bins) - 1):
+            a = bins[i];
+            b = bins[i + 1]
+            parts.append(f"SUM(CASE WHEN p.arr_delay >= %s AND p.arr_delay < %s THEN 1 ELSE 0 END) AS b{i}")
+            params.extend([a, b])
 
-    parts.append(
-        "SUM(CASE WHEN p.arr_delay < %s OR p.arr_delay >= %s OR p.arr_delay IS NULL THEN 1 ELSE 0 END) AS other")
-    params.extend([bins[0], bins[-1]])
+        parts.append(
+            "SUM(CASE WHEN p.arr_delay < %s OR p.arr_delay >= %s OR p.arr_delay IS NULL THEN 1 ELSE 0 END) AS other")
+        params.extend([bins[0], bins[-1]])
 
-    sql = "SELECT " + ", ".join(parts) + " FROM flights_performance p"
+        super().prepare(ctx)
+        # sql składany przy każdym powtórzeniu; intern daje ten sam obiekt, z którym przygotowano kursor
+        sql = sys.intern("SELECT " + ", ".join(parts) + " FROM flights_performance p")
+        ctx.params.update(sql=sql, cur=self.cursor(ctx, sql), args=tuple(params), buckets=len(bins))
 
-    conn = mysql_conn()
-    cur = conn.cursor()
-    t0 = time.perf_counter()
-    try:
-        cur.execute(sql, tuple(params))
+    def run(self, ctx):
+        cur = ctx.params["cur"]
+        cur.execute(ctx.params["sql"], ctx.params["args"])
         row = cur.fetchone()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-        num_buckets = len(bins)
-        return dt, f"buckets={num_buckets}, total in first bucket={row[0] if row else 0}"
-    finally:
-        cur.close()
-        conn.close()
+        ctx.conn.commit()
+        return f"buckets={ctx.params['buckets']}, total in first bucket={row[0] if row else 0}"
 
 
-def s_mysql_find_flights_route_range_with_stats(cfg, iteration: int):
+class MysqlFindRouteWithStats(MysqlScenario):
     # TODO adjust bench_config to have more rows as a result (adjust numuber of batches and/or use most popular routes)
-    idx = iteration - 1
-    route = cfg["queries"]["find_all_flights_on_route"]["routes"][idx]
-    origin = route.get("origin")
-    dest = route.get("dest")
-    date_from = route.get("date_from")
-    date_to = route.get("date_to")
-    limit = int(cfg.get("queries", {}).get("find_all_flights_on_route", {}).get("limit", 1000))
+    name = "mysql_find_route_with_stats"
 
     sql = (
         "SELECT f.flight_id, f.fl_date, f.op_unique_carrier, f.op_carrier_fl_num, f.origin, f.dest, "
@@ -322,31 +387,21 @@ def s_mysql_find_flights_route_range_with_stats(cfg, iteration: int):
         "LIMIT %s"
     )
 
-    conn = mysql_conn()
-    cur = conn.cursor()
-    t0 = time.perf_counter()
-    try:
-        cur.execute(sql, (origin, dest, date_from, date_to, limit))
-        rows = cur.fetchall()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["cur"] = self.cursor(ctx, self.sql)
+        ctx.params["args"] = route_params(ctx)
 
-        count = len(rows)
-        note = f"count={count}"
-        return dt, note
-    finally:
-        cur.close()
-        conn.close()
-
-
-def s_mysql_get_flight_with_stats(cfg, iteration: int):
-    raise NotImplemented
+    def run(self, ctx):
+        cur = ctx.params["cur"]
+        cur.execute(self.sql, ctx.params["args"])
+        rows = cur.fetchall()
+        ctx.conn.commit()
+        return f"count={len(rows)}"
 
 
-def s_mysql_rank_punctual_airlines(cfg, iteration: int):
-    limit = int(cfg["queries"]["airlines_ranking"]["limit"])
-    cancellation_weight = float(cfg["queries"]["airlines_ranking"]["cancellation_weight"])
-    ranking_for_month = iteration
+class MysqlRankPunctualAirlines(MysqlScenario):
+    name = "mysql_rank_punctual_airlines"
 
     sql = (
         "SELECT f.op_unique_carrier AS carrier, "
@@ -364,36 +419,32 @@ def s_mysql_rank_punctual_airlines(cfg, iteration: int):
         "LIMIT %s"
     )
 
-    conn = mysql_conn()
-    cur = conn.cursor()
-    t0 = time.perf_counter()
-    try:
-        cur.execute(sql, (cancellation_weight, ranking_for_month, limit,))
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        _, ctx.params["month"] = month_param(ctx)
+        ctx.params["cur"] = self.cursor(ctx, self.sql)
+        ctx.params["args"] = (float(rank_cfg["cancellation_weight"]), ctx.params["month"], int(rank_cfg["limit"]))
+
+    def run(self, ctx):
+        cur = ctx.params["cur"]
+        cur.execute(self.sql, ctx.params["args"])
         rows = cur.fetchall()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-        note = "month=" + str(ranking_for_month) + ", " + "most_punctual=" + rows[0][0] if rows else "no_results"
-        return dt, note
-    finally:
-        cur.close()
-        conn.close()
+        ctx.conn.commit()
+        return "month=" + str(ctx.params["month"]) + ", " + "most_punctual=" + rows[0][0] if rows else "no_results"
 
 
 SCENARIOS_MYSQL = [
-    ("mysql_add_flight", s_mysql_add_flight),
-    ("mysql_add_flight_stats", s_mysql_add_flight_stats),
-    ("mysql_top_routes_month", s_mysql_top_routes_month),
-    ("mysql_histogram_arr_delay", s_mysql_histogram_arr_delay),
-    ("mysql_find_route_with_stats", s_mysql_find_flights_route_range_with_stats),
-    # ("mysql_get_flight_with_stats", s_mysql_get_flight_with_stats),
-    ("mysql_rank_punctual_airlines", s_mysql_rank_punctual_airlines),
+    MysqlAddFlight(),
+    MysqlAddFlightStats(),
+    MysqlAddFlightStatsPipelined(),
+    MysqlTopRoutesMonth(),
+    MysqlHistogramArrDelay(),
+    MysqlFindRouteWithStats(),
+    MysqlRankPunctualAirlines(),
 ]
 
 
-def run_mysql(cfg, dataset_name: str, dataset_size: int):
+def run_mysql(cfg, dataset_size: int, dataset_name: str):
     warmup_mysql()
-    for name, fn in SCENARIOS_MYSQL:
-        for r in range(1, int(cfg["repeats"]) + 1):
-            dt, notes = fn(cfg, r)
-            log_result("mysql", dataset_name, name, r, dt, notes)
-            print(f"[mysql][{name}][run={r}] {dt:.2f} ms :: {notes}")
+    run_scenarios("mysql", SCENARIOS_MYSQL, cfg, dataset_name)
@@ -1,10 +1,16 @@
+import itertools
 import os
-import time
 from psycopg2 import pool
-from bench_common import log_result
+from dimensions import ensure_flight_dimensions
+from scenario import (FLIGHT_INSERT_COLS, Scenario, delayed_values, flight_values, forget_write_state,
+                      histogram_bins, insert_flight_entry, month_param, performance_values, prepared_statements,
+                      route_params, run_scenarios, stats_entries, stats_note, write_state)
 
 _POOL = None
 
+# instrukcje przygotowane per sesja serwera (backend pid): tekst zapytania -> "EXECUTE ..." dla cur.execute
+_PREPARED = {}
+
 def postgres_conn():
     global _POOL
     if _POOL is None:
@@ -40,282 +46,340 @@ def _put_conn(conn):
     if _POOL:
         _POOL.putconn(conn)
 
-def warmup_postgres():
+def close_postgres_pool():
+    """Zamyka wszystkie połączenia puli (wymagane przed CREATE DATABASE ... TEMPLATE)."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.closeall()
+        _POOL = None
+    _PREPARED.clear()
+
+def cleanup_postgres(cfg, keep_rows: int):
+    """
+    Przed importem przyrostowym: usuwa wiersze dopisane przez scenariusze zapisu (flight_id > keep_rows
+    i statystyki add_flight_stats ze stanu zapisu), osierocone lotniska/przewoźników (np. ZZ) i cofa sekwencję, żeby delta dostała id keep_rows + 1...
+    """
     conn = postgres_conn()
     cur = conn.cursor()
     try:
-        cur.execute("SELECT flight_id FROM flights LIMIT 1")
-        cur.fetchone()
+        # statystyki z add_flight_stats mogą wisieć na locie z importu (cel awaryjny anti-join po restore)
+        stats_ids = [int(i) for i in write_state("postgres").stats_ids]
+        # kolejność respektuje klucze obce (performance.delay_id -> flights_delayed)
+        for table in ["flight_status", "flights_performance", "flights_delayed"]:
+            cur.execute(f"DELETE FROM {table} WHERE flight_id > %s OR flight_id = ANY(%s)", (keep_rows, stats_ids))
+        for table in ["flights_cancelled", "flights"]:
+            cur.execute(f"DELETE FROM {table} WHERE flight_id > %s", (keep_rows,))
+        cur.execute("""
+            DELETE FROM airport a
+            WHERE a.city_name IS NULL
+              AND NOT EXISTS (SELECT 1 FROM flights f WHERE f.origin = a.airport_code)
+              AND NOT EXISTS (SELECT 1 FROM flights f WHERE f.dest = a.airport_code)
+        """)
+        cur.execute("""
+            DELETE FROM airline a
+            WHERE NOT EXISTS (SELECT 1 FROM flights f WHERE f.op_unique_carrier = a.carrier_code)
+        """)
+        cur.execute("SELECT setval(pg_get_serial_sequence('flights', 'flight_id'), %s)", (keep_rows,))
         conn.commit()
-        return None
     finally:
         cur.close()
         _put_conn(conn)
 
-def s_postgres_add_flight(cfg, iteration: int):
-    flight = cfg["queries"]["insert_flight"]["flights"][iteration - 1]
-
-    cols = [
-        "year", "month", "day_of_month", "day_of_week", "fl_date",
-        "op_unique_carrier", "op_carrier_fl_num", "origin", "dest",
-        "crs_dep_time", "crs_arr_time", "crs_elapsed_time", "distance",
-    ]
-    placeholders = ", ".join(["%s"] * len(cols))
-    insert_sql = (
-        f"INSERT INTO flights ({', '.join(cols)}) "
-        f"VALUES ({placeholders}) RETURNING flight_id"
-    )
+    forget_write_state("postgres")
 
+def analyze_postgres():
     conn = postgres_conn()
     cur = conn.cursor()
-
-    carrier_code = flight["op_unique_carrier"]
-    cur.execute("SELECT 1 FROM airline WHERE carrier_code = %s", (carrier_code,))
-    if not cur.fetchone():
-        cur.execute(
-            "INSERT INTO airline (carrier_code) VALUES (%s)",
-            (carrier_code,),
-        )
-
-    origin = flight["origin"]
-    dest = flight["dest"]
-
-    for code in {origin, dest}:
-        cur.execute("SELECT 1 FROM airport WHERE airport_code = %s", (code,))
-        if not cur.fetchone():
-            cur.execute(
-                "INSERT INTO airport (airport_code, city_name, state_name) "
-                "VALUES (%s, NULL, NULL)",
-                (code,),
-            )
-
-    conn.commit()
-
-    vals = [
-        int(flight["year"]),
-        int(flight["month"]),
-        int(flight["day_of_month"]),
-        int(flight["day_of_week"]),
-        flight["fl_date"],
-        carrier_code,
-        str(flight["op_carrier_fl_num"]),
-        origin,
-        dest,
-        int(flight.get("crs_dep_time", 0)),
-        int(flight.get("crs_arr_time", 0)),
-        int(flight.get("crs_elapsed_time", 0)),
-        int(flight.get("distance", 0)),
-    ]
-
-    t0 = time.perf_counter()
     try:
-        cur.execute(insert_sql, vals)
-        inserted_id = cur.fetchone()[0]
+        cur.execute("ANALYZE")
         conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-
-        inserted_ids = (
-            cfg.setdefault("queries", {})
-               .setdefault("update_flight", {})
-               .setdefault("_inserted_ids_postgres", [])
-        )
-        inserted_ids.append(inserted_id)
-
-        return dt, f"inserted_id={inserted_id}"
     finally:
         cur.close()
         _put_conn(conn)
 
-def s_postgres_add_flight_stats(cfg, iteration: int):
+def warmup_postgres():
     conn = postgres_conn()
     cur = conn.cursor()
-
-    update_flight_cfg = cfg["queries"].setdefault("update_flight", {})
-
-    cur.execute(
-        """
-        SELECT f.flight_id
-        FROM flights f
-        LEFT JOIN flights_performance p ON p.flight_id = f.flight_id
-        WHERE p.flight_id IS NULL
-        ORDER BY f.flight_id DESC
-        LIMIT 1;
-        """
-    )
-    row = cur.fetchone()
-    if not row or row[0] is None:
+    try:
+        cur.execute("SELECT flight_id FROM flights LIMIT 1")
+        cur.fetchone()
+        conn.commit()
+        return None
+    finally:
         cur.close()
         _put_conn(conn)
-        raise RuntimeError("Brak lotu bez statystyk dla postgres_add_flight_stats")
 
-    flight_id = row[0]
+def _pg_prepared(conn, sql: str) -> str:
+    """PREPARE zapytania raz na sesję (placeholdery %s -> $n); zwraca EXECUTE z placeholderami dla psycopg2."""
+    statements = _PREPARED.setdefault(conn.get_backend_pid(), {})
+    if sql not in statements:
+        name = f"bench_stmt_{len(statements) + 1}"
+        counter = itertools.count(1)
+        parts = sql.split("%s")
+        body = parts[0] + "".join(f"${next(counter)}{part}" for part in parts[1:])
+        cur = conn.cursor()
+        try:
+            cur.execute(f"PREPARE {name} AS {body}")
+            conn.commit()
+        finally:
+            cur.close()
+        args = len(parts) - 1
+        statements[sql] = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * args)})" if args else "")
+    return statements[sql]
+
+
+class PostgresScenario(Scenario):
+    """Połączenie z puli i kursor w prepare(), zwrot do puli w cleanup()."""
+
+    def prepare(self, ctx):
+        ctx.conn = postgres_conn()
+        ctx.cur = ctx.conn.cursor()
+
+    def statement(self, ctx, sql: str) -> str:
+        """Zapytanie dla cur.execute; w trybie prepared EXECUTE instrukcji przygotowanej poza pomiarem."""
+        return _pg_prepared(ctx.conn, sql) if prepared_statements() else sql
+
+    def cleanup(self, ctx):
+        if ctx.cur is not None:
+            ctx.cur.close()
+        if ctx.conn is not None:
+            _put_conn(ctx.conn)
+
+
+class PostgresAddFlight(PostgresScenario):
+    name = "postgres_add_flight"
 
-    perf = update_flight_cfg["flight_performance"][iteration - 1]
-    delayed_list = update_flight_cfg.get("flights_delayed", [])
-    delayed_entry = next(
-        (d for d in delayed_list if d.get("flight_index") == (iteration - 1)),
-        None
+    insert_sql = (
+        f"INSERT INTO flights ({', '.join(FLIGHT_INSERT_COLS)}) "
+        f"VALUES ({', '.join(['%s'] * len(FLIGHT_INSERT_COLS))}) RETURNING flight_id"
     )
 
-    t0 = time.perf_counter()
-    try:
-        if delayed_entry:
-            cur.execute(
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        flight = insert_flight_entry(ctx.cfg, ctx.iteration)
+
+        # słowniki (airline/airport) poza pomiarem: zapytanie tylko dla kodów nieznanych rejestrowi
+        ensure_flight_dimensions(ctx, flight)
+        ctx.conn.commit()
+        ctx.params["sql"] = self.statement(ctx, self.insert_sql)
+        ctx.params["vals"] = flight_values(flight, flight["op_unique_carrier"])
+
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["vals"])
+        ctx.result = ctx.cur.fetchone()[0]
+        ctx.conn.commit()
+        return f"inserted_id={ctx.result}"
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_flight(ctx.result)
+        super().cleanup(ctx)
+
+
+class PostgresAddFlightStats(PostgresScenario):
+    name = "postgres_add_flight_stats"
+
+    delayed_sql = """
+        INSERT INTO flights_delayed (
+            flight_id,
+            carrier_delay,
+            weather_delay,
+            nas_delay,
+            security_delay,
+            late_aircraft_delay
+        )
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (flight_id) DO NOTHING
+    """
+
+    performance_sql = """
+        INSERT INTO flights_performance (
+            flight_id,
+            dep_time,
+            dep_delay,
+            taxi_out,
+            wheels_off,
+            wheels_on,
+            taxi_in,
+            arr_time,
+            arr_delay,
+            actual_elapsed_time,
+            air_time,
+            diverted,
+            delay_id
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (flight_id) DO NOTHING
+    """
+
+    status_sql = """
+        INSERT INTO flight_status (flight_id, performance_id, cancellation_id)
+        VALUES (%s, %s, %s)
+    """
+
+    def target_flight(self, ctx):
+        # cel: najnowszy lot z add_flight bez statystyk; anti-join tylko, gdy stanu nie ma (np. po restore)
+        flight_id = ctx.state.take_pending(newest=True)
+        if flight_id is None:
+            ctx.cur.execute(
+                """
+                SELECT f.flight_id
+                FROM flights f
+                LEFT JOIN flights_performance p ON p.flight_id = f.flight_id
+                WHERE p.flight_id IS NULL
+                ORDER BY f.flight_id DESC
+                LIMIT 1;
                 """
-                INSERT INTO flights_delayed (
-                    flight_id,
-                    carrier_delay,
-                    weather_delay,
-                    nas_delay,
-                    security_delay,
-                    late_aircraft_delay
-                )
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (flight_id) DO NOTHING
-                """,
-                (
-                    int(flight_id),
-                    int(delayed_entry.get("carrier_delay", 0)),
-                    int(delayed_entry.get("weather_delay", 0)),
-                    int(delayed_entry.get("nas_delay", 0)),
-                    int(delayed_entry.get("security_delay", 0)),
-                    int(delayed_entry.get("late_aircraft_delay", 0)),
-                )
-            )
-
-        cur.execute(
-            """
-            INSERT INTO flights_performance (
-                flight_id,
-                dep_time,
-                dep_delay,
-                taxi_out,
-                wheels_off,
-                wheels_on,
-                taxi_in,
-                arr_time,
-                arr_delay,
-                actual_elapsed_time,
-                air_time,
-                diverted,
-                delay_id
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (flight_id) DO NOTHING
-            """,
-            (
-                int(flight_id),
-                int(perf.get("dep_time", 0)),
-                int(perf.get("dep_delay", 0)),
-                int(perf.get("taxi_out", 0)),
-                int(perf.get("wheels_off", 0)),
-                int(perf.get("wheels_on", 0)),
-                int(perf.get("taxi_in", 0)),
-                int(perf.get("arr_time", 0)),
-                int(perf.get("arr_delay", 0)),
-                int(perf.get("actual_elapsed_time", 0)),
-                int(perf.get("air_time", 0)),
-                bool(perf.get("diverted", False)),
-                flight_id if delayed_entry else None,
             )
+            row = ctx.cur.fetchone()
+            ctx.conn.commit()
+            if not row or row[0] is None:
+                raise RuntimeError("Brak lotu bez statystyk dla postgres_add_flight_stats")
+            flight_id = row[0]
+        return flight_id
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        flight_id = self.target_flight(ctx)
+        perf, delayed_entry = stats_entries(ctx.cfg, ctx.iteration)
+        ctx.params.update(
+            flight_id=flight_id,
+            delayed_entry=delayed_entry,
+            delayed_args=delayed_values(flight_id, delayed_entry) if delayed_entry else None,
+            perf_args=performance_values(flight_id, perf, delayed_entry),
+            status_args=(int(flight_id), int(flight_id), None),
         )
+        self.prepare_statements(ctx)
 
-        cur.execute(
-            """
-            INSERT INTO flight_status (flight_id, performance_id, cancellation_id)
-            VALUES (%s, %s, %s)
-            """,
-            (int(flight_id), int(flight_id), None)
+    def prepare_statements(self, ctx):
+        ctx.params.update(
+            delayed_sql=self.statement(ctx, self.delayed_sql) if ctx.params["delayed_entry"] else None,
+            performance_sql=self.statement(ctx, self.performance_sql),
+            status_sql=self.statement(ctx, self.status_sql),
         )
 
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-        note = f"flight_id={flight_id}, perf_inserted=1"
-        if delayed_entry:
-            note += ", delayed_inserted=1"
-        return dt, note
+    def run(self, ctx):
+        cur = ctx.cur
+        if ctx.params["delayed_args"]:
+            cur.execute(ctx.params["delayed_sql"], ctx.params["delayed_args"])
+        cur.execute(ctx.params["performance_sql"], ctx.params["perf_args"])
+        cur.execute(ctx.params["status_sql"], ctx.params["status_args"])
+
+        ctx.conn.commit()
+        return stats_note(ctx.params["flight_id"], ctx.params["delayed_entry"])
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_stats(ctx.params["flight_id"])
+        super().cleanup(ctx)
+
+
+class PostgresAddFlightStatsPipelined(PostgresAddFlightStats):
+    """
+    add_flight_stats jednym poleceniem: INSERT-y flights_delayed i flights_performance jako CTE przed INSERT-em
+    flight_status - jedna podróż do serwera zamiast trzech. Klucze obce sprawdzane są na końcu całego polecenia,
+    więc delay_id (= flight_id) w flights_performance widzi wiersz wstawiony przez CTE delayed.
+    Cel: kopia najnowszego lotu wstawiona w prepare() (loty z add_flight zabiera sekwencyjny add_flight_stats).
+    """
+    name = "postgres_add_flight_stats_pipelined"
+
+    copy_sql = (
+        f"INSERT INTO flights ({', '.join(FLIGHT_INSERT_COLS)}) "
+        f"SELECT {', '.join(FLIGHT_INSERT_COLS)} FROM flights ORDER BY flight_id DESC LIMIT 1 "
+        f"RETURNING flight_id"
+    )
 
-    finally:
-        cur.close()
-        _put_conn(conn)
+    pipelined_sql = (
+        f"WITH performance AS ({PostgresAddFlightStats.performance_sql}) "
+        f"{PostgresAddFlightStats.status_sql}"
+    )
+
+    pipelined_delayed_sql = (
+        f"WITH delayed AS ({PostgresAddFlightStats.delayed_sql}), "
+        f"performance AS ({PostgresAddFlightStats.performance_sql}) "
+        f"{PostgresAddFlightStats.status_sql}"
+    )
 
-def s_postgres_top_routes_month(cfg, iteration: int):
-    month = iteration
-    limit = int(cfg["queries"]["top_routes_month"]["limit"])
+    def target_flight(self, ctx):
+        ctx.cur.execute(self.copy_sql)
+        flight_id = ctx.cur.fetchone()[0]
+        ctx.conn.commit()
+        ctx.state.inserted_ids.append(flight_id)
+        return flight_id
 
-    conn = postgres_conn()
-    cur = conn.cursor()
-    try:
-        sql_q = (
-            "SELECT f.origin, f.dest, COUNT(*) AS flights_count "
-            "FROM flights f "
-            "WHERE f.month = %s "
-            "GROUP BY f.origin, f.dest "
-            "ORDER BY flights_count DESC "
-            "LIMIT %s"
-        )
-        t0 = time.perf_counter()
-        cur.execute(sql_q, (month, limit))
-        rows = cur.fetchall()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
+    def prepare_statements(self, ctx):
+        if ctx.params["delayed_entry"]:
+            sql, args = self.pipelined_delayed_sql, ctx.params["delayed_args"] + ctx.params["perf_args"]
+        else:
+            sql, args = self.pipelined_sql, ctx.params["perf_args"]
+        ctx.params.update(sql=self.statement(ctx, sql), args=args + ctx.params["status_args"])
+
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["args"])
+        ctx.conn.commit()
+        return stats_note(ctx.params["flight_id"], ctx.params["delayed_entry"])
+
+
+class PostgresTopRoutesMonth(PostgresScenario):
+    name = "postgres_top_routes_month"
+
+    sql = (
+        "SELECT f.origin, f.dest, COUNT(*) AS flights_count "
+        "FROM flights f "
+        "WHERE f.month = %s "
+        "GROUP BY f.origin, f.dest "
+        "ORDER BY flights_count DESC "
+        "LIMIT %s"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        _, month = month_param(ctx)
+        ctx.params["sql"] = self.statement(ctx, self.sql)
+        ctx.params["args"] = (month, int(ctx.cfg["queries"]["top_routes_month"]["limit"]))
+
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["args"])
+        rows = ctx.cur.fetchall()
+        ctx.conn.commit()
 
         entries = []
         for origin, dest, count in rows:
             entries.append(f"{origin}-{dest}({count})")
 
-        note = ";".join(entries) if entries else "no_results"
-        return dt, note
-    finally:
-        cur.close()
-        _put_conn(conn)
+        return ";".join(entries) if entries else "no_results"
 
-def s_postgres_histogram_arr_delay(cfg, iteration: int):
-    bins = cfg["queries"]["histogram_arr_delay"]["bins"]
-    try:
-        bins = [int(b) for b in bins]
-    except Exception:
-        return 0.0, "invalid_bins"
 
-    if len(bins) < 2:
-        return 0.0, "buckets=0"
+class PostgresHistogramArrDelay(PostgresScenario):
+    name = "postgres_histogram_arr_delay"
 
-    parts = []
-    params = []
-    for i in range(len(bins) - 1):
-        a = bins[i]; b = bins[i + 1]
-        parts.append(f"SUM(CASE WHEN p.arr_delay >= %s AND p.arr_delay < %s THEN 1 ELSE 0 END) AS b{i}")
-        params.extend([a, b])
+    def prepare(self, ctx):
+        bins = histogram_bins(ctx.cfg)
+        parts = []
+        params = []
+        for i in range(len(bins) - 1):
+            a = bins[i]; b = bins[i + 1]
+            parts.append(f"SUM(CASE WHEN p.arr_delay >= %s AND p.arr_delay < %s THEN 1 ELSE 0 END) AS b{i}")
+            params.extend([a, b])
 
-    parts.append("SUM(CASE WHEN p.arr_delay < %s OR p.arr_delay >= %s OR p.arr_delay IS NULL THEN 1 ELSE 0 END) AS other")
-    params.extend([bins[0], bins[-1]])
+        parts.append("SUM(CASE WHEN p.arr_delay < %s OR p.arr_delay >= %s OR p.arr_delay IS NULL THEN 1 ELSE 0 END) AS other")
+        params.extend([bins[0], bins[-1]])
 
-    sql_q = "SELECT " + ", ".join(parts) + " FROM flights_performance p"
+        super().prepare(ctx)
+        ctx.params.update(sql=self.statement(ctx, "SELECT " + ", ".join(parts) + " FROM flights_performance p"),
+                          args=tuple(params), buckets=len(bins))
+
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["args"])
+        row = ctx.cur.fetchone()
+        ctx.conn.commit()
+        return f"buckets={ctx.params['buckets']}, total_in_first={row[0] if row else 0}"
 
-    conn = postgres_conn()
-    cur = conn.cursor()
-    t0 = time.perf_counter()
-    try:
-        cur.execute(sql_q, tuple(params))
-        row = cur.fetchone()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-        num_buckets = len(bins)
-        return dt, f"buckets={num_buckets}, total_in_first={row[0] if row else 0}"
-    finally:
-        cur.close()
-        _put_conn(conn)
 
-def s_postgres_find_flights_route_range_with_stats(cfg, iteration: int):
-    idx = iteration - 1
-    route = cfg["queries"]["find_all_flights_on_route"]["routes"][idx]
-    origin = route.get("origin")
-    dest = route.get("dest")
-    date_from = route.get("date_from")
-    date_to = route.get("date_to")
-    limit = int(cfg.get("queries", {}).get("find_all_flights_on_route", {}).get("limit", 1000))
+class PostgresFindRouteWithStats(PostgresScenario):
+    name = "postgres_find_route_with_stats"
 
-    sql_q = (
+    sql = (
         "SELECT f.flight_id, f.fl_date, f.op_unique_carrier, f.op_carrier_fl_num, f.origin, f.dest, "
         "p.dep_time, p.dep_delay, p.arr_time, p.arr_delay, p.actual_elapsed_time, p.air_time, p.diverted, "
         "d.carrier_delay, d.weather_delay, d.nas_delay, d.security_delay, d.late_aircraft_delay, "
@@ -328,36 +392,28 @@ def s_postgres_find_flights_route_range_with_stats(cfg, iteration: int):
         "LIMIT %s"
     )
 
-    conn = postgres_conn()
-    cur = conn.cursor()
-    t0 = time.perf_counter()
-    try:
-        cur.execute(sql_q, (origin, dest, date_from, date_to, limit))
-        rows = cur.fetchall()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["sql"] = self.statement(ctx, self.sql)
+        ctx.params["args"] = route_params(ctx)
 
-        count = len(rows)
-        note = f"count={count}"
-        return dt, note
-    finally:
-        cur.close()
-        _put_conn(conn)
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["args"])
+        rows = ctx.cur.fetchall()
+        ctx.conn.commit()
+        return f"count={len(rows)}"
 
-def s_postgres_get_flight_with_stats(cfg, iteration: int):
-    raise NotImplemented
 
-def s_postgres_rank_punctual_airlines(cfg, iteration: int):
-    limit = int(cfg["queries"]["airlines_ranking"]["limit"])
-    cancellation_weight = float(cfg["queries"]["airlines_ranking"]["cancellation_weight"])
-    ranking_for_month = iteration
+class PostgresRankPunctualAirlines(PostgresScenario):
+    name = "postgres_rank_punctual_airlines"
 
-    sql_q = (
+    # CAST wagi: w PREPARE typ $1 wynikałby z SUM (bigint) i 0.5 zaokrąglałoby się do liczby całkowitej
+    sql = (
         "SELECT f.op_unique_carrier AS carrier, "
         "       AVG(p.arr_delay) AS avg_arr_delay, "
         "       SUM(CASE WHEN c.flight_id IS NOT NULL THEN 1 ELSE 0 END) AS cancelled_count, "
         "       COUNT(f.flight_id) AS total_flights, "
-        "       (COALESCE(AVG(p.arr_delay), 0) + (SUM(CASE WHEN c.flight_id IS NOT NULL THEN 1 ELSE 0 END) * %s / GREATEST(COUNT(f.flight_id),1)) * 100) AS score "
+        "       (COALESCE(AVG(p.arr_delay), 0) + (SUM(CASE WHEN c.flight_id IS NOT NULL THEN 1 ELSE 0 END) * CAST(%s AS numeric) / GREATEST(COUNT(f.flight_id),1)) * 100) AS score "
         "FROM flights f "
         "LEFT JOIN flights_performance p ON f.flight_id = p.flight_id "
         "LEFT JOIN flights_cancelled c ON f.flight_id = c.flight_id "
@@ -368,34 +424,30 @@ def s_postgres_rank_punctual_airlines(cfg, iteration: int):
         "LIMIT %s"
     )
 
-    conn = postgres_conn()
-    cur = conn.cursor()
-    t0 = time.perf_counter()
-    try:
-        cur.execute(sql_q, (cancellation_weight, ranking_for_month, limit))
-        rows = cur.fetchall()
-        conn.commit()
-        dt = (time.perf_counter() - t0) * 1000
-        note = ("month=" + str(ranking_for_month) + ", most_punctual=" + rows[0][0]) if rows else "no_results"
-        return dt, note
-    finally:
-        cur.close()
-        _put_conn(conn)
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        _, ctx.params["month"] = month_param(ctx)
+        ctx.params["sql"] = self.statement(ctx, self.sql)
+        ctx.params["args"] = (float(rank_cfg["cancellation_weight"]), ctx.params["month"], int(rank_cfg["limit"]))
+
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["args"])
+        rows = ctx.cur.fetchall()
+        ctx.conn.commit()
+        return ("month=" + str(ctx.params["month"]) + ", most_punctual=" + rows[0][0]) if rows else "no_results"
+
 
 SCENARIOS_POSTGRES = [
-    ("postgres_add_flight", s_postgres_add_flight),
-    ("postgres_add_flight_stats", s_postgres_add_flight_stats),
-    ("postgres_top_routes_month", s_postgres_top_routes_month),
-    ("postgres_histogram_arr_delay", s_postgres_histogram_arr_delay),
-    ("postgres_find_route_with_stats", s_postgres_find_flights_route_range_with_stats),
-    # ("postgres_get_flight_with_stats", s_postgres_get_flight_with_stats),
-    ("postgres_rank_punctual_airlines", s_postgres_rank_punctual_airlines),
+    PostgresAddFlight(),
+    PostgresAddFlightStats(),
+    PostgresAddFlightStatsPipelined(),
+    PostgresTopRoutesMonth(),
+    PostgresHistogramArrDelay(),
+    PostgresFindRouteWithStats(),
+    PostgresRankPunctualAirlines(),
 ]
 
-def run_postgres(cfg, dataset_name: str, dataset_size: int):
+def run_postgres(cfg, dataset_size: int, dataset_name: str):
     warmup_postgres()
-    for name, fn in SCENARIOS_POSTGRES:
-        for r in range(1, int(cfg["repeats"]) + 1):
-            dt, notes = fn(cfg, r)
-            log_result("postgres", dataset_name, name, r, dt, notes)
-            print(f"[postgres][{name}][run={r}] {dt:.2f} ms :: {notes}")
+    run_scenarios("postgres", SCENARIOS_POSTGRES, cfg, dataset_name)
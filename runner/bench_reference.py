@@ -0,0 +1,378 @@
+"""
+Silnik referencyjny: kolumny z flights_N.csv zapisane raz jako pliki .npy i czytane przez memmap,
+scenariusze SCENARIOS_POSTGRES liczone wektorowo w numpy.
+
+Służy jako dolne ograniczenie czasu (brak sieci, brak parsera SQL) i jako źródło poprawnych
+odpowiedzi, z którymi analyze_results porównuje notatki pozostałych baz.
+"""
+import json
+import os
+import time
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import read_frame
+from scenario import (Scenario, histogram_bins, insert_flight_entry, month_param, route_params, run_scenarios,
+                      stats_entries, stats_note)
+
+DELAY_NULL = np.iinfo(np.int16).min
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# kolumna -> dtype na dysku
+REFERENCE_COLUMNS = {
+    "carrier": np.int16,
+    "origin": np.int16,
+    "dest": np.int16,
+    "month": np.int8,
+    "fl_date": np.int32,     # date.toordinal()
+    "arr_delay": np.int16,   # DELAY_NULL = brak wartości
+    "dep_delay": np.int16,
+    "cancelled": np.bool_,
+    "has_perf": np.bool_,    # odpowiednik wiersza w flights_performance
+}
+
+_STORE = None
+
+
+def _cache_dir(file_name: str) -> Path:
+    src = Path(file_name)
+    return src.with_name(src.stem + ".ref")
+
+
+def _source_meta(file_name: str) -> dict:
+    st = os.stat(file_name)
+    return {"source": os.path.basename(file_name), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _route_key(origin, dest, ordinal):
+    origin, dest, ordinal = (np.asarray(v, dtype=np.int64) for v in (origin, dest, ordinal))
+    return (origin << 35) | (dest << 20) | ordinal
+
+
+def _delays(series) -> np.ndarray:
+    values = pd.to_numeric(series, errors="coerce")
+    out = values.fillna(DELAY_NULL).clip(DELAY_NULL, np.iinfo(np.int16).max)
+    return out.to_numpy(dtype=np.int16)
+
+
+def convert_to_reference(file_name: str) -> Path:
+    """Zamienia flights_N.csv na kolumny .npy + słowniki + posortowane indeksy (jednorazowo, z cache)."""
+    out_dir = _cache_dir(file_name)
+    meta_path = out_dir / "meta.json"
+    meta = _source_meta(file_name)
+
+    if meta_path.exists():
+        with open(meta_path) as f:
+            if json.load(f).get("source_meta") == meta:
+                return out_dir
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df = read_frame(
+        file_name,
+        columns=["month", "fl_date", "op_unique_carrier", "origin", "dest", "arr_delay", "dep_delay", "cancelled"],
+    )
+
+    carriers = sorted(df["op_unique_carrier"].dropna().unique().tolist())
+    airports = sorted(set(df["origin"].dropna().unique()) | set(df["dest"].dropna().unique()))
+
+    cols = {
+        "carrier": pd.Index(carriers).get_indexer(df["op_unique_carrier"]).astype(np.int16),
+        "origin": pd.Index(airports).get_indexer(df["origin"]).astype(np.int16),
+        "dest": pd.Index(airports).get_indexer(df["dest"]).astype(np.int16),
+        "month": df["month"].to_numpy(dtype=np.int8),
+        "fl_date": (pd.to_datetime(df["fl_date"]).to_numpy(dtype="datetime64[D]").astype(np.int64)
+                    + _EPOCH_ORDINAL).astype(np.int32),
+        "arr_delay": _delays(df["arr_delay"]),
+        "dep_delay": _delays(df["dep_delay"]),
+        "cancelled": df["cancelled"].fillna(0).to_numpy() == 1,
+    }
+    cols["has_perf"] = ~cols["cancelled"]
+
+    for name, dtype in REFERENCE_COLUMNS.items():
+        np.save(out_dir / f"{name}.npy", cols[name].astype(dtype, copy=False))
+
+    # indeks (origin, dest, fl_date): posortowane klucze + permutacja
+    keys = _route_key(cols["origin"], cols["dest"], cols["fl_date"])
+    route_perm = np.argsort(keys, kind="stable")
+    np.save(out_dir / "idx_route_key.npy", keys[route_perm])
+    np.save(out_dir / "idx_route_perm.npy", route_perm.astype(np.int32))
+
+    # indeks month: permutacja + granice dla miesięcy 0..13
+    month_perm = np.argsort(cols["month"], kind="stable")
+    bounds = np.searchsorted(cols["month"][month_perm], np.arange(0, 14), side="left")
+    np.save(out_dir / "idx_month_perm.npy", month_perm.astype(np.int32))
+    np.save(out_dir / "idx_month_bounds.npy", bounds.astype(np.int64))
+
+    with open(meta_path, "w") as f:
+        json.dump({"source_meta": meta, "rows": int(len(df)), "carriers": carriers, "airports": airports}, f)
+    return out_dir
+
+
+def reset_reference():
+    global _STORE
+    _STORE = None
+
+
+def import_to_reference(file_name: str, cfg=None) -> None:
+    global _STORE
+    print(f"\n[IMPORTING] Converting {file_name} into reference columns...")
+
+    if not os.path.exists(file_name):
+        print(f"ERROR: File not found: {file_name}")
+        return
+
+    t0 = time.perf_counter()
+    out_dir = convert_to_reference(file_name)
+    with open(out_dir / "meta.json") as f:
+        meta = json.load(f)
+
+    # mmap_mode="c": copy-on-write, więc scenariusze zapisu nie ruszają plików na dysku
+    cols = {name: np.load(out_dir / f"{name}.npy", mmap_mode="c") for name in REFERENCE_COLUMNS}
+    idx = {name: np.load(out_dir / f"{name}.npy", mmap_mode="r")
+           for name in ("idx_route_key", "idx_route_perm", "idx_month_perm", "idx_month_bounds")}
+
+    _STORE = {
+        "rows": int(meta["rows"]),
+        "cols": cols,
+        "idx": idx,
+        "carriers": list(meta["carriers"]),
+        "airports": list(meta["airports"]),
+        "delta": {name: [] for name in REFERENCE_COLUMNS},
+    }
+    dt = time.perf_counter() - t0
+    print(f"[IMPORTING][reference] done. Total: {_STORE['rows']} records in {dt:.2f}s ({out_dir})")
+
+
+def _store():
+    if _STORE is None:
+        raise RuntimeError("Silnik referencyjny nie ma załadowanych danych (import_to_reference)")
+    return _STORE
+
+
+def _code(store, dict_name: str, value: str, add: bool = False) -> int:
+    values = store[dict_name]
+    try:
+        return values.index(value)
+    except ValueError:
+        if not add:
+            return -1
+        values.append(value)
+        return len(values) - 1
+
+
+def _delta_array(store, name: str) -> np.ndarray:
+    return np.asarray(store["delta"][name], dtype=REFERENCE_COLUMNS[name])
+
+
+def _ordinal_range(date_from: str, date_to: str):
+    """Zakres dni, których północ mieści się w [date_from, date_to] (semantyka TIMESTAMP BETWEEN)."""
+    d0 = datetime.fromisoformat(date_from)
+    d1 = datetime.fromisoformat(date_to)
+    lo = d0.date() if d0.time() == datetime.min.time() else d0.date() + timedelta(days=1)
+    return lo.toordinal(), d1.date().toordinal()
+
+
+class ReferenceScenario(Scenario):
+    def prepare(self, ctx):
+        ctx.conn = _store()
+
+
+class ReferenceAddFlight(ReferenceScenario):
+    name = "reference_add_flight"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["flight"] = insert_flight_entry(ctx.cfg, ctx.iteration)
+
+    def run(self, ctx):
+        store, flight = ctx.conn, ctx.params["flight"]
+        delta = store["delta"]
+        delta["carrier"].append(_code(store, "carriers", flight["op_unique_carrier"], add=True))
+        delta["origin"].append(_code(store, "airports", flight["origin"], add=True))
+        delta["dest"].append(_code(store, "airports", flight["dest"], add=True))
+        delta["month"].append(int(flight["month"]))
+        delta["fl_date"].append(datetime.fromisoformat(str(flight["fl_date"])).date().toordinal())
+        delta["arr_delay"].append(DELAY_NULL)
+        delta["dep_delay"].append(DELAY_NULL)
+        delta["cancelled"].append(False)
+        delta["has_perf"].append(False)
+        inserted_id = store["rows"] + len(delta["month"])
+        return f"inserted_id={inserted_id}"
+
+
+class ReferenceAddFlightStats(ReferenceScenario):
+    name = "reference_add_flight_stats"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        store = ctx.conn
+        # cel jak w SQL (ORDER BY flight_id DESC): ostatni lot bez statystyk, najpierw w delcie
+        pending = [i for i, has in enumerate(store["delta"]["has_perf"]) if not has]
+        if pending:
+            target = (store["delta"], pending[-1], store["rows"] + pending[-1] + 1)
+        else:
+            base_pending = np.flatnonzero(~store["cols"]["has_perf"])
+            if not len(base_pending):
+                raise RuntimeError("Brak lotu bez statystyk dla reference_add_flight_stats")
+            pos = int(base_pending[-1])
+            target = (store["cols"], pos, pos + 1)
+
+        perf, delayed_entry = stats_entries(ctx.cfg, ctx.iteration)
+        ctx.params.update(target=target, perf=perf, delayed_entry=delayed_entry)
+
+    def run(self, ctx):
+        columns, pos, flight_id = ctx.params["target"]
+        columns["has_perf"][pos] = True
+        columns["arr_delay"][pos] = int(ctx.params["perf"].get("arr_delay", 0))
+        return stats_note(flight_id, ctx.params["delayed_entry"])
+
+
+class ReferenceTopRoutesMonth(ReferenceScenario):
+    name = "reference_top_routes_month"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["limit"] = int(ctx.cfg["queries"]["top_routes_month"]["limit"])
+        _, ctx.params["month"] = month_param(ctx)
+
+    def run(self, ctx):
+        month, limit, store = ctx.params["month"], ctx.params["limit"], ctx.conn
+        cols, idx = store["cols"], store["idx"]
+        n_airports = np.int64(max(len(store["airports"]), 1))
+
+        bounds = idx["idx_month_bounds"]
+        rows = idx["idx_month_perm"][bounds[month]:bounds[month + 1]]
+        keys = cols["origin"][rows].astype(np.int64) * n_airports + cols["dest"][rows]
+
+        d_month = _delta_array(store, "month")
+        if len(d_month):
+            sel = d_month == month
+            d_keys = _delta_array(store, "origin")[sel].astype(np.int64) * n_airports + _delta_array(store, "dest")[sel]
+            keys = np.concatenate([keys, d_keys])
+
+        uniq, counts = np.unique(keys, return_counts=True)
+        top = np.lexsort((uniq, -counts))[:limit]
+
+        airports = store["airports"]
+        entries = [
+            f"{airports[int(uniq[i] // n_airports)]}-{airports[int(uniq[i] % n_airports)]}({int(counts[i])})"
+            for i in top
+        ]
+        return ";".join(entries) if entries else "no_results"
+
+
+class ReferenceHistogramArrDelay(ReferenceScenario):
+    name = "reference_histogram_arr_delay"
+
+    def prepare(self, ctx):
+        ctx.params["bins"] = histogram_bins(ctx.cfg)
+        super().prepare(ctx)
+
+    def run(self, ctx):
+        bins, store = ctx.params["bins"], ctx.conn
+        cols = store["cols"]
+
+        delays = cols["arr_delay"][cols["has_perf"] & (cols["arr_delay"] != DELAY_NULL)]
+        d_has = _delta_array(store, "has_perf")
+        if len(d_has):
+            d_delay = _delta_array(store, "arr_delay")
+            delays = np.concatenate([delays, d_delay[d_has & (d_delay != DELAY_NULL)]])
+        counts, _ = np.histogram(delays, bins=np.asarray(bins, dtype=np.int64))
+        # np.histogram zamyka ostatni przedział z prawej strony, SQL nie
+        counts[-1] -= int(np.count_nonzero(delays == bins[-1]))
+        return f"buckets={len(bins)}, total_in_first={int(counts[0])}"
+
+
+class ReferenceFindRouteWithStats(ReferenceScenario):
+    name = "reference_find_route_with_stats"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["args"] = route_params(ctx)
+
+    def run(self, ctx):
+        route_origin, route_dest, date_from, date_to, limit = ctx.params["args"]
+        store = ctx.conn
+
+        origin = _code(store, "airports", route_origin)
+        dest = _code(store, "airports", route_dest)
+        count = 0
+        if origin >= 0 and dest >= 0:
+            lo, hi = _ordinal_range(date_from, date_to)
+            keys = store["idx"]["idx_route_key"]
+            start = np.searchsorted(keys, _route_key(origin, dest, lo), side="left")
+            stop = np.searchsorted(keys, _route_key(origin, dest, hi), side="right")
+            count = int(stop - start)
+
+            d_date = _delta_array(store, "fl_date")
+            if len(d_date):
+                count += int(np.count_nonzero(
+                    (_delta_array(store, "origin") == origin) & (_delta_array(store, "dest") == dest)
+                    & (d_date >= lo) & (d_date <= hi)
+                ))
+        count = min(count, limit)
+        return f"count={count}"
+
+
+class ReferenceRankPunctualAirlines(ReferenceScenario):
+    name = "reference_rank_punctual_airlines"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        ctx.params.update(limit=int(rank_cfg["limit"]), cancellation_weight=float(rank_cfg["cancellation_weight"]),
+                          month=month_param(ctx)[1])
+
+    def run(self, ctx):
+        limit, cancellation_weight = ctx.params["limit"], ctx.params["cancellation_weight"]
+        ranking_for_month = ctx.params["month"]
+        store = ctx.conn
+        cols, idx = store["cols"], store["idx"]
+
+        bounds = idx["idx_month_bounds"]
+        rows = idx["idx_month_perm"][bounds[ranking_for_month]:bounds[ranking_for_month + 1]]
+        carrier = cols["carrier"][rows]
+        delay = cols["arr_delay"][rows]
+        has_delay = cols["has_perf"][rows] & (delay != DELAY_NULL)
+        cancelled = cols["cancelled"][rows]
+
+        d_month = _delta_array(store, "month")
+        if len(d_month):
+            sel = d_month == ranking_for_month
+            d_delay = _delta_array(store, "arr_delay")[sel]
+            carrier = np.concatenate([carrier, _delta_array(store, "carrier")[sel]])
+            has_delay = np.concatenate([has_delay, _delta_array(store, "has_perf")[sel] & (d_delay != DELAY_NULL)])
+            delay = np.concatenate([delay, d_delay])
+            cancelled = np.concatenate([cancelled, _delta_array(store, "cancelled")[sel]])
+
+        n = len(store["carriers"])
+        total = np.bincount(carrier, minlength=n)
+        n_delay = np.bincount(carrier, weights=has_delay, minlength=n)
+        sum_delay = np.bincount(carrier, weights=np.where(has_delay, delay, 0), minlength=n)
+        n_cancelled = np.bincount(carrier, weights=cancelled, minlength=n)
+
+        avg_delay = np.divide(sum_delay, n_delay, out=np.zeros(n), where=n_delay > 0)
+        score = avg_delay + (n_cancelled * cancellation_weight / np.maximum(total, 1)) * 100
+        present = np.flatnonzero(total > 0)
+        ranking = present[np.argsort(score[present], kind="stable")][:limit]
+
+        if not len(ranking):
+            return "no_results"
+        return "month=" + str(ranking_for_month) + ", most_punctual=" + store["carriers"][int(ranking[0])]
+
+
+SCENARIOS_REFERENCE = [
+    ReferenceAddFlight(),
+    ReferenceAddFlightStats(),
+    ReferenceTopRoutesMonth(),
+    ReferenceHistogramArrDelay(),
+    ReferenceFindRouteWithStats(),
+    ReferenceRankPunctualAirlines(),
+]
+
+
+def run_reference(cfg, dataset_size: int, dataset_name: str):
+    run_scenarios("reference", SCENARIOS_REFERENCE, cfg, dataset_name)
@@ -1,15 +1,33 @@
 import csv
+import time
 import yaml
 from pathlib import Path
 
-from bench_cassandra import run_cassandra, reset_cassandra
-from bench_mongo import run_mongo, reset_mongo
-from bench_mysql import run_mysql, reset_mysql
-from bench_postgres import run_postgres, reset_postgres
-from make_samples import make_samples
+from bench_cassandra import run_cassandra, reset_cassandra, cleanup_cassandra, SCENARIOS_CASS
+from bench_duckdb import run_duckdb, reset_duckdb, import_to_duckdb, cleanup_duckdb, analyze_duckdb, SCENARIOS_DUCKDB
+from bench_sqlite import run_sqlite, reset_sqlite, cleanup_sqlite, analyze_sqlite, SCENARIOS_SQLITE
+from bench_reference import run_reference, reset_reference, import_to_reference
+from bench_mongo import run_mongo, reset_mongo, cleanup_mongo, analyze_mongo, mongo_db_label, SCENARIOS_MONGO
+from bench_mysql import run_mysql, reset_mysql, cleanup_mysql, analyze_mysql, SCENARIOS_MYSQL
+from bench_postgres import run_postgres, reset_postgres, cleanup_postgres, analyze_postgres, SCENARIOS_POSTGRES
+from bench_common import log_result, add_before_scenario_hook, clear_scenario_hooks, set_result_tags, set_run_tags
+from cache_state import cache_modes, install_cache_hook
+from client_profiling import install_profiling_probe
+from latency_proxy import PROXY_TARGETS, run_rtt_sweep
+from make_samples import DEFAULT_SEED, make_samples
+from net_delay import run_delay_sweep
+from param_gen import load_params
+from quiesce import quiesce
+from result_cache import run_cache_workload
+from scenario import forget_write_state, set_statement_mode, statement_modes
+from server_config import PROFILE_BACKENDS, apply_profile, reset_profile, server_profiles
+from server_metrics import install_metrics_probe
+from snapshots import SNAPSHOT_BACKENDS, snapshot_key, has_snapshot, create_snapshot, restore_snapshot
+from synth_data import ensure_profile, generate_dataset
 
 from sql_import.import_postgres import import_to_postgres
 from sql_import.import_mysql import import_to_mysql
+from sql_import.import_sqlite import import_to_sqlite
 from nosql_import import import_to_mongo, import_to_cassandra
 
 RESULTS_PATH = Path("/app/results/results.csv")
@@ -24,49 +42,163 @@ def ensure_results_header():
         with open(RESULTS_PATH, "w", newline="") as f:
             csv.writer(f).writerow(["ts", "db", "dataset", "scenario", "repeat", "elapsed_ms", "notes"])
 
-db_importers = {
-    "mysql": import_to_mysql,
-    "postgres": import_to_postgres,
-    "mongo": import_to_mongo,
-    "cassandra": import_to_cassandra,
-}
-
 db_importers = {
     "mongo": import_to_mongo,
     "mysql": import_to_mysql,
     "postgres": import_to_postgres,
-    "cassandra": import_to_cassandra
+    "cassandra": import_to_cassandra,
+    "duckdb": import_to_duckdb,
+    "sqlite": import_to_sqlite,
+    "reference": import_to_reference,
 }
 
 db_resetters = {
     "mongo": reset_mongo,
     "mysql": reset_mysql,
     "postgres": reset_postgres,
-    "cassandra": reset_cassandra
+    "cassandra": reset_cassandra,
+    "duckdb": reset_duckdb,
+    "sqlite": reset_sqlite,
+    "reference": reset_reference,
+}
+
+# import przyrostowy: sprzątanie po scenariuszach zapisu zamiast resetu (brak wpisu = zawsze pełny import)
+db_cleaners = {
+    "mongo": cleanup_mongo,
+    "mysql": cleanup_mysql,
+    "postgres": cleanup_postgres,
+    "cassandra": cleanup_cassandra,
+    "duckdb": cleanup_duckdb,
+    "sqlite": cleanup_sqlite,
+}
+
+db_stats_refreshers = {
+    "mongo": analyze_mongo,
+    "mysql": analyze_mysql,
+    "postgres": analyze_postgres,
+    "duckdb": analyze_duckdb,
+    "sqlite": analyze_sqlite,
 }
 
+# import.parallel (zakresy flight_id w osobnych procesach) obsługują tylko importery postgres/mysql
+PARALLEL_IMPORT_DBS = {"mysql", "postgres"}
+
+# statements.modes (text / prepared) - instrukcje przygotowane po stronie serwera mają tylko backendy SQL z serwerem
+STATEMENT_DBS = {"mysql", "postgres"}
+
 db_runners = {
     "mongo": run_mongo,
     "mysql": run_mysql,
     "postgres": run_postgres,
     "cassandra": run_cassandra,
+    "duckdb": run_duckdb,
+    "sqlite": run_sqlite,
+    "reference": run_reference,
+}
+
+# mieszany workload przez cache wyników (result_cache.enabled)
+db_scenarios = {
+    "mongo": SCENARIOS_MONGO,
+    "mysql": SCENARIOS_MYSQL,
+    "postgres": SCENARIOS_POSTGRES,
+    "cassandra": SCENARIOS_CASS,
+    "duckdb": SCENARIOS_DUCKDB,
+    "sqlite": SCENARIOS_SQLITE,
 }
 
 def prepare_samples(cfg):
-    datasets = [int(d["size"]) for d in cfg["datasets"]]
+    sampled = [d for d in cfg["datasets"] if not d.get("synthetic")]
     src_file = cfg["samples"]["src_file"]
     dst_dir = cfg["samples"]["dst_dir"]
-    make_samples(src_file, dst_dir, datasets)
+
+    if sampled:
+        t0 = time.perf_counter()
+        manifest = make_samples(src_file, dst_dir, [int(d["size"]) for d in sampled],
+                                cache_dir=cfg["samples"].get("cache_dir"),
+                                compression=cfg["samples"].get("compression"),
+                                seed=cfg["samples"].get("seed", DEFAULT_SEED))
+        dt = (time.perf_counter() - t0) * 1000
+
+        # seed i hash źródła trafiają do wyników, żeby dało się odtworzyć dokładnie te same próbki
+        for dataset in sampled if manifest else []:
+            notes = (f"seed={manifest['seed']}, source_sha256={manifest['source_sha256'][:16]}, "
+                     f"mode={manifest['mode']}, cached={str(manifest['cached']).lower()}")
+            log_result("samples", dataset["name"], "samples_make", 1, dt, notes)
+
+    prepare_synthetic(cfg)
+
+
+def prepare_synthetic(cfg):
+    synthetic = [d for d in cfg["datasets"] if d.get("synthetic")]
+    if not synthetic:
+        return
+
+    syn_cfg = cfg.get("synthetic", {})
+    dst_dir = cfg["samples"]["dst_dir"]
+    profile = ensure_profile(cfg["samples"]["src_file"], syn_cfg.get("profile_dir") or dst_dir)
+
+    for dataset in synthetic:
+        t0 = time.perf_counter()
+        manifest = generate_dataset(profile, dst_dir, int(dataset["size"]),
+                                    seed=int(syn_cfg.get("seed", DEFAULT_SEED)),
+                                    workers=int(syn_cfg.get("workers", 0)),
+                                    shard_rows=int(syn_cfg.get("shard_rows", 1_000_000)),
+                                    fmt=syn_cfg.get("format", "csv"))
+        dt = (time.perf_counter() - t0) * 1000
+        notes = (f"seed={manifest['seed']}, profile_sha256={manifest['profile'][:16]}, "
+                 f"workers={manifest['workers']}, mode=synthetic, cached={str(manifest['cached']).lower()}")
+        log_result("samples", dataset["name"], "samples_make", 1, dt, notes)
+
+def nested_with(prev, dataset, cfg) -> bool:
+    """Czy plik `dataset` zaczyna się od wszystkich wierszy `prev` (wtedy wystarczy doładować deltę)."""
+    if prev is None or int(prev["size"]) >= int(dataset["size"]):
+        return False
+    if bool(prev.get("synthetic")) != bool(dataset.get("synthetic")):
+        return False
+    if dataset.get("synthetic"):
+        # shard i ma ten sam seed w każdym rozmiarze, więc prefiksem są tylko pełne shardy
+        return int(prev["size"]) % int(cfg.get("synthetic", {}).get("shard_rows", 1_000_000)) == 0
+    # make_samples zapisuje mniejsze próbki jako prefiksy większych
+    return True
+
+def import_worker_sweep(cfg, db) -> list:
+    """Configi kolejnych pełnych importów: po jednym na liczbę workerów z import.parallel.sweep."""
+    sweep = cfg.get("import", {}).get("parallel", {}).get("sweep") or []
+    if db not in PARALLEL_IMPORT_DBS or not sweep:
+        return [cfg]
+
+    runs = []
+    for workers in sweep:
+        import_cfg = dict(cfg.get("import", {}))
+        import_cfg["parallel"] = {**import_cfg.get("parallel", {}), "workers": int(workers)}
+        runs.append({**cfg, "import": import_cfg})
+    return runs
+
+def install_restore_hook(cfg, db, key):
+    """Opcjonalny restore snapshotu przed wybranymi scenariuszami (restore_before_scenarios: lista albo all)."""
+    wanted = cfg.get("snapshots", {}).get("restore_before_scenarios") or []
+    if not wanted:
+        return
+
+    def hook(label, scenario, repeat, run):
+        if repeat == 1 and (wanted == "all" or scenario in wanted):
+            restore_snapshot(db, key, cfg)
+
+    add_before_scenario_hook(hook)
 
 if __name__ == "__main__":
     cfg = load_cfg()
-    prepare_samples(cfg)
     ensure_results_header()
+    prepare_samples(cfg)
     dbs_to_run = cfg["db"]
-    datasets = cfg["datasets"]
+    datasets = sorted(cfg["datasets"], key=lambda d: int(d["size"]))
     path_to_samples = cfg["samples"]["dst_dir"]
+    incremental = cfg.get("import", {}).get("mode", "full") == "incremental"
+    use_snapshots = bool(cfg.get("snapshots", {}).get("enabled"))
+    use_quiesce = bool(cfg.get("quiesce", {}).get("enabled"))
 
     for db in dbs_to_run:
+        prev = None
         for dataset in datasets:
             dataset_size = int(dataset["size"])
             dataset_name = dataset["name"]
@@ -74,12 +206,105 @@ if __name__ == "__main__":
             run_function = db_runners[db]
             reset_function = db_resetters[db]
             import_function = db_importers[db]
+            sample_path = path_to_samples + "/flights_" + str(dataset_size) + ".csv"
+
+            snap_key = None
+            if use_snapshots and db in SNAPSHOT_BACKENDS:
+                snap_key = snapshot_key(db, dataset_name, sample_path, cfg)
+
+            import_timers = []
+            if snap_key and has_snapshot(db, snap_key, cfg):
+                print(f"\n[RESTORE] Restoring {db} snapshot for dataset **{dataset_name}**...")
+                restore_snapshot(db, snap_key, cfg)
+            elif incremental and db in db_cleaners and nested_with(prev, dataset, cfg):
+                start_row = int(prev["size"])
+                print(f"\n[CLEANUP] Removing write-scenario rows from {db} before dataset **{dataset_name}**...")
+                db_cleaners[db](cfg, start_row)
+
+                print(f"\n[IMPORTING] Importing rows {start_row}..{dataset_size} to {db} for dataset **{dataset_name}**...")
+                import_timers.append(import_function(sample_path, cfg, start_row))
+
+                if db in db_stats_refreshers:
+                    print(f"\n[ANALYZE] Refreshing {db} statistics...")
+                    db_stats_refreshers[db]()
+            else:
+                # przy import.parallel.sweep pełny import powtarzamy dla każdej liczby workerów
+                for import_cfg in import_worker_sweep(cfg, db):
+                    print(f"\n[RESET] Cleaning {db} before dataset **{dataset_name}**...")
+                    reset_function()
+                    forget_write_state(db)
+
+                    print(f"\n[IMPORTING] Importing to {db} for dataset **{dataset_name}**...")
+                    import_timers.append(import_function(sample_path, import_cfg))
+
+            for repeat, import_timer in enumerate(import_timers, 1):
+                if import_timer:
+                    import_timer.log(dataset_name, repeat)
+
+            if snap_key and not has_snapshot(db, snap_key, cfg):
+                create_snapshot(db, snap_key, cfg)
+            prev = dataset
+
+            if use_quiesce:
+                quiesce(db, cfg, dataset_name)
+
+            # parametry scenariuszy z rozkładu próbki - raz na dataset, te same dla każdej bazy
+            load_params(cfg, dataset_name, sample_path)
+
+            # server_profiles: scenariusze raz na profil konfiguracji serwera (bazy bez profili - raz, bez tagu)
+            profiles = server_profiles(cfg) if db in PROFILE_BACKENDS else []
+            for profile in profiles or [None]:
+                profile_tags = {}
+                if profile:
+                    restart = apply_profile(db, profile, cfg, dataset_name)
+                    profile_tags = {"profile": profile["name"], "restart": None if restart == "no" else restart}
+
+                # statements.modes: [] - jeden przebieg (text) bez tagu; [text, prepared] - osobny przebieg na protokół
+                for protocol in (statement_modes(cfg) if db in STATEMENT_DBS else []) or [None]:
+                    set_statement_mode(protocol)
+                    set_run_tags(**profile_tags, protocol=protocol)
+
+                    # cache.modes: [] - jeden przebieg bez tagu; [cold, warm] - osobny przebieg scenariuszy dla każdego trybu
+                    for cache_mode in cache_modes(cfg) or [None]:
+                        clear_scenario_hooks()
+                        if snap_key:
+                            install_restore_hook(cfg, db, snap_key)
+                        if cache_mode:
+                            install_cache_hook(cfg, db, cache_mode)
+                        install_metrics_probe(cfg, db)
+                        install_profiling_probe(cfg)
+
+                        print(f"\nStarting tests for **{db}**, dataset size **{dataset_name}**"
+                              + (f", statements **{protocol}**" if protocol else "")
+                              + (f", cache **{cache_mode}**..." if cache_mode else "..."))
+                        run_function(cfg, dataset_size, dataset_name)
+                        set_result_tags()
+
+            set_run_tags()
+            set_statement_mode(None)
+            if profiles:
+                reset_profile(db, cfg)
+
+            # pipeline.delays_ms: scenariusze zapisu (sekwencyjne vs pipelined) pod sztucznym opóźnieniem sieci
+            if cfg.get("pipeline", {}).get("delays_ms") and db in db_scenarios:
+                clear_scenario_hooks()
+                run_delay_sweep(db, db_scenarios[db], cfg, dataset_name)
+
+            # network.rtt_ms: scenariusze (i opcjonalnie import) przez proxy z opóźnieniem, jitterem i limitem łącza
+            if cfg.get("network", {}).get("rtt_ms") and db in PROXY_TARGETS:
+                clear_scenario_hooks()
 
-            print(f"\n[RESET] Cleaning {db} before dataset **{dataset_name}**...")
-            reset_function()
+                def reimport():
+                    print(f"\n[RESET] Cleaning {db} before import through latency proxy...")
+                    reset_function()
+                    forget_write_state(db)
+                    return import_function(sample_path, cfg)
 
-            print(f"\n[IMPORTING] Importing to {db} for dataset **{dataset_name}**...")
-            import_function(path_to_samples + "/flights_" + str(dataset_size) + ".csv")
+                label = mongo_db_label(cfg) if db == "mongo" else db
+                run_rtt_sweep(db, db_scenarios[db], cfg, dataset_name, label, reimport)
 
-            print(f"\nStarting tests for **{db}**, dataset size **{dataset_name}**...")
-            run_function(cfg, dataset_size, dataset_name)
+            if cfg.get("result_cache", {}).get("enabled") and db in db_scenarios:
+                clear_scenario_hooks()
+                label = mongo_db_label(cfg) if db == "mongo" else db
+                print(f"\nStarting result cache workload for **{db}**, dataset size **{dataset_name}**...")
+                run_cache_workload(db, db_scenarios[db], cfg, dataset_name, label)
@@ -0,0 +1,326 @@
+import os
+import sqlite3
+
+from dimensions import ensure_flight_dimensions
+
+from scenario import (FLIGHT_INSERT_COLS, Scenario, delayed_values, flight_values, forget_write_state,
+                      histogram_bins, insert_flight_entry, month_param, performance_values, route_params, run_scenarios,
+                      stats_entries, stats_note, write_state)
+
+_CONN = None
+
+SQLITE_DEFAULTS = {
+    "mmap_size": 268435456,   # PRAGMA mmap_size w bajtach, 0 = bez mmap
+    "cache_size": -262144,    # PRAGMA cache_size: < 0 = KiB, > 0 = liczba stron
+    "synchronous": "NORMAL",  # tryb na czas scenariuszy (import zawsze jedzie z OFF)
+}
+
+
+def _sqlite_settings(cfg=None) -> dict:
+    settings = dict(SQLITE_DEFAULTS)
+    settings.update((cfg or {}).get("sqlite") or {})
+    return settings
+
+
+def _sqlite_path() -> str:
+    return os.getenv("SQLITE_PATH", "/tmp/flights.sqlite")
+
+
+def apply_sqlite_pragmas(conn, cfg=None):
+    settings = _sqlite_settings(cfg)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+
+
+def sqlite_conn(cfg=None):
+    global _CONN
+    if _CONN is None:
+        _CONN = sqlite3.connect(_sqlite_path())
+        apply_sqlite_pragmas(_CONN, cfg)
+    return _CONN
+
+
+def close_sqlite():
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
+
+
+def reset_sqlite():
+    close_sqlite()
+
+    path = _sqlite_path()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def cleanup_sqlite(cfg, keep_rows: int):
+    """
+    Przed importem przyrostowym: usuwa wiersze scenariuszy zapisu (flight_id > keep_rows i statystyki
+    add_flight_stats ze stanu zapisu) i osierocone słowniki.
+    """
+    conn = sqlite_conn(cfg)
+    cur = conn.cursor()
+    try:
+        for table in ["flight_status", "flights_performance", "flights_delayed", "flights_cancelled", "flights"]:
+            cur.execute(f"DELETE FROM {table} WHERE flight_id > ?", (keep_rows,))
+        # statystyki z add_flight_stats mogą wisieć na locie z importu (cel awaryjny bez stanu zapisu)
+        stats_ids = [int(i) for i in write_state("sqlite").stats_ids]
+        if stats_ids:
+            placeholders = ", ".join(["?"] * len(stats_ids))
+            for table in ["flight_status", "flights_performance", "flights_delayed"]:
+                cur.execute(f"DELETE FROM {table} WHERE flight_id IN ({placeholders})", stats_ids)
+        cur.execute(
+            "DELETE FROM airport WHERE city_name IS NULL "
+            "AND airport_code NOT IN (SELECT origin FROM flights) "
+            "AND airport_code NOT IN (SELECT dest FROM flights)"
+        )
+        cur.execute("DELETE FROM airline WHERE carrier_code NOT IN (SELECT op_unique_carrier FROM flights)")
+        conn.commit()
+    finally:
+        cur.close()
+
+    forget_write_state("sqlite")
+
+
+def analyze_sqlite():
+    conn = sqlite_conn()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+class SqliteScenario(Scenario):
+    """Kursor na wspólnym połączeniu w prepare(), zamknięcie kursora w cleanup()."""
+
+    def prepare(self, ctx):
+        ctx.conn = sqlite_conn(ctx.cfg)
+        ctx.cur = ctx.conn.cursor()
+
+    def cleanup(self, ctx):
+        if ctx.cur is not None:
+            ctx.cur.close()
+
+
+class SqliteAddFlight(SqliteScenario):
+    name = "sqlite_add_flight"
+
+    insert_sql = (
+        f"INSERT INTO flights ({', '.join(FLIGHT_INSERT_COLS)}) "
+        f"VALUES ({', '.join(['?'] * len(FLIGHT_INSERT_COLS))})"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        flight = insert_flight_entry(ctx.cfg, ctx.iteration)
+
+        # słowniki (airline/airport) poza pomiarem: zapytanie tylko dla kodów nieznanych rejestrowi
+        ensure_flight_dimensions(ctx, flight)
+        ctx.conn.commit()
+        ctx.params["vals"] = flight_values(flight, flight["op_unique_carrier"])
+
+    def run(self, ctx):
+        ctx.cur.execute(self.insert_sql, ctx.params["vals"])
+        ctx.result = ctx.cur.lastrowid
+        ctx.conn.commit()
+        return f"inserted_id={ctx.result}"
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_flight(ctx.result)
+        super().cleanup(ctx)
+
+
+class SqliteAddFlightStats(SqliteScenario):
+    name = "sqlite_add_flight_stats"
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        # cel: najnowszy lot z add_flight bez statystyk; anti-join tylko, gdy stanu nie ma
+        flight_id = ctx.state.take_pending(newest=True)
+        if flight_id is None:
+            ctx.cur.execute(
+                """
+                SELECT f.flight_id
+                FROM flights f
+                LEFT JOIN flights_performance p ON p.flight_id = f.flight_id
+                WHERE p.flight_id IS NULL
+                ORDER BY f.flight_id DESC
+                LIMIT 1
+                """
+            )
+            row = ctx.cur.fetchone()
+            if not row or row[0] is None:
+                raise RuntimeError("Brak lotu bez statystyk dla sqlite_add_flight_stats")
+            flight_id = row[0]
+
+        perf, delayed_entry = stats_entries(ctx.cfg, ctx.iteration)
+        ctx.params.update(
+            flight_id=flight_id,
+            delayed_entry=delayed_entry,
+            delayed_args=delayed_values(flight_id, delayed_entry) if delayed_entry else None,
+            perf_args=performance_values(flight_id, perf, delayed_entry),
+            status_args=(int(flight_id), int(flight_id), None),
+        )
+
+    def run(self, ctx):
+        cur = ctx.cur
+        if ctx.params["delayed_args"]:
+            cur.execute(
+                """
+                INSERT INTO flights_delayed (
+                    flight_id, carrier_delay, weather_delay, nas_delay, security_delay, late_aircraft_delay
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (flight_id) DO NOTHING
+                """,
+                ctx.params["delayed_args"]
+            )
+
+        cur.execute(
+            """
+            INSERT INTO flights_performance (
+                flight_id, dep_time, dep_delay, taxi_out, wheels_off, wheels_on, taxi_in,
+                arr_time, arr_delay, actual_elapsed_time, air_time, diverted, delay_id
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (flight_id) DO NOTHING
+            """,
+            ctx.params["perf_args"]
+        )
+
+        cur.execute(
+            "INSERT INTO flight_status (flight_id, performance_id, cancellation_id) VALUES (?, ?, ?)",
+            ctx.params["status_args"]
+        )
+
+        ctx.conn.commit()
+        return stats_note(ctx.params["flight_id"], ctx.params["delayed_entry"])
+
+    def cleanup(self, ctx):
+        if ctx.completed:
+            ctx.state.add_stats(ctx.params["flight_id"])
+        super().cleanup(ctx)
+
+
+class SqliteTopRoutesMonth(SqliteScenario):
+    name = "sqlite_top_routes_month"
+
+    sql = (
+        "SELECT f.origin, f.dest, COUNT(*) AS flights_count "
+        "FROM flights f "
+        "WHERE f.month = ? "
+        "GROUP BY f.origin, f.dest "
+        "ORDER BY flights_count DESC "
+        "LIMIT ?"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        _, month = month_param(ctx)
+        ctx.params["args"] = (month, int(ctx.cfg["queries"]["top_routes_month"]["limit"]))
+
+    def run(self, ctx):
+        ctx.cur.execute(self.sql, ctx.params["args"])
+        rows = ctx.cur.fetchall()
+
+        entries = [f"{origin}-{dest}({count})" for origin, dest, count in rows]
+        return ";".join(entries) if entries else "no_results"
+
+
+class SqliteHistogramArrDelay(SqliteScenario):
+    name = "sqlite_histogram_arr_delay"
+
+    def prepare(self, ctx):
+        bins = histogram_bins(ctx.cfg)
+        parts = []
+        params = []
+        for i in range(len(bins) - 1):
+            parts.append(f"SUM(CASE WHEN p.arr_delay >= ? AND p.arr_delay < ? THEN 1 ELSE 0 END) AS b{i}")
+            params.extend([bins[i], bins[i + 1]])
+
+        parts.append("SUM(CASE WHEN p.arr_delay < ? OR p.arr_delay >= ? OR p.arr_delay IS NULL THEN 1 ELSE 0 END) AS other")
+        params.extend([bins[0], bins[-1]])
+
+        super().prepare(ctx)
+        ctx.params.update(sql="SELECT " + ", ".join(parts) + " FROM flights_performance p",
+                          args=tuple(params), buckets=len(bins))
+
+    def run(self, ctx):
+        ctx.cur.execute(ctx.params["sql"], ctx.params["args"])
+        row = ctx.cur.fetchone()
+        return f"buckets={ctx.params['buckets']}, total_in_first={(row[0] or 0) if row else 0}"
+
+
+class SqliteFindRouteWithStats(SqliteScenario):
+    name = "sqlite_find_route_with_stats"
+
+    sql = (
+        "SELECT f.flight_id, f.fl_date, f.op_unique_carrier, f.op_carrier_fl_num, f.origin, f.dest, "
+        "p.dep_time, p.dep_delay, p.arr_time, p.arr_delay, p.actual_elapsed_time, p.air_time, p.diverted, "
+        "d.carrier_delay, d.weather_delay, d.nas_delay, d.security_delay, d.late_aircraft_delay, "
+        "c.cancellation_code "
+        "FROM flights f "
+        "LEFT JOIN flights_performance p ON f.flight_id = p.flight_id "
+        "LEFT JOIN flights_delayed d ON p.delay_id = d.flight_id "
+        "LEFT JOIN flights_cancelled c ON f.flight_id = c.flight_id "
+        "WHERE f.origin = ? AND f.dest = ? AND f.fl_date BETWEEN ? AND ? "
+        "LIMIT ?"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        ctx.params["args"] = route_params(ctx)
+
+    def run(self, ctx):
+        ctx.cur.execute(self.sql, ctx.params["args"])
+        rows = ctx.cur.fetchall()
+        return f"count={len(rows)}"
+
+
+class SqliteRankPunctualAirlines(SqliteScenario):
+    name = "sqlite_rank_punctual_airlines"
+
+    sql = (
+        "SELECT f.op_unique_carrier AS carrier, "
+        "       AVG(p.arr_delay) AS avg_arr_delay, "
+        "       SUM(CASE WHEN c.flight_id IS NOT NULL THEN 1 ELSE 0 END) AS cancelled_count, "
+        "       COUNT(f.flight_id) AS total_flights, "
+        "       (COALESCE(AVG(p.arr_delay), 0) + (SUM(CASE WHEN c.flight_id IS NOT NULL THEN 1 ELSE 0 END) * ? / MAX(COUNT(f.flight_id), 1)) * 100) AS score "
+        "FROM flights f "
+        "LEFT JOIN flights_performance p ON f.flight_id = p.flight_id "
+        "LEFT JOIN flights_cancelled c ON f.flight_id = c.flight_id "
+        "WHERE f.month = ? "
+        "GROUP BY f.op_unique_carrier "
+        "HAVING COUNT(f.flight_id) > 0 "
+        "ORDER BY score ASC "
+        "LIMIT ?"
+    )
+
+    def prepare(self, ctx):
+        super().prepare(ctx)
+        rank_cfg = ctx.cfg["queries"]["airlines_ranking"]
+        _, ctx.params["month"] = month_param(ctx)
+        ctx.params["args"] = (float(rank_cfg["cancellation_weight"]), ctx.params["month"], int(rank_cfg["limit"]))
+
+    def run(self, ctx):
+        ctx.cur.execute(self.sql, ctx.params["args"])
+        rows = ctx.cur.fetchall()
+        return ("month=" + str(ctx.params["month"]) + ", most_punctual=" + rows[0][0]) if rows else "no_results"
+
+
+SCENARIOS_SQLITE = [
+    SqliteAddFlight(),
+    SqliteAddFlightStats(),
+    SqliteTopRoutesMonth(),
+    SqliteHistogramArrDelay(),
+    SqliteFindRouteWithStats(),
+    SqliteRankPunctualAirlines(),
+]
+
+
+def run_sqlite(cfg, dataset_size: int, dataset_name: str):
+    run_scenarios("sqlite", SCENARIOS_SQLITE, cfg, dataset_name)
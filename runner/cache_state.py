@@ -0,0 +1,364 @@
+"""
+Tryby pomiaru cache: cold / warm, ustawiane przez cache.modes w configu.
+
+Każdy tryb to osobny przebieg scenariuszy; wyniki mają w notatce tag "| cache=cold" / "| cache=warm"
+(cold dodatkowo evict=<metoda>), więc obie krzywe da się narysować osobno.
+
+cold - przed KAŻDYM powtórzeniem usuwamy dane z cache:
+- restart kontenera bazy (cache.cold.restart_containers, wymaga CLI dockera w runnerze), albo w bazie:
+  - postgres:  pg_buffercache_evict() dla wszystkich buforów (PG 17+) + DISCARD ALL i nowa pula połączeń
+  - mysql:     zmniejszenie innodb_buffer_pool_size do minimum i powrót (resize online wyrzuca strony)
+  - mongo:     cache_size WiredTiger do minimum i powrót + planCacheClear
+  - cassandra: nodetool invalidatekeycache / invalidaterowcache (docker exec)
+  - sqlite/duckdb: zamknięcie połączenia + posix_fadvise(DONTNEED) na pliku bazy
+- opcjonalnie page cache systemu w kontenerze (drop_caches; działa tylko w kontenerze uprzywilejowanym)
+
+warm - przed PIERWSZYM powtórzeniem: prewarm (pg_prewarm, skany tabel/indeksów InnoDB, skany kolekcji Mongo,
+odczyt pliku sqlite/duckdb) i cache.warm.iterations niemierzonych wykonań scenariusza
+(poza scenariuszami zapisu z cache.warm.skip).
+"""
+import os
+import shutil
+import subprocess
+import time
+
+import bench_duckdb
+import bench_mongo
+import bench_mysql
+import bench_postgres
+import bench_sqlite
+from bench_common import add_before_scenario_hook, set_result_tags
+
+CACHE_MODES = ("cold", "warm")
+
+DEFAULT_CONTAINERS = {
+    "postgres": "dbbench-postgres",
+    "mysql": "dbbench-mysql",
+    "mongo": "dbbench-mongo",
+    "cassandra": "dbbench-cassandra",
+}
+DEFAULT_WARMUP_SKIP = ["add_flight", "add_flight_stats", "add_flight_stats_pipelined", "update_flight",
+                       "insert_batch", "update_many", "delete_many"]
+
+
+def cache_modes(cfg) -> list:
+    modes = [str(m) for m in (cfg.get("cache", {}).get("modes") or [])]
+    for mode in modes:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+    return modes
+
+
+# ---------------------------------------------------------------- docker
+
+def _docker_available() -> bool:
+    return shutil.which("docker") is not None
+
+
+def _container(cfg, db) -> str:
+    return (cfg.get("cache", {}).get("containers") or {}).get(db, DEFAULT_CONTAINERS.get(db, ""))
+
+
+def _docker(*args) -> bool:
+    res = subprocess.run(["docker", *args], capture_output=True, text=True)
+    return res.returncode == 0
+
+
+def _wait_until(probe, timeout: float = 180.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            probe()
+            return
+        except Exception:
+            if time.perf_counter() >= deadline:
+                raise
+            time.sleep(1)
+
+
+def _drop_os_cache(cfg, db) -> bool:
+    if not cfg.get("cache", {}).get("cold", {}).get("drop_os_cache") or not _docker_available():
+        return False
+    return _docker("exec", _container(cfg, db), "sh", "-c", "sync && echo 3 > /proc/sys/vm/drop_caches")
+
+
+def _fadvise_dontneed(path: str):
+    for p in (path, path + "-wal", path + ".wal"):
+        if os.path.exists(p):
+            fd = os.open(p, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def _read_file(path: str):
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            while f.read(16 * 1024 * 1024):
+                pass
+
+
+# ---------------------------------------------------------------- postgres
+
+def _pg_probe():
+    conn = bench_postgres.postgres_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchone()
+        conn.rollback()
+    finally:
+        bench_postgres._put_conn(conn)
+
+
+def _pg_evict(cfg) -> str:
+    conn = bench_postgres.postgres_conn()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_buffercache")
+        cur.execute("SELECT pg_buffercache_evict(bufferid) FROM pg_buffercache WHERE relfilenode IS NOT NULL")
+        cur.fetchall()
+        cur.execute("DISCARD ALL")
+    finally:
+        cur.close()
+        conn.autocommit = False
+        bench_postgres._put_conn(conn)
+    # nowe backendy = puste cache katalogu i planów we wszystkich sesjach puli
+    bench_postgres.close_postgres_pool()
+    return "buffercache"
+
+
+def _pg_prewarm(cfg):
+    conn = bench_postgres.postgres_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_prewarm")
+        cur.execute("""
+            SELECT pg_prewarm(c.oid)
+            FROM pg_class c
+            WHERE c.relnamespace = 'public'::regnamespace AND c.relkind IN ('r', 'i')
+        """)
+        cur.fetchall()
+        conn.commit()
+    finally:
+        cur.close()
+        bench_postgres._put_conn(conn)
+
+
+# ---------------------------------------------------------------- mysql
+
+def _mysql_probe():
+    conn = bench_mysql.mysql_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchall()
+        cur.close()
+    finally:
+        conn.close()
+
+
+def _mysql_evict(cfg) -> str:
+    from sql_import.import_mysql import get_mysql_connection
+
+    conn = get_mysql_connection()
+    cur = conn.cursor()
+    method = "buffer_pool_resize"
+    try:
+        cur.execute("SELECT @@innodb_buffer_pool_size")
+        size = int(cur.fetchone()[0])
+        try:
+            for target in (0, size):
+                # 0 jest zaokrąglane w górę do minimalnego rozmiaru puli
+                cur.execute(f"SET GLOBAL innodb_buffer_pool_size = {target}")
+                _wait_until(lambda: _mysql_resize_done(cur), timeout=120)
+        except Exception as e:
+            print(f"[cache][mysql] buffer pool resize failed ({e}); only FLUSH TABLES")
+            method = "flush_tables"
+        cur.execute("FLUSH TABLES")
+    finally:
+        cur.close()
+        conn.close()
+    bench_mysql.close_mysql_pool()
+    return method
+
+
+def _mysql_resize_done(cur):
+    cur.execute("SHOW GLOBAL STATUS LIKE 'Innodb_buffer_pool_resize_status_code'")
+    row = cur.fetchone()
+    if row and int(row[1]) != 0:
+        raise RuntimeError("buffer pool resize in progress")
+
+
+def _mysql_prewarm(cfg):
+    conn = bench_mysql.mysql_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT table_name, index_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND seq_in_index = 1
+        """)
+        for table, index in cur.fetchall():
+            # pełny skan indeksu ściąga jego strony do buffer poola (PRIMARY = dane tabeli)
+            cur.execute(f"SELECT COUNT(*) FROM {table} FORCE INDEX (`{index}`)")
+            cur.fetchall()
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+# ---------------------------------------------------------------- mongo
+
+def _mongo_probe():
+    client = bench_mongo.mongo_client()
+    try:
+        client.admin.command("ping")
+    finally:
+        client.close()
+
+
+def _mongo_evict(cfg) -> str:
+    client = bench_mongo.mongo_client()
+    try:
+        cache = client.admin.command("serverStatus")["wiredTiger"]["cache"]
+        size_mb = max(1, int(cache["maximum bytes configured"]) // (1024 * 1024))
+        for target in ("1M", f"{size_mb}M"):
+            client.admin.command({"setParameter": 1, "wiredTigerEngineRuntimeConfig": f"cache_size={target}"})
+        db = client["flightsdb"]
+        for name in db.list_collection_names():
+            db.command({"planCacheClear": name})
+    finally:
+        client.close()
+    return "wt_cache_resize"
+
+
+def _mongo_prewarm(cfg):
+    client = bench_mongo.mongo_client()
+    try:
+        db = client["flightsdb"]
+        for name in db.list_collection_names():
+            col = db[name]
+            list(col.aggregate([{"$group": {"_id": None, "n": {"$sum": 1}}}]))
+            for index in col.list_indexes():
+                keys = {k: 1 for k in index["key"]}
+                if "_id" not in keys:
+                    keys["_id"] = 0
+                for _ in col.find({}, keys).hint(index["name"]).batch_size(10_000):
+                    pass
+    finally:
+        client.close()
+
+
+# ---------------------------------------------------------------- cassandra
+
+def _cass_probe():
+    from bench_cassandra import cass_client
+
+    s = cass_client()
+    try:
+        s.execute("SELECT release_version FROM system.local")
+    finally:
+        s.cluster.shutdown()
+
+
+def _close_cass_session():
+    from bench_cassandra import close_cass_session
+
+    close_cass_session()
+
+
+def _cass_evict(cfg) -> str:
+    if not _docker_available():
+        return "none"
+    container = _container(cfg, "cassandra")
+    for cmd in ("invalidatekeycache", "invalidaterowcache", "invalidatecountercache"):
+        _docker("exec", container, "nodetool", cmd)
+    return "invalidate_caches"
+
+
+# ---------------------------------------------------------------- sqlite / duckdb
+
+def _sqlite_evict(cfg) -> str:
+    bench_sqlite.close_sqlite()
+    _fadvise_dontneed(bench_sqlite._sqlite_path())
+    return "reopen+fadvise"
+
+
+def _duckdb_path() -> str:
+    return os.getenv("DUCKDB_PATH", "/tmp/flights.duckdb")
+
+
+def _duckdb_evict(cfg) -> str:
+    bench_duckdb.close_duckdb()
+    _fadvise_dontneed(_duckdb_path())
+    return "reopen+fadvise"
+
+
+# db -> (eviction w bazie, prewarm, sonda gotowości po restarcie kontenera, porzucenie połączeń)
+CACHE_BACKENDS = {
+    "postgres": (_pg_evict, _pg_prewarm, _pg_probe, bench_postgres.close_postgres_pool),
+    "mysql": (_mysql_evict, _mysql_prewarm, _mysql_probe, bench_mysql.close_mysql_pool),
+    "mongo": (_mongo_evict, _mongo_prewarm, _mongo_probe, bench_mongo.close_mongo_client),
+    "cassandra": (_cass_evict, None, _cass_probe, _close_cass_session),
+    "sqlite": (_sqlite_evict, lambda cfg: _read_file(bench_sqlite._sqlite_path()), None, None),
+    "duckdb": (_duckdb_evict, lambda cfg: _read_file(_duckdb_path()), None, None),
+}
+
+
+def restart_container(db: str, cfg) -> bool:
+    """docker restart kontenera bazy + czekanie na gotowość; False, gdy się nie da (brak CLI dockera, sondy)."""
+    _, _, probe, drop_connections = CACHE_BACKENDS[db]
+    if not probe or not _docker_available():
+        return False
+    if drop_connections:
+        drop_connections()
+    if not _docker("restart", _container(cfg, db)):
+        return False
+    _wait_until(probe)
+    return True
+
+
+def evict_caches(db: str, cfg) -> str:
+    """Zimny start dla bazy db; zwraca użytą metodę (trafia do tagu evict=...)."""
+    evict = CACHE_BACKENDS[db][0]
+    cold_cfg = cfg.get("cache", {}).get("cold", {})
+
+    if cold_cfg.get("restart_containers") and restart_container(db, cfg):
+        return "restart"
+
+    method = evict(cfg)
+    if _drop_os_cache(cfg, db):
+        method += "+os"
+    return method
+
+
+def prewarm(db: str, cfg):
+    _, warm, _, _ = CACHE_BACKENDS[db]
+    if warm and cfg.get("cache", {}).get("warm", {}).get("prewarm", True):
+        warm(cfg)
+
+
+def install_cache_hook(cfg, db: str, mode: str):
+    """Hook przed powtórzeniami scenariuszy dla trybu mode; ustawia też tag cache=... w wynikach."""
+    set_result_tags(cache=mode)
+    if db not in CACHE_BACKENDS:
+        return
+
+    warm_cfg = cfg.get("cache", {}).get("warm", {})
+    iterations = int(warm_cfg.get("iterations", 2))
+    skip = set(warm_cfg.get("skip", DEFAULT_WARMUP_SKIP))
+
+    def hook(label, scenario, repeat, run):
+        if mode == "cold":
+            set_result_tags(cache=mode, evict=evict_caches(db, cfg))
+        elif repeat == 1:
+            prewarm(db, cfg)
+            if run is not None and scenario.split("_", 1)[-1] not in skip:
+                for _ in range(iterations):
+                    run()
+
+    add_before_scenario_hook(hook)
@@ -0,0 +1,24 @@
+"""
+Polecenia administracyjne Cassandry w kontenerze bazy (`docker exec`): nodetool flush / snapshot / import
+i skrypty powłoki. Wspólne dla snapshotów, importu (faza flush), quiesce i profili serwera; działają tylko,
+gdy runner ma CLI dockera (cass_exec_available).
+"""
+import os
+import shutil
+import subprocess
+
+CASSANDRA_KEYSPACE = "flights"
+
+
+def cass_container() -> str:
+    return os.getenv("CASSANDRA_CONTAINER", "dbbench-cassandra")
+
+
+def cass_exec_available() -> bool:
+    return shutil.which("docker") is not None
+
+
+def cass_exec(*args) -> str:
+    """Polecenie w kontenerze Cassandry; stdout, CalledProcessError przy błędzie."""
+    res = subprocess.run(["docker", "exec", cass_container(), *args], capture_output=True, text=True, check=True)
+    return res.stdout
@@ -0,0 +1,204 @@
+"""
+Profilowanie klienta (profiling.enabled w configu): ile z mierzonego czasu scenariusza to praca Pythona po stronie
+runnera (dekodowanie wierszy, budowanie słowników, pętle kubełkowania, sorted()), a ile czekanie na bazę.
+
+Sonda obejmuje mierzony odcinek run() każdego powtórzenia i dopisuje do tagów wyniku:
+- cpu_ms:  czas CPU procesu (time.process_time, wszystkie wątki - także wątki I/O sterowników)
+- gc_ms, gc_n:  pauzy odśmiecacza (gc.callbacks)
+- alloc_kb, alloc_peak_kb:  pamięć zaalokowana i nadal żywa po run() / szczyt w trakcie (tracemalloc)
+
+oraz zapisuje w profiling.out_dir (domyślnie results/profiles) plik per (baza, dataset, scenariusz),
+zbierający wszystkie powtórzenia:
+- profiler=sampling:  <klucz>.folded - stosy głównego wątku próbkowane co sample_ms (format collapsed stacks:
+                      flamegraph.pl, speedscope, inferno); mały narzut, próbkowanie zależy od GIL
+                      (sys.getswitchinterval), więc odstępy bywają dłuższe niż sample_ms
+- profiler=cprofile:  <klucz>.prof - pstats (python -m pstats, snakeviz, flameprof); narzut rzędu 2x
+- tracemalloc:        <klucz>.alloc.txt - miejsca alokacji żywych po run(), sumowane po powtórzeniach
+
+Profiler i tracemalloc spowalniają mierzony kod - takie wyniki mają tag profiler=... (osobna seria w analizie).
+"""
+import cProfile
+import gc
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+import bench_common
+from bench_common import add_run_probe
+from scenario import execute
+
+PROFILERS = ("sampling", "cprofile", "none")
+
+TOP_ALLOCATIONS = 25
+
+# klucz pliku -> zebrane dane (Counter stosów / pstats.Stats / Counter rozmiarów alokacji)
+_FOLDED = {}
+_PSTATS = {}
+_ALLOCS = {}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def collapse(frame, stop_code=execute.__code__) -> str:
+    """Stos od korzenia do liścia ("a;b;c"), bez ramek powyżej (i łącznie z) stop_code."""
+    labels = []
+    while frame is not None and frame.f_code is not stop_code:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Wątek próbkujący stos wątku thread_id co interval_s (sys._current_frames)."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            # próbka z chwili zatrzymywania to już kod sondy, nie scenariusza
+            if frame is not None and not self._stop.is_set():
+                self.counts[collapse(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+
+class GcPauses:
+    """Callback gc.callbacks: suma i liczba pauz odśmiecacza."""
+
+    def __init__(self):
+        self.ms = 0.0
+        self.n = 0
+        self._t0 = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._t0 = time.perf_counter()
+        elif self._t0 is not None:
+            self.ms += (time.perf_counter() - self._t0) * 1000
+            self.n += 1
+            self._t0 = None
+
+
+def _out_dir(cfg) -> Path:
+    out_dir = cfg.get("profiling", {}).get("out_dir")
+    path = Path(out_dir) if out_dir else bench_common.RESULTS_PATH.parent / "profiles"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _file_key(ctx) -> str:
+    return re.sub(r"[^\w.-]+", "_", f"{ctx.label}_{ctx.dataset_name}_{ctx.scenario}")
+
+
+def _write_folded(path: Path, counts: Counter):
+    with open(path, "w") as f:
+        for stack, n in counts.most_common():
+            if stack:
+                f.write(f"{stack} {n}\n")
+
+
+def _write_allocs(path: Path, sizes: Counter, runs: int):
+    with open(path, "w") as f:
+        f.write(f"# pamięć żywa po run(), suma z {runs} powtórzeń [KiB]\n")
+        for where, size in sizes.most_common(TOP_ALLOCATIONS):
+            f.write(f"{size / 1024:12.1f}  {where}\n")
+
+
+def profiler_tag(cfg) -> str:
+    """Wartość tagu profiler (None = sam pomiar CPU/GC, bez narzutu w mierzonym kodzie)."""
+    p_cfg = cfg.get("profiling", {})
+    profiler = p_cfg.get("profiler", "sampling")
+    parts = [] if profiler == "none" else [profiler]
+    if p_cfg.get("tracemalloc"):
+        parts.append("tracemalloc")
+    return "+".join(parts) or None
+
+
+def install_profiling_probe(cfg):
+    """Sonda wokół run() każdego powtórzenia (profiling.enabled); innermost - najbliżej pomiaru."""
+    p_cfg = cfg.get("profiling", {})
+    if not p_cfg.get("enabled"):
+        return
+    profiler = p_cfg.get("profiler", "sampling")
+    if profiler not in PROFILERS:
+        raise ValueError(f"profiling.profiler must be one of {PROFILERS}, got {profiler!r}")
+    interval_s = float(p_cfg.get("sample_ms", 1)) / 1000
+    trace_allocs = bool(p_cfg.get("tracemalloc"))
+    tag = profiler_tag(cfg)
+    out_dir = _out_dir(cfg)
+
+    def probe(ctx):
+        key = _file_key(ctx)
+        pauses = GcPauses()
+        gc.callbacks.append(pauses)
+        started = mem0 = None
+        if trace_allocs:
+            # tracemalloc włączony z zewnątrz (PYTHONTRACEMALLOC) zostaje włączony
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        sampler = prof = None
+        if profiler == "sampling":
+            sampler = StackSampler(threading.get_ident(), interval_s)
+            sampler.start()
+        elif profiler == "cprofile":
+            prof = cProfile.Profile()
+            prof.enable()
+        cpu0 = time.process_time()
+
+        def finish():
+            cpu_ms = (time.process_time() - cpu0) * 1000
+            if prof is not None:
+                prof.disable()
+            counts = sampler.stop() if sampler is not None else None
+            gc.callbacks.remove(pauses)
+
+            tags = {"cpu_ms": round(cpu_ms, 3), "gc_ms": round(pauses.ms, 3), "gc_n": pauses.n}
+            if trace_allocs:
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if started:
+                    tracemalloc.stop()
+                tags.update(alloc_kb=round((current - mem0) / 1024, 1), alloc_peak_kb=round((peak - mem0) / 1024, 1))
+                sizes = _ALLOCS.setdefault(key, [Counter(), 0])
+                for stat in snapshot.statistics("lineno"):
+                    sizes[0][str(stat.traceback)] += stat.size
+                sizes[1] += 1
+                _write_allocs(out_dir / f"{key}.alloc.txt", *sizes)
+            if counts is not None:
+                _FOLDED.setdefault(key, Counter()).update(counts)
+                _write_folded(out_dir / f"{key}.folded", _FOLDED[key])
+            if prof is not None:
+                if key in _PSTATS:
+                    _PSTATS[key].add(prof)
+                else:
+                    _PSTATS[key] = pstats.Stats(prof)
+                _PSTATS[key].dump_stats(out_dir / f"{key}.prof")
+            if tag:
+                tags["profiler"] = tag
+            return tags
+
+        return finish
+
+    add_run_probe(probe, innermost=True)
@@ -0,0 +1,156 @@
+"""
+Kolumnowy cache danych (Arrow IPC / Feather v2).
+
+Surowy CSV jest parsowany raz i zapisywany jako plik .arrow, którego nazwa zawiera hash źródła.
+Próbki flights_N.csv dostają obok siebie flights_N.arrow; importery czytają z niego przez memory map
+zamiast parsować tekst (CSV zostaje dla mongoimport/cqlsh i jako format wymiany).
+"""
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+COMPRESSIONS = (None, "zstd", "lz4")
+
+_TEXT_COLUMNS = ["op_unique_carrier", "op_carrier_fl_num", "origin", "origin_city_name", "origin_state_nm",
+                 "dest", "dest_city_name", "dest_state_nm", "cancellation_code"]
+_INT_COLUMNS = ["year", "month", "day_of_month", "day_of_week"]
+
+# typy kolumn surowego CSV; reszta kolumn liczbowych to float64 (tak jak czyta je pandas przy brakach)
+RAW_COLUMN_TYPES = {
+    **{c: pa.string() for c in _TEXT_COLUMNS},
+    **{c: pa.int64() for c in _INT_COLUMNS},
+    "fl_date": pa.date32(),
+}
+
+_NUMERIC_COLUMNS = ["crs_dep_time", "dep_time", "dep_delay", "taxi_out", "wheels_off", "wheels_on", "taxi_in",
+                    "crs_arr_time", "arr_time", "arr_delay", "cancelled", "diverted", "crs_elapsed_time",
+                    "actual_elapsed_time", "air_time", "distance", "carrier_delay", "weather_delay", "nas_delay",
+                    "security_delay", "late_aircraft_delay"]
+RAW_COLUMN_TYPES.update({c: pa.float64() for c in _NUMERIC_COLUMNS})
+
+
+def _normalize_compression(compression) -> Optional[str]:
+    if compression in (None, "", "none", False):
+        return None
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Nieobsługiwana kompresja: {compression} (dozwolone: none, zstd, lz4)")
+    return compression
+
+
+def file_digest(path) -> str:
+    """sha256 pliku; wynik jest zapamiętywany obok pliku dla danej pary (rozmiar, mtime)."""
+    path = Path(path)
+    st = path.stat()
+    sidecar = path.with_name(path.name + ".sha256.json")
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    try:
+        with open(sidecar) as f:
+            cached = json.load(f)
+        if cached.get("stamp") == stamp:
+            return cached["sha256"]
+    except (OSError, ValueError):
+        pass
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    try:
+        with open(sidecar, "w") as f:
+            json.dump({"stamp": stamp, "sha256": digest}, f)
+    except OSError:
+        # katalog z surowymi danymi może być tylko do odczytu
+        pass
+    return digest
+
+
+def columnar_path(file_name) -> Path:
+    return Path(file_name).with_suffix(".arrow")
+
+
+def write_columnar(table: pa.Table, dest, compression=None) -> Path:
+    dest = Path(dest)
+    tmp = dest.with_name(dest.name + ".tmp")
+    options = pa.ipc.IpcWriteOptions(compression=_normalize_compression(compression))
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    os.replace(tmp, dest)
+    return dest
+
+
+def open_columnar(path) -> pa.Table:
+    """Tabela z pliku .arrow przez memory map (bez kopiowania, jeśli plik nie jest skompresowany)."""
+    source = pa.memory_map(str(path), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def ensure_columnar(src: str, cache_dir: str, compression=None) -> Path:
+    """Zwraca ścieżkę do kolumnowej kopii src w cache_dir, konwertując CSV tylko gdy hash źródła jest nowy."""
+    digest = file_digest(src)
+    cache = Path(cache_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    dest = cache / f"{Path(src).stem}-{digest[:16]}.arrow"
+    if dest.exists():
+        return dest
+
+    print(f"[cache] converting {src} -> {dest}")
+    options = _normalize_compression(compression)
+    reader = pa_csv.open_csv(
+        src,
+        read_options=pa_csv.ReadOptions(block_size=64 * 1024 * 1024),
+        convert_options=pa_csv.ConvertOptions(column_types=RAW_COLUMN_TYPES, strings_can_be_null=True),
+    )
+    tmp = dest.with_name(dest.name + ".tmp")
+    rows = 0
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, reader.schema, options=pa.ipc.IpcWriteOptions(compression=options)) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    os.replace(tmp, dest)
+    print(f"[cache] wrote {dest} ({rows} rows)")
+    return dest
+
+
+def write_sample(table: pa.Table, csv_dest, compression=None):
+    """Zapisuje próbkę jako CSV (dla narzędzi zewnętrznych) i jako .arrow (dla importerów)."""
+    pa_csv.write_csv(table, str(csv_dest))
+    write_columnar(table, columnar_path(csv_dest), compression)
+
+
+def read_frame(file_name, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """DataFrame z próbki: z pliku .arrow, jeśli istnieje, inaczej z CSV."""
+    arrow = columnar_path(file_name)
+    if arrow.exists():
+        table = open_columnar(arrow)
+        if columns is not None:
+            table = table.select(list(columns))
+        return table.to_pandas()
+    return pd.read_csv(file_name, usecols=columns, na_values=["", " "])
+
+
+def iter_records(file_name, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+    """Wiersze próbki jako słowniki - z .arrow wartości są typowane, z CSV są stringami."""
+    arrow = columnar_path(file_name)
+    if arrow.exists():
+        table = open_columnar(arrow)
+        if columns is not None:
+            table = table.select(list(columns))
+        for batch in table.to_batches(max_chunksize=10_000):
+            yield from batch.to_pylist()
+        return
+
+    with open(file_name, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row if columns is None else {k: row.get(k) for k in columns}
@@ -0,0 +1,99 @@
+"""
+Rejestr wymiarów (airline / airport) per baza SQL: kody obecne w tabelach wczytane raz (przy pierwszym użyciu)
+i dopisywanie tylko kodów, których rejestr jeszcze nie widział - jednym wielowierszowym INSERT-em na tabelę
+z pominięciem duplikatów (ON CONFLICT DO NOTHING / INSERT IGNORE / INSERT OR IGNORE).
+
+Używają go importery (load_airlines / load_airports) i scenariusze add_flight: znany kod = zero zapytań,
+nowy kod = jeden INSERT poza pomiarem. Koszt pierwszego wystąpienia trafia do tagów wyniku add_flight
+(dim_new, dim_ms), a czas wczytania rejestru do dim_preload_ms w scenariuszu, który go wczytał.
+Reset, restore snapshotu i sprzątanie przed importem przyrostowym (forget_write_state) zapominają rejestr bazy.
+"""
+import time
+
+# db -> (placeholder, INSERT pomijający istniejące klucze)
+DIALECTS = {
+    "postgres": ("%s", "INSERT INTO {table} ({columns}) VALUES {rows} ON CONFLICT DO NOTHING"),
+    "mysql": ("%s", "INSERT IGNORE INTO {table} ({columns}) VALUES {rows}"),
+    "sqlite": ("?", "INSERT OR IGNORE INTO {table} ({columns}) VALUES {rows}"),
+}
+
+# wierszy w jednym INSERT-cie (airport: 3 parametry na wiersz, starsze SQLite przyjmują najwyżej 999)
+BATCH_ROWS = 300
+
+_REGISTRIES = {}
+
+
+class DimensionRegistry:
+    def __init__(self, db: str):
+        self.placeholder, self.insert_template = DIALECTS[db]
+        self.airlines = None    # None = jeszcze nie wczytane z bazy
+        self.airports = None
+        self.preload_ms = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.airlines is not None
+
+    def preload(self, cursor) -> bool:
+        """Kody z tabel airline / airport (raz); True, gdy wczytane teraz."""
+        if self.loaded:
+            return False
+        t0 = time.perf_counter()
+        cursor.execute("SELECT carrier_code FROM airline")
+        airlines = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT airport_code FROM airport")
+        self.airports = {row[0] for row in cursor.fetchall()}
+        self.airlines = airlines
+        self.preload_ms = (time.perf_counter() - t0) * 1000
+        return True
+
+    def ensure(self, cursor, airlines=(), airports=None) -> int:
+        """
+        Dopisuje nieznane kody (airports: kod -> (city_name, state_name)); zwraca liczbę nowych kodów.
+        Commit należy do wywołującego.
+        """
+        self.preload(cursor)
+        new_airlines = list({code for code in airlines if code} - self.airlines)
+        new_airports = [(code, *names) for code, names in (airports or {}).items()
+                        if code and code not in self.airports]
+
+        self._insert(cursor, "airline", ["carrier_code"], [(code,) for code in new_airlines])
+        self._insert(cursor, "airport", ["airport_code", "city_name", "state_name"], new_airports)
+
+        self.airlines.update(new_airlines)
+        self.airports.update(row[0] for row in new_airports)
+        return len(new_airlines) + len(new_airports)
+
+    def _insert(self, cursor, table: str, columns: list, rows: list):
+        row_sql = "(" + ", ".join([self.placeholder] * len(columns)) + ")"
+        for start in range(0, len(rows), BATCH_ROWS):
+            batch = rows[start:start + BATCH_ROWS]
+            sql = self.insert_template.format(table=table, columns=", ".join(columns),
+                                              rows=", ".join([row_sql] * len(batch)))
+            cursor.execute(sql, [value for row in batch for value in row])
+
+
+def dimension_registry(db: str) -> DimensionRegistry:
+    if db not in _REGISTRIES:
+        _REGISTRIES[db] = DimensionRegistry(db)
+    return _REGISTRIES[db]
+
+
+def forget_dimensions(db: str = None):
+    if db is None:
+        _REGISTRIES.clear()
+    else:
+        _REGISTRIES.pop(db, None)
+
+
+def ensure_flight_dimensions(ctx, flight):
+    """add_flight.prepare(): przewoźnik i lotniska lotu przez rejestr bazy ctx.db; koszt nowych kodów w tagach."""
+    registry = dimension_registry(ctx.db)
+    preloaded = registry.preload(ctx.cur)
+    t0 = time.perf_counter()
+    new = registry.ensure(ctx.cur, [flight["op_unique_carrier"]],
+                          {flight["origin"]: (None, None), flight["dest"]: (None, None)})
+    if new:
+        ctx.tags.update(dim_new=new, dim_ms=round((time.perf_counter() - t0) * 1000, 3))
+    if preloaded:
+        ctx.tags["dim_preload_ms"] = round(registry.preload_ms, 3)
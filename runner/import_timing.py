@@ -0,0 +1,98 @@
+"""
+Pomiar importu w podziale na fazy: parse, transform, dimensions, facts, commit (+ opcjonalne index).
+Import wsadowy SQL dokłada deindex, logged, constraints i analyze (odbudowa po załadowaniu),
+Cassandra - flush (memtable na dysk; odpowiednik commit/checkpoint).
+
+Importer zwraca ImportTimer, a bench_runner zapisuje każdą fazę jako scenariusz <db>_import_<faza>
+(powtórzenie 1, a przy przemiataniu liczby workerów kolejne powtórzenia) z notatką rows=..., rows_per_s=...
+Fazy, które przechodzą przez cały plik (parse, facts) i całość (total) mają też bytes=..., bytes_per_s=...:
+bytes to rozmiar wejścia importera (.arrow, jeśli istnieje, inaczej CSV), przy imporcie przyrostowym
+(start_row > 0) proporcjonalnie pomniejszony o pominięty prefiks; dla pozostałych faz (np. kilkanaście
+wierszy dimensions) przepustowość względem całego pliku nic nie znaczy.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from bench_common import log_result
+from dataset_cache import columnar_path
+
+IMPORT_PHASES = ("parse", "transform", "deindex", "dimensions", "facts", "commit", "flush", "logged", "index",
+                 "constraints", "analyze")
+
+# fazy z bytes_per_s (obok całości)
+THROUGHPUT_PHASES = ("parse", "facts")
+
+
+def _source_bytes(file_name) -> int:
+    arrow = columnar_path(file_name)
+    path = arrow if arrow.exists() else file_name
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class ImportTimer:
+    def __init__(self, db: str, file_name: str, prefix: str = None, start_row: int = 0):
+        self.db = db
+        # prefiks nazwy scenariusza: mongo loguje jako mongo_<layout>, ale scenariusze nazywa mongo_*
+        self.prefix = prefix or db
+        self.source_bytes = _source_bytes(file_name)
+        # wiersze pliku pominięte przy imporcie przyrostowym (już załadowane)
+        self.start_row = int(start_row or 0)
+        self.phases = {}
+        # dodatkowe pary k=v doklejane do notatki (np. workers=4 przy imporcie równoległym)
+        self.tags = {}
+        self._started = time.perf_counter()
+        self._finished = None
+
+    def add(self, phase: str, seconds: float, rows: int = 0):
+        stat = self.phases.setdefault(phase, [0.0, 0])
+        stat[0] += seconds
+        stat[1] += rows
+
+    def count(self, phase: str, rows: int):
+        self.phases.setdefault(phase, [0.0, 0])[1] += rows
+
+    @contextmanager
+    def phase(self, phase: str, rows: int = 0):
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(phase, time.perf_counter() - t0, rows)
+
+    def finish(self) -> "ImportTimer":
+        self._finished = time.perf_counter()
+        return self
+
+    def total_rows(self) -> int:
+        return max((rows for _, rows in self.phases.values()), default=0)
+
+    def loaded_bytes(self) -> int:
+        """Bajty wejścia przypadające na załadowane wiersze (przy start_row > 0 proporcjonalnie do ich udziału)."""
+        if not self.start_row:
+            return self.source_bytes
+        rows = self.total_rows()
+        return round(self.source_bytes * rows / (self.start_row + rows))
+
+    def _note(self, seconds: float, rows: int, with_bytes: bool = True) -> str:
+        rate = (lambda n: n / seconds) if seconds > 0 else (lambda n: 0.0)
+        note = f"rows={rows}, rows_per_s={rate(rows):.0f}"
+        if with_bytes:
+            loaded = self.loaded_bytes()
+            note += f", bytes={loaded}, bytes_per_s={rate(loaded):.0f}"
+        return "".join([note] + [f", {k}={v}" for k, v in self.tags.items()])
+
+    def log(self, dataset_name: str, repeat: int = 1):
+        total_rows = self.total_rows()
+        for phase, (seconds, rows) in self.phases.items():
+            ms = seconds * 1000
+            notes = self._note(seconds, rows, phase in THROUGHPUT_PHASES)
+            log_result(self.db, dataset_name, f"{self.prefix}_import_{phase}", repeat, ms, notes)
+            print(f"[{self.db}][import_{phase}] {ms:.2f} ms :: {notes}")
+
+        total = (self._finished or time.perf_counter()) - self._started
+        log_result(self.db, dataset_name, f"{self.prefix}_import_total", repeat, total * 1000,
+                   self._note(total, total_rows))
@@ -0,0 +1,229 @@
+"""
+Proxy TCP (asyncio) między runnerem a portem bazy, dodające opóźnienie, jitter i limit przepustowości -
+do sprawdzenia, jak "gadatliwe" ścieżki (load_flights: kilka instrukcji na wiersz, pętla po dniach
+w cass_read_by_carrier_day, kolejne INSERT-y add_flight_stats) zachowują się przy RTT innym niż mostek dockera.
+
+Każdy fragment strumienia jest dostarczany po rtt_ms / 2 (+ jitter: równomiernie ±jitter_ms / 2) w każdą stronę,
+bez zmiany kolejności (jak TCP); przy bandwidth_mbps fragment dodatkowo czeka, aż "łącze" nada poprzednie.
+Rozdzielczość opóźnienia to timer pętli asyncio (~1 ms).
+
+Przemiatanie (network.rtt_ms w configu): dla każdego RTT proxy startuje w osobnym procesie (nie konkuruje
+o GIL z mierzonym klientem), zmienne <DB>_HOST/<DB>_PORT (i DB_CONFIG importerów SQL) wskazują na proxy,
+a pule/klienci są zamykani, żeby nowe połączenia szły przez proxy. Wyniki mają tag "| rtt=<ms>ms";
+rtt 0 to sam narzut proxy - punkt odniesienia dla pozostałych.
+
+Samodzielnie: python latency_proxy.py --target postgres:5432 --listen 15432 --rtt 20 --jitter 2 --bandwidth 100
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+from contextlib import contextmanager
+
+import bench_cassandra
+import bench_mongo
+import bench_mysql
+import bench_postgres
+from bench_common import set_run_tags
+from scenario import run_scenarios
+from sql_import import import_mysql, import_postgres
+
+CHUNK = 64 * 1024
+
+# db -> (zmienna hosta, zmienna portu, domyślny host, domyślny port) - te same co w fabrykach połączeń
+PROXY_TARGETS = {
+    "postgres": ("POSTGRES_HOST", "POSTGRES_PORT", "localhost", 5432),
+    "mysql": ("MYSQL_HOST", "MYSQL_PORT", "localhost", 3306),
+    "mongo": ("MONGO_HOST", "MONGO_PORT", "mongodb", 27017),
+    "cassandra": ("CASSANDRA_HOST", "CASSANDRA_PORT", "cassandra", 9042),
+}
+
+# połączenia otwarte przed przekierowaniem omijałyby proxy (i po nim - wskazywały na zatrzymane proxy)
+CLOSE_CLIENTS = {
+    "postgres": bench_postgres.close_postgres_pool,
+    "mysql": bench_mysql.close_mysql_pool,
+    "mongo": bench_mongo.close_mongo_client,
+    "cassandra": bench_cassandra.close_cass_session,
+}
+
+# importery SQL czytają adres raz, przy imporcie modułu
+IMPORT_CONFIGS = {
+    "postgres": import_postgres.DB_CONFIG,
+    "mysql": import_mysql.DB_CONFIG,
+}
+
+
+class LatencyProxy:
+    def __init__(self, target_host: str, target_port: int, rtt_ms: float = 0.0, jitter_ms: float = 0.0,
+                 bandwidth_mbps: float = None):
+        self.target = (target_host, int(target_port))
+        self.rtt_ms = float(rtt_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.bandwidth_mbps = bandwidth_mbps
+
+    def one_way_delay(self) -> float:
+        """Opóźnienie w jedną stronę [s]."""
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) / 2 if self.jitter_ms else 0.0
+        return max(0.0, self.rtt_ms / 2 + jitter) / 1000
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0, ready=None):
+        """Nasłuch na host:port (0 = wolny port); ready(port) po otwarciu gniazda."""
+        server = await asyncio.start_server(self._handle, host, port)
+        if ready:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.target)
+        except OSError as e:
+            print(f"[latency_proxy] cannot connect to {self.target[0]}:{self.target[1]}: {e}")
+            client_writer.close()
+            return
+        await asyncio.gather(self._pipe(client_reader, server_writer), self._pipe(server_reader, client_writer))
+
+    async def _pipe(self, reader, writer):
+        """Jeden kierunek: odczyt od razu, zapis w chwili dostarczenia (fragmenty w drodze nie blokują odczytu)."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send(queue, writer))
+        line_free = 0.0
+        deliver_at = 0.0
+        try:
+            while True:
+                try:
+                    data = await reader.read(CHUNK)
+                except (ConnectionError, OSError):
+                    data = b""
+                sent = loop.time()
+                if data and self.bandwidth_mbps:
+                    line_free = max(line_free, sent) + len(data) * 8 / (self.bandwidth_mbps * 1_000_000)
+                    sent = line_free
+                # jitter nie może zamienić kolejności fragmentów
+                deliver_at = max(deliver_at, sent + self.one_way_delay())
+                await queue.put((deliver_at, data))
+                if not data:
+                    break
+        finally:
+            await sender
+
+    async def _send(self, queue, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                deliver_at, data = await queue.get()
+                wait = deliver_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+
+def _proxy_main(proxy: LatencyProxy, port_conn):
+    asyncio.run(proxy.serve(ready=port_conn.send))
+
+
+def start_proxy(proxy: LatencyProxy):
+    """Proxy w osobnym procesie (spawn - bez kopiowania wątków i połączeń runnera); zwraca (proces, port)."""
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_proxy_main, args=(proxy, child_conn), name="latency-proxy", daemon=True)
+    process.start()
+    if not parent_conn.poll(30):
+        process.terminate()
+        raise RuntimeError("latency proxy did not start")
+    return process, parent_conn.recv()
+
+
+def stop_proxy(process):
+    process.terminate()
+    process.join(5)
+
+
+def _target(db: str):
+    host_var, port_var, host, port = PROXY_TARGETS[db]
+    return os.getenv(host_var, host), int(os.getenv(port_var, port))
+
+
+@contextmanager
+def routed(db: str, port: int):
+    """Klienci bazy db łączą się przez 127.0.0.1:port; po wyjściu - z powrotem bezpośrednio."""
+    host_var, port_var, _, _ = PROXY_TARGETS[db]
+    saved_env = {var: os.environ.get(var) for var in (host_var, port_var)}
+    import_cfg = IMPORT_CONFIGS.get(db)
+    saved_import = dict(import_cfg) if import_cfg is not None else None
+
+    CLOSE_CLIENTS[db]()
+    os.environ[host_var], os.environ[port_var] = "127.0.0.1", str(port)
+    if import_cfg is not None:
+        import_cfg.update(host="127.0.0.1", port=port)
+    try:
+        yield
+    finally:
+        CLOSE_CLIENTS[db]()
+        for var, value in saved_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+        if import_cfg is not None:
+            import_cfg.clear()
+            import_cfg.update(saved_import)
+
+
+def run_rtt_sweep(db: str, scenarios, cfg, dataset_name: str, label: str = None, reimport=None):
+    """
+    Scenariusze bazy db (network.scenarios albo wszystkie) raz na każde RTT z network.rtt_ms;
+    przy network.import i podanym reimport() (reset + import, zwraca ImportTimer) także pełny import.
+    """
+    n_cfg = cfg.get("network", {})
+    rtts = n_cfg.get("rtt_ms") or []
+    if not rtts or db not in PROXY_TARGETS:
+        return
+    ops = n_cfg.get("scenarios") or []
+    chosen = [s for s in scenarios if not ops or s.name.split("_", 1)[-1] in ops]
+
+    target = _target(db)
+    try:
+        for rtt_ms in rtts:
+            proxy = LatencyProxy(*target, rtt_ms=rtt_ms, jitter_ms=n_cfg.get("jitter_ms") or 0,
+                                 bandwidth_mbps=n_cfg.get("bandwidth_mbps"))
+            process, port = start_proxy(proxy)
+            try:
+                with routed(db, port):
+                    set_run_tags(rtt=f"{rtt_ms}ms")
+                    print(f"\nStarting scenarios for **{db}**, dataset size **{dataset_name}** through latency proxy, "
+                          f"RTT **{rtt_ms} ms** (jitter {proxy.jitter_ms} ms, "
+                          f"bandwidth {proxy.bandwidth_mbps or 'unlimited'} Mbit/s)...")
+                    if n_cfg.get("import") and reimport:
+                        timer = reimport()
+                        if timer:
+                            timer.log(dataset_name)
+                    if chosen:
+                        run_scenarios(db, chosen, cfg, dataset_name, label)
+            finally:
+                stop_proxy(process)
+    finally:
+        set_run_tags()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCP proxy with injected latency, jitter and bandwidth limit")
+    parser.add_argument("--target", required=True, help="host:port of the database")
+    parser.add_argument("--listen", type=int, default=0, help="local port (0 = any free port)")
+    parser.add_argument("--rtt", type=float, default=0.0, help="round-trip time to add [ms]")
+    parser.add_argument("--jitter", type=float, default=0.0, help="RTT spread [ms]")
+    parser.add_argument("--bandwidth", type=float, default=None, help="link limit [Mbit/s]")
+    args = parser.parse_args()
+
+    host, port = args.target.rsplit(":", 1)
+    asyncio.run(LatencyProxy(host, int(port), args.rtt, args.jitter, args.bandwidth).serve(
+        "0.0.0.0", args.listen, ready=lambda p: print(f"[latency_proxy] listening on {p} -> {args.target}")))
@@ -1,71 +1,260 @@
 import argparse
-import csv
+import bisect
+import hashlib
+import json
+import math
 import random
+import shutil
+from array import array
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import BinaryIO, Iterator, List, Optional, Sequence
 
-def _reservoir_sample(rows: Iterable[List[str]], sample_size: int, rng: random.Random):
-    """Keep an unbiased random sample limited to sample_size rows while streaming rows."""
-    sample: List[List[str]] = []
+import pyarrow as pa
+
+from dataset_cache import ensure_columnar, file_digest, open_columnar, write_sample
+
+DEFAULT_SEED = 42
+MANIFEST_NAME = "samples_manifest.json"
+
+
+def _open_unit(rng: random.Random) -> float:
+    """Liczba z przedziału (0, 1) - log(0) i log(1 - 1) nie mogą się pojawić."""
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+
+def _skip_length(w: float, rng: random.Random) -> int:
+    return int(math.log(_open_unit(rng)) / math.log1p(-min(w, 1.0 - 1e-16)))
+
+
+def _line_offsets(fh: BinaryIO) -> Iterator[int]:
+    """Offsety (w bajtach) kolejnych niepustych wierszy, licząc od bieżącej pozycji pliku."""
+    offset = fh.tell()
+    for line in fh:
+        if line.strip():
+            yield offset
+        offset += len(line)
+
+
+def _reservoir_sample(offsets: Iterator[int], sample_size: int, rng: random.Random):
+    """
+    Algorithm L (Li, 1994): jednorodna próbka sample_size elementów ze strumienia.
+
+    Zamiast losować dla każdego wiersza, losuje długość przeskoku do następnego trafienia,
+    więc liczba wywołań RNG to O(k * log(n / k)). Trzyma tylko offsety wierszy (8 B / wiersz).
+    """
+    sample = array("q")
     total_rows = 0
 
-    for row in rows:
+    for offset in offsets:
+        sample.append(offset)
         total_rows += 1
-        if len(sample) < sample_size:
-            sample.append(row)
-            continue
+        if total_rows == sample_size:
+            break
+
+    if total_rows < sample_size:
+        return sample, total_rows
 
-        idx = rng.randint(0, total_rows - 1)
-        if idx < sample_size:
-            sample[idx] = row
+    w = math.exp(math.log(_open_unit(rng)) / sample_size)
+    next_pick = total_rows + _skip_length(w, rng)
+
+    for offset in offsets:
+        if total_rows == next_pick:
+            sample[rng.randrange(sample_size)] = offset
+            w *= math.exp(math.log(_open_unit(rng)) / sample_size)
+            next_pick += _skip_length(w, rng) + 1
+        total_rows += 1
 
     return sample, total_rows
 
-def make_samples(src: str, out: str, sizes: Sequence[int] = (10_000, 100_000, 1_000_000)):
-    out_path = Path(out)
-    out_path.mkdir(parents=True, exist_ok=True)
 
-    cleaned_sizes = sorted({int(s) for s in sizes if int(s) > 0})
-    if not cleaned_sizes:
-        print("no valid sample sizes provided")
-        return
+def _reservoir_indices(total_rows: int, sample_size: int, rng: random.Random):
+    """
+    Algorithm L na indeksach 0..total_rows-1 (źródło z dostępem swobodnym, np. tabela Arrow).
+    Te same przeskoki co w _reservoir_sample(iter(range(total_rows))), ale bez przechodzenia po pominiętych
+    wierszach: O(k * log(n / k)) kroków i pamięć O(k) zamiast listy wszystkich indeksów.
+    """
+    sample = array("q", range(min(sample_size, total_rows)))
+    if total_rows <= sample_size:
+        return sample
+
+    w = math.exp(math.log(_open_unit(rng)) / sample_size)
+    next_pick = sample_size + _skip_length(w, rng)
+    while next_pick < total_rows:
+        sample[rng.randrange(sample_size)] = next_pick
+        w *= math.exp(math.log(_open_unit(rng)) / sample_size)
+        next_pick += _skip_length(w, rng) + 1
+    return sample
+
+
+# zmiana sposobu losowania = inne próbki dla tego samego seeda, więc inny klucz manifestu
+SAMPLES_LAYOUT = "nested-prefix-reservoir"
+
+
+def _samples_key(source_sha256: str, sizes: List[int], seed: int, mode: str) -> str:
+    payload = json.dumps({"source": source_sha256, "sizes": sizes, "seed": seed, "mode": mode,
+                          "layout": SAMPLES_LAYOUT}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _load_manifest(out_path: Path) -> Optional[dict]:
+    try:
+        with open(out_path / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-    max_size = cleaned_sizes[-1]
-    rng = random.Random()
 
-    with open(src, newline="", encoding="utf-8") as fh:
-        reader = csv.reader(fh)
-        try:
-            header = next(reader)
-        except StopIteration:
+def _sample_files(out_path: Path, sizes: Sequence[int], mode: str) -> List[Path]:
+    files = [out_path / f"flights_{size}.csv" for size in sizes]
+    if mode == "columnar":
+        files += [f.with_suffix(".arrow") for f in files]
+    return files
+
+
+def _size_bucket(rank: int, sizes: List[int]) -> int:
+    return bisect.bisect_right(sizes, rank)
+
+
+def _make_samples_lines(src: str, out_path: Path, cleaned_sizes: List[int], rng: random.Random) -> int:
+    """
+    Jeden przebieg po źródle wybiera offsety największej próbki; losowa permutacja nadaje im rangi,
+    a mniejsze próbki to wiersze o randze < size (zagnieżdżone). Wiersze kopiujemy jako surowe bajty
+    w jednym przejściu po offsetach posortowanych rosnąco, do kubełków [0, s1), [s1, s2), ...;
+    flights_<s_k>.csv to sklejenie kubełków 0..k, więc mniejsza próbka jest prefiksem większej
+    (na tym opiera się import przyrostowy).
+    """
+    with open(src, "rb") as fh:
+        header = fh.readline()
+        if not header:
             print(f"{src} is empty; nothing to sample")
-            return
+            return 0
+
+        sample, total_rows = _reservoir_sample(_line_offsets(fh), cleaned_sizes[-1], rng)
+
+        ranks = list(range(len(sample)))
+        rng.shuffle(ranks)
+
+        made = [size for size in cleaned_sizes if size <= total_rows]
+        for size in cleaned_sizes[len(made):]:
+            print(f"source has {total_rows} rows; cannot make {size}")
+
+        buckets = [out_path / f".flights_bucket_{i}.tmp" for i in range(len(cleaned_sizes))]
+        with ExitStack() as stack:
+            bucket_files = [stack.enter_context(open(b, "wb")) for b in buckets]
+            for offset, rank in sorted(zip(sample, ranks)):
+                fh.seek(offset)
+                line = fh.readline()
+                if not line.endswith(b"\n"):
+                    line += b"\n"
+                bucket_files[_size_bucket(rank, cleaned_sizes)].write(line)
+
+    for k, size in enumerate(made):
+        dest = out_path / f"flights_{size}.csv"
+        # read_frame / iter_records wolą flights_N.arrow - kopia z trybu columnar byłaby starą próbką
+        dest.with_suffix(".arrow").unlink(missing_ok=True)
+        with open(dest, "wb") as out_f:
+            out_f.write(header)
+            for bucket in buckets[:k + 1]:
+                with open(bucket, "rb") as b:
+                    shutil.copyfileobj(b, out_f, 16 * 1024 * 1024)
+        print(f"wrote {dest} ({size} rows)")
+
+    for bucket in buckets:
+        bucket.unlink()
+
+    return total_rows
 
-        sample, total_rows = _reservoir_sample(reader, max_size, rng)
 
-    if total_rows < max_size:
-        max_size = total_rows
+def _make_samples_columnar(src: str, out_path: Path, cleaned_sizes: List[int], rng: random.Random,
+                           cache_dir: str, compression: Optional[str]) -> int:
+    """
+    Losuje wiersze z kolumnowej kopii surowego pliku (bez parsowania CSV) - tym samym Algorithm L
+    co tryb lines, na indeksach wierszy zamiast offsetów.
+    """
+    table = open_columnar(ensure_columnar(src, cache_dir, compression))
+    total_rows = table.num_rows
 
-    rng.shuffle(sample)
+    # rezerwuar nie jest w losowej kolejności - permutacja robi z prefiksów zagnieżdżone próbki;
+    # w obrębie kubełka [s_{k-1}, s_k) czytamy rosnąco, a mniejsza próbka zostaje prefiksem większej
+    indices = _reservoir_indices(total_rows, cleaned_sizes[-1], rng).tolist()
+    rng.shuffle(indices)
+    ordered = []
+    prev = 0
 
     for size in cleaned_sizes:
         if total_rows < size:
             print(f"source has {total_rows} rows; cannot make {size}")
             continue
 
+        ordered.extend(sorted(indices[prev:size]))
+        prev = size
         dest = out_path / f"flights_{size}.csv"
-        with open(dest, "w", newline="", encoding="utf-8") as out_f:
-            writer = csv.writer(out_f)
-            writer.writerow(header)
-            writer.writerows(sample[:size])
+        write_sample(table.take(pa.array(ordered)), dest, compression)
         print(f"wrote {dest} ({size} rows)")
 
+    return total_rows
+
+
+def make_samples(src: str, out: str, sizes: Sequence[int] = (10_000, 100_000, 1_000_000),
+                 cache_dir: Optional[str] = None, compression: Optional[str] = None,
+                 seed: int = DEFAULT_SEED) -> Optional[dict]:
+    """
+    Tworzy zagnieżdżone próbki flights_<size>.csv i zwraca manifest (seed, hash źródła, liczba wierszy).
+    Jeśli manifest w katalogu wyjściowym ma ten sam klucz (źródło, rozmiary, seed, tryb) i pliki istnieją,
+    próbki nie są generowane ponownie.
+    """
+    out_path = Path(out)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    cleaned_sizes = sorted({int(s) for s in sizes if int(s) > 0})
+    if not cleaned_sizes:
+        print("no valid sample sizes provided")
+        return None
+
+    seed = int(seed)
+    mode = "columnar" if cache_dir else "lines"
+    source_sha256 = file_digest(src)
+    key = _samples_key(source_sha256, cleaned_sizes, seed, mode)
+
+    manifest = _load_manifest(out_path)
+    if manifest and manifest.get("key") == key:
+        made = [s for s in cleaned_sizes if s <= manifest["total_rows"]]
+        if all(f.exists() for f in _sample_files(out_path, made, mode)):
+            print(f"samples up to date (seed={seed}, key={key[:16]}); skipping")
+            return {**manifest, "cached": True}
+
+    rng = random.Random(seed)
+    if mode == "columnar":
+        total_rows = _make_samples_columnar(src, out_path, cleaned_sizes, rng, cache_dir, compression)
+    else:
+        total_rows = _make_samples_lines(src, out_path, cleaned_sizes, rng)
+
+    manifest = {
+        "key": key,
+        "source": str(src),
+        "source_sha256": source_sha256,
+        "sizes": cleaned_sizes,
+        "seed": seed,
+        "mode": mode,
+        "total_rows": total_rows,
+    }
+    with open(out_path / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return {**manifest, "cached": False}
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--src", required=True)
     parser.add_argument("--out", required=True)
     parser.add_argument("--sizes", nargs="*", type=int, default=None, help="Override dataset sizes")
+    parser.add_argument("--cache-dir", default=None, help="Columnar cache directory (Arrow IPC)")
+    parser.add_argument("--compression", default=None, choices=["none", "zstd", "lz4"])
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="RNG seed (recorded in the manifest)")
     args = parser.parse_args()
 
     sizes = tuple(args.sizes) if args.sizes else (10_000, 100_000, 1_000_000)
-    make_samples(args.src, args.out, sizes)
+    make_samples(args.src, args.out, sizes, args.cache_dir, args.compression, args.seed)
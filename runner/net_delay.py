@@ -0,0 +1,60 @@
+"""
+Sztuczne opóźnienie sieci między runnerem a bazami (tc netem na interfejsie runnera) dla scenariuszy,
+w których liczy się liczba podróży do serwera: add_flight (1 round trip), add_flight_stats (3 INSERT-y po kolei)
+i add_flight_stats_pipelined (jedno polecenie: CTE w postgres, multi-statement w mysql).
+
+netem opóźnia pakiety wychodzące z runnera, więc RTT do każdej bazy rośnie o delay_ms. Wymaga tc (iproute2)
+i CAP_NET_ADMIN w kontenerze runnera (docker-compose: cap_add NET_ADMIN); bez tego przemiatanie jest pomijane.
+Wyniki przebiegu mają tag "| net_delay=<ms>ms"; zwykły przebieg scenariuszy to pomiar lokalny (bez tagu).
+"""
+import shutil
+import subprocess
+
+from bench_common import set_run_tags
+from scenario import run_scenarios
+
+SWEEP_OPS = ("add_flight", "add_flight_stats", "add_flight_stats_pipelined")
+
+
+def _tc(*args) -> bool:
+    res = subprocess.run(["tc", *args], capture_output=True, text=True)
+    if res.returncode != 0:
+        print(f"[net_delay] tc {' '.join(args)} failed: {res.stderr.strip()}")
+    return res.returncode == 0
+
+
+def set_delay(delay_ms: float, interface: str) -> bool:
+    return _tc("qdisc", "replace", "dev", interface, "root", "netem", "delay", f"{delay_ms}ms")
+
+
+def clear_delay(interface: str):
+    _tc("qdisc", "del", "dev", interface, "root")
+
+
+def run_delay_sweep(db: str, scenarios, cfg, dataset_name: str):
+    """Scenariusze SWEEP_OPS bazy db raz na każde opóźnienie z pipeline.delays_ms."""
+    p_cfg = cfg.get("pipeline", {})
+    delays = p_cfg.get("delays_ms") or []
+    chosen = [s for s in scenarios if s.name.split("_", 1)[-1] in SWEEP_OPS]
+    if not delays or not chosen:
+        return
+    if shutil.which("tc") is None:
+        print("[net_delay] tc (iproute2) not available in the runner; skipping injected latency sweep")
+        return
+
+    interface = p_cfg.get("interface", "eth0")
+    applied = False
+    try:
+        for delay_ms in delays:
+            if not set_delay(delay_ms, interface):
+                print("[net_delay] netem needs the sch_netem module and CAP_NET_ADMIN in the runner; skipping sweep")
+                return
+            applied = True
+            print(f"\nStarting round-trip scenarios for **{db}**, dataset size **{dataset_name}**, "
+                  f"injected delay **{delay_ms} ms**...")
+            set_run_tags(net_delay=f"{delay_ms}ms")
+            run_scenarios(db, chosen, cfg, dataset_name)
+    finally:
+        set_run_tags()
+        if applied:
+            clear_delay(interface)
@@ -1,10 +1,81 @@
 # runner/nosql_import/cassandra_import.py
 
-import csv
+from datetime import date
+from itertools import islice
+from cassandra.concurrent import execute_concurrent
 from bench_cassandra import cass_client, _parse_date
+from dataset_cache import iter_records
+from import_timing import ImportTimer
+from cass_admin import CASSANDRA_KEYSPACE, cass_exec, cass_exec_available
 
-def import_to_cassandra(file_name: str) -> None:
-    print(f"\n[IMPORTING] Importing {file_name} into Cassandra...")
+
+def write_concurrency(cfg) -> int:
+    """import.cassandra.write_concurrency (1 = jeden session.execute na wiersz, jak w pozostałych importerach)."""
+    c_cfg = ((cfg or {}).get("import") or {}).get("cassandra") or {}
+    return max(1, int(c_cfg.get("write_concurrency") or 1))
+
+def _to_int(row: dict, name: str) -> int:
+    v = row.get(name)
+    if v in (None, ""):
+        return 0
+    try:
+        return int(float(v))
+    except ValueError:
+        return 0
+
+
+def _row_params(row: dict):
+    """Wartości dla obu tabel zapytań albo None, gdy wiersz nie ma daty lotu."""
+    # z próbki .arrow wartości są już typowane (date, float), z CSV są stringami
+    origin = row.get("origin")
+    dest = row.get("dest")
+
+    fl_date_str = row.get("fl_date")
+    if not fl_date_str:
+        return None
+    fl_date = fl_date_str if isinstance(fl_date_str, date) else _parse_date(fl_date_str)
+
+    dep_time_raw = row.get("crs_dep_time") or row.get("dep_time") or "0"
+    try:
+        dep_time = int(float(dep_time_raw))
+    except ValueError:
+        dep_time = 0
+
+    carrier = row.get("op_unique_carrier")
+    fl_num_raw = row.get("op_carrier_fl_num") or "0"
+    try:
+        fl_num = int(float(fl_num_raw))
+    except ValueError:
+        fl_num = 0
+
+    arr_delay = _to_int(row, "arr_delay")
+    dep_delay = _to_int(row, "dep_delay")
+    distance = _to_int(row, "distance")
+    cancelled = _to_int(row, "cancelled")
+    diverted = _to_int(row, "diverted")
+
+    route_values = (
+        origin, dest, fl_date, dep_time,
+        carrier, fl_num,
+        arr_delay, dep_delay, distance,
+        cancelled, diverted,
+    )
+    carrier_values = (
+        carrier, fl_date, dep_time,
+        origin, dest, fl_num,
+        arr_delay, dep_delay, cancelled, diverted,
+    )
+    return route_values, carrier_values
+
+
+def import_to_cassandra(file_name: str, cfg=None, start_row: int = 0) -> ImportTimer:
+    print(f"\n[IMPORTING] Importing {file_name} into Cassandra (from row {start_row})...")
+
+    timer = ImportTimer("cassandra", file_name, start_row=start_row)
+    concurrency = write_concurrency(cfg)
+    if concurrency > 1:
+        # inna ścieżka ładowania niż bazowa - osobna seria w analizie
+        timer.tags["concurrency"] = concurrency
 
     s = cass_client()
 
@@ -31,62 +102,37 @@ def import_to_cassandra(file_name: str) -> None:
         """
     )
 
-    with open(file_name, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            origin = row.get("origin")
-            dest = row.get("dest")
-
-            fl_date_str = row.get("fl_date")
-            if not fl_date_str:
-                continue
-            fl_date = _parse_date(fl_date_str)
-
-            dep_time_raw = row.get("crs_dep_time") or row.get("dep_time") or "0"
-            try:
-                dep_time = int(dep_time_raw)
-            except ValueError:
-                dep_time = 0
-
-            carrier = row.get("op_unique_carrier")
-            fl_num_raw = row.get("op_carrier_fl_num") or "0"
-            try:
-                fl_num = int(fl_num_raw)
-            except ValueError:
-                fl_num = 0
-
-            def to_int(name: str) -> int:
-                v = row.get(name)
-                if v in (None, ""):
-                    return 0
-                try:
-                    return int(float(v))
-                except ValueError:
-                    return 0
-
-            arr_delay = to_int("arr_delay")
-            dep_delay = to_int("dep_delay")
-            distance = to_int("distance")
-            cancelled = to_int("cancelled")
-            diverted = to_int("diverted")
-
-            s.execute(
-                insert_route,
-                (
-                    origin, dest, fl_date, dep_time,
-                    carrier, fl_num,
-                    arr_delay, dep_delay, distance,
-                    cancelled, diverted,
-                ),
-            )
-
-            s.execute(
-                insert_carrier,
-                (
-                    carrier, fl_date, dep_time,
-                    origin, dest, fl_num,
-                    arr_delay, dep_delay, cancelled, diverted,
-                ),
-            )
+    # paczki po 10k wierszy: czytanie (parse), konwersja na krotki (transform) i INSERT-y (facts) mierzone osobno
+    records = islice(iter_records(file_name), start_row, None)
+    while True:
+        with timer.phase("parse"):
+            chunk = list(islice(records, 10_000))
+        if not chunk:
+            break
+        timer.count("parse", len(chunk))
+
+        with timer.phase("transform", rows=len(chunk)):
+            params = [p for p in map(_row_params, chunk) if p is not None]
+
+        with timer.phase("facts", rows=len(params)):
+            if concurrency > 1:
+                # execute_concurrent wraca po potwierdzeniu wszystkich zapisów paczki (bariera),
+                # pierwszy błąd przerywa import
+                statements = [(insert_route, route_values) for route_values, _ in params]
+                statements += [(insert_carrier, carrier_values) for _, carrier_values in params]
+                execute_concurrent(s, statements, concurrency=concurrency, raise_on_first_error=True)
+            else:
+                for route_values, carrier_values in params:
+                    s.execute(insert_route, route_values)
+                    s.execute(insert_carrier, carrier_values)
+
+    # odpowiednik commit/checkpoint z pozostałych baz: memtable na dysk, inaczej koszt flushu
+    # zostaje w tle i trafia do pierwszych scenariuszy
+    if cass_exec_available():
+        with timer.phase("flush", rows=timer.phases.get("facts", [0.0, 0])[1]):
+            cass_exec("nodetool", "flush", CASSANDRA_KEYSPACE)
+    else:
+        print("[IMPORTING][cassandra] docker CLI not available in this container; flush phase skipped")
 
     print("[IMPORTING][cassandra] done.")
+    return timer.finish()
@@ -1,40 +1,70 @@
 # runner/nosql_import/mongo_import.py
 
 import csv
-from bench_mongo import mongo_client
+from itertools import islice
+from bench_mongo import mongo_client, mongo_layout, mongo_db_label, to_typed_doc, ensure_flights_collection, storage_note
+from dataset_cache import iter_records
+from import_timing import ImportTimer
 
-def import_to_mongo(file_name: str) -> None:
-    print(f"\n[IMPORTING] Importing {file_name} into MongoDB...")
+def _raw_numbers(row: dict) -> dict:
+    # lekkie konwersje na liczby – używane w agregacjach
+    for key in ["arr_delay", "dep_delay", "distance"]:
+        val = row.get(key)
+        if val is not None and val != "":
+            try:
+                row[key] = float(val)
+            except ValueError:
+                row[key] = None
+    return row
+
+def import_to_mongo(file_name: str, cfg=None, start_row: int = 0) -> ImportTimer:
+    layout = mongo_layout(cfg)
+    timer = ImportTimer(mongo_db_label(cfg), file_name, prefix="mongo", start_row=start_row)
+    print(f"\n[IMPORTING] Importing {file_name} into MongoDB (layout={layout}, from row {start_row})...")
 
     c = mongo_client()
     db = c["flightsdb"]
-    col = db["flights"]
+    col = ensure_flights_collection(db, layout)
 
-    # na wszelki wypadek czyścimy kolekcję
-    col.delete_many({})
+    # na wszelki wypadek czyścimy kolekcję (poza importem przyrostowym - wtedy dokładamy deltę)
+    if not start_row:
+        col.delete_many({})
 
-    batch = []
     batch_size = 10_000
 
-    with open(file_name, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # lekkie konwersje na liczby – używane w agregacjach
-            for key in ["arr_delay", "dep_delay", "distance"]:
-                val = row.get(key)
-                if val is not None and val != "":
-                    try:
-                        row[key] = float(val)
-                    except ValueError:
-                        row[key] = None
+    if layout == "raw":
+        # layout raw to dokładnie wiersze tekstowe z CSV
+        f = open(file_name, newline="", encoding="utf-8")
+        rows = csv.DictReader(f)
+    else:
+        f = None
+        rows = iter_records(file_name)
+
+    # paczki po batch_size: czytanie (parse), konwersja typów (transform) i insert_many (facts) mierzone osobno
+    records = islice(rows, start_row, None)
+    try:
+        while True:
+            with timer.phase("parse"):
+                batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            timer.count("parse", len(batch))
 
-            batch.append(row)
+            with timer.phase("transform", rows=len(batch)):
+                if layout == "raw":
+                    batch = [_raw_numbers(row) for row in batch]
+                else:
+                    batch = [to_typed_doc(row, layout) for row in batch]
 
-            if len(batch) >= batch_size:
-                col.insert_many(batch)
-                batch.clear()
+            with timer.phase("facts", rows=len(batch)):
+                col.insert_many(batch, ordered=False)
+    finally:
+        if f:
+            f.close()
 
-        if batch:
-            col.insert_many(batch)
+    # odpowiednik commitu: wymuszenie zapisu na dysk
+    with timer.phase("commit", rows=timer.phases.get("facts", [0, 0])[1]):
+        c.admin.command("fsync")
 
-    print("[IMPORTING][mongo] done.")
\ No newline at end of file
+    print(f"[IMPORTING][mongo] done. {storage_note(db)}")
+    return timer.finish()
@@ -0,0 +1,189 @@
+"""
+Generator parametrów scenariuszy odczytu: trasy, przewoźnicy, miesiące i zakresy dat losowane z rozkładu
+załadowanej próbki (flights_N.csv / .arrow) zamiast stałych list z configu.
+
+Tryby (params.mode):
+- config   - jak dotąd: kolejne wartości z queries.* (trasy po kolei, miesiące 1..12, stały przewoźnik)
+- uniform  - każda trasa / przewoźnik / miesiąc obecny w próbce z tym samym prawdopodobieństwem
+- zipf     - klucze posortowane wg liczności w próbce, p(rank) ~ 1 / rank^zipf_s (popularne trasy są gorące)
+- hotset   - losowy (z seeda) podzbiór hot_fraction kluczy dostaje hot_probability odwołań, reszta resztę
+
+Losowanie jest deterministyczne: RNG z (seed, operacja, powtórzenie), gdzie operacja to nazwa scenariusza
+bez prefiksu bazy - postgres_find_route_with_stats i cass_find_route_with_stats w powtórzeniu 3 dostają tę
+samą trasę, więc porównanie z silnikiem referencyjnym dalej działa. Zakres dat zaczyna się w dniu, w którym
+wylosowana trasa (przewoźnik) faktycznie lata, więc zapytania nie zwracają pustych wyników przez przypadek.
+Seed, tryb i liczność kluczy trafiają do results.csv jako wiersz params_make.
+"""
+import random
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from bench_common import log_result
+from dataset_cache import read_frame
+
+PARAM_MODES = ("config", "uniform", "zipf", "hotset")
+
+_PROFILE_COLUMNS = ["year", "month", "fl_date", "op_unique_carrier", "origin", "dest"]
+
+# dataset_name -> generator dla run_scenarios
+_GENERATORS = {}
+
+
+class ParamProfile:
+    """Liczności kluczy w próbce i dni, w których każdy klucz występuje."""
+
+    def __init__(self, file_name: str):
+        df = read_frame(file_name, columns=_PROFILE_COLUMNS)
+        df = df.dropna(subset=["fl_date", "op_unique_carrier", "origin", "dest"])
+        df["day"] = pd.to_datetime(df["fl_date"]).dt.date
+
+        self.rows = len(df)
+        self.routes = self._keyed(df, ["origin", "dest"])
+        self.carriers = self._keyed(df, ["op_unique_carrier"])
+        self.months = self._keyed(df, ["year", "month"])
+
+    @staticmethod
+    def _keyed(df: pd.DataFrame, columns) -> list:
+        """[(klucz, liczność, posortowane dni)] od najczęstszego klucza; remisy po kluczu (stała kolejność)."""
+        groups = df.groupby(columns, sort=True)["day"]
+        out = []
+        for (key, count), days in zip(groups.size().items(), groups.unique()):
+            key = key if isinstance(key, tuple) else (key,)
+            out.append((tuple(k.item() if hasattr(k, "item") else k for k in key), int(count), sorted(days)))
+        out.sort(key=lambda e: -e[1])
+        return out
+
+
+class ParamGenerator:
+    def __init__(self, profile: ParamProfile, cfg):
+        p_cfg = cfg.get("params", {})
+        self.mode = str(p_cfg.get("mode", "zipf"))
+        if self.mode not in PARAM_MODES[1:]:
+            raise ValueError(f"Unknown params mode '{self.mode}', expected one of {PARAM_MODES}")
+        self.seed = int(p_cfg.get("seed", 42))
+        self.zipf_s = float(p_cfg.get("zipf_s", 1.1))
+        self.hot_fraction = float(p_cfg.get("hot_fraction", 0.05))
+        self.hot_probability = float(p_cfg.get("hot_probability", 0.9))
+        self.route_window = int(p_cfg.get("route_window_days", 7))
+        self.carrier_window = int(p_cfg.get("carrier_window_days", 7))
+        self.profile = profile
+        self._weights = {kind: self._cum_weights(kind, getattr(profile, kind))
+                         for kind in ("routes", "carriers", "months")}
+
+    def _cum_weights(self, kind: str, keyed: list) -> list:
+        n = len(keyed)
+        if self.mode == "uniform":
+            weights = [1.0] * n
+        elif self.mode == "zipf":
+            weights = [1.0 / (rank ** self.zipf_s) for rank in range(1, n + 1)]
+        else:
+            hot = set(random.Random(f"{self.seed}:hot:{kind}").sample(range(n), max(1, round(n * self.hot_fraction)))
+                      if n else [])
+            cold = n - len(hot)
+            hot_p = self.hot_probability if cold else 1.0
+            weights = [hot_p / len(hot) if i in hot else (1.0 - hot_p) / cold for i in range(n)]
+
+        cum, total = [], 0.0
+        for w in weights:
+            total += w
+            cum.append(total)
+        return cum
+
+    def _pick(self, kind: str, op: str, iteration: int):
+        keyed = getattr(self.profile, kind)
+        if not keyed:
+            return None, None
+        rng = random.Random(f"{self.seed}:{op}:{iteration}")
+        key, _, days = rng.choices(keyed, cum_weights=self._weights[kind])[0]
+        return key, (rng, days)
+
+    def route(self, op: str, iteration: int):
+        """(origin, dest, date_from, date_to) - okno route_window_days od dnia, w którym trasa lata."""
+        key, pick = self._pick("routes", op, iteration)
+        if key is None:
+            return None
+        rng, days = pick
+        start = rng.choice(days)
+        end = start + timedelta(days=self.route_window - 1)
+        # sama data (północ) od dołu: w SQLite fl_date jest tekstem i '2024-05-01 00:00:00' > '2024-05-01'
+        return key[0], key[1], start.isoformat(), f"{end.isoformat()} 23:59:59"
+
+    def month(self, op: str, iteration: int):
+        """(year, month)."""
+        key, _ = self._pick("months", op, iteration)
+        return None if key is None else (int(key[0]), int(key[1]))
+
+    def carrier_days(self, op: str, iteration: int):
+        """(carrier, date_from, date_to) - okno carrier_window_days od dnia, w którym przewoźnik lata."""
+        key, pick = self._pick("carriers", op, iteration)
+        if key is None:
+            return None
+        rng, days = pick
+        start = rng.choice(days)
+        end = start + timedelta(days=self.carrier_window - 1)
+        return key[0], start.isoformat(), end.isoformat()
+
+    def note(self) -> str:
+        p = self.profile
+        return (f"mode={self.mode}, seed={self.seed}, routes={len(p.routes)}, carriers={len(p.carriers)}, "
+                f"months={len(p.months)}, rows={p.rows}")
+
+
+class ConfigParams:
+    """Tryb config: wartości z list queries.* po kolei (bez profilu próbki)."""
+
+    mode = "config"
+
+    def __init__(self, cfg):
+        self.queries = cfg.get("queries", {})
+
+    def route(self, op: str, iteration: int):
+        routes = self.queries.get("find_all_flights_on_route", {}).get("routes") or []
+        if not routes:
+            return None
+        route = routes[(iteration - 1) % len(routes)]
+        return route.get("origin"), route.get("dest"), route.get("date_from"), route.get("date_to")
+
+    def month(self, op: str, iteration: int):
+        months = self.queries.get("airlines_ranking", {}).get("months") or list(range(1, 13))
+        year = int(str(self.queries.get("top_routes_month", {}).get("month", date.today().year)).split("-")[0])
+        return year, int(months[(iteration - 1) % len(months)])
+
+    def carrier_days(self, op: str, iteration: int):
+        q = self.queries.get("read_by_carrier_day", {})
+        if not q.get("carrier"):
+            return None
+        return q["carrier"], q["date_from"], q["date_to"]
+
+    def note(self) -> str:
+        return "mode=config"
+
+
+def load_params(cfg, dataset_name: str, file_name: str):
+    """Profil próbki + generator dla dataset_name (raz na dataset); zapisuje wiersz params_make."""
+    if dataset_name in _GENERATORS:
+        return _GENERATORS[dataset_name]
+
+    mode = str(cfg.get("params", {}).get("mode", "zipf"))
+    t0 = time.perf_counter()
+    gen = ConfigParams(cfg) if mode == "config" else ParamGenerator(ParamProfile(file_name), cfg)
+    dt = (time.perf_counter() - t0) * 1000
+    log_result("params", dataset_name, "params_make", 1, dt, gen.note())
+    print(f"[params][{dataset_name}] {dt:.2f} ms :: {gen.note()}")
+
+    _GENERATORS[dataset_name] = gen
+    return gen
+
+
+def param_generator(cfg, dataset_name: str):
+    """Generator zarejestrowany przez load_params albo tryb config (np. run_* wołane bez bench_runnera)."""
+    if dataset_name in _GENERATORS:
+        return _GENERATORS[dataset_name]
+    mode = str(cfg.get("params", {}).get("mode", "zipf"))
+    if mode != "config":
+        # bez tego backend wołany ze złą nazwą datasetu cicho mierzyłby inne parametry niż pozostałe
+        raise RuntimeError(f"No parameter generator registered for dataset '{dataset_name}' (params.mode={mode}); "
+                           f"call load_params first")
+    return ConfigParams(cfg)
@@ -7,12 +7,15 @@ import sys
 BASE_DIR = Path(__file__).resolve().parent
 RESULTS_PATH = BASE_DIR / "results" / "results.csv"
 CHARTS_DIR = BASE_DIR / "results" / "charts"
-KNOWN_DBS = ["mysql", "postgres", "mongo", "cassandra"]
+KNOWN_DBS = ["mysql", "postgres", "mongo", "cassandra", "duckdb", "sqlite", "reference"]
 DB_COLORS = {
     "mysql": "#1f77b4",
     "postgres": "#ff7f0e",
     "mongo": "#2ca02c",
     "cassandra": "#d62728",
+    "duckdb": "#9467bd",
+    "sqlite": "#8c564b",
+    "reference": "#7f7f7f",
 }
 
 
@@ -53,6 +56,13 @@ def load_results() -> pd.DataFrame:
         return s
 
     df["operation"] = df["scenario"].map(scenario_to_operation)
+
+    # tag trybu cache doklejany do notatki po " | " (bench_common.log_result); brak = jeden przebieg
+    notes = df["notes"].astype(str) if "notes" in df.columns else pd.Series("", index=df.index)
+    df["cache"] = notes.str.extract(r" \| .*?cache=(\w+)", expand=False).fillna("")
+    # przemiatanie opóźnienia sieci (proxy network.rtt_ms / netem pipeline.delays_ms); NaN = pomiar lokalny
+    df["rtt_ms"] = notes.str.extract(r" \| .*?rtt=([\d.]+)ms", expand=False).astype(float)
+    df["net_delay"] = notes.str.extract(r" \| .*?net_delay=([\d.]+)ms", expand=False).astype(float)
     return df
 
 
@@ -66,7 +76,7 @@ def plot_scenario_lines(df: pd.DataFrame) -> None:
         raise ValueError(f"Brak wymaganych kolumn w DataFrame: {missing}")
 
     grouped = (
-        df.groupby(["operation", "db", "dataset", "dataset_size_num"], as_index=False)
+        df.groupby(["operation", "db", "cache", "dataset", "dataset_size_num"], as_index=False)
           .agg(mean_ms=("elapsed_ms", "mean"))
     )
 
@@ -97,20 +107,22 @@ def plot_scenario_lines(df: pd.DataFrame) -> None:
         ]
 
         for db in db_order:
-            db_sub = sub[sub["db"] == db]
-            if db_sub.empty:
-                continue
+            for cache in sorted(sub["cache"].unique()):
+                db_sub = sub[(sub["db"] == db) & (sub["cache"] == cache)]
+                if db_sub.empty:
+                    continue
 
-            x = db_sub["dataset_size_num"]
-            y = db_sub["mean_ms"]
+                x = db_sub["dataset_size_num"]
+                y = db_sub["mean_ms"]
 
-            plt.plot(
-                x,
-                y,
-                marker="o",
-                label=db,
-                color=DB_COLORS.get(db),
-            )
+                plt.plot(
+                    x,
+                    y,
+                    marker="o",
+                    label=f"{db} ({cache})" if cache else db,
+                    color=DB_COLORS.get(db),
+                    linestyle="--" if cache == "cold" else "-",
+                )
 
         plt.xlabel("Rozmiar próbki (wiersze)")
         plt.xscale('log')
@@ -130,9 +142,131 @@ def plot_scenario_lines(df: pd.DataFrame) -> None:
         print(f"[plot] Zapisano wykres: {out_path}")
 
 
+def plot_import_throughput(df: pd.DataFrame) -> None:
+    """Przepustowość importu (rows/s z notatki) per faza vs. rozmiar danych - jeden wykres na fazę."""
+    imports = df[df["operation"].astype(str).str.startswith("import_")].copy()
+    if imports.empty or "notes" not in imports.columns:
+        return
+
+    imports["rows_per_s"] = (
+        imports["notes"].astype(str).str.extract(r"rows_per_s=([\d.]+)", expand=False).astype(float)
+    )
+    imports = imports.dropna(subset=["rows_per_s"])
+    imports["phase"] = imports["operation"].str.slice(len("import_"))
+    CHARTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    for phase in sorted(imports["phase"].unique()):
+        sub = imports[imports["phase"] == phase].sort_values("dataset_size_num")
+        dataset_labels = (
+            sub[["dataset_size_num", "dataset"]]
+            .drop_duplicates("dataset_size_num")
+            .sort_values("dataset_size_num")
+        )
+
+        plt.figure()
+        db_order = KNOWN_DBS + [db for db in sorted(sub["db"].unique()) if db not in KNOWN_DBS]
+        for db in db_order:
+            db_sub = sub[sub["db"] == db].groupby("dataset_size_num", as_index=False)["rows_per_s"].mean()
+            if db_sub.empty:
+                continue
+            plt.plot(db_sub["dataset_size_num"], db_sub["rows_per_s"], marker="o", label=db,
+                     color=DB_COLORS.get(db))
+
+        plt.xlabel("Rozmiar próbki (wiersze)")
+        plt.xscale('log')
+        plt.ylabel("Wiersze / s")
+        plt.title(f"import: {phase} – przepustowość vs. rozmiar danych")
+        plt.xticks(dataset_labels["dataset_size_num"], dataset_labels["dataset"])
+        plt.legend(title="Baza danych")
+        plt.grid(True, linestyle="--", alpha=0.5)
+
+        out_path = CHARTS_DIR / f"import_{phase}_throughput.png"
+        plt.tight_layout()
+        plt.savefig(out_path)
+        plt.close()
+        print(f"[plot] Zapisano wykres: {out_path}")
+
+
+def plot_import_workers(df: pd.DataFrame) -> None:
+    """Przemiatanie import.parallel.sweep: rows/s całego importu vs. liczba workerów (wykres na dataset)."""
+    totals = df[df["operation"].astype(str) == "import_total"].copy()
+    if totals.empty or "notes" not in totals.columns:
+        return
+
+    notes = totals["notes"].astype(str)
+    totals["workers"] = notes.str.extract(r"workers=(\d+)", expand=False).astype(float)
+    totals["rows_per_s"] = notes.str.extract(r"rows_per_s=([\d.]+)", expand=False).astype(float)
+    totals = totals.dropna(subset=["workers", "rows_per_s"])
+    CHARTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    for dataset in totals["dataset"].unique():
+        sub = totals[totals["dataset"] == dataset]
+        if sub["workers"].nunique() < 2:
+            continue
+
+        plt.figure()
+        for db in sorted(sub["db"].unique()):
+            db_sub = sub[sub["db"] == db].groupby("workers", as_index=False)["rows_per_s"].mean()
+            plt.plot(db_sub["workers"], db_sub["rows_per_s"], marker="o", label=db, color=DB_COLORS.get(db))
+
+        plt.xlabel("Liczba workerów importu")
+        plt.ylabel("Wiersze / s")
+        plt.title(f"import równoległy – {dataset}")
+        plt.legend(title="Baza danych")
+        plt.grid(True, linestyle="--", alpha=0.5)
+
+        out_path = CHARTS_DIR / f"import_workers_{dataset}.png"
+        plt.tight_layout()
+        plt.savefig(out_path)
+        plt.close()
+        print(f"[plot] Zapisano wykres: {out_path}")
+
+
+def plot_latency_vs_rtt(df: pd.DataFrame) -> None:
+    """Przemiatanie network.rtt_ms: średni czas vs. RTT proxy - wykres na operację, linia na bazę i dataset."""
+    swept = df.dropna(subset=["rtt_ms"])
+    if swept.empty:
+        return
+    CHARTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    for op_name in sorted(swept["operation"].unique()):
+        sub = swept[swept["operation"] == op_name]
+        if sub["rtt_ms"].nunique() < 2:
+            continue
+
+        plt.figure()
+        db_order = KNOWN_DBS + [db for db in sorted(sub["db"].unique()) if db not in KNOWN_DBS]
+        datasets = sub[["dataset_size_num", "dataset"]].drop_duplicates().sort_values("dataset_size_num")["dataset"]
+        for db in db_order:
+            for i, dataset in enumerate(datasets):
+                line = (sub[(sub["db"] == db) & (sub["dataset"] == dataset)]
+                        .groupby("rtt_ms", as_index=False)["elapsed_ms"].mean())
+                if line.empty:
+                    continue
+                plt.plot(line["rtt_ms"], line["elapsed_ms"], marker="o", label=f"{db} ({dataset})",
+                         color=DB_COLORS.get(db), alpha=1.0 if i == len(datasets) - 1 else 0.5)
+
+        plt.xlabel("RTT dodane przez proxy [ms]")
+        plt.ylabel("Średni czas [ms]")
+        plt.title(f"{op_name} – średni czas vs. RTT")
+        plt.legend(title="Baza danych")
+        plt.grid(True, linestyle="--", alpha=0.5)
+
+        out_path = CHARTS_DIR / f"{op_name}_vs_rtt.png"
+        plt.tight_layout()
+        plt.savefig(out_path)
+        plt.close()
+        print(f"[plot] Zapisano wykres: {out_path}")
+
+
 def main():
     df = load_results()
-    plot_scenario_lines(df)
+    # przebiegi ze sztucznym opóźnieniem sieci nie mieszają się z pomiarem lokalnym (mają własne wykresy)
+    local = df[df["rtt_ms"].isna() & df["net_delay"].isna()]
+    plot_scenario_lines(local)
+    plot_import_throughput(local)
+    plot_import_workers(local)
+    plot_latency_vs_rtt(df)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+"""
+Faza "quiesce" między importem a scenariuszami: domknięcie pracy w tle, żeby pierwsze powtórzenia
+nie mierzyły autovacuum, flushowania stron czy kompakcji.
+
+Dla każdej bazy: akcja (jednorazowa) + metryka pracy w tle odpytywana co poll_interval_s,
+aż spadnie do progu (threshold) w stable_polls kolejnych odczytach albo minie timeout_s.
+
+- postgres:   VACUUM ANALYZE + CHECKPOINT; metryka = procesy autovacuum i inne aktywne zapytania
+- mysql:      ANALYZE TABLE; metryka = % brudnych stron w buffer poolu InnoDB
+- mongo:      fsync (checkpoint WiredTiger); metryka = % brudnych danych w cache (+100, gdy trwa checkpoint)
+- cassandra:  nodetool flush przez `docker exec` (gdy runner ma CLI dockera);
+              metryka = aktywne + oczekujące zadania flush/kompakcji z system_views.thread_pools
+- sqlite:     PRAGMA wal_checkpoint(TRUNCATE)
+- duckdb:     CHECKPOINT
+
+Wynik trafia do results.csv jako scenariusz <db>_quiesce (czas całości, notatka z czasem akcji i oczekiwania).
+"""
+import time
+
+import bench_duckdb
+import bench_mongo
+import bench_mysql
+import bench_postgres
+import bench_sqlite
+from bench_common import log_result
+from cass_admin import CASSANDRA_KEYSPACE, cass_exec, cass_exec_available
+
+CASSANDRA_BACKGROUND_POOLS = ["CompactionExecutor", "MemtableFlushWriter", "MemtablePostFlush"]
+
+DEFAULT_THRESHOLDS = {"postgres": 0, "mysql": 1.0, "mongo": 1.0, "cassandra": 0}
+
+
+# ---------------------------------------------------------------- postgres
+
+def _pg_settle(cfg):
+    conn = bench_postgres.postgres_conn()
+    # VACUUM nie może działać w transakcji
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("VACUUM ANALYZE")
+        cur.execute("CHECKPOINT")
+    finally:
+        cur.close()
+        conn.autocommit = False
+        bench_postgres._put_conn(conn)
+
+
+def _pg_metric(cfg) -> float:
+    conn = bench_postgres.postgres_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT count(*)
+            FROM pg_stat_activity
+            WHERE pid <> pg_backend_pid()
+              AND (backend_type = 'autovacuum worker'
+                   OR (backend_type = 'client backend' AND state = 'active'))
+        """)
+        return float(cur.fetchone()[0])
+    finally:
+        conn.rollback()
+        cur.close()
+        bench_postgres._put_conn(conn)
+
+
+# ---------------------------------------------------------------- mysql
+
+def _mysql_settle(cfg):
+    bench_mysql.analyze_mysql()
+
+
+def _mysql_metric(cfg) -> float:
+    conn = bench_mysql.mysql_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("SHOW GLOBAL STATUS WHERE Variable_name IN "
+                    "('Innodb_buffer_pool_pages_dirty', 'Innodb_buffer_pool_pages_total')")
+        status = {name: float(value) for name, value in cur.fetchall()}
+        total = status.get("Innodb_buffer_pool_pages_total") or 1.0
+        return 100.0 * status.get("Innodb_buffer_pool_pages_dirty", 0.0) / total
+    finally:
+        cur.close()
+        conn.close()
+
+
+# ---------------------------------------------------------------- mongo
+
+def _mongo_settle(cfg):
+    client = bench_mongo.mongo_client()
+    try:
+        client.admin.command("fsync")
+    finally:
+        client.close()
+
+
+def _mongo_metric(cfg) -> float:
+    client = bench_mongo.mongo_client()
+    try:
+        wt = client.admin.command("serverStatus").get("wiredTiger", {})
+    finally:
+        client.close()
+    cache = wt.get("cache", {})
+    dirty = float(cache.get("tracked dirty bytes in the cache", 0))
+    configured = float(cache.get("maximum bytes configured", 0)) or 1.0
+    checkpoint = wt.get("transaction", {}).get("transaction checkpoint currently running", 0)
+    return 100.0 * dirty / configured + (100.0 if checkpoint else 0.0)
+
+
+# ---------------------------------------------------------------- cassandra
+
+def _cass_settle(cfg):
+    if not cass_exec_available():
+        print("[quiesce][cassandra] docker CLI not available in this container; flush skipped, polling only")
+        return
+    cass_exec("nodetool", "flush", CASSANDRA_KEYSPACE)
+
+
+def _cass_metric(cfg) -> float:
+    # wspólna sesja: cass_client() przy każdym odczycie (co poll_interval_s) budowałby nowy Cluster bez shutdown
+    from bench_cassandra import shared_cass_session
+
+    rows = shared_cass_session().execute("SELECT name, active_tasks, pending_tasks FROM system_views.thread_pools")
+    return float(sum(r.active_tasks + r.pending_tasks for r in rows if r.name in CASSANDRA_BACKGROUND_POOLS))
+
+
+# ---------------------------------------------------------------- sqlite / duckdb
+
+def _sqlite_settle(cfg):
+    bench_sqlite.sqlite_conn(cfg).execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def _duckdb_settle(cfg):
+    bench_duckdb.duckdb_conn().execute("CHECKPOINT")
+
+
+# db -> (akcja, metryka albo None)
+QUIESCE_BACKENDS = {
+    "postgres": (_pg_settle, _pg_metric),
+    "mysql": (_mysql_settle, _mysql_metric),
+    "mongo": (_mongo_settle, _mongo_metric),
+    "cassandra": (_cass_settle, _cass_metric),
+    "sqlite": (_sqlite_settle, None),
+    "duckdb": (_duckdb_settle, None),
+}
+
+
+def _wait_for_metric(metric, cfg, threshold: float, interval: float, timeout: float, stable_polls: int):
+    """Odpytuje metrykę, aż stable_polls kolejnych odczytów będzie <= threshold; zwraca (polls, ostatnia, ok)."""
+    deadline = time.perf_counter() + timeout
+    polls = below = 0
+    value = None
+    while True:
+        value = metric(cfg)
+        polls += 1
+        below = below + 1 if value <= threshold else 0
+        if below >= stable_polls:
+            return polls, value, True
+        if time.perf_counter() >= deadline:
+            return polls, value, False
+        time.sleep(interval)
+
+
+def quiesce(db: str, cfg, dataset_name: str):
+    """Akcja + czekanie na ciszę w tle dla bazy db; zapisuje wiersz <db>_quiesce do results.csv."""
+    if db not in QUIESCE_BACKENDS:
+        return
+    q_cfg = cfg.get("quiesce", {})
+    settle, metric = QUIESCE_BACKENDS[db]
+
+    label = bench_mongo.mongo_db_label(cfg) if db == "mongo" else db
+    print(f"\n[QUIESCE] Settling {label} before scenarios...")
+
+    t0 = time.perf_counter()
+    settle(cfg)
+    action_ms = (time.perf_counter() - t0) * 1000
+
+    notes = f"action_ms={action_ms:.0f}"
+    if metric is not None:
+        threshold = float((q_cfg.get("thresholds") or {}).get(db, DEFAULT_THRESHOLDS.get(db, 0)))
+        t1 = time.perf_counter()
+        polls, value, settled = _wait_for_metric(
+            metric, cfg, threshold,
+            interval=float(q_cfg.get("poll_interval_s", 1)),
+            timeout=float(q_cfg.get("timeout_s", 300)),
+            stable_polls=int(q_cfg.get("stable_polls", 2)),
+        )
+        wait_ms = (time.perf_counter() - t1) * 1000
+        notes += (f", wait_ms={wait_ms:.0f}, polls={polls}, metric={value:.2f}, threshold={threshold:g}, "
+                  f"settled={str(settled).lower()}")
+
+    dt = (time.perf_counter() - t0) * 1000
+    log_result(label, dataset_name, f"{db}_quiesce", 1, dt, notes)
+    print(f"[{label}][quiesce] {dt:.2f} ms :: {notes}")
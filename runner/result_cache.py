@@ -0,0 +1,233 @@
+"""
+Cache wyników zapytań po stronie aplikacji (w procesie runnera) i mieszany workload, który go mierzy.
+
+ResultCache: LRU z limitem wpisów (max_entries) i TTL (ttl_s). Klucz = (baza, operacja, parametry zapytania
+z generatora param_gen), a każdy wpis ma tagi tego, od czego zależy wynik: ("month", (rok, miesiąc)) albo
+("carrier", kod). Zapis (add_flight / add_flight_stats) unieważnia wpisy z tagiem swojego miesiąca
+i przewoźnika, więc kolejny odczyt idzie do bazy.
+
+CachedScenario owija scenariusz odczytu: prepare() jak w oryginale, w run() (mierzone) najpierw lookup
+w cache, przy chybieniu zapytanie i zapis wyniku. Przy trafieniu cleanup() (niemierzone) może jeszcze raz
+wykonać zapytanie i porównać notatkę z podaną z cache - tak liczymy, ile odpowiedzi było nieaktualnych.
+
+run_cache_workload: ta sama, z seeda, sekwencja odczytów (read_ops) przeplatanych zapisami (write_ratio)
+wykonana dwa razy - bez cache (off) i przez cache (on). Wynik: wiersz <prefiks>_result_cache_<tryb>
+z p50 odczytów jako czasem i notatką hit_rate, p50/p99 odczytów i zapisów, stale (liczba i udział
+nieaktualnych trafień), age_p50/max (wiek podanych wpisów), invalidated, evicted, expired.
+"""
+import random
+import time
+from collections import OrderedDict
+
+from bench_common import log_result
+from param_gen import param_generator
+from scenario import (RunContext, Scenario, carrier_day_params, execute, insert_flight_entry, month_param,
+                      write_state)
+
+DEFAULT_READ_OPS = ["top_routes_month", "rank_punctual_airlines"]
+WRITE_OPS = ["add_flight", "add_flight_stats"]
+CACHE_MODES = ("off", "on")
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()   # key -> (wynik, czas zapisu, tagi)
+        self._by_tag = {}               # tag -> klucze
+        self.hits = self.misses = self.invalidated = self.evicted = self.expired = 0
+
+    def get(self, key):
+        """(wynik, wiek w s) albo None; trafienie przesuwa wpis na koniec kolejki LRU."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] > self.ttl_s:
+            self._drop(key)
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], time.monotonic() - entry[1]
+
+    def put(self, key, value, tags=()):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, time.monotonic(), tuple(tags))
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evicted += 1
+
+    def invalidate(self, tags) -> int:
+        n = 0
+        for tag in tags:
+            for key in list(self._by_tag.get(tag, ())):
+                self._drop(key)
+                n += 1
+        self.invalidated += n
+        return n
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _month_key(ctx):
+    month = month_param(ctx)
+    return month, [("month", month)]
+
+
+def _carrier_day_key(ctx):
+    carrier, date_from, date_to, limit = carrier_day_params(ctx)
+    return (carrier, date_from, date_to, limit), [("carrier", carrier)]
+
+
+# operacja -> (parametry zapytania, tagi zależności); parametry są te same, które wylosował scenariusz
+CACHE_KEYS = {
+    "top_routes_month": _month_key,
+    "rank_punctual_airlines": _month_key,
+    "rank_punctual_airlines_pipeline": _month_key,
+    "histogram_arr_delay_month": _month_key,
+    "read_by_carrier_day": _carrier_day_key,
+}
+
+
+class CachedScenario(Scenario):
+    def __init__(self, inner: Scenario, cache: ResultCache, verify: bool = True):
+        self.inner = inner
+        self.name = inner.name
+        self.param_op = inner.param_op
+        self.cache = cache
+        self.verify = verify
+
+    def prepare(self, ctx):
+        self.inner.prepare(ctx)
+        params, tags = CACHE_KEYS[ctx.op](ctx)
+        # nazwa scenariusza, nie ctx.op: wariant z param_op nie może dostać wyniku zapisanego przez operację bazową
+        ctx.params["cache_key"] = (ctx.label, ctx.scenario, params)
+        ctx.params["cache_tags"] = tags
+
+    def run(self, ctx):
+        hit = self.cache.get(ctx.params["cache_key"])
+        if hit is not None:
+            ctx.params["cache_hit"] = hit
+            return hit[0]
+        note = self.inner.run(ctx)
+        self.cache.put(ctx.params["cache_key"], note, ctx.params["cache_tags"])
+        return note
+
+    def cleanup(self, ctx):
+        try:
+            hit = ctx.params.get("cache_hit")
+            if hit is not None and self.verify:
+                ctx.params["stale"] = self.inner.run(ctx) != hit[0]
+        finally:
+            self.inner.cleanup(ctx)
+
+
+def _flight_tags(flight) -> list:
+    return [("month", (int(flight["year"]), int(flight["month"]))), ("carrier", flight["op_unique_carrier"])]
+
+
+def _percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def workload_sequence(c_cfg, read_ops, write_ops) -> list:
+    """Kolejność operacji (taka sama dla off i on); zapisy na zmianę add_flight / add_flight_stats."""
+    rng = random.Random(f"{int(c_cfg.get('seed', 42))}:result_cache")
+    write_ratio = float(c_cfg.get("write_ratio", 0.1))
+    ops, writes = [], 0
+    for _ in range(int(c_cfg.get("ops", 200))):
+        if write_ops and rng.random() < write_ratio:
+            ops.append(write_ops[writes % len(write_ops)])
+            writes += 1
+        else:
+            ops.append(rng.choice(read_ops))
+    return ops
+
+
+def run_cache_workload(db: str, scenarios, cfg, dataset_name: str, label: str = None):
+    """Mieszany workload bez cache i przez ResultCache; po jednym wierszu wyników na tryb."""
+    c_cfg = cfg.get("result_cache", {})
+    label = label or db
+    by_op = {s.name.split("_", 1)[-1]: s for s in scenarios}
+    prefix = scenarios[0].name.split("_", 1)[0]
+    read_ops = [op for op in (c_cfg.get("read_ops") or DEFAULT_READ_OPS) if op in by_op and op in CACHE_KEYS]
+    write_ops = [op for op in WRITE_OPS if op in by_op]
+    if not read_ops:
+        print(f"[{label}][result_cache] no cacheable read scenarios, skipping")
+        return
+
+    flights = cfg["queries"]["insert_flight"].get("flights", [])
+    ops = workload_sequence(c_cfg, read_ops, write_ops)
+    gen = param_generator(cfg, dataset_name)
+    invalidate = bool(c_cfg.get("invalidate", True))
+    verify = bool(c_cfg.get("verify_hits", True))
+
+    for r, mode in enumerate(CACHE_MODES, 1):
+        cache = ResultCache(int(c_cfg.get("max_entries", 1024)), float(c_cfg.get("ttl_s", 60)))
+        flight_tags = {}
+        reads, writes, ages = [], [], []
+        stale = writes_done = 0
+
+        for step, op in enumerate(ops, 1):
+            scenario = by_op[op]
+            is_write = op in write_ops
+            if is_write:
+                # scenariusze zapisu biorą lot z queries.insert_flight.flights[iteration - 1]
+                iteration = writes_done // len(write_ops) % max(len(flights), 1) + 1
+                writes_done += 1
+            else:
+                iteration = step
+                if mode == "on":
+                    scenario = CachedScenario(scenario, cache, verify)
+
+            ctx = RunContext(cfg=cfg, db=db, label=label, dataset_name=dataset_name, iteration=iteration,
+                             state=write_state(db), scenario=scenario.name, gen=gen, param_op=scenario.param_op)
+            dt, _ = execute(scenario, ctx)
+            if not ctx.completed:
+                continue
+
+            if is_write:
+                writes.append(dt)
+                flight = insert_flight_entry(cfg, iteration) if flights else None
+                target = ctx.result if op == "add_flight" else ctx.params.get("flight_id")
+                tags = flight_tags.get(target) or (_flight_tags(flight) if flight else [])
+                if op == "add_flight" and target is not None and tags:
+                    flight_tags[target] = tags
+                if invalidate:
+                    cache.invalidate(tags)
+            else:
+                reads.append(dt)
+                if "cache_hit" in ctx.params:
+                    ages.append(ctx.params["cache_hit"][1] * 1000)
+                    stale += bool(ctx.params.get("stale"))
+
+        hits = len(ages)
+        notes = (f"ops={len(ops)}, reads={len(reads)}, writes={len(writes)}, "
+                 f"hit_rate={cache.hit_rate if mode == 'on' else 0.0:.4f}, "
+                 f"p50_ms={_percentile(reads, 50):.3f}, p99_ms={_percentile(reads, 99):.3f}, "
+                 f"write_p50_ms={_percentile(writes, 50):.3f}, write_p99_ms={_percentile(writes, 99):.3f}, "
+                 f"stale={stale}, stale_rate={stale / hits if hits else 0.0:.4f}, "
+                 f"age_p50_ms={_percentile(ages, 50):.1f}, age_max_ms={max(ages, default=0.0):.1f}, "
+                 f"invalidated={cache.invalidated}, evicted={cache.evicted}, expired={cache.expired}")
+        scenario_name = f"{prefix}_result_cache_{mode}"
+        log_result(label, dataset_name, scenario_name, r, _percentile(reads, 50), notes)
+        print(f"[{label}][{scenario_name}] {notes}")
@@ -0,0 +1,317 @@
+"""
+API scenariuszy: klasa Scenario z trzema fazami, czas mierzy harness (run_scenarios).
+
+- prepare(ctx) - niemierzone: połączenie/kursor, parametry z configu, wybór wiersza docelowego, słowniki
+- run(ctx)     - jedyna mierzona faza; zwraca notatkę do results.csv
+- cleanup(ctx) - niemierzone, wołane zawsze (też po błędzie): zwrot połączenia, zapis stanu
+- probe(ctx)   - opcjonalna sonda scenariusza wokół run() (np. ruch sieciowy doklejany do notatki)
+
+Parametry odczytów (trasy, miesiące, przewoźnicy) scenariusze biorą z ctx.gen (param_gen) przez
+route_params / month_param / carrier_day_params, kluczem losowania jest ctx.op - ta sama operacja w każdej bazie.
+Wariant tego samego zapytania (np. mongo_rank_punctual_airlines_pipeline) ustawia param_op na operację bazową,
+żeby losował te same parametry i był porównywany z nią i z silnikiem referencyjnym.
+
+Sondy z bench_common.add_run_probe (np. liczniki serwera) robią snapshot tuż przed i tuż po run(),
+poza pomiarem; ich tagi trafiają tylko do wyniku tego powtórzenia.
+
+Tryb protokołu zapytań SQL (statements.modes): text - pełny tekst zapytania z parametrami wstawionymi przez
+sterownik, prepared - instrukcje przygotowane po stronie serwera, trzymane per połączenie (postgres, mysql).
+
+Stan współdzielony między scenariuszami zapisu (id wstawionych lotów, klucze wierszy Cassandry)
+trzyma WriteState per baza zamiast kluczy doklejanych do cfg; restore snapshotu i reset bazy go czyszczą.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Optional
+
+from bench_common import before_scenario, log_result, start_run_probes
+from dimensions import forget_dimensions
+from param_gen import param_generator
+
+
+class SkipScenario(Exception):
+    """Rzucane w prepare(), gdy scenariusza nie da się wykonać (np. brak danych w configu); treść = notatka."""
+
+
+@dataclass
+class WriteState:
+    # id lotów wstawionych przez <db>_add_flight (flight_id albo ObjectId), w kolejności wstawiania
+    inserted_ids: list = field(default_factory=list)
+    # loty z add_flight, które nie dostały jeszcze statystyk z add_flight_stats
+    pending_stats: list = field(default_factory=list)
+    # loty, którym add_flight_stats dopisał statystyki - także cel awaryjny spoza stanu (np. lot z importu po restore)
+    stats_ids: list = field(default_factory=list)
+    # klucze (origin, dest, fl_date, dep_time, carrier, fl_num) wierszy wstawionych do Cassandry
+    cass_written: list = field(default_factory=list)
+
+    def add_flight(self, flight_id):
+        self.inserted_ids.append(flight_id)
+        self.pending_stats.append(flight_id)
+
+    def take_pending(self, newest: bool = True):
+        """Kolejny lot bez statystyk: najnowszy (jak ORDER BY flight_id DESC) albo najstarszy; None, gdy brak."""
+        if not self.pending_stats:
+            return None
+        return self.pending_stats.pop() if newest else self.pending_stats.pop(0)
+
+    def add_stats(self, flight_id):
+        self.stats_ids.append(flight_id)
+
+
+_WRITE_STATE = {}
+
+
+def write_state(db: str) -> WriteState:
+    return _WRITE_STATE.setdefault(db, WriteState())
+
+
+def forget_write_state(db: str = None):
+    """Po restore/resecie stan (i rejestr wymiarów) wskazywałby na nieistniejące wiersze."""
+    if db is None:
+        _WRITE_STATE.clear()
+    else:
+        _WRITE_STATE.pop(db, None)
+    forget_dimensions(db)
+
+
+STATEMENT_MODES = ("text", "prepared")
+
+_STATEMENT_MODE = "text"
+
+
+def statement_modes(cfg) -> list:
+    modes = [str(m) for m in (cfg.get("statements", {}).get("modes") or [])]
+    for mode in modes:
+        if mode not in STATEMENT_MODES:
+            raise ValueError(f"Unknown statements mode '{mode}', expected one of {STATEMENT_MODES}")
+    return modes
+
+
+def set_statement_mode(mode: str = None):
+    global _STATEMENT_MODE
+    _STATEMENT_MODE = mode or "text"
+
+
+def prepared_statements() -> bool:
+    return _STATEMENT_MODE == "prepared"
+
+
+@dataclass
+class RunContext:
+    cfg: dict
+    db: str                  # klucz bazy (stan zapisu, backendy)
+    label: str               # nazwa bazy w results.csv (np. mongo_typed)
+    dataset_name: str
+    iteration: int           # numer powtórzenia 1..repeats
+    state: WriteState
+    scenario: str = ""       # pełna nazwa scenariusza (np. postgres_top_routes_month)
+    gen: Any = None          # generator parametrów (param_gen) dla datasetu
+    conn: Any = None         # połączenie / klient / sesja z prepare()
+    cur: Any = None          # kursor SQL z prepare()
+    params: dict = field(default_factory=dict)   # parametry przygotowane w prepare() dla run()
+    result: Any = None       # to, czego cleanup() potrzebuje z run() (np. wstawione id)
+    note: str = ""
+    elapsed_ms: Optional[float] = None           # None = run() nie zakończył się
+    tags: dict = field(default_factory=dict)     # tagi tylko tego wyniku (np. delty liczników serwera)
+    param_op: Optional[str] = None               # Scenario.param_op - operacja bazowa wariantu
+
+    @property
+    def completed(self) -> bool:
+        return self.elapsed_ms is not None
+
+    @property
+    def op(self) -> str:
+        """Operacja bez prefiksu bazy albo param_op wariantu - wspólny klucz losowania parametrów dla wszystkich baz."""
+        return self.param_op or self.scenario.split("_", 1)[-1]
+
+
+class Scenario:
+    name = ""
+    # operacja, z którą wariant dzieli parametry (np. "rank_punctual_airlines"); None = z nazwy scenariusza
+    param_op = None
+
+    def prepare(self, ctx: RunContext):
+        pass
+
+    def run(self, ctx: RunContext) -> str:
+        raise NotImplementedError
+
+    def cleanup(self, ctx: RunContext):
+        pass
+
+    def probe(self, ctx: RunContext):
+        """
+        Sonda tego scenariusza (np. liczniki ruchu sieciowego): jak bench_common.add_run_probe zwraca funkcję
+        wołaną po run() albo None. Startuje po sondach globalnych, więc ich własne zapytania (serverStatus
+        sondy metrics) nie wpadają w jej okno.
+        """
+        return None
+
+
+def execute(scenario: Scenario, ctx: RunContext, probes: bool = True):
+    """
+    Jedno wykonanie: prepare -> run (mierzone) -> cleanup; zwraca (ms, notatka).
+    probes=False (rozgrzewka): bez sond - profile i liczniki opisują tylko mierzone powtórzenia.
+    """
+    try:
+        scenario.prepare(ctx)
+        finishers = start_run_probes(ctx, [scenario.probe]) if probes else []
+        t0 = time.perf_counter()
+        note = scenario.run(ctx)
+        ctx.elapsed_ms = (time.perf_counter() - t0) * 1000
+        ctx.note = note
+        # w odwrotnej kolejności: sonda startująca ostatnia (najbliżej pomiaru) kończy pierwsza
+        for finish in reversed(finishers):
+            ctx.tags.update(finish())
+    except SkipScenario as e:
+        ctx.note = str(e)
+    finally:
+        scenario.cleanup(ctx)
+    return (ctx.elapsed_ms or 0.0), ctx.note
+
+
+def run_scenarios(db: str, scenarios, cfg, dataset_name: str, label: str = None):
+    label = label or db
+    gen = param_generator(cfg, dataset_name)
+
+    for scenario in scenarios:
+        name = scenario.name
+
+        def context(r):
+            return RunContext(cfg=cfg, db=db, label=label, dataset_name=dataset_name, iteration=r,
+                              state=write_state(db), scenario=name, gen=gen, param_op=scenario.param_op)
+
+        for r in range(1, int(cfg["repeats"]) + 1):
+            before_scenario(label, name, r, lambda: execute(scenario, context(r), probes=False))
+            ctx = context(r)
+            dt, notes = execute(scenario, ctx)
+            log_result(label, dataset_name, name, r, dt, notes, ctx.tags)
+            print(f"[{label}][{name}][run={r}] {dt:.2f} ms :: {notes}")
+
+
+# ---------------------------------------------------------------- parametry wspólne dla backendów
+
+FLIGHT_INSERT_COLS = [
+    "year", "month", "day_of_month", "day_of_week", "fl_date",
+    "op_unique_carrier", "op_carrier_fl_num", "origin", "dest",
+    "crs_dep_time", "crs_arr_time", "crs_elapsed_time", "distance",
+]
+
+
+def flight_values(flight, carrier_code) -> list:
+    return [
+        int(flight["year"]),
+        int(flight["month"]),
+        int(flight["day_of_month"]),
+        int(flight["day_of_week"]),
+        flight["fl_date"],
+        carrier_code,
+        str(flight["op_carrier_fl_num"]),
+        flight["origin"],
+        flight["dest"],
+        int(flight.get("crs_dep_time", 0)),
+        int(flight.get("crs_arr_time", 0)),
+        int(flight.get("crs_elapsed_time", 0)),
+        int(flight.get("distance", 0)),
+    ]
+
+
+def insert_flight_entry(cfg, iteration: int) -> dict:
+    """Lot z queries.insert_flight.flights dla powtórzenia iteration (repeats może przekraczać liczbę lotów)."""
+    flights = cfg["queries"]["insert_flight"]["flights"]
+    return flights[(iteration - 1) % len(flights)]
+
+
+def stats_entries(cfg, iteration: int):
+    """(flight_performance, flights_delayed albo None) dla powtórzenia iteration (cyklicznie po liście)."""
+    update_flight_cfg = cfg["queries"].setdefault("update_flight", {})
+    perf_list = update_flight_cfg["flight_performance"]
+    idx = (iteration - 1) % len(perf_list)
+    delayed_list = update_flight_cfg.get("flights_delayed", [])
+    delayed_entry = next(
+        (d for d in delayed_list if d.get("flight_index") == idx),
+        None
+    )
+    return perf_list[idx], delayed_entry
+
+
+def delayed_values(flight_id, delayed_entry) -> tuple:
+    return (
+        int(flight_id),
+        int(delayed_entry.get("carrier_delay", 0)),
+        int(delayed_entry.get("weather_delay", 0)),
+        int(delayed_entry.get("nas_delay", 0)),
+        int(delayed_entry.get("security_delay", 0)),
+        int(delayed_entry.get("late_aircraft_delay", 0)),
+    )
+
+
+def performance_values(flight_id, perf, delayed_entry) -> tuple:
+    return (
+        int(flight_id),
+        int(perf.get("dep_time", 0)),
+        int(perf.get("dep_delay", 0)),
+        int(perf.get("taxi_out", 0)),
+        int(perf.get("wheels_off", 0)),
+        int(perf.get("wheels_on", 0)),
+        int(perf.get("taxi_in", 0)),
+        int(perf.get("arr_time", 0)),
+        int(perf.get("arr_delay", 0)),
+        int(perf.get("actual_elapsed_time", 0)),
+        int(perf.get("air_time", 0)),
+        bool(perf.get("diverted", False)),
+        flight_id if delayed_entry else None,
+    )
+
+
+def stats_note(flight_id, delayed_entry) -> str:
+    note = f"flight_id={flight_id}, perf_inserted=1"
+    if delayed_entry:
+        note += ", delayed_inserted=1"
+    return note
+
+
+def histogram_bins(cfg) -> list:
+    bins = cfg["queries"]["histogram_arr_delay"]["bins"]
+    try:
+        bins = [int(b) for b in bins]
+    except Exception:
+        raise SkipScenario("invalid_bins")
+
+    if len(bins) < 2:
+        raise SkipScenario("buckets=0")
+    return bins
+
+
+def route_params(ctx: RunContext) -> tuple:
+    """(origin, dest, date_from, date_to, limit) dla find_route_with_stats - trasa z generatora parametrów."""
+    route = ctx.gen.route(ctx.op, ctx.iteration)
+    if route is None:
+        raise SkipScenario("no_routes_in_config")
+    limit = int(ctx.cfg.get("queries", {}).get("find_all_flights_on_route", {}).get("limit", 1000))
+    return (*route, limit)
+
+
+def month_param(ctx: RunContext) -> tuple:
+    """(year, month) dla scenariuszy miesięcznych (top_routes_month, rank_punctual_airlines, ...)."""
+    month = ctx.gen.month(ctx.op, ctx.iteration)
+    if month is None:
+        raise SkipScenario("no_months")
+    return month
+
+
+def month_range(year: int, month: int) -> tuple:
+    """[pierwszy dzień miesiąca, pierwszy dzień następnego) jako date."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def carrier_day_params(ctx: RunContext) -> tuple:
+    """(carrier, date_from, date_to, limit) dla read_by_carrier_day."""
+    carrier_days = ctx.gen.carrier_days(ctx.op, ctx.iteration)
+    if carrier_days is None:
+        raise SkipScenario("no_carrier_in_config")
+    limit = int(ctx.cfg.get("queries", {}).get("read_by_carrier_day", {}).get("limit", 1000))
+    return (*carrier_days, limit)
@@ -0,0 +1,236 @@
+"""
+Profile konfiguracji serwerów (server_profiles w configu): każdy profil to zestaw parametrów per baza,
+scenariusze lecą raz na profil, a wyniki mają tag "| profile=<nazwa>".
+
+Przed każdym profilem baza wraca do ustawień obrazu (reset tego, co ustawił poprzedni profil), potem:
+- postgres:  ALTER SYSTEM SET (postgresql.auto.conf) + pg_reload_conf(); parametry z pending_restart
+             (np. shared_buffers, max_worker_processes) wymagają restartu kontenera
+- mysql:     SET PERSIST; zmienne tylko do odczytu (np. innodb_log_file_size) przez SET PERSIST_ONLY + restart;
+             rozmiary z sufiksem K/M/G są przeliczane na bajty (SET nie przyjmuje sufiksów)
+- mongo:     setParameter; klucz cache_size (np. 2G) ustawia rozmiar cache WiredTiger
+             przez wiredTigerEngineRuntimeConfig - bez restartu
+- cassandra: compaction_throughput / concurrent_compactors / stream_throughput przez nodetool, pozostałe klucze
+             (najwyższego poziomu) dopisane do cassandra.yaml w kontenerze (kopia oryginału obok) + restart;
+             MAX_HEAP_SIZE to zmienna środowiska kontenera - zmiana wymaga docker compose up, nie profilu
+
+Restart i nodetool wymagają CLI dockera w runnerze; bez niego parametry wymagające restartu zostają
+zapisane, ale nieaktywne (tag restart=skipped), a profil jest i tak mierzony.
+Zastosowanie profilu trafia do results.csv jako scenariusz <db>_server_profile.
+"""
+import re
+import time
+
+import bench_mongo
+import bench_postgres
+from bench_common import log_result
+from cache_state import _docker, _docker_available, _container, restart_container
+from cass_admin import cass_exec
+
+PROFILE_DBS = ("postgres", "mysql", "mongo", "cassandra")
+
+DEFAULT_CASSANDRA_YAML = "/etc/cassandra/cassandra.yaml"
+
+CASSANDRA_NODETOOL = {
+    "compaction_throughput": "setcompactionthroughput",
+    "concurrent_compactors": "setconcurrentcompactors",
+    "stream_throughput": "setstreamthroughput",
+}
+
+_SIZE_RE = re.compile(r"^(\d+)\s*([KMG])B?$", re.IGNORECASE)
+
+# db -> stan potrzebny do powrotu do ustawień obrazu (parametry poprzedniego profilu, oryginalne wartości)
+_APPLIED = {}
+
+
+def server_profiles(cfg) -> list:
+    profiles = cfg.get("server_profiles") or []
+    for profile in profiles:
+        if not profile.get("name"):
+            raise ValueError("Each server_profiles entry needs a name")
+    return profiles
+
+
+def _restart(db: str, cfg) -> str:
+    if restart_container(db, cfg):
+        return "done"
+    print(f"[server_profile][{db}] container restart not possible (no docker CLI); restart-only settings inactive")
+    return "skipped"
+
+
+# ---------------------------------------------------------------- postgres
+
+def _pg_apply(settings: dict, cfg) -> bool:
+    conn = bench_postgres.postgres_conn()
+    # ALTER SYSTEM nie może działać w transakcji
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("ALTER SYSTEM RESET ALL")
+        for name, value in settings.items():
+            cur.execute(f"ALTER SYSTEM SET {name} = %s", (str(value),))
+        cur.execute("SELECT pg_reload_conf()")
+        # SIGHUP jest obsługiwany asynchronicznie - pending_restart pojawia się po chwili
+        time.sleep(1)
+        cur.execute("SELECT name FROM pg_settings WHERE pending_restart")
+        return bool(cur.fetchall())
+    finally:
+        cur.close()
+        conn.autocommit = False
+        bench_postgres._put_conn(conn)
+
+
+def _pg_reset(cfg) -> bool:
+    return _pg_apply({}, cfg)
+
+
+# ---------------------------------------------------------------- mysql
+
+def _mysql_value(value):
+    m = _SIZE_RE.match(str(value))
+    if m:
+        return int(m.group(1)) * 1024 ** ("KMG".index(m.group(2).upper()) + 1)
+    return value
+
+
+def _mysql_apply(settings: dict, cfg) -> bool:
+    from sql_import.import_mysql import get_mysql_connection
+
+    conn = get_mysql_connection()
+    cur = conn.cursor()
+    restart = False
+    try:
+        # powrót do wartości domyślnych zmiennych ustawionych przez poprzedni profil
+        for name in _APPLIED.pop("mysql", []):
+            try:
+                cur.execute(f"SET GLOBAL {name} = DEFAULT")
+            except Exception:
+                restart = True
+        cur.execute("RESET PERSIST")
+
+        for name, value in settings.items():
+            try:
+                cur.execute(f"SET PERSIST {name} = %s", (_mysql_value(value),))
+            except Exception as e:
+                # 1238: zmienna tylko do odczytu - działa dopiero po restarcie
+                if getattr(e, "errno", None) != 1238:
+                    raise
+                cur.execute(f"SET PERSIST_ONLY {name} = %s", (_mysql_value(value),))
+                restart = True
+        _APPLIED["mysql"] = list(settings)
+    finally:
+        cur.close()
+        conn.close()
+    return restart
+
+
+def _mysql_reset(cfg) -> bool:
+    return _mysql_apply({}, cfg)
+
+
+# ---------------------------------------------------------------- mongo
+
+def _mongo_cache_bytes(client) -> int:
+    return int(client.admin.command("serverStatus")["wiredTiger"]["cache"]["maximum bytes configured"])
+
+
+def _mongo_apply(settings: dict, cfg) -> bool:
+    client = bench_mongo.mongo_client()
+    try:
+        _mongo_restore(client)
+        original = {}
+        for name, value in settings.items():
+            if name == "cache_size":
+                original[name] = f"{max(1, _mongo_cache_bytes(client) // (1024 * 1024))}M"
+                client.admin.command({"setParameter": 1, "wiredTigerEngineRuntimeConfig": f"cache_size={value}"})
+            else:
+                original[name] = client.admin.command({"getParameter": 1, name: 1})[name]
+                client.admin.command({"setParameter": 1, name: value})
+        _APPLIED["mongo"] = original
+    finally:
+        client.close()
+    return False
+
+
+def _mongo_restore(client):
+    for name, value in _APPLIED.pop("mongo", {}).items():
+        if name == "cache_size":
+            client.admin.command({"setParameter": 1, "wiredTigerEngineRuntimeConfig": f"cache_size={value}"})
+        else:
+            client.admin.command({"setParameter": 1, name: value})
+
+
+def _mongo_reset(cfg) -> bool:
+    return _mongo_apply({}, cfg)
+
+
+# ---------------------------------------------------------------- cassandra
+
+def _cass_yaml(cfg) -> str:
+    return cfg.get("server_config", {}).get("cassandra_yaml", DEFAULT_CASSANDRA_YAML)
+
+
+def _cass_shell(cfg, script: str) -> bool:
+    return _docker("exec", _container(cfg, "cassandra"), "sh", "-c", script)
+
+
+def _cass_apply(settings: dict, cfg) -> bool:
+    if not _docker_available():
+        print("[server_profile][cassandra] docker CLI not available in this container; profile not applied")
+        return False
+
+    path = _cass_yaml(cfg)
+    # kopia oryginału raz, potem każdy profil startuje od niej
+    _cass_shell(cfg, f"[ -f {path}.bench-orig ] || cp {path} {path}.bench-orig; cp {path}.bench-orig {path}")
+    restart = bool(_APPLIED.pop("cassandra", False))
+
+    yaml_settings = {k: v for k, v in settings.items() if k not in CASSANDRA_NODETOOL}
+    for name, value in yaml_settings.items():
+        # klucz zakomentowany albo ustawiony w pliku - zastąpiony, brak klucza - dopisany na końcu
+        _cass_shell(cfg, f"grep -qE '^#? *{name}:' {path} "
+                         f"&& sed -i -E 's|^#? *{name}:.*|{name}: {value}|' {path} "
+                         f"|| echo '{name}: {value}' >> {path}")
+    if yaml_settings:
+        restart = True
+
+    for name, value in settings.items():
+        if name in CASSANDRA_NODETOOL:
+            cass_exec("nodetool", CASSANDRA_NODETOOL[name], str(value))
+    # runtime z nodetool znika dopiero po restarcie - przy resecie trzeba go zrobić
+    _APPLIED["cassandra"] = bool(settings)
+    return restart
+
+
+def _cass_reset(cfg) -> bool:
+    return _cass_apply({}, cfg)
+
+
+# db -> (zastosowanie profilu, powrót do ustawień obrazu); obie zwracają "potrzebny restart"
+PROFILE_BACKENDS = {
+    "postgres": (_pg_apply, _pg_reset),
+    "mysql": (_mysql_apply, _mysql_reset),
+    "mongo": (_mongo_apply, _mongo_reset),
+    "cassandra": (_cass_apply, _cass_reset),
+}
+
+
+def apply_profile(db: str, profile: dict, cfg, dataset_name: str) -> str:
+    """Ustawia profil dla bazy db (restart, jeśli trzeba); zwraca tag restart=... dla wyników."""
+    apply, _ = PROFILE_BACKENDS[db]
+    settings = profile.get(db) or {}
+    name = profile["name"]
+    print(f"\n[SERVER PROFILE] Applying profile **{name}** to {db}: {settings or 'image defaults'}")
+
+    t0 = time.perf_counter()
+    restart = _restart(db, cfg) if apply(settings, cfg) else "no"
+    dt = (time.perf_counter() - t0) * 1000
+
+    notes = f"profile={name}, settings={len(settings)}, restart={restart}"
+    log_result(db, dataset_name, f"{db}_server_profile", 1, dt, notes)
+    return restart
+
+
+def reset_profile(db: str, cfg):
+    """Po przemiataniu profili: ustawienia obrazu (kolejny dataset importujemy na domyślnych)."""
+    _, reset = PROFILE_BACKENDS[db]
+    if reset(cfg):
+        _restart(db, cfg)
@@ -0,0 +1,242 @@
+"""
+Liczniki serwera wokół mierzonej fazy: snapshot przed run() i po nim (oba poza pomiarem czasu),
+delta trafia do tagów wyniku po " | " (np. "| hit_ratio=0.9981, rows_read=1204, bytes_read=0, ...").
+
+Snapshot idzie przez połączenie scenariusza (ctx.conn), więc liczy pracę tej sesji:
+- postgres:  pg_stat_database (blks_*, temp_bytes), pg_statio_user_tables / pg_stat_user_tables
+             (hit_ratio, bytes_read, rows_read tylko dla tabel użytkownika - bez odczytów katalogu przez sam snapshot),
+             pg_stat_statements (stmt_calls, stmt_rows; wymaga shared_preload_libraries, inaczej pomijane);
+             przed odczytem pg_stat_force_next_flush() + commit, bo backend wysyła statystyki najwyżej raz na sekundę
+- mysql:     Innodb_buffer_pool_read_requests / _reads (hit_ratio), Innodb_rows_read, Innodb_data_read,
+             performance_schema: table_io_waits_summary_by_table (io_reads) i statement digests (stmt_calls,
+             rows_examined; bez zapytań samego snapshotu)
+- mongo:     serverStatus: opcounters (ops, bez command), WiredTiger cache (pages requested / read into cache,
+             bytes read into cache), metrics.queryExecutor.scannedObjects (docsExamined) i scanned (keysExamined)
+- cassandra: system_views.caches (chunk cache: hit_ratio), local_read_latency / local_scan_latency (liczba
+             odczytów partycji -> rows_read); bajtów odczytanych z dysku system_views nie podaje
+
+Wspólne pola pochodne: hit_ratio, rows_read, bytes_read (tam, gdzie baza je udostępnia) - analyze_results
+uśrednia je per scenariusz. Bazy wbudowane (sqlite, duckdb, reference) nie mają liczników serwera.
+"""
+from bench_common import add_run_probe
+
+# ---------------------------------------------------------------- postgres
+
+PG_DATABASE_SQL = """
+    SELECT blks_hit, blks_read, temp_bytes, current_setting('block_size')::int
+    FROM pg_stat_database
+    WHERE datname = current_database()
+"""
+
+PG_TABLES_SQL = """
+    SELECT COALESCE(sum(COALESCE(io.heap_blks_hit, 0) + COALESCE(io.idx_blks_hit, 0)
+                        + COALESCE(io.toast_blks_hit, 0)), 0),
+           COALESCE(sum(COALESCE(io.heap_blks_read, 0) + COALESCE(io.idx_blks_read, 0)
+                        + COALESCE(io.toast_blks_read, 0)), 0),
+           COALESCE(sum(COALESCE(st.seq_tup_read, 0) + COALESCE(st.idx_tup_fetch, 0)), 0)
+    FROM pg_statio_user_tables io
+    JOIN pg_stat_user_tables st USING (relid)
+"""
+
+# zapytania snapshotu same trafiają do pg_stat_statements - odfiltrowane po "pg_stat"
+PG_STATEMENTS_SQL = """
+    SELECT COALESCE(sum(calls), 0), COALESCE(sum(rows), 0)
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND query NOT LIKE '%pg_stat%'
+"""
+
+_PG_STATEMENTS = None   # None = jeszcze nie sprawdzone, potem True/False
+
+
+def _pg_statements_available(cur) -> bool:
+    global _PG_STATEMENTS
+    if _PG_STATEMENTS is None:
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+            cur.execute("SELECT 1 FROM pg_stat_statements LIMIT 1")
+            cur.fetchall()
+            cur.connection.commit()
+            _PG_STATEMENTS = True
+        except Exception as e:
+            cur.connection.rollback()
+            print(f"[metrics][postgres] pg_stat_statements unavailable ({str(e).strip()}); skipping stmt_*")
+            _PG_STATEMENTS = False
+    return _PG_STATEMENTS
+
+
+def _pg_snapshot(ctx) -> dict:
+    conn = ctx.conn
+    cur = conn.cursor()
+    try:
+        # wysyłka statystyk backendu jest odkładana do 1 s - wymuszamy ją na końcu tej transakcji
+        cur.execute("SELECT pg_stat_force_next_flush()")
+        conn.commit()
+
+        cur.execute(PG_DATABASE_SQL)
+        db_hit, db_read, temp_bytes, block_size = cur.fetchone()
+        cur.execute(PG_TABLES_SQL)
+        hit, read, rows = cur.fetchone()
+        snap = {
+            "blks_hit": int(hit), "blks_read": int(read), "rows_read": int(rows),
+            "db_blks_hit": int(db_hit), "db_blks_read": int(db_read), "temp_bytes": int(temp_bytes),
+            "block_size": int(block_size),
+        }
+        if _pg_statements_available(cur):
+            cur.execute(PG_STATEMENTS_SQL)
+            calls, stmt_rows = cur.fetchone()
+            snap.update(stmt_calls=int(calls), stmt_rows=int(stmt_rows))
+        conn.commit()
+        return snap
+    finally:
+        cur.close()
+
+
+def _pg_derive(d: dict) -> dict:
+    return {
+        "hit_ratio": _ratio(d["blks_hit"], d["blks_hit"] + d["blks_read"]),
+        "rows_read": d["rows_read"],
+        "bytes_read": d["blks_read"] * d["block_size"],
+    }
+
+
+# ---------------------------------------------------------------- mysql
+
+MYSQL_STATUS = ("Innodb_buffer_pool_read_requests", "Innodb_buffer_pool_reads", "Innodb_rows_read",
+                "Innodb_data_read")
+
+MYSQL_TABLE_IO_SQL = """
+    SELECT COALESCE(SUM(COUNT_READ), 0)
+    FROM performance_schema.table_io_waits_summary_by_table
+    WHERE OBJECT_SCHEMA = DATABASE()
+"""
+
+MYSQL_STATEMENTS_SQL = """
+    SELECT COALESCE(SUM(COUNT_STAR), 0), COALESCE(SUM(SUM_ROWS_EXAMINED), 0)
+    FROM performance_schema.events_statements_summary_by_digest
+    WHERE SCHEMA_NAME = DATABASE()
+      AND DIGEST_TEXT NOT LIKE '%performance_schema%'
+      AND DIGEST_TEXT NOT LIKE 'SHOW %'
+"""
+
+
+def _mysql_snapshot(ctx) -> dict:
+    cur = ctx.conn.cursor()
+    try:
+        names = ", ".join(f"'{n}'" for n in MYSQL_STATUS)
+        cur.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({names})")
+        status = {name: int(value) for name, value in cur.fetchall()}
+        cur.execute(MYSQL_TABLE_IO_SQL)
+        io_reads = int(cur.fetchone()[0])
+        cur.execute(MYSQL_STATEMENTS_SQL)
+        calls, examined = cur.fetchone()
+    finally:
+        cur.close()
+    return {
+        "read_requests": status.get("Innodb_buffer_pool_read_requests", 0),
+        "disk_reads": status.get("Innodb_buffer_pool_reads", 0),
+        "rows_read": status.get("Innodb_rows_read", 0),
+        "bytes_read": status.get("Innodb_data_read", 0),
+        "io_reads": io_reads,
+        "stmt_calls": int(calls),
+        "rows_examined": int(examined),
+    }
+
+
+def _mysql_derive(d: dict) -> dict:
+    return {
+        "hit_ratio": _ratio(d["read_requests"] - d["disk_reads"], d["read_requests"]),
+        "rows_read": d["rows_read"],
+        "bytes_read": d["bytes_read"],
+    }
+
+
+# ---------------------------------------------------------------- mongo
+
+MONGO_OPS = ("query", "getmore", "insert", "update", "delete")
+
+
+def _mongo_snapshot(ctx) -> dict:
+    status = ctx.conn.admin.command("serverStatus")
+    cache = status.get("wiredTiger", {}).get("cache", {})
+    executor = status.get("metrics", {}).get("queryExecutor", {})
+    return {
+        "ops": sum(int(status.get("opcounters", {}).get(op, 0)) for op in MONGO_OPS),
+        "pages_requested": int(cache.get("pages requested from the cache", 0)),
+        "pages_read": int(cache.get("pages read into cache", 0)),
+        "bytes_read": int(cache.get("bytes read into cache", 0)),
+        "docs_examined": int(executor.get("scannedObjects", 0)),
+        "keys_examined": int(executor.get("scanned", 0)),
+    }
+
+
+def _mongo_derive(d: dict) -> dict:
+    return {
+        "hit_ratio": _ratio(d["pages_requested"] - d["pages_read"], d["pages_requested"]),
+        "rows_read": d["docs_examined"],
+        "bytes_read": d["bytes_read"],
+    }
+
+
+# ---------------------------------------------------------------- cassandra
+
+def _cass_snapshot(ctx) -> dict:
+    session = ctx.conn
+    snap = {"chunk_hits": 0, "chunk_requests": 0, "key_hits": 0, "key_requests": 0}
+    for row in session.execute("SELECT name, hit_count, request_count FROM system_views.caches"):
+        if row.name == "chunks":
+            snap.update(chunk_hits=int(row.hit_count), chunk_requests=int(row.request_count))
+        elif row.name == "keys":
+            snap.update(key_hits=int(row.hit_count), key_requests=int(row.request_count))
+
+    for view, key in (("local_read_latency", "reads"), ("local_scan_latency", "scans")):
+        rows = session.execute(f"SELECT count FROM system_views.{view} WHERE keyspace_name = %s",
+                               (session.keyspace,))
+        snap[key] = sum(int(r.count) for r in rows)
+    return snap
+
+
+def _cass_derive(d: dict) -> dict:
+    return {
+        "hit_ratio": _ratio(d["chunk_hits"], d["chunk_requests"]),
+        "rows_read": d["reads"] + d["scans"],
+    }
+
+
+# db -> (snapshot liczników, pola pochodne z delty)
+METRICS_BACKENDS = {
+    "postgres": (_pg_snapshot, _pg_derive),
+    "mysql": (_mysql_snapshot, _mysql_derive),
+    "mongo": (_mongo_snapshot, _mongo_derive),
+    "cassandra": (_cass_snapshot, _cass_derive),
+}
+
+DERIVED_FIELDS = ("hit_ratio", "rows_read", "bytes_read")
+
+# stałe, nie liczniki - bez delty
+_NOT_COUNTERS = {"block_size"}
+
+
+def _ratio(part, total):
+    # brak odwołań do cache (np. zapis bez odczytu) - brak wartości zamiast sztucznego 0 albo 1
+    return round(part / total, 4) if total > 0 else None
+
+
+def delta(before: dict, after: dict, derive) -> dict:
+    d = {k: after[k] - before.get(k, 0) if k not in _NOT_COUNTERS else after[k] for k in after}
+    out = {k: v for k, v in derive(d).items() if v is not None}
+    out.update({k: v for k, v in d.items() if k not in out and k not in _NOT_COUNTERS and k not in DERIVED_FIELDS})
+    return out
+
+
+def install_metrics_probe(cfg, db: str):
+    """Sonda wokół run() każdego powtórzenia dla bazy db (metrics.enabled w configu)."""
+    if not cfg.get("metrics", {}).get("enabled") or db not in METRICS_BACKENDS:
+        return
+    snapshot, derive = METRICS_BACKENDS[db]
+
+    def probe(ctx):
+        before = snapshot(ctx)
+        return lambda: delta(before, snapshot(ctx), derive)
+
+    add_run_probe(probe)
@@ -0,0 +1,383 @@
+"""
+Snapshoty załadowanych danych: jeden import na (baza, dataset, schemat), potem restore w sekundach.
+
+Klucz snapshotu = hash z (baza, nazwa datasetu, hash schematu, sha256 pliku próbki), więc zmiana DDL,
+layoutu Mongo albo seeda próbkowania daje nowy snapshot zamiast przywrócenia nieaktualnych danych.
+
+- postgres:   CREATE DATABASE snap_<klucz> TEMPLATE <baza> (restore = DROP + CREATE ... TEMPLATE snap_<klucz>)
+- mysql:      schemat snap_<klucz> z kopią tabel (INSERT ... SELECT po stronie serwera; runner nie ma dostępu
+              do plików .ibd, więc transport tablespace / CLONE nie wchodzą w grę)
+- mongo:      baza snap_<klucz> wypełniana przez $out (server-side, bez mongodump w kontenerze runnera)
+- cassandra:  nodetool snapshot + nodetool import przez `docker exec` (tylko gdy runner ma CLI dockera)
+- sqlite:     backup API do pliku w snapshots.dir
+- duckdb:     kopia pliku bazy po CHECKPOINT
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+import bench_duckdb
+import bench_mongo
+import bench_postgres
+import bench_sqlite
+from cass_admin import CASSANDRA_KEYSPACE, cass_exec, cass_exec_available
+from dataset_cache import file_digest
+from scenario import forget_write_state
+
+SNAPSHOT_PREFIX = "snap_"
+DEFAULT_SNAPSHOT_DIR = "/data/snapshots"
+
+SQL_TABLES = ["airline", "airport", "flights", "flights_cancelled", "flights_delayed", "flights_performance",
+              "flight_status"]
+MONGO_COLLECTIONS = ["flights", "flights_performance", "flights_delayed", "flights_cancelled"]
+CASSANDRA_TABLES = ["flights_by_route_day", "flights_by_carrier_day"]
+
+
+def _digest(parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _snapshot_dir(cfg) -> Path:
+    return Path(((cfg or {}).get("snapshots") or {}).get("dir") or DEFAULT_SNAPSHOT_DIR)
+
+
+# ---------------------------------------------------------------- postgres
+
+def _pg_admin():
+    import psycopg2
+
+    conn = psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST", "localhost"),
+        port=int(os.getenv("POSTGRES_PORT", 5432)),
+        user=os.getenv("POSTGRES_USER", "bench"),
+        password=os.getenv("POSTGRES_PASSWORD", "bench"),
+        dbname="postgres",
+    )
+    conn.autocommit = True
+    return conn
+
+
+def _pg_dbname() -> str:
+    return os.getenv("POSTGRES_DB", "flights_db")
+
+
+def _pg_copy_database(source: str, target: str):
+    """CREATE DATABASE target TEMPLATE source; szablon nie może mieć żadnych innych połączeń."""
+    bench_postgres.close_postgres_pool()
+    conn = _pg_admin()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE datname IN (%s, %s) AND pid <> pg_backend_pid()",
+            (source, target),
+        )
+        cur.execute(f'DROP DATABASE IF EXISTS "{target}"')
+        cur.execute(f'CREATE DATABASE "{target}" TEMPLATE "{source}"')
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _pg_schema(cfg) -> list:
+    conn = bench_postgres.postgres_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT table_name, column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'public' ORDER BY 1, 2"
+        )
+        columns = cur.fetchall()
+        cur.execute("SELECT indexdef FROM pg_indexes WHERE schemaname = 'public' ORDER BY 1")
+        indexes = cur.fetchall()
+        conn.commit()
+        return [columns, indexes]
+    finally:
+        cur.close()
+        bench_postgres._put_conn(conn)
+
+
+def _pg_has(key, cfg) -> bool:
+    conn = _pg_admin()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (SNAPSHOT_PREFIX + key,))
+        return cur.fetchone() is not None
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _pg_create(key, cfg):
+    _pg_copy_database(_pg_dbname(), SNAPSHOT_PREFIX + key)
+
+
+def _pg_restore(key, cfg):
+    _pg_copy_database(SNAPSHOT_PREFIX + key, _pg_dbname())
+
+
+# ---------------------------------------------------------------- mysql
+
+def _mysql_admin():
+    from sql_import.import_mysql import get_mysql_connection
+
+    return get_mysql_connection()
+
+
+def _mysql_dbname() -> str:
+    return os.getenv("MYSQL_DATABASE", "flights")
+
+
+def _mysql_schema(cfg) -> list:
+    conn = _mysql_admin()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT table_name, column_name, column_type FROM information_schema.columns "
+            "WHERE table_schema = %s ORDER BY 1, 2", (_mysql_dbname(),)
+        )
+        columns = cur.fetchall()
+        cur.execute(
+            "SELECT table_name, index_name, seq_in_index, column_name FROM information_schema.statistics "
+            "WHERE table_schema = %s ORDER BY 1, 2, 3", (_mysql_dbname(),)
+        )
+        return [columns, cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _mysql_copy_tables(cur, source: str, target: str):
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cur.execute("SET UNIQUE_CHECKS = 0")
+    for table in SQL_TABLES:
+        cur.execute(f"TRUNCATE TABLE `{target}`.`{table}`")
+        cur.execute(f"INSERT INTO `{target}`.`{table}` SELECT * FROM `{source}`.`{table}`")
+    cur.execute("SET UNIQUE_CHECKS = 1")
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+
+def _mysql_has(key, cfg) -> bool:
+    conn = _mysql_admin()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1 FROM information_schema.schemata WHERE schema_name = %s", (SNAPSHOT_PREFIX + key,))
+        return cur.fetchone() is not None
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _mysql_create(key, cfg):
+    snap = SNAPSHOT_PREFIX + key
+    conn = _mysql_admin()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP DATABASE IF EXISTS `{snap}`")
+        cur.execute(f"CREATE DATABASE `{snap}`")
+        for table in SQL_TABLES:
+            # LIKE kopiuje kolumny i indeksy (bez FK - kopia jest tylko źródłem danych)
+            cur.execute(f"CREATE TABLE `{snap}`.`{table}` LIKE `{_mysql_dbname()}`.`{table}`")
+        _mysql_copy_tables(cur, _mysql_dbname(), snap)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _mysql_restore(key, cfg):
+    conn = _mysql_admin()
+    cur = conn.cursor()
+    try:
+        _mysql_copy_tables(cur, SNAPSHOT_PREFIX + key, _mysql_dbname())
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+# ---------------------------------------------------------------- mongo
+
+def _mongo_schema(cfg) -> list:
+    # kolekcja może jeszcze nie istnieć przed pierwszym importem, więc schemat bierzemy z kodu
+    return [bench_mongo.mongo_layout(cfg), bench_mongo.MONGO_FLIGHT_INDEXES]
+
+
+def _mongo_out(source_col, target_db: str, name: str, cfg):
+    out = {"db": target_db, "coll": name}
+    if name == "flights" and bench_mongo.mongo_layout(cfg) == "timeseries":
+        out["timeseries"] = {"timeField": "fl_date", "metaField": "meta", "granularity": "hours"}
+    # $out podmienia kolekcję docelową atomowo i zostawia jej indeksy
+    source_col.aggregate([{"$match": {}}, {"$out": out}], allowDiskUse=True)
+
+
+def _mongo_has(key, cfg) -> bool:
+    return (SNAPSHOT_PREFIX + key) in bench_mongo.mongo_client().list_database_names()
+
+
+def _mongo_create(key, cfg):
+    client = bench_mongo.mongo_client()
+    snap = SNAPSHOT_PREFIX + key
+    client.drop_database(snap)
+    db = client["flightsdb"]
+    existing = set(db.list_collection_names())
+    for name in MONGO_COLLECTIONS:
+        if name in existing:
+            _mongo_out(db[name], snap, name, cfg)
+
+
+def _mongo_restore(key, cfg):
+    client = bench_mongo.mongo_client()
+    snap = client[SNAPSHOT_PREFIX + key]
+    db = client["flightsdb"]
+    saved = set(snap.list_collection_names())
+    for name in MONGO_COLLECTIONS:
+        if name in saved:
+            _mongo_out(snap[name], "flightsdb", name, cfg)
+        elif name in db.list_collection_names():
+            db[name].delete_many({})
+
+
+# ---------------------------------------------------------------- cassandra
+
+def _cass_schema(cfg) -> list:
+    from bench_cassandra import cass_client
+
+    rows = cass_client().execute(
+        "SELECT table_name, column_name, type, kind FROM system_schema.columns WHERE keyspace_name = %s",
+        (CASSANDRA_KEYSPACE,),
+    )
+    return sorted(tuple(r) for r in rows)
+
+
+def _cass_has(key, cfg) -> bool:
+    if not cass_exec_available():
+        return False
+    return key in cass_exec("nodetool", "listsnapshots")
+
+
+def _cass_create(key, cfg):
+    if not cass_exec_available():
+        print("[snapshot][cassandra] docker CLI not available in this container; snapshot skipped")
+        return
+    cass_exec("nodetool", "clearsnapshot", "-t", key, "--", CASSANDRA_KEYSPACE)
+    cass_exec("nodetool", "flush", CASSANDRA_KEYSPACE)
+    cass_exec("nodetool", "snapshot", "-t", key, CASSANDRA_KEYSPACE)
+
+
+def _cass_restore(key, cfg):
+    from bench_cassandra import cass_client
+
+    s = cass_client()
+    for table in CASSANDRA_TABLES:
+        s.execute(f"TRUNCATE {table};")
+        # katalog tabeli ma sufiks z id tabeli, stąd glob po stronie kontenera
+        cass_exec(
+            "sh", "-c",
+            f"nodetool import --copy-data {CASSANDRA_KEYSPACE} {table} "
+            f"/var/lib/cassandra/data/{CASSANDRA_KEYSPACE}/{table}-*/snapshots/{key}",
+        )
+
+
+# ---------------------------------------------------------------- sqlite / duckdb
+
+def _sqlite_schema(cfg) -> list:
+    from sql_import.import_sqlite import SQLITE_INDEXES_DDL, SQLITE_TABLES_DDL
+
+    return [SQLITE_TABLES_DDL, SQLITE_INDEXES_DDL]
+
+
+def _sqlite_snapshot_path(key, cfg) -> Path:
+    return _snapshot_dir(cfg) / f"{SNAPSHOT_PREFIX}{key}.sqlite"
+
+
+def _sqlite_has(key, cfg) -> bool:
+    return _sqlite_snapshot_path(key, cfg).exists()
+
+
+def _sqlite_create(key, cfg):
+    dest = _sqlite_snapshot_path(key, cfg)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    target = sqlite3.connect(dest)
+    try:
+        bench_sqlite.sqlite_conn(cfg).backup(target)
+    finally:
+        target.close()
+
+
+def _sqlite_restore(key, cfg):
+    bench_sqlite.reset_sqlite()
+    source = sqlite3.connect(_sqlite_snapshot_path(key, cfg))
+    target = sqlite3.connect(bench_sqlite._sqlite_path())
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def _duckdb_schema(cfg) -> list:
+    return [bench_duckdb.DUCKDB_COLUMNS]
+
+
+def _duckdb_path() -> str:
+    return os.getenv("DUCKDB_PATH", "/tmp/flights.duckdb")
+
+
+def _duckdb_snapshot_path(key, cfg) -> Path:
+    return _snapshot_dir(cfg) / f"{SNAPSHOT_PREFIX}{key}.duckdb"
+
+
+def _duckdb_has(key, cfg) -> bool:
+    return _duckdb_snapshot_path(key, cfg).exists()
+
+
+def _duckdb_create(key, cfg):
+    dest = _duckdb_snapshot_path(key, cfg)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    bench_duckdb.duckdb_conn().execute("CHECKPOINT")
+    bench_duckdb.close_duckdb()
+    shutil.copyfile(_duckdb_path(), dest)
+
+
+def _duckdb_restore(key, cfg):
+    bench_duckdb.close_duckdb()
+    shutil.copyfile(_duckdb_snapshot_path(key, cfg), _duckdb_path())
+
+
+# db -> (schemat, czy istnieje, utwórz, przywróć)
+SNAPSHOT_BACKENDS = {
+    "postgres": (_pg_schema, _pg_has, _pg_create, _pg_restore),
+    "mysql": (_mysql_schema, _mysql_has, _mysql_create, _mysql_restore),
+    "mongo": (_mongo_schema, _mongo_has, _mongo_create, _mongo_restore),
+    "cassandra": (_cass_schema, _cass_has, _cass_create, _cass_restore),
+    "sqlite": (_sqlite_schema, _sqlite_has, _sqlite_create, _sqlite_restore),
+    "duckdb": (_duckdb_schema, _duckdb_has, _duckdb_create, _duckdb_restore),
+}
+
+
+def snapshot_key(db: str, dataset_name: str, sample_path: str, cfg) -> str:
+    schema_fn = SNAPSHOT_BACKENDS[db][0]
+    schema_hash = _digest(schema_fn(cfg))
+    sample_hash = file_digest(sample_path) if os.path.exists(sample_path) else "missing"
+    # nazwy baz: małe litery, bez kropek; 40 znaków + prefiks mieści się w limitach PG/MySQL/Mongo
+    return f"{db}_{dataset_name}_{_digest([db, dataset_name, schema_hash, sample_hash])[:24]}".lower()
+
+
+def has_snapshot(db: str, key: str, cfg) -> bool:
+    return SNAPSHOT_BACKENDS[db][1](key, cfg)
+
+
+def create_snapshot(db: str, key: str, cfg):
+    print(f"[snapshot][{db}] creating {key}")
+    SNAPSHOT_BACKENDS[db][2](key, cfg)
+
+
+def restore_snapshot(db: str, key: str, cfg):
+    print(f"[snapshot][{db}] restoring {key}")
+    SNAPSHOT_BACKENDS[db][3](key, cfg)
+    # stan scenariuszy zapisu wskazywałby na nieistniejące wiersze
+    forget_write_state(db)
@@ -1,10 +1,44 @@
-from typing import Callable, Any
+from multiprocessing import Pool
+from typing import Callable, Any, Dict, List, Tuple
 
 import pandas as pd
 
-def load_csv(filename):
-    print(f"File: {filename}")
-    df = pd.read_csv(filename, na_values=["", " "])
+from dataset_cache import read_frame
+from dimensions import DimensionRegistry
+
+# Kolumny tabel w kolejności używanej przez import wsadowy (flight_id nadawany po stronie klienta).
+# Kolejność tabel respektuje klucze obce.
+BULK_TABLE_COLUMNS = {
+    "flights": ["flight_id", "year", "month", "day_of_month", "day_of_week", "fl_date", "op_unique_carrier",
+                "op_carrier_fl_num", "origin", "dest", "crs_dep_time", "crs_arr_time", "crs_elapsed_time",
+                "distance"],
+    "flights_cancelled": ["flight_id", "cancellation_code"],
+    "flights_delayed": ["flight_id", "carrier_delay", "weather_delay", "nas_delay", "security_delay",
+                        "late_aircraft_delay"],
+    "flights_performance": ["flight_id", "dep_time", "dep_delay", "taxi_out", "wheels_off", "wheels_on", "taxi_in",
+                            "arr_time", "arr_delay", "actual_elapsed_time", "air_time", "diverted", "delay_id"],
+    "flight_status": ["flight_id", "performance_id", "cancellation_id"],
+}
+
+def bulk_load_settings(cfg) -> dict:
+    """Sekcja import.bulk_load z configu; pusty dict, gdy tryb wsadowy jest wyłączony."""
+    settings = ((cfg or {}).get("import") or {}).get("bulk_load") or {}
+    return settings if settings.get("enabled") else {}
+
+def import_workers(cfg) -> int:
+    """import.parallel.workers z configu (1 = ładowanie w jednym połączeniu)."""
+    parallel = ((cfg or {}).get("import") or {}).get("parallel") or {}
+    return max(1, int(parallel.get("workers") or 1))
+
+def parse_csv(filename, start_row: int = 0):
+    """Próbka jako DataFrame; start_row > 0 pomija wiersze już załadowane (import przyrostowy prefiksu)."""
+    print(f"File: {filename}" + (f" (from row {start_row})" if start_row else ""))
+    df = read_frame(filename)
+    if start_row:
+        df = df.iloc[start_row:].reset_index(drop=True)
+    return df
+
+def transform_frame(df):
     df = df.drop(columns=['origin_city_name', 'origin_state_nm',
                           'dest_city_name', 'dest_state_nm'])
 
@@ -15,34 +49,40 @@ def load_csv(filename):
 
     return df.replace({float('NaN'): None})
 
-def load_airlines(conn, cursor, df, insert_query : str):
-    """Loads unique airline data into the 'airline' table."""
+def load_csv(filename, start_row: int = 0):
+    return transform_frame(parse_csv(filename, start_row))
+
+def load_airlines(conn, cursor, df, registry: DimensionRegistry):
+    """Loads unique airline data into the 'airline' table (only codes the registry has not seen, one batch)."""
     airlines = set()
     print("\n--- Loading (AIRLINE) table ---")
 
     for carrier in df['op_unique_carrier'].unique():
         if carrier: airlines.add(carrier)
 
-    for carrier in airlines:
-        try:
-            cursor.execute(
-                insert_query, (carrier,)
-            )
-        except Exception as e:
-            print(f"Error when inserting to airline ({carrier}): {e}")
+    try:
+        new = registry.ensure(cursor, airlines=airlines)
+    except Exception as e:
+        # rejestr mógł zapamiętać część kodów - przy kolejnym użyciu wczyta je z bazy od nowa
+        registry.airlines = registry.airports = None
+        conn.rollback()
+        print(f"Error when inserting to airline: {e}")
+        return len(airlines)
 
     conn.commit()
-    print("Table (AIRLINE) successfully loaded.")
+    print(f"Table (AIRLINE) successfully loaded ({new} new of {len(airlines)}).")
+    return len(airlines)
 
 
-def load_airports(conn, cursor, filename : str, insert_query : str):
-    """Loads unique airport data into the 'airport' table."""
+def load_airports(conn, cursor, filename : str, registry: DimensionRegistry):
+    """Loads unique airport data into the 'airport' table (only codes the registry has not seen, one batch)."""
     print("\n--- Loading (AIRPORT) table ---")
     airports = {}
 
-    # Read relevant columns again for airport processing (due to previous drop)
-    airport_data = pd.read_csv(filename)[['origin', 'origin_city_name', 'origin_state_nm',
-                                          'dest', 'dest_city_name', 'dest_state_nm']].drop_duplicates()
+    # Read relevant columns again for airport processing (due to previous drop);
+    # with a columnar sample this is a projection, not a second CSV parse
+    airport_data = read_frame(filename, columns=['origin', 'origin_city_name', 'origin_state_nm',
+                                                 'dest', 'dest_city_name', 'dest_state_nm']).drop_duplicates()
 
     # Consolidate all unique airports
     for _, row in airport_data.iterrows():
@@ -51,21 +91,23 @@ def load_airports(conn, cursor, filename : str, insert_query : str):
         if row['dest'] not in airports and pd.notna(row['dest']):
             airports[row['dest']] = (row['dest_city_name'], row['dest_state_nm'])
 
-    for code, (city, state) in airports.items():
-        try:
-            # Changed: Use ON CONFLICT DO NOTHING for PostgreSQL equivalent of INSERT IGNORE
-            cursor.execute(
-                insert_query,
-                (code, city, state)
-            )
-        except Exception as e:
-            print(f"ERROR when inserting to airport ({code}): {e}")
+    # NaN z pandas jako NULL
+    airports = {code: tuple(None if pd.isna(v) else v for v in names) for code, names in airports.items()}
+    try:
+        new = registry.ensure(cursor, airports=airports)
+    except Exception as e:
+        registry.airlines = registry.airports = None
+        conn.rollback()
+        print(f"ERROR when inserting to airport: {e}")
+        return len(airports)
 
     conn.commit()
-    print("Table (AIRPORT) successfully loaded.")
+    print(f"Table (AIRPORT) successfully loaded ({new} new of {len(airports)}).")
+    return len(airports)
 
-def load_flights(conn, cursor, df, flights_insert_sql : str, get_flight_id_func: Callable[[Any], Any]):
-    """Loads flight, performance, cancellation, and delay data."""
+def load_flights(conn, cursor, df, flights_insert_sql : str, get_flight_id_func: Callable[[Any], Any],
+                 commit: bool = True):
+    """Loads flight, performance, cancellation, and delay data (commit=False leaves the last batch open)."""
     print("\n--- Loading flights ---")
     index = 0
 
@@ -133,9 +175,103 @@ def load_flights(conn, cursor, df, flights_insert_sql : str, get_flight_id_func:
                 conn.commit()
                 print(f"Loaded {index + 1} flights...")
 
-        conn.commit()
+        if commit:
+            conn.commit()
         print(f"\nLoading flights has finished. Total: {index + 1} records.")
 
     except Exception as e:
         conn.rollback()
-        print(f"\nERROR when inserting data. Error: {e} for record number: {index}")
\ No newline at end of file
+        print(f"\nERROR when inserting data. Error: {e} for record number: {index}")
+        # bez tego import po błędzie zapisałby fazę facts z rows=len(df) i zwrócił ImportTimer jak po sukcesie
+        raise
+
+def bulk_insert_sql(table: str, placeholder: str = "%s") -> str:
+    cols = BULK_TABLE_COLUMNS[table]
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join([placeholder] * len(cols))})"
+
+
+def build_flight_rows(df, first_id: int = 1) -> Dict[str, List[tuple]]:
+    """Splits the frame into per-table row tuples (same rules as load_flights) with explicit flight ids."""
+    tables = {table: [] for table in BULK_TABLE_COLUMNS}
+
+    # astype(object) gives plain Python scalars, which every DB driver can bind
+    for offset, row in enumerate(df.astype(object).itertuples(index=False)):
+        flight_id = first_id + offset
+
+        fl_date_obj = row.fl_date.split()[0] if isinstance(row.fl_date, str) and row.fl_date else row.fl_date
+        tables["flights"].append((
+            flight_id, row.year, row.month, row.day_of_month, row.day_of_week, fl_date_obj,
+            row.op_unique_carrier, row.op_carrier_fl_num, row.origin, row.dest,
+            row.crs_dep_time, row.crs_arr_time, row.crs_elapsed_time, row.distance
+        ))
+
+        if row.cancelled == 1:
+            tables["flights_cancelled"].append((flight_id, row.cancellation_code))
+            tables["flight_status"].append((flight_id, None, flight_id))
+            continue
+
+        total_delay_reasons = (row.carrier_delay or 0) + (row.weather_delay or 0) + (row.nas_delay or 0) + \
+                              (row.security_delay or 0) + (row.late_aircraft_delay or 0)
+        delay_id = None
+        if total_delay_reasons > 0:
+            delay_id = flight_id
+            tables["flights_delayed"].append((
+                flight_id, row.carrier_delay, row.weather_delay, row.nas_delay,
+                row.security_delay, row.late_aircraft_delay
+            ))
+
+        tables["flights_performance"].append((
+            flight_id, row.dep_time, row.dep_delay, row.taxi_out, row.wheels_off, row.wheels_on,
+            row.taxi_in, row.arr_time, row.arr_delay, row.actual_elapsed_time, row.air_time,
+            bool(row.diverted == 1), delay_id
+        ))
+        tables["flight_status"].append((flight_id, flight_id, None))
+
+    return tables
+
+
+def load_flights_bulk(conn, cursor, tables: Dict[str, List[tuple]], placeholder: str = "%s",
+                      batch_size: int = 50_000, commit: bool = True):
+    """Loads rows prepared by build_flight_rows with executemany, committing once at the end (unless commit=False)."""
+    print("\n--- Loading flights (bulk) ---")
+
+    try:
+        for table in BULK_TABLE_COLUMNS:
+            rows = tables.get(table, [])
+            sql = bulk_insert_sql(table, placeholder)
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[start:start + batch_size])
+            print(f"Loaded {len(rows)} rows into {table}")
+
+        if commit:
+            conn.commit()
+        print(f"\nLoading flights has finished. Total: {len(tables.get('flights', []))} records.")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"\nERROR when inserting data (bulk). Error: {e}")
+        # bez tego wywołujący commitowałby pustą transakcję i raportował udany import
+        raise
+
+
+def id_ranges(n_rows: int, workers: int) -> List[Tuple[int, int]]:
+    """Rozłączne, ciągłe zakresy wierszy [start, stop) - po jednym na workera."""
+    step = max(1, -(-n_rows // max(1, workers)))
+    return [(start, min(start + step, n_rows)) for start in range(0, n_rows, step)]
+
+
+def load_flights_parallel(load_range: Callable[[tuple], int], df, first_id: int, workers: int) -> int:
+    """
+    Dzieli ramkę na rozłączne zakresy flight_id i ładuje je równolegle w osobnych procesach.
+    load_range((part, part_first_id)) musi być funkcją modułu (pickle) i otwierać własne połączenie;
+    wymiary (airline/airport) muszą być już załadowane, a sekwencję poprawia wywołujący.
+    """
+    parts = [(df.iloc[start:stop], first_id + start) for start, stop in id_ranges(len(df), workers)]
+    print(f"\n--- Loading flights in {len(parts)} parallel workers ---")
+    if not parts:
+        return 0
+
+    with Pool(len(parts)) as pool:
+        loaded = sum(pool.map(load_range, parts))
+    print(f"\nLoading flights has finished. Total: {loaded} records.")
+    return loaded
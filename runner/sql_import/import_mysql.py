@@ -1,6 +1,10 @@
 import mysql.connector
 import os
-from .common import load_csv, load_airlines, load_airports, load_flights
+from import_timing import ImportTimer
+from functools import partial
+from dimensions import dimension_registry
+from .common import (parse_csv, transform_frame, load_airlines, load_airports, load_flights, bulk_load_settings,
+                     build_flight_rows, load_flights_bulk, import_workers, load_flights_parallel, BULK_TABLE_COLUMNS)
 import argparse
 
 DB_CONFIG = {
@@ -23,9 +27,78 @@ MYSQL_FLIGHTS_INSERT_SQL = """
 def get_mysql_last_id(cursor):
     return cursor.lastrowid
 
-def import_to_mysql(file_name):
+def drop_secondary_indexes(cursor):
+    """
+    Tryb wsadowy: usuwa indeksy pomocnicze (nieunikalne) i zwraca ich definicje.
+    Indeks, na którym opiera się klucz obcy, InnoDB odmówi usunąć - taki zostaje.
+    """
+    cursor.execute("""
+        SELECT table_name, index_name, GROUP_CONCAT(column_name ORDER BY seq_in_index)
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND non_unique = 1
+        GROUP BY table_name, index_name
+        ORDER BY table_name, index_name
+    """)
+    dropped = []
+    for table, name, columns in cursor.fetchall():
+        try:
+            cursor.execute(f"DROP INDEX {name} ON {table}")
+            dropped.append((table, name, columns))
+        except mysql.connector.Error as err:
+            print(f"Keeping index {table}.{name}: {err.msg}")
+    print(f"Dropped {len(dropped)} indexes")
+    return dropped
+
+def rebuild_secondary_indexes(conn, cursor, dropped, settings: dict, timer: ImportTimer, rows: int):
+    """Odtwarza indeksy jednym ALTER TABLE na tabelę (InnoDB buduje je sortowaniem, nie wstawianiem)."""
+    print("\n--- Rebuilding indexes ---")
+    with timer.phase("index", rows=rows):
+        try:
+            # równoległe budowanie indeksów (MySQL >= 8.0.27)
+            cursor.execute(f"SET SESSION innodb_ddl_threads = {int(settings.get('maintenance_workers', 2))}")
+        except mysql.connector.Error as err:
+            print(f"innodb_ddl_threads not supported: {err.msg}")
+
+        by_table = {}
+        for table, name, columns in dropped:
+            by_table.setdefault(table, []).append(f"ADD INDEX {name} ({columns})")
+        for table, clauses in by_table.items():
+            cursor.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+
+    with timer.phase("analyze", rows=rows):
+        cursor.execute(f"ANALYZE TABLE airline, airport, {', '.join(BULK_TABLE_COLUMNS)}")
+        cursor.fetchall()
+    print(f"Rebuilt {len(dropped)} indexes.")
+
+def _load_range_mysql(part, relaxed_checks: bool = False) -> int:
+    """Worker importu równoległego: jeden zakres flight_id, własne połączenie i transakcja."""
+    df, first_id = part
+    conn = mysql.connector.connect(**DB_CONFIG)
     try:
-        df = load_csv(file_name)
+        cursor = conn.cursor()
+        if relaxed_checks:
+            # ustawienia sesji - każdy worker musi je włączyć u siebie
+            cursor.execute("SET SESSION unique_checks = 0")
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+        load_flights_bulk(conn, cursor, build_flight_rows(df, first_id), batch_size=5_000)
+        cursor.close()
+    finally:
+        conn.close()
+    return len(df)
+
+def fix_auto_increment(cursor):
+    # InnoDB sam przesuwa licznik przy jawnych id, ale po równoległym ładowaniu ustawiamy go wprost
+    cursor.execute("SELECT COALESCE(MAX(flight_id), 0) + 1 FROM flights")
+    cursor.execute(f"ALTER TABLE flights AUTO_INCREMENT = {int(cursor.fetchone()[0])}")
+
+def import_to_mysql(file_name, cfg=None, start_row=0):
+    timer = ImportTimer("mysql", file_name, start_row=start_row)
+    try:
+        with timer.phase("parse"):
+            df = parse_csv(file_name, start_row)
+        timer.count("parse", len(df))
+        with timer.phase("transform", rows=len(df)):
+            df = transform_frame(df)
     except FileNotFoundError:
         print(f"ERROR: File not found: {file_name}")
         return
@@ -41,11 +114,52 @@ def import_to_mysql(file_name):
         print(f"ERROR connectiong to MYSQL database: {err}")
         return
 
+    settings = bulk_load_settings(cfg)
+    workers = import_workers(cfg)
+    timer.tags["workers"] = workers
     try:
-        load_airlines(conn, cursor, df, insert_query="INSERT IGNORE INTO airline (carrier_code) VALUES (%s)")
-        load_airports(conn, cursor, file_name,
-                      insert_query="INSERT IGNORE INTO airport (airport_code, city_name, state_name) VALUES (%s, %s, %s)")
-        load_flights(conn, cursor, df, MYSQL_FLIGHTS_INSERT_SQL, get_mysql_last_id)
+        dropped = None
+        if settings:
+            # sprawdzanie FK i unikalności wyłączone tylko w tej sesji
+            with timer.phase("deindex"):
+                cursor.execute("SET SESSION unique_checks = 0")
+                cursor.execute("SET SESSION foreign_key_checks = 0")
+                dropped = drop_secondary_indexes(cursor)
+
+        try:
+            with timer.phase("dimensions"):
+                airlines = load_airlines(conn, cursor, df, dimension_registry("mysql"))
+                airports = load_airports(conn, cursor, file_name, dimension_registry("mysql"))
+                timer.count("dimensions", airlines + airports)
+
+            if workers > 1:
+                # build_flight_rows liczy się w workerach, więc transformacja wchodzi w fazę facts
+                cursor.execute("SELECT COALESCE(MAX(flight_id), 0) + 1 FROM flights")
+                first_id = cursor.fetchone()[0]
+                with timer.phase("facts", rows=len(df)):
+                    load_flights_parallel(partial(_load_range_mysql, relaxed_checks=bool(settings)), df, first_id,
+                                          workers)
+                fix_auto_increment(cursor)
+            elif settings:
+                # jawne flight_id przesuwają AUTO_INCREMENT same; executemany składa wielowierszowe INSERT-y
+                cursor.execute("SELECT COALESCE(MAX(flight_id), 0) + 1 FROM flights")
+                first_id = cursor.fetchone()[0]
+                with timer.phase("transform"):
+                    tables = build_flight_rows(df, first_id)
+                with timer.phase("facts", rows=len(df)):
+                    load_flights_bulk(conn, cursor, tables, batch_size=5_000, commit=False)
+            else:
+                with timer.phase("facts", rows=len(df)):
+                    load_flights(conn, cursor, df, MYSQL_FLIGHTS_INSERT_SQL, get_mysql_last_id, commit=False)
+            with timer.phase("commit", rows=len(df)):
+                conn.commit()
+        finally:
+            if dropped is not None:
+                conn.rollback()
+                rebuild_secondary_indexes(conn, cursor, dropped, settings, timer, len(df))
+                cursor.execute("SET SESSION unique_checks = 1")
+                cursor.execute("SET SESSION foreign_key_checks = 1")
+        return timer.finish()
     except Exception as e:
         conn.rollback()
         print(f"\nERROR when inserting data. Error: {e}")
@@ -1,6 +1,11 @@
+import csv
+import io
 import psycopg2
 import os
-from .common import load_csv, load_airlines, load_airports, load_flights
+from import_timing import ImportTimer
+from dimensions import dimension_registry
+from .common import (parse_csv, transform_frame, load_airlines, load_airports, load_flights, bulk_load_settings,
+                     build_flight_rows, import_workers, load_flights_parallel, BULK_TABLE_COLUMNS)
 import argparse
 
 DB_CONFIG = {
@@ -23,9 +28,109 @@ def get_postgres_last_id(cursor):
     result = cursor.fetchone()
     return result[0] if result else None
 
-def import_to_postgres(file_name):
+def _copy_row(row):
+    # COPY nie rzutuje "12.0" na INT tak jak INSERT z parametrem, więc całkowite floaty piszemy jako int
+    return [int(v) if isinstance(v, float) and v.is_integer() else v for v in row]
+
+def copy_flight_rows(cursor, tables):
+    """Ładuje krotki z build_flight_rows przez COPY ... FROM STDIN (CSV, pusta wartość = NULL)."""
+    print("\n--- Loading flights (COPY) ---")
+    for table, cols in BULK_TABLE_COLUMNS.items():
+        rows = tables.get(table, [])
+        buf = io.StringIO()
+        csv.writer(buf).writerows(map(_copy_row, rows))
+        buf.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", buf)
+        print(f"Loaded {len(rows)} rows into {table}")
+
+def fix_flight_sequence(cursor):
+    # flight_id nadajemy po stronie klienta, więc SERIAL trzeba przestawić ręcznie
+    cursor.execute("SELECT setval(pg_get_serial_sequence('flights', 'flight_id'), (SELECT MAX(flight_id) FROM flights))")
+
+def _load_range_postgres(part) -> int:
+    """Worker importu równoległego: jeden zakres flight_id, własne połączenie i transakcja."""
+    df, first_id = part
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        copy_flight_rows(cursor, build_flight_rows(df, first_id))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return len(df)
+
+def drop_secondary_objects(cursor, unlogged: bool = False):
+    """
+    Tryb wsadowy: zapamiętuje i usuwa klucze obce oraz indeksy pomocnicze (klucze główne zostają),
+    opcjonalnie przełącza tabele faktów na UNLOGGED. Zwraca to, co trzeba odtworzyć po załadowaniu.
+    """
+    cursor.execute("""
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype = 'f' AND connamespace = 'public'::regnamespace
+        ORDER BY conname
+    """)
+    foreign_keys = cursor.fetchall()
+    cursor.execute("""
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indrelid
+        WHERE c.relnamespace = 'public'::regnamespace AND NOT i.indisprimary AND NOT i.indisunique
+        ORDER BY 1
+    """)
+    indexes = cursor.fetchall()
+
+    for table, name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+
+    unlogged_tables = list(BULK_TABLE_COLUMNS) if unlogged else []
+    for table in unlogged_tables:
+        cursor.execute(f"ALTER TABLE {table} SET UNLOGGED")
+
+    print(f"Dropped {len(indexes)} indexes and {len(foreign_keys)} foreign keys"
+          + (f"; {len(unlogged_tables)} tables UNLOGGED" if unlogged_tables else ""))
+    return indexes, foreign_keys, unlogged_tables
+
+def rebuild_secondary_objects(conn, cursor, saved, settings: dict, timer: ImportTimer, rows: int):
+    """Odwrotność drop_secondary_objects; każdy krok to osobna faza importu (czas odbudowy widać osobno)."""
+    indexes, foreign_keys, unlogged_tables = saved
+
+    if unlogged_tables:
+        with timer.phase("logged", rows=rows):
+            for table in unlogged_tables:
+                cursor.execute(f"ALTER TABLE {table} SET LOGGED")
+            conn.commit()
+
+    print("\n--- Rebuilding indexes ---")
+    with timer.phase("index", rows=rows):
+        cursor.execute(f"SET max_parallel_maintenance_workers = {int(settings.get('maintenance_workers', 2))}")
+        if settings.get("maintenance_work_mem"):
+            cursor.execute("SET maintenance_work_mem = %s", (str(settings["maintenance_work_mem"]),))
+        for _, ddl in indexes:
+            cursor.execute(ddl)
+        conn.commit()
+
+    with timer.phase("constraints", rows=rows):
+        for table, name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+        conn.commit()
+
+    with timer.phase("analyze", rows=rows):
+        cursor.execute("ANALYZE")
+        conn.commit()
+    print(f"Rebuilt {len(indexes)} indexes and {len(foreign_keys)} foreign keys.")
+
+def import_to_postgres(file_name, cfg=None, start_row=0):
+    timer = ImportTimer("postgres", file_name, start_row=start_row)
     try:
-        df = load_csv(file_name)
+        with timer.phase("parse"):
+            df = parse_csv(file_name, start_row)
+        timer.count("parse", len(df))
+        with timer.phase("transform", rows=len(df)):
+            df = transform_frame(df)
     except FileNotFoundError:
         print(f"ERROR: File not found: {file_name}")
         return
@@ -42,11 +147,46 @@ def import_to_postgres(file_name):
         print(f"ERROR connecting to PostgreSQL database: {err}")
         return
 
+    settings = bulk_load_settings(cfg)
+    workers = import_workers(cfg)
+    timer.tags["workers"] = workers
     try:
-        load_airlines(conn, cursor, df, insert_query = "INSERT INTO airline (carrier_code) VALUES (%s) ON CONFLICT (carrier_code) DO NOTHING")
-        load_airports(conn, cursor, file_name,
-                      insert_query="INSERT INTO airport (airport_code, city_name, state_name) VALUES (%s, %s, %s) ON CONFLICT (airport_code) DO NOTHING")
-        load_flights(conn, cursor, df, POSTGRES_FLIGHTS_INSERT_SQL, get_postgres_last_id)
+        saved = None
+        if settings:
+            with timer.phase("deindex"):
+                saved = drop_secondary_objects(cursor, bool(settings.get("unlogged")))
+                conn.commit()
+
+        try:
+            with timer.phase("dimensions"):
+                airlines = load_airlines(conn, cursor, df, dimension_registry("postgres"))
+                airports = load_airports(conn, cursor, file_name, dimension_registry("postgres"))
+                timer.count("dimensions", airlines + airports)
+
+            if settings or workers > 1:
+                cursor.execute("SELECT COALESCE(MAX(flight_id), 0) + 1 FROM flights")
+                first_id = cursor.fetchone()[0]
+                if workers > 1:
+                    # build_flight_rows liczy się w workerach, więc transformacja wchodzi w fazę facts
+                    with timer.phase("facts", rows=len(df)):
+                        load_flights_parallel(_load_range_postgres, df, first_id, workers)
+                else:
+                    with timer.phase("transform"):
+                        tables = build_flight_rows(df, first_id)
+                    with timer.phase("facts", rows=len(df)):
+                        copy_flight_rows(cursor, tables)
+                fix_flight_sequence(cursor)
+            else:
+                with timer.phase("facts", rows=len(df)):
+                    load_flights(conn, cursor, df, POSTGRES_FLIGHTS_INSERT_SQL, get_postgres_last_id, commit=False)
+            with timer.phase("commit", rows=len(df)):
+                conn.commit()
+        finally:
+            if saved:
+                # po błędzie ładowania też odtwarzamy indeksy i FK, żeby nie zostawić okrojonego schematu
+                conn.rollback()
+                rebuild_secondary_objects(conn, cursor, saved, settings, timer, len(df))
+        return timer.finish()
 
     except Exception as e:
         if conn:
@@ -0,0 +1,171 @@
+import argparse
+
+from bench_sqlite import sqlite_conn, apply_sqlite_pragmas
+from import_timing import ImportTimer
+from dimensions import dimension_registry
+from .common import parse_csv, transform_frame, load_airlines, load_airports, build_flight_rows, load_flights_bulk
+
+# Ten sam znormalizowany model co docker/postgres/init/schema.sql (SQLite nie ma ALTER TABLE ... ADD CONSTRAINT,
+# więc klucze obce są zdefiniowane w CREATE TABLE; egzekwowanie FK w SQLite jest domyślnie wyłączone).
+SQLITE_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS airline
+    (
+        carrier_code VARCHAR(10) PRIMARY KEY
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS airport
+    (
+        airport_code VARCHAR(10) PRIMARY KEY,
+        city_name    VARCHAR(100),
+        state_name   VARCHAR(50)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flights
+    (
+        flight_id         INTEGER PRIMARY KEY,
+        year              INT,
+        month             INT,
+        day_of_month      INT,
+        day_of_week       INT,
+        fl_date           TIMESTAMP,
+        op_unique_carrier VARCHAR(10) NOT NULL REFERENCES airline (carrier_code),
+        op_carrier_fl_num VARCHAR(20),
+        origin            VARCHAR(10) NOT NULL REFERENCES airport (airport_code),
+        dest              VARCHAR(10) NOT NULL REFERENCES airport (airport_code),
+        crs_dep_time      INT,
+        crs_arr_time      INT,
+        crs_elapsed_time  INT,
+        distance          INT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flights_delayed
+    (
+        flight_id           INT PRIMARY KEY REFERENCES flights (flight_id),
+        carrier_delay       INT,
+        weather_delay       INT,
+        nas_delay           INT,
+        security_delay      INT,
+        late_aircraft_delay INT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flights_performance
+    (
+        flight_id           INT PRIMARY KEY REFERENCES flights (flight_id),
+        dep_time            INT,
+        dep_delay           INT,
+        taxi_out            INT,
+        wheels_off          INT,
+        wheels_on           INT,
+        taxi_in             INT,
+        arr_time            INT,
+        arr_delay           INT,
+        actual_elapsed_time INT,
+        air_time            INT,
+        diverted            BOOLEAN,
+        delay_id            INT REFERENCES flights_delayed (flight_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flights_cancelled
+    (
+        flight_id         INT PRIMARY KEY REFERENCES flights (flight_id),
+        cancelled         BOOLEAN,
+        cancellation_code VARCHAR(10)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flight_status
+    (
+        flight_id       INT PRIMARY KEY REFERENCES flights (flight_id),
+        performance_id  INT REFERENCES flights_performance (flight_id),
+        cancellation_id INT REFERENCES flights_cancelled (flight_id),
+        CONSTRAINT chk_one_filled CHECK (
+            (performance_id IS NOT NULL AND cancellation_id IS NULL)
+                OR
+            (performance_id IS NULL AND cancellation_id IS NOT NULL)
+            )
+    )
+    """,
+]
+
+# indeksy pomocnicze zakładane dopiero po załadowaniu danych
+SQLITE_INDEXES_DDL = [
+    "CREATE INDEX IF NOT EXISTS idx_flights_carrier_time ON flights (op_unique_carrier, year, month)",
+    "CREATE INDEX IF NOT EXISTS idx_flights_origin ON flights (origin)",
+    "CREATE INDEX IF NOT EXISTS idx_flights_dest ON flights (dest)",
+    "CREATE INDEX IF NOT EXISTS idx_flights_route_date ON flights (origin, dest, fl_date)",
+    "CREATE INDEX IF NOT EXISTS idx_airport_city_name ON airport (city_name)",
+    "CREATE INDEX IF NOT EXISTS idx_perf_arr_delay ON flights_performance (arr_delay)",
+    "CREATE INDEX IF NOT EXISTS idx_cancelled_code ON flights_cancelled (cancellation_code)",
+]
+
+
+def import_to_sqlite(file_name, cfg=None, start_row=0):
+    timer = ImportTimer("sqlite", file_name, start_row=start_row)
+    try:
+        with timer.phase("parse"):
+            df = parse_csv(file_name, start_row)
+        timer.count("parse", len(df))
+        with timer.phase("transform", rows=len(df)):
+            df = transform_frame(df)
+    except FileNotFoundError:
+        print(f"ERROR: File not found: {file_name}")
+        return
+    except Exception as e:
+        print(f"ERROR: Processing CSV file failed {e}")
+        return
+
+    conn = sqlite_conn(cfg)
+    cursor = conn.cursor()
+    print("Connected to SQLite database")
+
+    try:
+        for ddl in SQLITE_TABLES_DDL:
+            cursor.execute(ddl)
+        conn.commit()
+
+        # WAL + synchronous=OFF tylko na czas ładowania; potem wracamy do ustawień z configu
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = OFF")
+
+        with timer.phase("dimensions"):
+            airlines = load_airlines(conn, cursor, df, dimension_registry("sqlite"))
+            airports = load_airports(conn, cursor, file_name, dimension_registry("sqlite"))
+            timer.count("dimensions", airlines + airports)
+
+        cursor.execute("SELECT COALESCE(MAX(flight_id), 0) FROM flights")
+        first_id = cursor.fetchone()[0] + 1
+        # rozbicie na krotki per tabela to jeszcze transformacja, nie ładowanie
+        with timer.phase("transform"):
+            tables = build_flight_rows(df, first_id)
+        with timer.phase("facts", rows=len(df)):
+            load_flights_bulk(conn, cursor, tables, placeholder="?", commit=False)
+        with timer.phase("commit", rows=len(df)):
+            conn.commit()
+
+        print("\n--- Creating indexes ---")
+        with timer.phase("index", rows=len(df)):
+            for ddl in SQLITE_INDEXES_DDL:
+                cursor.execute(ddl)
+            cursor.execute("ANALYZE")
+            conn.commit()
+        apply_sqlite_pragmas(conn, cfg)
+        print("Indexes created.")
+        return timer.finish()
+    except Exception as e:
+        conn.rollback()
+        print(f"\nERROR when inserting data. Error: {e}")
+    finally:
+        cursor.close()
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", required=True)
+    a = ap.parse_args()
+    import_to_sqlite(a.src)
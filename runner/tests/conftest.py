@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# moduły runnera importują się nawzajem płasko (python bench_runner.py z katalogu runner)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bench_common  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def results_csv(tmp_path, monkeypatch):
+    """log_result pisze do tymczasowego results.csv zamiast /app/results."""
+    path = tmp_path / "results.csv"
+    monkeypatch.setattr(bench_common, "RESULTS_PATH", path)
+    return path
@@ -0,0 +1,103 @@
+import csv
+
+import pytest
+
+import import_timing
+from import_timing import ImportTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(import_timing, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "flights_100.csv"
+    path.write_bytes(b"x" * 4000)
+    return path
+
+
+def _rows(results_csv) -> dict:
+    with open(results_csv, newline="") as f:
+        return {r[3]: r for r in csv.reader(f)}
+
+
+def test_phases_accumulate_time_and_rows(clock, source):
+    timer = ImportTimer("postgres", str(source))
+    for rows in (30, 70):
+        with timer.phase("facts", rows):
+            clock.now += 0.5
+    timer.count("dimensions", 12)
+    timer.add("dimensions", 0.25)
+    assert timer.phases == {"facts": [1.0, 100], "dimensions": [0.25, 12]}
+
+
+def test_phase_is_recorded_when_body_raises(clock, source):
+    timer = ImportTimer("postgres", str(source))
+    with pytest.raises(RuntimeError):
+        with timer.phase("commit"):
+            clock.now += 2
+            raise RuntimeError("boom")
+    assert timer.phases["commit"] == [2.0, 0]
+
+
+def test_source_bytes_prefer_columnar_copy(tmp_path, source):
+    assert ImportTimer("duckdb", str(source)).source_bytes == 4000
+    source.with_suffix(".arrow").write_bytes(b"y" * 1500)
+    assert ImportTimer("duckdb", str(source)).source_bytes == 1500
+    assert ImportTimer("duckdb", str(tmp_path / "missing.csv")).source_bytes == 0
+
+
+def test_log_writes_phase_rows_with_bytes_only_for_throughput_phases(clock, source, results_csv):
+    # jak w mongo_import: etykieta layoutu jako baza, scenariusze z prefiksem mongo
+    timer = ImportTimer("mongo_typed", str(source), prefix="mongo")
+    timer.tags["workers"] = 4
+    with timer.phase("parse", 100):
+        clock.now += 2
+    with timer.phase("dimensions", 5):
+        clock.now += 0.5
+    with timer.phase("facts", 100):
+        clock.now += 1.5
+    timer.finish()
+    clock.now += 10
+    timer.log("100")
+
+    rows = _rows(results_csv)
+    assert list(rows) == ["mongo_import_parse", "mongo_import_dimensions", "mongo_import_facts", "mongo_import_total"]
+    assert {r[1] for r in rows.values()} == {"mongo_typed"}
+    assert rows["mongo_import_parse"][6] == \
+        "rows=100, rows_per_s=50, bytes=4000, bytes_per_s=2000, workers=4"
+    assert rows["mongo_import_dimensions"][6] == "rows=5, rows_per_s=10, workers=4"
+    assert rows["mongo_import_facts"][5] == "1500.0"
+    # całość do finish(), nie do log(); wiersze = największa faza
+    assert rows["mongo_import_total"][5] == "4000.0"
+    assert rows["mongo_import_total"][6] == \
+        "rows=100, rows_per_s=25, bytes=4000, bytes_per_s=1000, workers=4"
+
+
+def test_zero_length_phase_reports_zero_rate(clock, source):
+    timer = ImportTimer("sqlite", str(source))
+    assert timer._note(0.0, 10) == "rows=10, rows_per_s=0, bytes=4000, bytes_per_s=0"
+
+
+def test_incremental_import_reports_bytes_of_loaded_rows_only(clock, source, results_csv):
+    # plik 4000 B, pierwsze 300 z 400 wierszy załadowane wcześniej -> delta to ~1/4 pliku
+    timer = ImportTimer("postgres", str(source), start_row=300)
+    with timer.phase("facts", 100):
+        clock.now += 1
+    timer.finish()
+    assert timer.loaded_bytes() == 1000
+    timer.log("400")
+    assert _rows(results_csv)["postgres_import_facts"][6] == "rows=100, rows_per_s=100, bytes=1000, bytes_per_s=1000"
+    assert ImportTimer("postgres", str(source), start_row=300).loaded_bytes() == 0
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+# latency_proxy importuje backendy (zamykanie klientów przy przekierowaniu), a te - sterowniki baz
+for driver in ("psycopg2", "mysql.connector", "pymongo", "cassandra"):
+    pytest.importorskip(driver)
+
+import latency_proxy  # noqa: E402
+from latency_proxy import LatencyProxy, routed  # noqa: E402
+
+
+async def _echo(reader, writer):
+    while data := await reader.read(65536):
+        writer.write(data)
+        await writer.drain()
+    writer.close()
+
+
+async def _through_proxy(proxy_args: dict, payloads, gap_s: float = 0.0):
+    """Wysyła payloads przez proxy do serwera echo; zwraca (odebrane bajty, czas do odebrania wszystkiego [s])."""
+    echo = await asyncio.start_server(_echo, "127.0.0.1", 0)
+    proxy = LatencyProxy(*echo.sockets[0].getsockname()[:2], **proxy_args)
+    ready = asyncio.get_running_loop().create_future()
+    serving = asyncio.ensure_future(proxy.serve(ready=ready.set_result))
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", await ready)
+        expected = b"".join(payloads)
+        t0 = time.perf_counter()
+        for payload in payloads:
+            writer.write(payload)
+            await writer.drain()
+            if gap_s:
+                await asyncio.sleep(gap_s)
+        received = await asyncio.wait_for(reader.readexactly(len(expected)), 10)
+        elapsed = time.perf_counter() - t0
+        writer.close()
+        return received, elapsed
+    finally:
+        serving.cancel()
+        echo.close()
+
+
+def test_one_way_delay_is_half_rtt_plus_bounded_jitter():
+    assert LatencyProxy("h", 1, rtt_ms=20).one_way_delay() == pytest.approx(0.010)
+    jittery = LatencyProxy("h", 1, rtt_ms=20, jitter_ms=4)
+    delays = [jittery.one_way_delay() for _ in range(1000)]
+    # ±jitter_ms / 2 w każdą stronę
+    assert all(0.008 - 1e-12 <= d <= 0.012 + 1e-12 for d in delays)
+    assert max(delays) - min(delays) > 0.003
+    # jitter większy niż RTT nie daje ujemnego opóźnienia
+    assert all(LatencyProxy("h", 1, rtt_ms=1, jitter_ms=50).one_way_delay() >= 0 for _ in range(1000))
+
+
+def test_round_trip_adds_rtt():
+    received, elapsed = asyncio.run(_through_proxy({"rtt_ms": 60}, [b"ping"]))
+    assert received == b"ping"
+    assert 0.06 <= elapsed < 0.5
+
+
+def test_jitter_does_not_reorder_chunks():
+    payloads = [f"{i:04d};".encode() for i in range(60)]
+    received, _ = asyncio.run(_through_proxy({"rtt_ms": 10, "jitter_ms": 20}, payloads, gap_s=0.002))
+    assert received == b"".join(payloads)
+
+
+def test_bandwidth_limit_delays_large_transfers():
+    payload = os.urandom(200_000)
+    # 200 kB przy 8 Mbit/s to 0.2 s w jedną stronę; echo wraca fragmentami, więc powrót nakłada się na wysyłkę
+    received, elapsed = asyncio.run(_through_proxy({"bandwidth_mbps": 8}, [payload]))
+    assert received == payload
+    assert 0.2 <= elapsed < 1.0
+
+
+def test_routed_points_clients_at_proxy_and_restores(monkeypatch):
+    closed = []
+    import_cfg = {"host": "postgres", "port": 5432, "dbname": "flights"}
+    monkeypatch.setitem(latency_proxy.CLOSE_CLIENTS, "postgres", lambda: closed.append(True))
+    monkeypatch.setitem(latency_proxy.IMPORT_CONFIGS, "postgres", import_cfg)
+    monkeypatch.setenv("POSTGRES_HOST", "db.internal")
+    monkeypatch.delenv("POSTGRES_PORT", raising=False)
+
+    with routed("postgres", 15432):
+        assert (os.environ["POSTGRES_HOST"], os.environ["POSTGRES_PORT"]) == ("127.0.0.1", "15432")
+        assert import_cfg == {"host": "127.0.0.1", "port": 15432, "dbname": "flights"}
+        assert len(closed) == 1
+
+    assert os.environ["POSTGRES_HOST"] == "db.internal"
+    assert "POSTGRES_PORT" not in os.environ
+    assert import_cfg == {"host": "postgres", "port": 5432, "dbname": "flights"}
+    assert len(closed) == 2
@@ -0,0 +1,94 @@
+import csv
+import random
+from collections import Counter
+
+import pytest
+
+from make_samples import MANIFEST_NAME, _reservoir_indices, _reservoir_sample, make_samples
+
+
+def _write_source(path, rows: int):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["row_id", "origin", "dest"])
+        for i in range(rows):
+            writer.writerow([i, f"O{i % 7}", f"D{i % 11}"])
+    return path
+
+
+def _row_ids(path) -> list:
+    with open(path, newline="") as f:
+        return [int(r["row_id"]) for r in csv.DictReader(f)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("total_rows,sample_size", [(1000, 50), (200, 199), (5000, 1)])
+def test_reservoir_indices_match_streaming_algorithm_l(seed, total_rows, sample_size):
+    streamed, n = _reservoir_sample(iter(range(total_rows)), sample_size, random.Random(seed))
+    assert n == total_rows
+    assert _reservoir_indices(total_rows, sample_size, random.Random(seed)).tolist() == streamed.tolist()
+
+
+def test_reservoir_indices_shorter_source_returns_everything():
+    assert _reservoir_indices(3, 10, random.Random(1)).tolist() == [0, 1, 2]
+
+
+def test_reservoir_indices_uniform_inclusion():
+    total_rows, sample_size, trials = 20, 5, 4000
+    rng = random.Random(123)
+    hits = Counter()
+    for _ in range(trials):
+        picked = _reservoir_indices(total_rows, sample_size, rng).tolist()
+        assert len(set(picked)) == sample_size
+        hits.update(picked)
+
+    # p = k / n = 0.25 dla każdego wiersza; odchylenie standardowe częstości ~0.007
+    for i in range(total_rows):
+        assert abs(hits[i] / trials - sample_size / total_rows) < 0.04, i
+
+
+@pytest.mark.parametrize("mode", ["lines", "columnar"])
+def test_samples_are_nested_prefixes(tmp_path, mode):
+    src = _write_source(tmp_path / "src.csv", 500)
+    cache_dir = str(tmp_path / "cache") if mode == "columnar" else None
+    manifest = make_samples(str(src), str(tmp_path / "out"), (50, 200, 10_000), cache_dir=cache_dir, seed=7)
+
+    assert manifest["mode"] == mode
+    assert manifest["total_rows"] == 500
+    assert not manifest["cached"]
+    assert not (tmp_path / "out" / "flights_10000.csv").exists()
+
+    small = _row_ids(tmp_path / "out" / "flights_50.csv")
+    large = _row_ids(tmp_path / "out" / "flights_200.csv")
+    assert len(small) == 50 and len(large) == 200
+    assert len(set(large)) == 200 and set(large) <= set(range(500))
+    # import przyrostowy dopisuje large[50:] do bazy z small
+    assert large[:50] == small
+
+
+@pytest.mark.parametrize("mode", ["lines", "columnar"])
+def test_samples_are_deterministic_and_cached(tmp_path, mode):
+    src = _write_source(tmp_path / "src.csv", 300)
+    cache_dir = str(tmp_path / "cache") if mode == "columnar" else None
+    out = tmp_path / "out"
+
+    make_samples(str(src), str(out), (40,), cache_dir=cache_dir, seed=3)
+    first = _row_ids(out / "flights_40.csv")
+    assert make_samples(str(src), str(out), (40,), cache_dir=cache_dir, seed=3)["cached"]
+
+    (out / MANIFEST_NAME).unlink()
+    make_samples(str(src), str(out), (40,), cache_dir=cache_dir, seed=3)
+    assert _row_ids(out / "flights_40.csv") == first
+
+    make_samples(str(src), str(out), (40,), cache_dir=cache_dir, seed=4)
+    assert _row_ids(out / "flights_40.csv") != first
+
+
+def test_lines_mode_removes_stale_columnar_sample(tmp_path):
+    src = _write_source(tmp_path / "src.csv", 300)
+    out = tmp_path / "out"
+    make_samples(str(src), str(out), (40,), cache_dir=str(tmp_path / "cache"), seed=1)
+    assert (out / "flights_40.arrow").exists()
+
+    make_samples(str(src), str(out), (40,), seed=2)
+    assert not (out / "flights_40.arrow").exists()
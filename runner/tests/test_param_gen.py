@@ -0,0 +1,141 @@
+import csv
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+import param_gen
+from param_gen import ConfigParams, ParamGenerator, ParamProfile, load_params, param_generator
+
+# trasa -> liczba lotów (ranking zipf: AAA-BBB pierwsza)
+ROUTE_COUNTS = {("AAA", "BBB"): 50, ("AAA", "CCC"): 20, ("BBB", "CCC"): 10, ("CCC", "DDD"): 5, ("DDD", "EEE"): 2}
+START = date(2024, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def no_registered_generators(monkeypatch):
+    monkeypatch.setattr(param_gen, "_GENERATORS", {})
+
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    path = tmp_path / "flights_87.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["year", "month", "fl_date", "op_unique_carrier", "origin", "dest"])
+        for r, ((origin, dest), n) in enumerate(ROUTE_COUNTS.items()):
+            for i in range(n):
+                day = START + timedelta(days=(r * 3 + i) % 60)
+                writer.writerow([day.year, day.month, day.isoformat(), "XX" if i % 2 else "YY", origin, dest])
+    return path
+
+
+@pytest.fixture
+def profile(sample_csv):
+    return ParamProfile(str(sample_csv))
+
+
+def _cfg(**params):
+    return {"params": params}
+
+
+def _route_freq(gen, iterations=4000) -> Counter:
+    return Counter(gen.route("find_route", i)[:2] for i in range(1, iterations + 1))
+
+
+def test_profile_counts_keys_most_frequent_first(profile):
+    assert profile.rows == sum(ROUTE_COUNTS.values())
+    assert [(key, count) for key, count, _ in profile.routes] == list(ROUTE_COUNTS.items())
+    assert {key for key, _, _ in profile.carriers} == {("XX",), ("YY",)}
+    assert [key for key, _, _ in profile.months] == [(2024, 1), (2024, 2)]
+
+
+def test_draws_are_deterministic_per_operation_and_iteration(profile):
+    gen = ParamGenerator(profile, _cfg(mode="zipf", seed=5))
+    again = ParamGenerator(profile, _cfg(mode="zipf", seed=5))
+    picks = [gen.route("find_route", i) for i in range(1, 50)]
+    assert picks == [again.route("find_route", i) for i in range(1, 50)]
+    assert [gen.month("top_routes_month", i) for i in range(1, 50)] == \
+           [again.month("top_routes_month", i) for i in range(1, 50)]
+
+    other_seed = ParamGenerator(profile, _cfg(mode="zipf", seed=6))
+    assert picks != [other_seed.route("find_route", i) for i in range(1, 50)]
+
+
+def test_uniform_mode_picks_every_key_equally(profile):
+    freq = _route_freq(ParamGenerator(profile, _cfg(mode="uniform", seed=1)))
+    for route in ROUTE_COUNTS:
+        assert freq[route] / 4000 == pytest.approx(1 / len(ROUTE_COUNTS), abs=0.03)
+
+
+def test_zipf_mode_weights_keys_by_rank(profile):
+    s = 1.1
+    freq = _route_freq(ParamGenerator(profile, _cfg(mode="zipf", seed=1, zipf_s=s)))
+    norm = sum(1 / rank ** s for rank in range(1, len(ROUTE_COUNTS) + 1))
+    for rank, route in enumerate(ROUTE_COUNTS, start=1):
+        assert freq[route] / 4000 == pytest.approx(1 / rank ** s / norm, abs=0.03)
+
+
+def test_hotset_mode_sends_hot_probability_to_hot_keys(profile):
+    gen = ParamGenerator(profile, _cfg(mode="hotset", seed=2, hot_fraction=0.2, hot_probability=0.9))
+    freq = _route_freq(gen)
+    hot, share = freq.most_common(1)[0]
+    assert share / 4000 == pytest.approx(0.9, abs=0.03)
+    # reszta rozłożona równo na zimne klucze
+    for route in ROUTE_COUNTS:
+        if route != hot:
+            assert freq[route] / 4000 == pytest.approx(0.1 / (len(ROUTE_COUNTS) - 1), abs=0.02)
+
+
+def test_date_windows_start_on_a_day_the_key_flies(profile):
+    gen = ParamGenerator(profile, _cfg(mode="uniform", seed=3, route_window_days=7, carrier_window_days=3))
+    route_days = {key: set(days) for key, _, days in profile.routes}
+    carrier_days = {key[0]: set(days) for key, _, days in profile.carriers}
+    for i in range(1, 30):
+        origin, dest, date_from, date_to = gen.route("find_route", i)
+        start = date.fromisoformat(date_from)
+        assert start in route_days[(origin, dest)]
+        assert date_to == f"{(start + timedelta(days=6)).isoformat()} 23:59:59"
+
+        carrier, c_from, c_to = gen.carrier_days("read_by_carrier_day", i)
+        assert date.fromisoformat(c_from) in carrier_days[carrier]
+        assert date.fromisoformat(c_to) - date.fromisoformat(c_from) == timedelta(days=2)
+
+
+def test_unknown_mode_is_rejected(profile):
+    with pytest.raises(ValueError):
+        ParamGenerator(profile, _cfg(mode="pareto"))
+
+
+def test_config_mode_cycles_through_config_lists():
+    cfg = {
+        "params": {"mode": "config"},
+        "queries": {
+            "find_all_flights_on_route": {"routes": [
+                {"origin": "AAA", "dest": "BBB", "date_from": "2024-01-01", "date_to": "2024-01-07"},
+                {"origin": "CCC", "dest": "DDD", "date_from": "2024-02-01", "date_to": "2024-02-07"},
+            ]},
+            "airlines_ranking": {"months": [3, 4, 5]},
+            "top_routes_month": {"month": "2023-03"},
+        },
+    }
+    gen = param_generator(cfg, "10000")
+    assert isinstance(gen, ConfigParams)
+    assert [gen.route("find_route", i)[0] for i in range(1, 5)] == ["AAA", "CCC", "AAA", "CCC"]
+    assert [gen.month("top_routes_month", i) for i in (1, 3, 4)] == [(2023, 3), (2023, 5), (2023, 3)]
+    assert gen.carrier_days("read_by_carrier_day", 1) is None
+
+
+def test_param_generator_requires_load_params_outside_config_mode(sample_csv, results_csv):
+    cfg = _cfg(mode="zipf", seed=1)
+    with pytest.raises(RuntimeError, match="load_params"):
+        param_generator(cfg, "87")
+
+    gen = load_params(cfg, "87", str(sample_csv))
+    assert param_generator(cfg, "87") is gen
+    assert load_params(cfg, "87", str(sample_csv)) is gen
+
+    with open(results_csv, newline="") as f:
+        rows = list(csv.reader(f))
+    assert [(r[1], r[2], r[3]) for r in rows] == [("params", "87", "params_make")]
+    assert "mode=zipf, seed=1" in rows[0][6]
@@ -0,0 +1,145 @@
+import pytest
+
+import result_cache
+from param_gen import ConfigParams
+from result_cache import CachedScenario, ResultCache, workload_sequence
+from scenario import RunContext, Scenario, WriteState, execute
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    return clock
+
+
+def test_get_returns_value_and_age(clock):
+    cache = ResultCache(ttl_s=60)
+    assert cache.get("k") is None
+    cache.put("k", "v")
+    clock.now += 2.5
+    assert cache.get("k") == ("v", 2.5)
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == 1 and cache.get("c")[0] == 3
+    assert cache.evicted == 1
+
+
+def test_put_existing_key_refreshes_value_and_tags(clock):
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1, [("month", (2024, 1))])
+    cache.put("a", 2, [("carrier", "XX")])
+    assert cache.invalidate([("month", (2024, 1))]) == 0
+    assert cache.get("a")[0] == 2
+    assert cache.invalidate([("carrier", "XX")]) == 1
+    assert cache.evicted == 0
+
+
+def test_ttl_expires_entries(clock):
+    cache = ResultCache(ttl_s=10)
+    cache.put("k", "v")
+    clock.now += 10
+    assert cache.get("k") is not None
+    clock.now += 0.01
+    assert cache.get("k") is None
+    assert cache.expired == 1
+    # wygasły wpis jest usunięty, a nie tylko pominięty
+    clock.now -= 5
+    assert cache.get("k") is None and cache.expired == 1
+
+
+def test_invalidate_drops_entries_with_any_given_tag(clock):
+    cache = ResultCache()
+    jan, feb = ("month", (2024, 1)), ("month", (2024, 2))
+    cache.put("top_jan", "x", [jan])
+    cache.put("rank_jan", "y", [jan])
+    cache.put("top_feb", "z", [feb])
+    cache.put("carrier_xx", "w", [("carrier", "XX")])
+
+    assert cache.invalidate([jan, ("carrier", "XX"), ("carrier", "YY")]) == 3
+    assert cache.invalidated == 3
+    assert [k for k in ("top_jan", "rank_jan", "top_feb", "carrier_xx") if cache.get(k)] == ["top_feb"]
+    assert cache.invalidate([jan]) == 0
+
+
+class CountingScenario(Scenario):
+    name = "fake_top_routes_month"
+
+    def __init__(self):
+        self.runs = 0
+        self.answer = "rows=1"
+
+    def run(self, ctx):
+        self.runs += 1
+        return self.answer
+
+
+def _ctx(cfg, iteration):
+    return RunContext(cfg=cfg, db="fake", label="fake", dataset_name="100", iteration=iteration,
+                      state=WriteState(), scenario=CountingScenario.name, gen=ConfigParams(cfg))
+
+
+def test_cached_scenario_serves_hits_and_verifies_them(clock):
+    cfg = {"queries": {"airlines_ranking": {"months": [1, 2]}, "top_routes_month": {"month": "2024-01"}}}
+    inner = CountingScenario()
+    cached = CachedScenario(inner, ResultCache())
+
+    notes = [execute(cached, _ctx(cfg, i))[1] for i in (1, 2, 3)]
+    assert notes == ["rows=1"] * 3
+    # miesiące 1, 2, 1: dwa chybienia (mierzone) + weryfikacja trafienia w cleanup()
+    assert inner.runs == 3
+    assert (cached.cache.hits, cached.cache.misses) == (1, 2)
+
+    inner.answer = "rows=2"
+    ctx = _ctx(cfg, 3)
+    assert execute(cached, ctx)[1] == "rows=1"
+    assert ctx.params["stale"] is True
+    assert ctx.params["cache_key"] == ("fake", "fake_top_routes_month", (2024, 1))
+
+
+class PipelineVariant(CountingScenario):
+    name = "fake_top_routes_month_pipeline"
+    param_op = "top_routes_month"
+
+
+def test_param_op_variant_shares_parameters_but_not_cache_entries(clock):
+    cfg = {"queries": {"airlines_ranking": {"months": [1, 2, 3]}, "top_routes_month": {"month": "2024-01"}}}
+    cache = ResultCache()
+    base, variant = CachedScenario(CountingScenario(), cache), CachedScenario(PipelineVariant(), cache)
+
+    base_ctx = _ctx(cfg, 2)
+    variant_ctx = _ctx(cfg, 2)
+    variant_ctx.scenario, variant_ctx.param_op = variant.name, variant.param_op
+    execute(base, base_ctx)
+    execute(variant, variant_ctx)
+
+    assert variant_ctx.op == "top_routes_month"
+    assert variant_ctx.params["cache_key"][2] == base_ctx.params["cache_key"][2] == (2024, 2)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_workload_sequence_is_seeded_and_alternates_writes():
+    c_cfg = {"seed": 7, "ops": 500, "write_ratio": 0.2}
+    ops = workload_sequence(c_cfg, ["top_routes_month", "rank_punctual_airlines"], ["add_flight", "add_flight_stats"])
+    assert ops == workload_sequence(c_cfg, ["top_routes_month", "rank_punctual_airlines"],
+                                    ["add_flight", "add_flight_stats"])
+    writes = [op for op in ops if op.startswith("add_")]
+    assert writes[:4] == ["add_flight", "add_flight_stats", "add_flight", "add_flight_stats"]
+    assert len(writes) / len(ops) == pytest.approx(0.2, abs=0.05)
+    assert workload_sequence(c_cfg, ["top_routes_month"], []) == ["top_routes_month"] * 500
@@ -0,0 +1,72 @@
+import pytest
+
+import bench_common
+from scenario import RunContext, Scenario, WriteState, execute, run_scenarios
+
+
+@pytest.fixture(autouse=True)
+def no_hooks():
+    bench_common.clear_scenario_hooks()
+    yield
+    bench_common.clear_scenario_hooks()
+
+
+class Recording(Scenario):
+    name = "fake_top_routes_month"
+
+    def __init__(self, log):
+        self.log = log
+
+    def probe(self, ctx):
+        self.log.append("start scenario")
+
+        def finish():
+            self.log.append("finish scenario")
+            ctx.note += ", traffic=1"
+            return {}
+
+        return finish
+
+    def run(self, ctx):
+        self.log.append("run")
+        return "rows=1"
+
+
+def _probe(log, name, innermost=False):
+    def probe(ctx):
+        log.append(f"start {name}")
+
+        def finish():
+            log.append(f"finish {name}")
+            return {name: 1}
+
+        return finish
+
+    bench_common.add_run_probe(probe, innermost=innermost)
+
+
+def test_scenario_probe_runs_between_global_and_innermost_probes():
+    log = []
+    _probe(log, "profiling", innermost=True)
+    _probe(log, "metrics")
+    ctx = RunContext(cfg={}, db="fake", label="fake", dataset_name="100", iteration=1, state=WriteState(),
+                     scenario=Recording.name)
+
+    assert execute(Recording(log), ctx)[1] == "rows=1, traffic=1"
+    assert log == ["start metrics", "start scenario", "start profiling", "run",
+                   "finish profiling", "finish scenario", "finish metrics"]
+    assert ctx.tags == {"profiling": 1, "metrics": 1}
+
+
+def test_warmup_runs_skip_probes(results_csv):
+    log = []
+    _probe(log, "profiling", innermost=True)
+    bench_common.add_before_scenario_hook(lambda db, scenario, repeat, run: run() if repeat == 1 else None)
+
+    run_scenarios("fake", [Recording(log)], {"repeats": 2, "params": {"mode": "config"}}, "100")
+
+    # rozgrzewka przed powtórzeniem 1 bez żadnej sondy, oba mierzone powtórzenia z sondami
+    assert log == ["run"] + ["start scenario", "start profiling", "run", "finish profiling", "finish scenario"] * 2
+    with open(results_csv) as f:
+        rows = f.read().splitlines()
+    assert len(rows) == 2 and all("profiling=1" in r and "traffic=1" in r for r in rows)